@@ -2,12 +2,16 @@
 cross_reference_crud.py
 =======================
 """
+import base64
+import binascii
+import json
 import os
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import Any, Iterator, List, Dict, Optional
 
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import or_, and_, text
+from sqlalchemy import or_, and_, text, exists
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, subqueryload
 
@@ -21,6 +25,75 @@ from agr_literature_service.api import resource_descriptor_cache
 from agr_literature_service.api.crud.user_utils import map_to_user_id
 
 
+def encode_external_ids_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_external_ids_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))["after"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid cursor {cursor}")
+
+
+def stream_external_ids_by_keyset(db: Session, owner_model, cursor: Optional[str] = None,
+                                  since: Optional[datetime] = None, chunk_size: int = 5000) -> Iterator[str]:
+    """
+    Resumable variant of the bulk external-id streams, shared by references
+    and resources (owner_model is ReferenceModel or ResourceModel).
+
+    Emits NDJSON, one {"curie", "cross_references", "cursor"} object per
+    owner in id order. Rows are read in keyset chunks (id > last id) each in
+    its own short transaction, so no snapshot is held for the whole download.
+    A client that loses the connection passes the cursor of the last line it
+    received to continue where it stopped. since limits the output to owners
+    whose row or one of whose cross references was updated at or after it.
+
+    The cursor is decoded (and rejected with a 400) before the generator is
+    returned, so errors surface as a normal HTTP response.
+    """
+    last_id = decode_external_ids_cursor(cursor)
+    owner_id_column = getattr(owner_model, f"{owner_model.__tablename__}_id")
+    xref_owner_column = getattr(CrossReferenceModel, f"{owner_model.__tablename__}_id")
+
+    def generate():
+        nonlocal last_id
+        try:
+            while True:
+                query = db.query(owner_id_column, owner_model.curie).filter(owner_id_column > last_id)
+                if since is not None:
+                    query = query.filter(or_(
+                        owner_model.date_updated >= since,
+                        exists().where(and_(xref_owner_column == owner_id_column,
+                                            CrossReferenceModel.date_updated >= since))))
+                owners = query.order_by(owner_id_column).limit(chunk_size).all()
+                if not owners:
+                    break
+                xrefs: Dict[int, List[Dict[str, Any]]] = {}
+                for owner_id, xref_curie, is_obsolete in db.query(
+                        xref_owner_column, CrossReferenceModel.curie, CrossReferenceModel.is_obsolete).filter(
+                        xref_owner_column.in_([owner_id for owner_id, _ in owners])).order_by(
+                        xref_owner_column, CrossReferenceModel.cross_reference_id):
+                    xrefs.setdefault(owner_id, []).append({"curie": xref_curie, "is_obsolete": is_obsolete})
+                # end the read transaction before handing the chunk to the client
+                db.commit()
+                for owner_id, owner_curie in owners:
+                    yield json.dumps({"curie": owner_curie,
+                                      "cross_references": xrefs.get(owner_id, []),
+                                      "cursor": encode_external_ids_cursor(owner_id)}) + "\n"
+                last_id = owners[-1][0]
+                if len(owners) < chunk_size:
+                    break
+        finally:
+            db.close()
+
+    return generate()
+
+
 def set_curie_prefix(xref_db_obj: CrossReferenceModel):
     xref_db_obj.curie_prefix = xref_db_obj.curie.split(":")[0]
 
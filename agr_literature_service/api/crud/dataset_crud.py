@@ -1,5 +1,6 @@
+import json
 from collections import defaultdict
-from typing import Dict, List
+from typing import Any, Dict, Iterator, List
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -124,6 +125,104 @@ def download_dataset(db: Session, mod_abbreviation: str, data_type: str,
     )
 
 
+def _dataset_download_metadata(dataset: DatasetModel) -> Dict:
+    return {
+        "dataset_id": dataset.dataset_id,
+        "title": dataset.title,
+        "mod_abbreviation": dataset.mod.abbreviation,
+        "data_type": dataset.data_type,
+        "dataset_type": dataset.dataset_type,
+        "description": dataset.description,
+        "date_created": str(dataset.date_created),
+        "date_updated": str(dataset.date_updated),
+        "created_by": dataset.created_by,
+        "updated_by": dataset.updated_by
+    }
+
+
+def _iter_dataset_set(db: Session, dataset_id: int, dataset_type: str, training: bool,
+                      batch_size: int):
+    """
+    Yield (reference_curie, value) for one half of a dataset, reading the
+    entries through a server-side cursor ordered by reference curie. value is
+    the classification value for document datasets (last entry wins, as in
+    download_dataset) and the list of entities for entity datasets.
+    """
+    query = db.query(DatasetEntryModel.reference_curie,
+                     DatasetEntryModel.entity,
+                     DatasetEntryModel.classification_value).filter(
+        DatasetEntryModel.dataset_id == dataset_id)
+    if training:
+        query = query.filter(DatasetEntryModel.set_type == "training")
+    elif dataset_type == "document":
+        query = query.filter(DatasetEntryModel.set_type == "testing")
+    else:
+        query = query.filter(DatasetEntryModel.set_type != "training")
+    rows = query.order_by(DatasetEntryModel.reference_curie,
+                          DatasetEntryModel.dataset_entry_id).yield_per(batch_size)
+
+    current_curie = None
+    current_value: Any = None
+    for reference_curie, entity, classification_value in rows:
+        reference_curie = str(reference_curie)
+        if reference_curie != current_curie:
+            if current_curie is not None:
+                yield current_curie, current_value
+            current_curie = reference_curie
+            current_value = [] if dataset_type == "entity" else None
+        if dataset_type == "entity":
+            current_value.append(str(entity))
+        else:
+            current_value = classification_value
+    if current_curie is not None:
+        yield current_curie, current_value
+
+
+def stream_dataset_download(db: Session, mod_abbreviation: str, data_type: str, dataset_type: str,
+                            version: int = None, output_format: str = "json",
+                            batch_size: int = 5000) -> Iterator[str]:
+    """
+    Streaming counterpart of download_dataset for large training sets.
+
+    "json" emits exactly the download_dataset payload, written incrementally;
+    "ndjson" emits the dataset metadata on the first line followed by one
+    {"set_type", "reference_curie", "value"} object per line. The dataset
+    lookup (and its 404) happens before the first chunk is produced; entries
+    are then read in batches through a server-side cursor so the worker never
+    holds the whole dataset in memory.
+    """
+    if dataset_type not in ("document", "entity"):
+        raise HTTPException(status_code=422, detail="Invalid dataset type")
+    if output_format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="output_format must be json or ndjson")
+    dataset = get_dataset(db, mod_abbreviation, data_type, dataset_type, version)
+    metadata = _dataset_download_metadata(dataset)
+    dataset_id = dataset.dataset_id
+
+    def generate():
+        try:
+            if output_format == "ndjson":
+                yield json.dumps(metadata) + "\n"
+                for set_type, training in (("training", True), ("testing", False)):
+                    for curie, value in _iter_dataset_set(db, dataset_id, dataset_type, training, batch_size):
+                        yield json.dumps({"set_type": set_type, "reference_curie": curie,
+                                          "value": value}) + "\n"
+                return
+            yield json.dumps(metadata)[:-1]
+            for key, training in (("data_training", True), ("data_testing", False)):
+                yield ', "' + key + '": {'
+                first = True
+                for curie, value in _iter_dataset_set(db, dataset_id, dataset_type, training, batch_size):
+                    yield ("" if first else ", ") + json.dumps(curie) + ": " + json.dumps(value)
+                    first = False
+                yield "}"
+            yield "}"
+        finally:
+            db.close()
+
+    return generate()
+
+
 def check_either_tet_or_workflow_tag_id_provided(topic_entity_tag_id, workflow_tag_id):
     if topic_entity_tag_id is not None and workflow_tag_id is not None:
         raise HTTPException(status_code=400,
@@ -2,8 +2,9 @@ import hashlib
 from typing import Dict, List, Optional, Set
 
 from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 from agr_literature_service.api.crud.referencefile_crud import file_upload_single
 from agr_literature_service.api.crud.referencefile_utils import remove_from_s3_and_db
@@ -15,6 +16,17 @@ from agr_literature_service.api.models import (
     ReferencefileModel,
 )
 from agr_literature_service.api.schemas.embedding_file_schemas import EmbeddingFileSchemaCreate
+from agr_literature_service.lit_processing.embedding.embedding_index import get_embedding_index, \
+    mark_embedding_index_stale
+
+# mod_corpus_association.corpus value of each corpus filter of similar_references
+CORPUS_FILTERS = {"inside_corpus": "mca.corpus IS TRUE",
+                  "needs_review": "mca.corpus IS NULL",
+                  "outside_corpus": "mca.corpus IS FALSE"}
+# nearest neighbours fetched per wanted result before the MOD/corpus filter;
+# widened (up to SIMILAR_MAX_CANDIDATES) when too few pass it
+SIMILAR_OVERSAMPLE = 4
+SIMILAR_MAX_CANDIDATES = 10000
 
 
 def _find_existing(db: Session, reference_id: int,
@@ -120,7 +132,8 @@ def create_or_update(db: Session, request: EmbeddingFileSchemaCreate,
     parquet actually changes the superseded one is deleted so it does not leak
     in DB/S3 or surface as a bare embedding in show_all. Concurrency-safe: a
     lost insert race falls back to re-pointing the winner's row rather than
-    500-ing.
+    500-ing. The local embedding index of this process is marked stale so it
+    picks the new parquet up on its next use.
     """
     reference = get_reference(db=db, curie_or_reference_id=request.reference_curie)
 
@@ -163,6 +176,7 @@ def create_or_update(db: Session, request: EmbeddingFileSchemaCreate,
         # file of the same reference: never rewrite access on unrelated files.
         _sync_parquet_access(db, parquet_rf, access_mods)
 
+    mark_embedding_index_stale()
     existing = _find_existing(db, reference.reference_id, request)
     if existing is not None:
         return _repoint_existing(db, existing, request, parquet_rf)
@@ -282,3 +296,66 @@ def get_embeddings_for_sources(
     for r in rows:
         result.setdefault(int(r.source_referencefile_id), []).append(r)
     return result
+
+
+def _filter_by_corpus(db: Session, reference_ids: List[int], mod_abbreviation: Optional[str],
+                      corpus: Optional[str]) -> Set[int]:
+    """The ``reference_ids`` with a mod_corpus_association matching the MOD
+    and corpus filters."""
+    conditions = ["mca.reference_id = ANY(:reference_ids)"]
+    params: Dict = {"reference_ids": reference_ids}
+    if mod_abbreviation is not None:
+        conditions.append("m.abbreviation = :mod_abbreviation")
+        params["mod_abbreviation"] = mod_abbreviation
+    if corpus is not None:
+        conditions.append(CORPUS_FILTERS[corpus])
+    rows = db.execute(text(
+        "SELECT DISTINCT mca.reference_id FROM mod_corpus_association mca "
+        "JOIN mod m ON m.mod_id = mca.mod_id "
+        f"WHERE {' AND '.join(conditions)}"), params).fetchall()
+    return {int(row[0]) for row in rows}
+
+
+def similar_references(db: Session, curie_or_reference_id: str, limit: int = 10,
+                       mod_abbreviation: Optional[str] = None, corpus: Optional[str] = None,
+                       exact: bool = False) -> List[Dict]:
+    """The ``limit`` references whose classifier embedding is closest (cosine)
+    to this reference's, best first, optionally only those associated with
+    ``mod_abbreviation`` and/or with a corpus status (inside_corpus,
+    needs_review, outside_corpus). Served from the local embedding index
+    (EMBEDDING_INDEX_DIR) as last loaded, which a background thread keeps
+    refreshing; approximate unless ``exact``."""
+    if corpus is not None and corpus not in CORPUS_FILTERS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"corpus must be one of {', '.join(CORPUS_FILTERS)}")
+    index = get_embedding_index()
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="The embedding similarity index is not configured")
+    reference = get_reference(db=db, curie_or_reference_id=curie_or_reference_id)
+    index.start_background_refresh(sessionmaker(bind=db.get_bind()))
+
+    filtered = mod_abbreviation is not None or corpus is not None
+    k = limit * SIMILAR_OVERSAMPLE if filtered else limit
+    while True:
+        candidates = index.search(reference.reference_id, k=k, exact=exact)
+        if candidates is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"No embedding is indexed for {reference.curie}")
+        hits = candidates
+        if filtered and candidates:
+            allowed = _filter_by_corpus(db, [reference_id for reference_id, _ in candidates],
+                                        mod_abbreviation, corpus)
+            hits = [hit for hit in candidates if hit[0] in allowed]
+        if len(hits) >= limit or len(candidates) < k or k >= SIMILAR_MAX_CANDIDATES:
+            break
+        k = min(k * SIMILAR_OVERSAMPLE, SIMILAR_MAX_CANDIDATES)
+    hits = hits[:limit]
+
+    rows = db.execute(text(
+        "SELECT reference_id, curie, title FROM reference WHERE reference_id = ANY(:reference_ids)"),
+        {"reference_ids": [reference_id for reference_id, _ in hits]}).fetchall() if hits else []
+    references = {int(row[0]): row for row in rows}
+    return [{"curie": references[reference_id][1], "title": references[reference_id][2],
+             "similarity": round(similarity, 6)}
+            for reference_id, similarity in hits if reference_id in references]
@@ -27,6 +27,7 @@ from agr_literature_service.api.crud.referencefile_utils import remove_from_s3_a
 from agr_literature_service.api.models import ReferenceModel, ReferencefileModel
 from agr_literature_service.api.utils.conversion_job_manager import ConversionJob, conversion_manager
 from agr_literature_service.api.utils.conversion_processor import run_conversion_job
+from agr_literature_service.api.utils.job_queue import job_queue_enabled
 from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import (
     PendingMainSource,
     get_nxml_referencefile,
@@ -910,13 +911,22 @@ def handle_conversion_request(db: Session, curie_or_reference_id: str, wait: boo
         user_id=user_id,
         expected_source_files=_expected_source_files_from_assessment(assessment),
     )
-    background_tasks.add_task(
-        run_conversion_job,
-        job.job_id,
-        reference.reference_id,
-        reference.curie,
-        overwrite_tei_md,
-    )
+    # With a job worker pool deployed the conversion runs there (and is
+    # requeued if its worker dies); otherwise, or if queueing fails, it runs
+    # after the response in this process.
+    queued = job_queue_enabled() and conversion_manager.enqueue(job.job_id, {
+        "reference_id": reference.reference_id,
+        "reference_curie": reference.curie,
+        "overwrite_tei_md": overwrite_tei_md,
+    })
+    if not queued:
+        background_tasks.add_task(
+            run_conversion_job,
+            job.job_id,
+            reference.reference_id,
+            reference.curie,
+            overwrite_tei_md,
+        )
     return status.HTTP_202_ACCEPTED, _status_payload(
         db, reference, status_str=STATUS_RUNNING,
         converted_classes=_converted_classes_from_assessment(assessment),
@@ -5,7 +5,6 @@ import shutil
 import tempfile
 from typing import Optional
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session, joinedload
@@ -21,9 +20,8 @@ from agr_literature_service.api.schemas.ml_model_schemas import (
     MLModelSchemaShow,
     MLModelSchemaShowWithNames,
 )
-from agr_literature_service.lit_processing.utils.s3_utils import download_file_from_s3
+from agr_literature_service.lit_processing.utils.s3_utils import download_file_from_s3, get_s3_client
 
-s3_client = boto3.client('s3')
 logger = logging.getLogger(__name__)
 
 
@@ -104,7 +102,7 @@ def upload(db: Session, request: MLModelSchemaPost, file: UploadFile):
     with gzip.open(temp_file_name, 'wb') as f_out:
         shutil.copyfileobj(file.file, f_out)
     with open(temp_file_name, 'rb') as gzipped_file:
-        upload_file_to_bucket(s3_client=s3_client, file_obj=gzipped_file, bucket="agr-literature", folder=folder,
+        upload_file_to_bucket(s3_client=get_s3_client(), file_obj=gzipped_file, bucket="agr-literature", folder=folder,
                               object_name=str(request.version_num) + ".gz", ExtraArgs=extra_args)
     os.remove(temp_file_name)
     return get_model_schema_from_orm(new_model)
@@ -116,7 +114,7 @@ def destroy(db: Session, ml_model_id: int):
         folder = get_ml_model_s3_folder(model.task_type, model.mod.abbreviation, model.topic)
         object_key = f"{folder}/{str(model.version_num)}.gz"
         # Delete the file from S3
-        s3_client.delete_object(Bucket='agr-literature', Key=object_key)
+        get_s3_client().delete_object(Bucket='agr-literature', Key=object_key)
         # Do not delete the model from the database
         # Might be needed for TET references
         # Deleting the bucket file itself should be enough
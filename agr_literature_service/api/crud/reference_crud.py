@@ -791,6 +791,21 @@ def stream_all_references_external_ids(db: Session):
     yield "]"
 
 
+def stream_references_external_ids_resumable(db: Session, cursor: Optional[str] = None,
+                                             since: Optional[datetime] = None):
+    """
+    NDJSON, keyset-paginated and resumable version of
+    stream_all_references_external_ids; see
+    cross_reference_crud.stream_external_ids_by_keyset.
+
+    :param db:
+    :param cursor: cursor of the last reference already received, None to start from the beginning
+    :param since: only references (or their cross references) updated at or after this time
+    :return: a generator of NDJSON lines
+    """
+    return cross_reference_crud.stream_external_ids_by_keyset(db, ReferenceModel, cursor=cursor, since=since)
+
+
 def show(db: Session, curie_or_reference_id: str):  # noqa
     """
 
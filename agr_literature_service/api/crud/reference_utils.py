@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, Iterable, List
 
 from fastapi import HTTPException, status
 from sqlalchemy import or_, text
@@ -164,3 +164,29 @@ def normalize_reference_curie(db: Session, curie: str):
             )
         curie = agrkb_curie
     return curie
+
+
+def normalize_reference_curies(db: Session, curies: Iterable[str]) -> Dict[str, str]:
+    """
+    Batch form of normalize_reference_curie: map each curie to its AGRKB:
+    curie with one query. AGRKB: curies map to themselves; XREFs that are
+    not in the cross_reference table are left out of the result.
+    """
+    curies = list(curies)
+    normalized = {curie: curie for curie in curies if curie.startswith("AGRKB:")}
+    xrefs = sorted({curie for curie in curies if not curie.startswith("AGRKB:")})
+    if xrefs:
+        rows = db.execute(
+            text("""
+                SELECT cr.curie AS xref, r.curie
+                FROM reference AS r
+                JOIN cross_reference AS cr
+                  ON r.reference_id = cr.reference_id
+                WHERE cr.is_obsolete IS FALSE
+                  AND cr.curie = ANY(:xrefs)
+            """),
+            {"xrefs": xrefs}
+        ).mappings().all()
+        for row in rows:
+            normalized.setdefault(row["xref"], row["curie"])
+    return normalized
@@ -1,5 +1,4 @@
 import copy
-import gzip
 import hashlib
 import logging
 import os
@@ -7,19 +6,18 @@ import shutil
 import tarfile
 import tempfile
 from itertools import count
+from urllib.parse import quote
 from typing import List, Optional, Union
 
-import boto3  # type: ignore
 from fastapi import HTTPException, status, UploadFile
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import and_, or_, text, select
 from sqlalchemy.orm import Session, subqueryload, joinedload
-from starlette.background import BackgroundTask
-from starlette.responses import FileResponse
+from starlette.responses import FileResponse, StreamingResponse
 
 from agr_literature_service.api.crud.reference_utils import get_reference
 from agr_literature_service.api.crud.referencefile_utils import read_referencefile_db_obj, \
-    get_s3_folder_from_md5sum, remove_from_s3_and_db
+    get_s3_folder_from_md5sum, remove_from_s3_and_db, fetch_referencefile_content
 from agr_literature_service.api.crud.referencefile_mod_utils import create as create_mod_connection, \
     destroy as destroy_mod_association
 from agr_literature_service.api.crud.workflow_tag_crud import get_current_workflow_status, \
@@ -30,15 +28,18 @@ from agr_literature_service.api.crud.topic_entity_tag_utils import delete_non_ma
 from agr_literature_service.api.models import ReferenceModel, ReferencefileModel, \
     ReferencefileModAssociationModel, ModModel, CopyrightLicenseModel, EmbeddingFileModel
 from agr_cognito_py import ModAccess, MOD_ACCESS_ABBR
-from agr_literature_service.api.s3.upload import upload_file_to_bucket
+from agr_literature_service.api.s3.download import STREAM_CHUNK_SIZE, iter_gunzipped_object
+from agr_literature_service.api.s3.referencefile_cache import get_referencefile_cache
 from agr_literature_service.api.schemas.referencefile_mod_schemas import ReferencefileModSchemaPost
 from agr_literature_service.api.schemas.referencefile_schemas import ReferencefileSchemaPost, \
     ReferencefileSchemaRelated, ReferencefileSchemaUpdate
 from agr_literature_service.api.schemas.workflow_tag_schemas import WorkflowTagSchemaPost
 from agr_literature_service.api.schemas.response_message_schemas import messageEnum
-from agr_literature_service.lit_processing.utils.s3_utils import download_file_from_s3
+from agr_literature_service.lit_processing.utils.s3_utils import STREAM_READ_SIZE, get_s3_client, \
+    upload_stream_to_s3
 from agr_literature_service.api.crud.reference_utils import normalize_reference_curie
 from agr_literature_service.api.crud.user_utils import map_to_user_id
+from agr_literature_service.api.util.streaming import iter_tar_stream
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,9 @@ file_upload_in_progress_tag_atp_id = "ATP:0000139"
 file_needed_tag_atp_id = "ATP:0000141"
 text_conversion_process_atp_id = "ATP:0000161"
 
+# supplemental files fetched from s3 ahead of the tar writer
+TARBALL_FETCH_WORKERS = 4
+
 
 # TRANSIENT (SCRUM-6246 figure-metadata backfill): a one-off process may flip
 # this so file_upload() persists *auxiliary* files (e.g. the figure-metadata
@@ -805,13 +809,17 @@ def find_first_available_display_name(display_name: str, file_extension: str, re
     return display_name
 
 
-def file_upload_single(db: Session, metadata: dict, file: UploadFile):  # pragma: no cover
-    mod_abbreviation = metadata["mod_abbreviation"] if "mod_abbreviation" in metadata else None
-    file.file.seek(0)
+def get_md5sum(fileobj) -> str:
+    fileobj.seek(0)
     md5sum_hash = hashlib.md5()
-    for byte_block in iter(lambda: file.file.read(4096), b""):
+    for byte_block in iter(lambda: fileobj.read(STREAM_READ_SIZE), b""):
         md5sum_hash.update(byte_block)
-    md5sum = md5sum_hash.hexdigest()
+    return md5sum_hash.hexdigest()
+
+
+def file_upload_single(db: Session, metadata: dict, file: UploadFile):  # pragma: no cover
+    mod_abbreviation = metadata["mod_abbreviation"] if "mod_abbreviation" in metadata else None
+    md5sum = get_md5sum(file.file)
     folder = get_s3_folder_from_md5sum(md5sum)
     referencefile_instance: ReferencefileModel = db.query(ReferencefileModel).filter(
         and_(
@@ -855,56 +863,89 @@ def file_upload_single(db: Session, metadata: dict, file: UploadFile):  # pragma
         # check if md5sum is the only one in the db before uploading to s3
         ref_file_by_md5sum_count = db.query(ReferencefileModel).filter(ReferencefileModel.md5sum == md5sum).count()
         if ref_file_by_md5sum_count == 1:
+            # gzip and multipart-upload in one streaming pass, nothing is
+            # written to local disk
             file.file.seek(0)
-            temp_file_name = metadata["display_name"] + "." + metadata["file_extension"] + ".gz"
-            with gzip.open(temp_file_name, 'wb') as f_out:
-                shutil.copyfileobj(file.file, f_out)
-            client = boto3.client('s3')
             env_state = os.environ.get("ENV_STATE", "")
-            extra_args = {'StorageClass': 'GLACIER_IR'} if env_state == "prod" else {'StorageClass': 'STANDARD'}
-            with open(temp_file_name, 'rb') as gzipped_file:
-                upload_file_to_bucket(s3_client=client, file_obj=gzipped_file, bucket="agr-literature", folder=folder,
-                                      object_name=md5sum + ".gz", ExtraArgs=extra_args)
-            os.remove(temp_file_name)
+            storage_class = 'GLACIER_IR' if env_state == "prod" else 'STANDARD'
+            if not upload_stream_to_s3(file.file, "agr-literature", folder + "/" + md5sum + ".gz", compress=True,
+                                       storage_class=storage_class):
+                logger.error(f"Failed to upload {md5sum}.gz for referencefile {new_referencefile_id}")
     return referencefile_instance
 
 
+def _user_can_download(referencefile: ReferencefileModel, mod_access: ModAccess) -> bool:
+    if referencefile.reference.copyright_license and referencefile.reference.copyright_license.open_access:
+        return True
+    if mod_access != ModAccess.NO_ACCESS:
+        if mod_access == ModAccess.ALL_ACCESS or any(
+                ref_file_mod.mod.abbreviation == MOD_ACCESS_ABBR[mod_access] if ref_file_mod.mod is not None else
+                True for ref_file_mod in referencefile.referencefile_mods):
+            return True
+    return False
+
+
+def _content_disposition(filename: str) -> str:
+    # same header FileResponse builds for its filename argument
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"attachment; filename*=utf-8''{quoted_filename}"
+    return f'attachment; filename="{filename}"'
+
+
 def download_file(db: Session, referencefile_id: int, mod_access: ModAccess,  # pragma: no cover
-                  use_in_api: bool = True):  # pragma: no cover
+                  use_in_api: bool = True, accept_gzip: bool = False):  # pragma: no cover
+    """
+    Stream a referencefile from S3 without temporary files.
+
+    For the API the gzipped object is decompressed on the fly into a
+    chunked StreamingResponse, or, when the client accepts it, the stored
+    gzip is passed through with Content-Encoding: gzip. With
+    use_in_api=False the uncompressed content is returned as bytes.
+
+    The uncompressed size of a stored object is unknown without
+    decompressing it, so S3 downloads have no Content-Length and ignore
+    Range headers (a range would mean decompressing from byte 0 anyway):
+    the whole file is sent with a 200.
+
+    When the local referencefile cache is enabled a verified cached copy is
+    served from disk, with Range support, and a full download that misses
+    the cache fills it (the gzip pass-through is skipped then, so browsers
+    populate it too).
+    """
     referencefile = read_referencefile_db_obj(db, referencefile_id)
 
-    user_permission = False
-    if referencefile.reference.copyright_license:
-        user_permission = referencefile.reference.copyright_license.open_access
-
-    if user_permission is False:
-        if mod_access != ModAccess.NO_ACCESS:
-            if mod_access == ModAccess.ALL_ACCESS or any(
-                    ref_file_mod.mod.abbreviation == MOD_ACCESS_ABBR[mod_access] if ref_file_mod.mod is not None else
-                    True for ref_file_mod in referencefile.referencefile_mods):
-                user_permission = True
-
-    if user_permission is True:
-        md5sum = referencefile.md5sum
-        display_name = referencefile.display_name + "." + referencefile.file_extension
-        folder = get_s3_folder_from_md5sum(md5sum)
-        object_name = folder + "/" + md5sum + ".gz"
-        download_file_from_s3(md5sum + ".gz", bucketname="agr-literature", s3_file_location=object_name)
-        with gzip.open(md5sum + ".gz", 'rb') as f_in, open(display_name, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
-        os.remove(md5sum + ".gz")
-        if use_in_api:
-            return FileResponse(path=display_name, filename=display_name, media_type="application/octet-stream",
-                                background=BackgroundTask(cleanup, display_name))
-        else:
-            with open(display_name, 'rb') as file:
-                file_content = file.read()
-            os.remove(display_name)
-            return file_content
-
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                        detail="The current user does not have permissions to get the requested file url. "
-                               "The associated paper is not available for free access.")
+    if not _user_can_download(referencefile, mod_access):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="The current user does not have permissions to get the requested file url. "
+                                   "The associated paper is not available for free access.")
+
+    md5sum = referencefile.md5sum
+    display_name = referencefile.display_name + "." + referencefile.file_extension
+    object_name = get_s3_folder_from_md5sum(md5sum) + "/" + md5sum + ".gz"
+    client = get_s3_client()
+
+    if not use_in_api:
+        return fetch_referencefile_content(md5sum, client)
+
+    cache = get_referencefile_cache()
+    cached_path = cache.get_path(md5sum) if cache is not None else None
+    if cached_path is not None:
+        # FileResponse answers Range requests itself
+        return FileResponse(path=cached_path, filename=display_name, media_type="application/octet-stream")
+
+    headers = {"Content-Disposition": _content_disposition(display_name), "Accept-Ranges": "none"}
+    s3_object = client.get_object(Bucket="agr-literature", Key=object_name)
+    if accept_gzip and cache is None:
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding",
+                        "Content-Length": str(s3_object['ContentLength'])})
+        return StreamingResponse(s3_object['Body'].iter_chunks(STREAM_CHUNK_SIZE),
+                                 media_type="application/octet-stream", headers=headers)
+
+    chunks = iter_gunzipped_object(s3_object['Body'])
+    if cache is not None:
+        chunks = cache.iter_and_cache(md5sum, chunks)
+    return StreamingResponse(chunks, media_type="application/octet-stream", headers=headers)
 
 
 def cleanup(file_path):
@@ -939,21 +980,13 @@ def download_additional_files_tarball(db: Session, reference_id, mod_access: Mod
         )
     ).all()
 
-    tar_file_path = ref_curie.replace(":", "_") + "_additional_files.tar.gz"
-    os.makedirs("tarball_tmp", exist_ok=True)
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        for referencefile in all_referencefile_supp:
-            md5sum = referencefile.md5sum
-            folder = get_s3_folder_from_md5sum(md5sum)
-            object_name = folder + "/" + md5sum + ".gz"
-            tmp_file_gz_path = "tarball_tmp/" + referencefile.display_name + ".gz"
-            tmp_file_name = referencefile.display_name + "." + referencefile.file_extension
-            tmp_file_path = "tarball_tmp/" + tmp_file_name
-            download_file_from_s3(tmp_file_gz_path, "agr-literature", object_name)
-            with gzip.open(tmp_file_gz_path, 'rb') as f_in, open(tmp_file_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-            tar.add(tmp_file_path, arcname=tmp_file_name)
-            os.remove(tmp_file_path)
-    shutil.rmtree("tarball_tmp")
-    return FileResponse(path=tar_file_path, filename=tar_file_path, media_type="application/gzip",
-                        background=BackgroundTask(cleanup, tar_file_path))
+    tar_file_name = ref_curie.replace(":", "_") + "_additional_files.tar.gz"
+    # the archive is assembled while it is sent: S3 objects are fetched and
+    # gunzipped a few at a time and appended to the tar in query order
+    members = [(referencefile.display_name + "." + referencefile.file_extension, referencefile.md5sum)
+               for referencefile in all_referencefile_supp]
+    client = get_s3_client()
+    return StreamingResponse(iter_tar_stream(members, lambda md5sum: fetch_referencefile_content(md5sum, client),
+                                             max_workers=TARBALL_FETCH_WORKERS),
+                             media_type="application/gzip",
+                             headers={"Content-Disposition": _content_disposition(tar_file_name)})
@@ -1,12 +1,14 @@
 import logging
 from os import environ
 
-import boto3
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from agr_literature_service.api.models import ReferencefileModel
 from agr_literature_service.api.s3.delete import delete_file_in_bucket
+from agr_literature_service.api.s3.download import fetch_gunzipped_object
+from agr_literature_service.api.s3.referencefile_cache import get_referencefile_cache
+from agr_literature_service.lit_processing.utils.s3_utils import get_s3_client
 
 
 logger = logging.getLogger(__name__)
@@ -36,9 +38,26 @@ def get_s3_folder_from_md5sum(md5sum: str):
     return folder
 
 
+def fetch_referencefile_content(md5sum: str, s3_client=None) -> bytes:  # pragma: no cover
+    """Uncompressed content of the S3 object stored for md5sum, read through
+    the local referencefile cache when it is enabled."""
+    cache = get_referencefile_cache()
+    if cache is not None:
+        content = cache.get(md5sum)
+        if content is not None:
+            return content
+    if s3_client is None:
+        s3_client = get_s3_client()
+    content = fetch_gunzipped_object(s3_client, "agr-literature",
+                                     get_s3_folder_from_md5sum(md5sum) + "/" + md5sum + ".gz")
+    if cache is not None:
+        cache.put(md5sum, content)
+    return content
+
+
 def remove_file_from_s3(md5sum: str):  # pragma: no cover
     folder = get_s3_folder_from_md5sum(md5sum)
-    client = boto3.client('s3')
+    client = get_s3_client()
     if not delete_file_in_bucket(s3_client=client, bucket="agr-literature", folder=folder, object_name=md5sum + ".gz"):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"File with md5sum {md5sum} is not available")
@@ -5,7 +5,7 @@ resource_crud.py
 
 import json
 from datetime import datetime
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
@@ -124,6 +124,21 @@ def stream_all_resources_external_ids(db: Session):
     yield "]"
 
 
+def stream_resources_external_ids_resumable(db: Session, cursor: Optional[str] = None,
+                                            since: Optional[datetime] = None):
+    """
+    NDJSON, keyset-paginated and resumable version of
+    stream_all_resources_external_ids; see
+    cross_reference_crud.stream_external_ids_by_keyset.
+
+    :param db:
+    :param cursor: cursor of the last resource already received, None to start from the beginning
+    :param since: only resources (or their cross references) updated at or after this time
+    :return: a generator of NDJSON lines
+    """
+    return cross_reference_crud.stream_external_ids_by_keyset(db, ResourceModel, cursor=cursor, since=since)
+
+
 def destroy(db: Session, curie: str):
     """
 
@@ -0,0 +1,362 @@
+"""
+Bulk creation of topic entity tags.
+
+``create_tags_bulk`` applies the rules of ``topic_entity_tag_crud.create_tag``
+to a whole list of tags but does each kind of lookup once for the batch:
+references, sources, ML models and ATP ids are resolved with one query (or
+call) each, duplicates are detected against the existing tags of the
+affected (reference, topic) pairs loaded in one query, new tags are inserted
+in one flush, and validation runs once per affected reference with the
+set-based engine. Every item gets the status code the single-tag endpoint
+would have returned for it (201 created, 200 note appended to an existing
+tag, 404/409/422 with a detail), and one item failing does not fail the
+others.
+"""
+import copy
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from dateutil import parser as date_parser
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from agr_literature_service.api.crud.ateam_db_helpers import atp_return_invalid_ids
+from agr_literature_service.api.crud.topic_entity_tag_crud import add_paper_to_mod_if_not_already, \
+    update_manual_indexing_workflow_tag
+from agr_literature_service.api.crud.topic_entity_tag_utils import add_audited_object_users_if_not_exist, \
+    check_and_set_sgd_display_tag, check_and_set_species
+from agr_literature_service.api.crud.topic_entity_tag_validation import revalidate_references
+from agr_literature_service.api.crud.user_utils import map_to_user_id
+from agr_literature_service.api.models import ReferenceModel, TopicEntityTagModel, TopicEntityTagSourceModel
+from agr_literature_service.api.models.audited_model import disable_set_date_updated_onupdate, \
+    get_default_user_value, impute_audit_user_ids
+from agr_literature_service.api.models.ml_model_model import MLModel
+from agr_literature_service.api.schemas.topic_entity_tag_schemas import TopicEntityTagSchemaPost
+
+logger = logging.getLogger(__name__)
+
+# (reference_id, topic) pairs per duplicate-candidate query
+DUPLICATE_QUERY_BATCH_SIZE = 2000
+
+_DEDUP_EXCLUDED_FIELDS = ('validation_by_author', 'validation_by_professional_biocurator',
+                          'date_created', 'date_updated', 'note')
+
+
+class _Item:
+    """One requested tag on its way through the batch."""
+
+    def __init__(self, index: int, request: TopicEntityTagSchemaPost):
+        self.index = index
+        self.data: Dict[str, Any] = jsonable_encoder(request)
+        self.reference_curie: str = self.data.pop("reference_curie")
+        self.force_insertion = self.data.pop("force_insertion", False)
+        self.index_wft = self.data.pop("index_wft", None)
+        self.source: Optional[TopicEntityTagSourceModel] = None
+        self.status_code: Optional[int] = None
+        self.detail: Any = None
+        self.tag: Optional[TopicEntityTagModel] = None
+        # set when the item was absorbed by an earlier item of the same batch
+        self.absorbed_by: Optional["_Item"] = None
+
+    def fail(self, status_code: int, detail: Any) -> None:
+        self.status_code = status_code
+        self.detail = detail
+
+    @property
+    def pending(self) -> bool:
+        return self.status_code is None
+
+    @property
+    def mod(self) -> Tuple[str, int]:
+        """abbreviation and mod_id of the source's secondary data provider"""
+        assert self.source is not None
+        return self.source.secondary_data_provider.abbreviation, self.source.secondary_data_provider_id
+
+    def result(self) -> Dict[str, Any]:
+        target = self.absorbed_by or self
+        tag_id = target.tag.topic_entity_tag_id if target.tag is not None else None
+        detail = self.detail
+        if isinstance(detail, dict) and "existing_tag_id" in detail:
+            if detail["existing_tag_id"] is None:
+                detail = {**detail, "existing_tag_id": tag_id}
+            tag_id = detail["existing_tag_id"]
+        return {"index": self.index, "status_code": self.status_code,
+                "topic_entity_tag_id": tag_id, "detail": detail}
+
+
+def _resolve_users(db: Session, items: List[_Item]) -> None:
+    resolved: Dict[str, Any] = {}
+    for item in items:
+        try:
+            for field in ("created_by", "updated_by"):
+                value = item.data.get(field)
+                if value is not None:
+                    if value not in resolved:
+                        resolved[value] = map_to_user_id(value, db)
+                    item.data[field] = resolved[value]
+        except HTTPException as e:
+            item.fail(e.status_code, e.detail)
+
+
+def _resolve_references(db: Session, items: List[_Item]) -> None:
+    """Same resolution as get_reference_id_from_curie_or_id, one query per
+    kind of identifier."""
+    curies = {item.reference_curie for item in items if not item.reference_curie.isdigit()}
+    agrkb = [c for c in curies if c.startswith("AGRKB:")]
+    xrefs = [c for c in curies if not c.startswith("AGRKB:")]
+    curie_to_id: Dict[str, int] = {}
+    if agrkb:
+        curie_to_id.update(db.query(ReferenceModel.curie, ReferenceModel.reference_id).filter(
+            ReferenceModel.curie.in_(agrkb)).all())
+    if xrefs:
+        curie_to_id.update(db.execute(text(
+            "SELECT curie, reference_id FROM cross_reference "
+            "WHERE curie = ANY(:curies) AND is_obsolete = False"), {"curies": xrefs}).fetchall())
+    for item in items:
+        curie = item.reference_curie
+        reference_id = int(curie) if curie.isdigit() else curie_to_id.get(curie)
+        if reference_id is None:
+            item.fail(status.HTTP_404_NOT_FOUND,
+                      f"Reference with the reference_id or curie {curie} is not available")
+        else:
+            item.data["reference_id"] = reference_id
+
+
+def _resolve_sources(db: Session, items: List[_Item]) -> None:
+    source_ids = {item.data["topic_entity_tag_source_id"] for item in items}
+    sources = {source.topic_entity_tag_source_id: source for source in db.query(TopicEntityTagSourceModel).options(
+        joinedload(TopicEntityTagSourceModel.secondary_data_provider)).filter(
+        TopicEntityTagSourceModel.topic_entity_tag_source_id.in_(source_ids)).all()}
+    for item in items:
+        item.source = sources.get(item.data["topic_entity_tag_source_id"])
+        if item.source is None:
+            item.fail(status.HTTP_404_NOT_FOUND, "Cannot find the specified source")
+
+
+def _normalize(item: _Item) -> None:
+    """The data provider specific defaults create_tag applies."""
+    data = item.data
+    if data["entity"] is None:
+        data["entity_type"] = None
+    if item.mod[0] == "SGD":
+        check_and_set_sgd_display_tag(data)
+        data['data_novelty'] = 'ATP:0000334' if data['topic'] == data['entity_type'] else 'ATP:0000335'
+    elif data.get('data_novelty') is None:
+        item.fail(status.HTTP_404_NOT_FOUND, "The 'data_novelty' is not passed in")
+    else:
+        check_and_set_species(data)
+
+
+def _check_atp_ids_and_models(db: Session, items: List[_Item]) -> None:
+    def atp_ids(item):
+        return [item.data[field] for field in ('topic', 'entity_type', 'display_tag') if item.data.get(field)]
+
+    invalid = set(atp_return_invalid_ids(sorted({a for item in items for a in atp_ids(item)})))
+    model_ids = {item.data["ml_model_id"] for item in items if item.data.get("ml_model_id")}
+    known_models: Set[int] = set()
+    if model_ids:
+        known_models = {row[0] for row in db.query(MLModel.ml_model_id).filter(MLModel.ml_model_id.in_(model_ids))}
+    for item in items:
+        bad = [atp_id for atp_id in atp_ids(item) if atp_id in invalid]
+        if bad:
+            item.fail(status.HTTP_422_UNPROCESSABLE_ENTITY, " ".join(f"{atp_id} is not valid." for atp_id in bad))
+        elif item.data.get("ml_model_id") and item.data["ml_model_id"] not in known_models:
+            item.fail(status.HTTP_422_UNPROCESSABLE_ENTITY, f"ML model with ID {item.data['ml_model_id']} not found")
+
+
+def _dedup_key_data(item: _Item, default_user: str) -> Dict[str, Any]:
+    """The fields check_for_duplicate_tags compares, with the audit users a
+    fresh row would be stored with."""
+    key_data = {k: v for k, v in item.data.items() if k not in _DEDUP_EXCLUDED_FIELDS}
+    key_data['created_by'], key_data['updated_by'] = impute_audit_user_ids(
+        key_data.get('created_by'), key_data.get('updated_by'), default_user)
+    return key_data
+
+
+def _load_candidates(db: Session, items: List[_Item]) -> Dict[Tuple[int, str], List[TopicEntityTagModel]]:
+    """Existing tags sharing a (reference_id, topic) with any item: the only
+    tags any of the duplicate checks can match."""
+    keys = sorted({(item.data["reference_id"], item.data["topic"]) for item in items})
+    candidates: Dict[Tuple[int, str], List[TopicEntityTagModel]] = defaultdict(list)
+    for start in range(0, len(keys), DUPLICATE_QUERY_BATCH_SIZE):
+        for tag in db.query(TopicEntityTagModel).filter(tuple_(
+                TopicEntityTagModel.reference_id, TopicEntityTagModel.topic).in_(
+                keys[start:start + DUPLICATE_QUERY_BATCH_SIZE])).all():
+            candidates[(tag.reference_id, tag.topic)].append(tag)
+    return candidates
+
+
+def _matches(fields: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
+    return all(fields.get(key) == value for key, value in wanted.items())
+
+
+def _conflict(reason: str, message: str, **details) -> Dict[str, Any]:
+    return {"reason": reason, "message": message, **details}
+
+
+def _check_duplicates(item: _Item, key_data: Dict[str, Any], candidates: List[Tuple[Dict[str, Any], Any]],
+                      default_user: str) -> bool:
+    """check_for_duplicate_tags against ``candidates`` (field dict, existing
+    tag or earlier item of the batch). Returns True when the item was
+    resolved (conflict, or absorbed as a note append)."""
+    note = item.data.get("note")
+    for fields, target in candidates:
+        if not _matches(fields, key_data):
+            continue
+        target_note = target.note if isinstance(target, TopicEntityTagModel) else target.data.get("note")
+        existing_id = target.topic_entity_tag_id if isinstance(target, TopicEntityTagModel) else None
+        if note is None or note in (target_note.split(" | ") if target_note else []):
+            item.fail(status.HTTP_409_CONFLICT, _conflict(
+                "duplicate", "The tag already exists in the database.",
+                existing_tag_id=existing_id, existing_note=target_note))
+            item.absorbed_by = None if existing_id else target
+            return True
+        new_note = note if target_note is None else target_note + " | " + note
+        if isinstance(target, TopicEntityTagModel):
+            target.note = new_note
+            target.updated_by = default_user
+            date_updated = item.data.get("date_updated")
+            if date_updated and date_parser.parse(date_updated) > target.date_updated:
+                target.date_updated = date_updated
+            else:
+                # keep date_updated; updated_by is set explicitly above
+                disable_set_date_updated_onupdate(target)
+            item.tag = target
+        else:
+            target.data["note"] = new_note
+            item.absorbed_by = target
+        item.status_code = status.HTTP_200_OK
+        return True
+
+    source = item.source
+    assert source is not None
+    if source.source_method == "abc_literature_system" and source.validation_type == "professional_biocurator":
+        negation_data = {k: v for k, v in key_data.items() if k != 'data_novelty'}
+        negation_data['negated'] = not negation_data['negated']
+        conflicting = [target.topic_entity_tag_id for fields, target in candidates
+                       if isinstance(target, TopicEntityTagModel) and _matches(fields, negation_data)]
+        if conflicting:
+            item.fail(status.HTTP_409_CONFLICT, _conflict(
+                "opposite_negation",
+                "One or more tags already exist in the database with the opposite 'negated' value.",
+                conflicting_tag_ids=conflicting))
+            return True
+
+    if item.force_insertion:
+        return False
+    without_creator = {k: v for k, v in key_data.items() if k not in ('created_by', 'updated_by')}
+    for fields, target in candidates:
+        if isinstance(target, TopicEntityTagModel) and _matches(fields, without_creator):
+            if target.note == note or note is None:
+                message = "The tag, created by another curator, already exists in the database."
+            elif target.note:
+                message = "The tag with a different note, created by another curator, already exists in the database."
+            else:
+                message = "The tag without a note, created by another curator, already exists in the database."
+            item.fail(status.HTTP_409_CONFLICT, _conflict(
+                "different_creator", message, existing_tag_id=target.topic_entity_tag_id,
+                existing_created_by=target.created_by, existing_note=target.note))
+            return True
+    return False
+
+
+def _plan_inserts(db: Session, items: List[_Item]) -> List[_Item]:
+    """Run the duplicate checks, earlier items of the batch included; returns
+    the items to insert."""
+    default_user = get_default_user_value()
+    existing = _load_candidates(db, items)
+    candidates: Dict[Tuple[int, str], List[Tuple[Dict[str, Any], Any]]] = defaultdict(list)
+    columns = [column.key for column in TopicEntityTagModel.__table__.columns]
+    for key, tags in existing.items():
+        candidates[key] = [({column: getattr(tag, column) for column in columns}, tag) for tag in tags]
+    to_insert = []
+    for item in items:
+        key_data = _dedup_key_data(item, default_user)
+        key = (item.data["reference_id"], item.data["topic"])
+        if _check_duplicates(item, key_data, candidates[key], default_user):
+            continue
+        candidates[key].append((key_data, item))
+        to_insert.append(item)
+    return to_insert
+
+
+def _new_tag(item: _Item) -> TopicEntityTagModel:
+    return TopicEntityTagModel(**copy.copy(item.data))
+
+
+def _insert(db: Session, to_insert: List[_Item]) -> None:
+    """Insert all new tags in one flush; if that fails, one savepoint per tag
+    so only the offending ones fail."""
+    try:
+        for item in to_insert:
+            item.tag = _new_tag(item)
+            db.add(item.tag)
+        db.commit()
+        return
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning("Bulk tag insert failed (%s), retrying tag by tag", e.orig)
+    for item in to_insert:
+        item.tag = None
+        try:
+            with db.begin_nested():
+                item.tag = _new_tag(item)
+                db.add(item.tag)
+        except IntegrityError as e:
+            item.tag = None
+            item.fail(status.HTTP_422_UNPROCESSABLE_ENTITY, f"invalid request: {e.orig}")
+    db.commit()
+
+
+def create_tags_bulk(db: Session, tags: List[TopicEntityTagSchemaPost]) -> Dict[str, Any]:
+    items = [_Item(index, tag) for index, tag in enumerate(tags)]
+    _resolve_users(db, items)
+    for step in (_resolve_references, _resolve_sources):
+        step(db, [item for item in items if item.pending])
+    for item in items:
+        if item.pending:
+            _normalize(item)
+    _check_atp_ids_and_models(db, [item for item in items if item.pending])
+    pending = [item for item in items if item.pending]
+    for users in {(item.data.get("created_by"), item.data.get("updated_by")) for item in pending}:
+        add_audited_object_users_if_not_exist(db, {"created_by": users[0], "updated_by": users[1]})
+
+    to_insert = _plan_inserts(db, pending)
+    # notes appended to existing tags
+    db.commit()
+    _insert(db, to_insert)
+    created = [item for item in to_insert if item.tag is not None]
+    for item in created:
+        item.status_code = status.HTTP_201_CREATED
+    for item in items:
+        if item.absorbed_by is not None and item.absorbed_by.tag is None:
+            # the absorbing item failed, so it has a status code
+            assert item.absorbed_by.status_code is not None
+            item.fail(item.absorbed_by.status_code, item.absorbed_by.detail)
+
+    mod_ids = dict(item.mod for item in created)
+    added_to_mod = set()
+    for item in created:
+        mod_abbreviation = item.mod[0]
+        if (item.data["reference_id"], mod_abbreviation) not in added_to_mod:
+            added_to_mod.add((item.data["reference_id"], mod_abbreviation))
+            add_paper_to_mod_if_not_already(db, item.reference_curie, item.data["reference_id"],
+                                            mod_abbreviation, mod_ids[mod_abbreviation])
+    for mod_id, reference_id, index_wft in {(item.mod[1], item.data["reference_id"], item.index_wft)
+                                            for item in created if item.index_wft is not None}:
+        update_manual_indexing_workflow_tag(db, mod_id, reference_id, index_wft)
+
+    reference_ids = sorted({item.data["reference_id"] for item in created})
+    if reference_ids:
+        revalidate_references(db, reference_ids)
+        db.commit()
+
+    results = [item.result() for item in items]
+    return {"created": len(created),
+            "updated": sum(1 for item in items if item.status_code == status.HTTP_200_OK),
+            "failed": sum(1 for item in items if item.status_code is not None and item.status_code >= 400),
+            "results": results}
@@ -2,24 +2,31 @@
 topic_entity_tag_crud.py
 ===========================
 """
+import base64
+import binascii
 import copy
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from collections import defaultdict
 from os import environ
 from typing import Any, Dict, List, Set, Tuple
 from datetime import datetime, timedelta
 from time import perf_counter
+from types import SimpleNamespace
 
 from dateutil import parser as date_parser
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import case, and_, or_, func, create_engine, text, inspect as sa_inspect
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker, noload
+from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker
 
+from agr_literature_service.api.crud.topic_entity_tag_validation import ATP_ID_SOURCE_AUTHOR, \
+    ATP_ID_SOURCE_CURATOR, revalidate_all_references, revalidate_references, revalidate_affected_references
 from agr_literature_service.api.crud.topic_entity_tag_utils import get_reference_id_from_curie_or_id, \
-    get_source_from_db, add_source_obj_to_db_session, get_sorted_column_values, \
+    get_source_from_db, add_source_obj_to_db_session, \
     check_and_set_sgd_display_tag, check_and_set_species, add_audited_object_users_if_not_exist, \
     get_ancestors, get_descendants, get_map_entity_curies_to_names, \
     id_to_name_cache, get_map_ateam_curies_to_names, get_mod_id_from_mod_abbreviation, \
@@ -27,7 +34,8 @@ from agr_literature_service.api.crud.topic_entity_tag_utils import get_reference
 from agr_literature_service.api.database.config import SQLALCHEMY_DATABASE_URL
 from agr_literature_service.api.models import (
     TopicEntityTagModel, WorkflowTagModel, ModCorpusAssociationModel,
-    ReferenceModel, TopicEntityTagSourceModel, ModModel, CrossReferenceModel
+    ReferenceModel, TopicEntityTagSourceModel, ModModel, CrossReferenceModel,
+    TopicEntityTagReferenceSummaryModel
 )
 from agr_literature_service.api.models.ml_model_model import MLModel
 from agr_literature_service.api.crud.workflow_tag_crud import get_workflow_tags_from_process, \
@@ -49,6 +57,12 @@ from agr_literature_service.api.crud.user_utils import map_to_user_id
 
 logger = logging.getLogger(__name__)
 
+# concurrent A-team / MOD name lookups while resolving the curies of one response
+CURIE_NAME_FETCH_WORKERS = 8
+
+# show_all_reference_tags column_only values answered from the reference's summary
+SUMMARY_COUNT_COLUMNS = {"species": "species_counts", "display_tag": "display_tag_counts"}
+
 
 def _tet_batch_timing_enabled():
     # Re-read each call so it can be toggled without a code change.
@@ -66,9 +80,6 @@ def _log_tet_batch_timing(message, *args):
         print(message % args, flush=True)
 
 
-ATP_ID_SOURCE_AUTHOR = "author"
-ATP_ID_SOURCE_CURATOR = "professional_biocurator"
-
 TET_CURIE_FIELDS = ['topic', 'entity_type', 'display_tag', 'entity', 'species']
 TET_SOURCE_CURIE_FIELDS = ['source_evidence_assertion']
 
@@ -803,69 +814,40 @@ def set_validation_values_to_tag(tag: TopicEntityTagModel):
 
 
 def revalidate_all_tags(email: str = None, delete_all_first: bool = False, curie_or_reference_id: str = None,
-                        validation_values_only: bool = False):
+                        validation_values_only: bool = False, atp_ids: List[str] = None,
+                        topic_entity_tag_source_ids: List[int] = None):
+    """Rebuild the validation pairs (unless ``validation_values_only``) and
+    validation values of all tags, or only those of one reference, with the
+    set-based engine in topic_entity_tag_validation. The pairs of each
+    reference are recomputed from scratch and only the differences written,
+    so ``delete_all_first`` is only needed to clear rows the engine would not
+    visit (those of references without tags).
+
+    With ``atp_ids`` and/or ``topic_entity_tag_source_ids`` (changed ATP
+    terms, whose descendants are included, and changed sources), only the
+    references with tags using them are revalidated."""
     engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"options": "-c timezone=utc"})
     new_session = sessionmaker(bind=engine, autoflush=True)
     db = new_session()
-    reference_query_filter = ""
-    query_tags = (db.query(TopicEntityTagModel)
-                  .join(TopicEntityTagModel.topic_entity_tag_source)
-                  .options(joinedload(TopicEntityTagModel.topic_entity_tag_source))
-                  .options(joinedload(TopicEntityTagModel.validated_by))
-                  .options(noload(TopicEntityTagModel.reference))
-                  .order_by(TopicEntityTagModel.reference_id,
-                            TopicEntityTagModel.topic_entity_tag_source_id,
-                            TopicEntityTagSourceModel.secondary_data_provider_id))
-    if not validation_values_only:
-        if curie_or_reference_id:
-            delete_all_first = True
-            reference_id = int(curie_or_reference_id) if curie_or_reference_id.isdigit() else None
-            if not reference_id:
-                reference_id = db.query(ReferenceModel.reference_id).filter(ReferenceModel.curie == curie_or_reference_id)
-            all_tag_ids_for_reference = [res[0] for res in db.query(
-                TopicEntityTagModel.topic_entity_tag_id).filter(TopicEntityTagModel.reference_id == reference_id).all()]
-            if not all_tag_ids_for_reference:
+    affected = None
+    try:
+        if atp_ids or topic_entity_tag_source_ids:
+            affected = revalidate_affected_references(db, atp_ids or [], topic_entity_tag_source_ids or [],
+                                                      update_pairs=not validation_values_only)
+        elif curie_or_reference_id:
+            reference_id = int(curie_or_reference_id) if curie_or_reference_id.isdigit() else \
+                db.query(ReferenceModel.reference_id).filter(ReferenceModel.curie == curie_or_reference_id).scalar()
+            if reference_id is None:
                 return
-            all_tag_ids_str = [str(tag_id) for tag_id in all_tag_ids_for_reference]
-            reference_query_filter = (f" WHERE validating_topic_entity_tag_id IN ({', '.join(all_tag_ids_str)}) "
-                                      f"OR validated_topic_entity_tag_id IN ({', '.join(all_tag_ids_str)})")
-            query_tags = query_tags.filter(TopicEntityTagModel.topic_entity_tag_id.in_(all_tag_ids_for_reference))
-        if delete_all_first:
-            db.execute(text("DELETE FROM topic_entity_tag_validation" + reference_query_filter))
+            revalidate_references(db, [reference_id], update_pairs=not validation_values_only)
             db.commit()
-        curr_ref_tags_in_db = None
-        curr_reference_id = None
-        curr_mod_id = None
-        for tag_counter, tag in enumerate(query_tags.all()):
-            if tag.reference_id != curr_reference_id or tag.topic_entity_tag_source.secondary_data_provider_id != curr_mod_id:
-                curr_reference_id = tag.reference_id
-                curr_mod_id = tag.topic_entity_tag_source.secondary_data_provider_id
-                curr_ref_tags_in_db = None
-            logger.info(f"Processing tag # {str(tag_counter)}")
-            if not delete_all_first:
-                db.execute(text(f"DELETE FROM topic_entity_tag_validation "
-                                f"WHERE validating_topic_entity_tag_id = {tag.topic_entity_tag_id}"))
-            curr_ref_tags_in_db = validate_tags(db=db, new_tag_obj=tag, validate_new_tag=False, commit_changes=False,
-                                                calculate_validation_values=False,
-                                                related_tags_in_db=curr_ref_tags_in_db)
-            if tag_counter > 0 and tag_counter % 200 == 0:
+        else:
+            if delete_all_first and not validation_values_only:
+                db.execute(text("DELETE FROM topic_entity_tag_validation"))
                 db.commit()
-        db.commit()
-    offset = 0
-    batch_size = 200
-    tag_counter = 0
-    while True:
-        batch_tags = query_tags.offset(offset).limit(batch_size).all()
-        if not batch_tags:
-            break  # All tags processed
-        for tag in batch_tags:
-            tag_counter += 1
-            logger.info(f"Setting validation values for tag #{tag_counter}")
-            set_validation_values_to_tag(tag)
-        db.commit()
-        offset += batch_size
-    db.commit()
-    db.close()
+            revalidate_all_references(db, update_pairs=not validation_values_only)
+    finally:
+        db.close()
 
     if email:
         email_recipients = email
@@ -873,7 +855,9 @@ def revalidate_all_tags(email: str = None, delete_all_first: bool = False, curie
         sender_password = environ.get('SENDER_PASSWORD', None)
         reply_to = environ.get('REPLY_TO', sender_email)
         email_body = "Finished re-validating all tags"
-        if curie_or_reference_id:
+        if affected is not None:
+            email_body = f"Finished re-validating the tags of {affected['references']} affected references"
+        elif curie_or_reference_id:
             email_body += " for reference " + str(curie_or_reference_id)
         send_email("Alliance ABC notification: all tags re-validated", email_recipients, email_body, sender_email,
                    sender_password, reply_to)
@@ -901,10 +885,23 @@ def patch_source(db: Session, topic_entity_tag_source_id: int, source_patch: Top
     source = get_source_from_db(db, topic_entity_tag_source_id)
     source_patch_data = source_patch.model_dump(exclude_unset=True)
     add_audited_object_users_if_not_exist(db, source_patch_data)
+    # whether the source's tags validate others depends on its validation_type
+    # and on the MOD (secondary data provider) it curates for
+    validation_changed = "validation_type" in source_patch_data and \
+        source_patch_data["validation_type"] != source.validation_type
+    if "secondary_data_provider_abbreviation" in source_patch_data:
+        secondary_data_provider = db.query(ModModel.mod_id).filter(
+            ModModel.abbreviation == source_patch_data.pop("secondary_data_provider_abbreviation")).one_or_none()
+        if secondary_data_provider is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Cannot find the specified secondary data provider")
+        source_patch_data["secondary_data_provider_id"] = secondary_data_provider.mod_id
+        validation_changed = validation_changed or \
+            secondary_data_provider.mod_id != source.secondary_data_provider_id
     for key, value in source_patch_data.items():
         setattr(source, key, value)
     db.commit()
-    return {"message": "updated"}
+    return {"message": "updated", "validation_changed": validation_changed}
 
 
 def show_source(db: Session, topic_entity_tag_source_id: int):
@@ -1157,6 +1154,15 @@ def _resolve_reference_ids_for_batch(db: Session, curies_or_reference_ids: List[
     return ident_to_ref_id
 
 
+def _sorted_column_values(db: Session, reference_id: int, column_name: str, desc: bool,
+                          curie_to_name: Dict[str, str]) -> List[str]:
+    """The reference's distinct values of the column, ordered by name."""
+    values = db.query(getattr(TopicEntityTagModel, column_name)).filter(
+        TopicEntityTagModel.reference_id == reference_id).distinct()
+    return sorted([value for value, in values if value],
+                  key=lambda value: curie_to_name.get(value, value), reverse=desc)
+
+
 def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, page_size: int = None, count_only: bool = False, sort_by: str = None, desc_sort: bool = False, column_only: str = None, column_filter: str = None, column_values: str = None, curie_to_name: dict = None):      # noqa: C901
 
     if page < 1:
@@ -1174,6 +1180,9 @@ def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, p
         distinct_column_values = a list of species for this paper if column_only = 'species'
         distinct_column_values = a list of display_tag for this paper if column_only = 'display_tag'
         """
+        if column_only in SUMMARY_COUNT_COLUMNS:
+            summary = db.get(TopicEntityTagReferenceSummaryModel, reference_id)
+            return list(getattr(summary, SUMMARY_COUNT_COLUMNS[column_only])) if summary else []
         distinct_column_values = db.query(getattr(TopicEntityTagModel, column_only)).filter_by(
             reference_id=reference_id).distinct().all()
         distinct_values = [x[0] for x in distinct_column_values if x[0] is not None]
@@ -1196,6 +1205,9 @@ def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, p
         query = filter_tet_data_by_column(query, column_filter, column_value_list)
 
     if count_only:
+        if not (column_filter and column_values):
+            summary = db.get(TopicEntityTagReferenceSummaryModel, reference_id)
+            return summary.tag_count if summary else 0
         return query.count()
     else:
         if sort_by:
@@ -1207,8 +1219,11 @@ def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, p
                     else_=0 if desc_sort else 1
                 )
                 # order_expression = case([(column.is_(None), 1 if desc_sort else 0)], else_=0 if desc_sort else 1)
-                sorted_column_values = get_sorted_column_values(reference_id, db,
-                                                                sort_by, desc_sort)
+                # the page's names come from this map anyway, so sort by it
+                # rather than fetching the column's names a second time
+                if curie_to_name is None:
+                    curie_to_name = get_curie_to_name_from_all_tets(db, curie_or_reference_id)
+                sorted_column_values = _sorted_column_values(db, reference_id, sort_by, desc_sort, curie_to_name)
                 curie_ordering = case({curie: index for index, curie in enumerate(sorted_column_values)},
                                       value=getattr(TopicEntityTagModel, sort_by))
                 query = query.order_by(order_expression, curie_ordering, TopicEntityTagModel.topic_entity_tag_id)
@@ -1246,6 +1261,10 @@ def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, p
                 query = query.order_by(order_expression, column_property.desc() if desc_sort else column_property,
                                        TopicEntityTagModel.topic_entity_tag_id)
 
+        else:
+            # a stable order, so that the pages neither overlap nor skip tags
+            query = query.order_by(TopicEntityTagModel.topic_entity_tag_id)
+
         page_q = query.offset((page - 1) * page_size if page_size else None).limit(page_size)
         rows = page_q.all()
         # Callers (e.g. the batch endpoint) may supply a precomputed map built
@@ -1255,6 +1274,32 @@ def show_all_reference_tags(db: Session, curie_or_reference_id, page: int = 1, p
         return _serialize_reference_tag_rows(db, rows, curie_to_name)
 
 
+def _reference_tag_summary(reference_id: int,
+                           summary: Optional[TopicEntityTagReferenceSummaryModel]) -> Dict[str, Any]:
+    if summary is None:
+        return {"reference_id": reference_id}
+    return {column.key: getattr(summary, column.key)
+            for column in TopicEntityTagReferenceSummaryModel.__table__.columns}
+
+
+def show_reference_tag_summary(db: Session, curie_or_reference_id: str):
+    """The reference's row of topic_entity_tag_reference_summary (an empty
+    summary if it has no tags)."""
+    reference_id = get_reference_id_from_curie_or_id(db, curie_or_reference_id)
+    return _reference_tag_summary(reference_id, db.get(TopicEntityTagReferenceSummaryModel, reference_id))
+
+
+def show_reference_tag_summaries(db: Session, curies_or_reference_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Summaries of many references keyed by the identifiers they were asked
+    for; identifiers that do not resolve to a reference are left out."""
+    ident_to_ref_id = _resolve_reference_ids_for_batch(db, curies_or_reference_ids)
+    reference_ids = {ref_id for ref_id in ident_to_ref_id.values() if ref_id is not None}
+    summaries = {summary.reference_id: summary for summary in db.query(TopicEntityTagReferenceSummaryModel).filter(
+        TopicEntityTagReferenceSummaryModel.reference_id.in_(reference_ids)).all()} if reference_ids else {}
+    return {ident: _reference_tag_summary(ref_id, summaries.get(ref_id))
+            for ident, ref_id in ident_to_ref_id.items() if ref_id is not None}
+
+
 def _ci_in(column, values):
     """Case-insensitive IN over a string column. Facet values arrive as exact
     keyword-aggregation strings, but topic/confidence-level curies can differ in
@@ -2062,47 +2107,52 @@ def validate_topic(db: Session, reference_curie: str, topic: str, mod_abbreviati
     }
 
 
-def get_all_topic_entity_tags_by_mod(db: Session, mod_abbreviation: str, days_updated: int = 7):
+def encode_tags_by_mod_cursor(date_updated: datetime, topic_entity_tag_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps(
+        {"after": [date_updated.isoformat(), topic_entity_tag_id]}).encode()).decode().rstrip("=")
+
+
+def decode_tags_by_mod_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_date, after_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+        return datetime.fromisoformat(after_date), int(after_id)
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid cursor {cursor}")
+
+
+def _tag_row_for_names(tag: Dict[str, Any], source_evidence_assertions: Dict[int, str]):
+    """Attribute view of a by_mod tag row, as build_curie_to_name_map expects."""
+    return SimpleNamespace(**tag, topic_entity_tag_source=SimpleNamespace(
+        source_evidence_assertion=source_evidence_assertions.get(tag["topic_entity_tag_source_id"])))
+
+
+def get_all_topic_entity_tags_by_mod(db: Session, mod_abbreviation: str, days_updated: int = 7,
+                                     page_size: Optional[int] = None, cursor: Optional[str] = None):
     # This MOD-facing export deliberately ships ONLY tags curated in the ABC
     # itself: an allowlist of source_method = 'abc_literature_system', not a
     # denylist of specific sources. Tags from classifier / pipeline / bulk
     # loader sources (abc_document_classifier, curation_status_form,
     # string_matching_antibody, the PDB association pipeline, ACKnowledge/AFP,
     # sgd_reference_curation, zfin_reference_curation, ...) are intentionally
-    # excluded (SCRUM-6404 review). The same filter is applied to the source
-    # metadata below and in get_curie_to_name_mapping_for_mod.
+    # excluded (SCRUM-6404 review). The same filter selects the source
+    # metadata, which is resolved first so the tag query filters on the
+    # source ids alone.
+    #
+    # Tags come ordered by (date_updated, topic_entity_tag_id). With page_size
+    # set, each call returns one page and a next_cursor (None on the last page)
+    # to pass back as cursor: the next page starts right after the last tag
+    # returned, read from ix_topic_entity_tag_date_updated_id instead of
+    # skipping the earlier rows as OFFSET would.
+    after = decode_tags_by_mod_cursor(cursor)
 
     current_date = datetime.now()
     past_date = current_date - timedelta(days=int(days_updated))
     last_date_updated = past_date.strftime("%Y-%m-%d")
 
-    rows = db.execute(text("SELECT cr.curie, tet.*, "
-                           "get_most_current_email(u.person_id) AS email "
-                           "FROM cross_reference cr "
-                           "JOIN topic_entity_tag tet ON cr.reference_id = tet.reference_id AND cr.curie_prefix = :mod_abbreviation "
-                           "JOIN topic_entity_tag_source tets ON tet.topic_entity_tag_source_id = tets.topic_entity_tag_source_id "
-                           "JOIN users u ON tet.updated_by = u.id "
-                           "JOIN mod m ON tets.secondary_data_provider_id = m.mod_id "
-                           "WHERE m.abbreviation = :mod_abbreviation "
-                           "AND tets.source_method = 'abc_literature_system' "
-                           "AND tet.date_updated >= :last_date_updated"),
-                      {'mod_abbreviation': mod_abbreviation, 'last_date_updated': last_date_updated}).mappings().fetchall()
-
-    # tags = [dict(row) for row in rows]
-    # there are duplicate rows returned
-    tags = []
-    processed_ids = set()
-    for row in rows:
-        row_dict = dict(row)
-        topic_entity_tag_id = row_dict['topic_entity_tag_id']
-        if topic_entity_tag_id not in processed_ids:
-            tags.append(row_dict)
-            processed_ids.add(topic_entity_tag_id)
-
-    curie_to_name_mapping = get_curie_to_name_mapping_for_mod(db, mod_abbreviation, last_date_updated)
-
-    data = [get_tet_with_names(db, tag, curie_to_name_mapping) for tag in tags]
-
     src_rows = db.execute(text("SELECT tets.* "
                                "FROM topic_entity_tag_source tets "
                                "JOIN mod m ON tets.secondary_data_provider_id = m.mod_id "
@@ -2110,30 +2160,59 @@ def get_all_topic_entity_tags_by_mod(db: Session, mod_abbreviation: str, days_up
                                "AND tets.source_method = 'abc_literature_system'"),
                           {'mod_abbreviation': mod_abbreviation}).mappings().fetchall()
     metadata = [dict(row) for row in src_rows]
+    if not metadata:
+        return {"metadata": metadata, "data": [], "next_cursor": None}
+
+    params: Dict[str, Any] = {'mod_abbreviation': mod_abbreviation, 'last_date_updated': last_date_updated,
+                              'source_ids': [source['topic_entity_tag_source_id'] for source in metadata]}
+    keyset_filter = ""
+    if after is not None:
+        keyset_filter = "AND (tet.date_updated, tet.topic_entity_tag_id) > (:after_date, :after_id) "
+        params['after_date'], params['after_id'] = after
+    limit = ""
+    if page_size:
+        # one extra row tells whether there is a next page
+        limit = "LIMIT :limit"
+        params['limit'] = page_size + 1
+
+    # one MOD curie per tag (a reference can have several MOD xrefs)
+    rows = db.execute(text("SELECT cr.curie, tet.*, "
+                           "get_most_current_email(u.person_id) AS email "
+                           "FROM topic_entity_tag tet "
+                           "JOIN LATERAL (SELECT curie FROM cross_reference "
+                           "              WHERE reference_id = tet.reference_id "
+                           "              AND curie_prefix = :mod_abbreviation "
+                           "              ORDER BY is_obsolete, curie LIMIT 1) cr ON TRUE "
+                           "JOIN users u ON tet.updated_by = u.id "
+                           "WHERE tet.topic_entity_tag_source_id = ANY(:source_ids) "
+                           "AND tet.date_updated >= :last_date_updated "
+                           f"{keyset_filter}"
+                           "ORDER BY tet.date_updated, tet.topic_entity_tag_id "
+                           f"{limit}"),
+                      params).mappings().fetchall()
+    tags = [dict(row) for row in rows]
+
+    next_cursor = None
+    if page_size and len(tags) > page_size:
+        tags = tags[:page_size]
+        next_cursor = encode_tags_by_mod_cursor(tags[-1]['date_updated'], tags[-1]['topic_entity_tag_id'])
+
+    # names for the curies of this page only
+    source_evidence_assertions = {source['topic_entity_tag_source_id']: source['source_evidence_assertion']
+                                  for source in metadata}
+    curie_to_name_mapping = build_curie_to_name_map(
+        db, [_tag_row_for_names(tag, source_evidence_assertions) for tag in tags])
 
-    return {"metadata": metadata, "data": data}
-
-
-def get_curie_to_name_mapping_for_mod(db, mod_abbreviation, last_date_updated):
-
-    curie_to_name_mapping = {}
+    data = [get_tet_with_names(db, tag, curie_to_name_mapping) for tag in tags]
 
-    rows = db.execute(text("SELECT DISTINCT tet.reference_id "
-                           "FROM topic_entity_tag tet "
-                           "JOIN topic_entity_tag_source tets ON tet.topic_entity_tag_source_id = tets.topic_entity_tag_source_id "
-                           "JOIN mod m ON tets.secondary_data_provider_id = m.mod_id "
-                           "WHERE m.abbreviation = :mod_abbreviation "
-                           "AND tets.source_method = 'abc_literature_system' "
-                           "AND tet.date_updated >= :last_date_updated"),
-                      {'mod_abbreviation': mod_abbreviation, 'last_date_updated': last_date_updated}).mappings().fetchall()
-    for x in rows:
-        curie_to_name_mapping.update(get_curie_to_name_from_all_tets(db, str(x['reference_id'])))
-    return curie_to_name_mapping
+    return {"metadata": metadata, "data": data, "next_cursor": next_cursor}
 
 
 def get_curie_to_name_from_all_tets(db: Session, curie_or_reference_id: str):
     reference_id = get_reference_id_from_curie_or_id(db, curie_or_reference_id)
-    ref_related_tets = db.query(TopicEntityTagModel).filter(TopicEntityTagModel.reference_id == reference_id).all()
+    ref_related_tets = db.query(TopicEntityTagModel).options(
+        joinedload(TopicEntityTagModel.topic_entity_tag_source)).filter(
+        TopicEntityTagModel.reference_id == reference_id).all()
     return build_curie_to_name_map(db, ref_related_tets)
 
 
@@ -2151,33 +2230,63 @@ def get_curie_to_name_from_references(db: Session, reference_ids: List[int]):
     return build_curie_to_name_map(db, ref_related_tets)
 
 
-def _get_cached_curie_names(curies, fetch_names):
-    curie_list = list(dict.fromkeys([curie for curie in curies if curie]))
-    curie_to_name = {}
-    missing = []
-    for curie in curie_list:
-        cached_name = id_to_name_cache.get(curie)
-        if cached_name is None:
-            missing.append(curie)
-        else:
-            curie_to_name[curie] = cached_name
+def _cache_fetched_curie_names(fetched):
+    for curie, name in fetched.items():
+        # Skip caching identity fallbacks (name == curie): map_curies_to_names
+        # returns {curie: curie} when the A-team lookup fails or returns nothing.
+        # Caching those would poison id_to_name_cache for the full TTL and keep the
+        # grid showing raw curies even after A-team recovers. They are still returned
+        # for this request (raw-curie display fallback); leaving them uncached makes
+        # the next request re-fetch them.
+        if name and name != curie:
+            id_to_name_cache.set(curie, name)
+
 
-    if missing:
-        fetched = fetch_names(missing) or {}
+def _get_cached_curie_names_bulk(lookups):
+    """Resolve several (curies, fetch_names) lookups at once: cache hits first,
+    then the misses of every lookup fetched concurrently, one fetch_names call
+    per lookup."""
+    curie_to_name = {}
+    pending = []
+    for curies, fetch_names in lookups:
+        missing = []
+        for curie in dict.fromkeys([curie for curie in curies if curie]):
+            cached_name = id_to_name_cache.get(curie)
+            if cached_name is None:
+                missing.append(curie)
+            else:
+                curie_to_name[curie] = cached_name
+        if missing:
+            pending.append((fetch_names, missing))
+
+    if len(pending) == 1:
+        results = [pending[0][0](pending[0][1])]
+    elif pending:
+        with ThreadPoolExecutor(max_workers=min(CURIE_NAME_FETCH_WORKERS, len(pending))) as executor:
+            results = list(executor.map(lambda lookup: lookup[0](lookup[1]), pending))
+    else:
+        results = []
+    for fetched in results:
+        fetched = fetched or {}
         curie_to_name.update(fetched)
-        for curie, name in fetched.items():
-            # Skip caching identity fallbacks (name == curie): map_curies_to_names
-            # returns {curie: curie} when the A-team lookup fails or returns nothing.
-            # Caching those would poison id_to_name_cache for the full TTL and keep the
-            # grid showing raw curies even after A-team recovers. They are still returned
-            # for this request (raw-curie display fallback); leaving them uncached makes
-            # the next request re-fetch them.
-            if name and name != curie:
-                id_to_name_cache.set(curie, name)
+        _cache_fetched_curie_names(fetched)
     return curie_to_name
 
 
+def _get_cached_curie_names(curies, fetch_names):
+    return _get_cached_curie_names_bulk([(curies, fetch_names)])
+
+
+def _entity_names_fetcher(db: Session, entity_id_validation, entity_type_name):
+    return lambda missing: get_map_entity_curies_to_names(
+        db, entity_id_validation=entity_id_validation, curies_category=entity_type_name, curies=missing)
+
+
 def build_curie_to_name_map(db: Session, ref_related_tets):
+    """Names for every curie of ``ref_related_tets``. All curies are collected
+    first and the cache misses resolved in one concurrent round; entity
+    lookups need their entity type's name, so those whose entity type name
+    is not cached yet go in a second round."""
     all_atp_terms = set()
     entity_id_validation_entity_type_entities: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
     all_entity_curies = set()
@@ -2200,28 +2309,25 @@ def build_curie_to_name_map(db: Session, ref_related_tets):
                 source_eco_codes.add(tet.topic_entity_tag_source.source_evidence_assertion)
             elif tet.topic_entity_tag_source.source_evidence_assertion.startswith("ATP:"):
                 all_atp_terms.add(tet.topic_entity_tag_source.source_evidence_assertion)
-    entity_curie_to_name = _get_cached_curie_names(
-        all_atp_terms,
-        lambda missing: get_map_ateam_curies_to_names(category="atpterm", curies=missing)
-    )
-    entity_curie_to_name.update(_get_cached_curie_names(
-        source_eco_codes,
-        lambda missing: get_map_ateam_curies_to_names(category="ecoterm", curies=missing)
-    ))
-    entity_curie_to_name.update(_get_cached_curie_names(
-        tag_species,
-        lambda missing: get_map_ateam_curies_to_names(category="species", curies=missing)
-    ))
+    lookups = [
+        (all_atp_terms, lambda missing: get_map_ateam_curies_to_names(category="atpterm", curies=missing)),
+        (source_eco_codes, lambda missing: get_map_ateam_curies_to_names(category="ecoterm", curies=missing)),
+        (tag_species, lambda missing: get_map_ateam_curies_to_names(category="species", curies=missing))
+    ]
+    deferred = []
     for entity_id_validation, entity_type_curies_dict in entity_id_validation_entity_type_entities.items():
         for entity_type, curies in entity_type_curies_dict.items():
-            entity_type_name = entity_curie_to_name[entity_type]
-            entity_curie_to_name.update(_get_cached_curie_names(
-                curies,
-                lambda missing: get_map_entity_curies_to_names(
-                    db, entity_id_validation=entity_id_validation,
-                    curies_category=entity_type_name,
-                    curies=missing)
-            ))
+            entity_type_name = id_to_name_cache.get(entity_type)
+            if entity_type_name is None:
+                deferred.append((entity_id_validation, entity_type, curies))
+            else:
+                lookups.append((curies, _entity_names_fetcher(db, entity_id_validation, entity_type_name)))
+    entity_curie_to_name = _get_cached_curie_names_bulk(lookups)
+    if deferred:
+        entity_curie_to_name.update(_get_cached_curie_names_bulk([
+            (curies, _entity_names_fetcher(db, entity_id_validation,
+                                           entity_curie_to_name.get(entity_type, entity_type)))
+            for entity_id_validation, entity_type, curies in deferred]))
     for curie_without_name in (all_entity_curies | all_atp_terms) - set(entity_curie_to_name.keys()):
         entity_curie_to_name[curie_without_name] = curie_without_name
     return entity_curie_to_name
@@ -1,4 +1,5 @@
 import logging
+import threading
 from os import environ
 from typing import Dict, List, Set
 import requests
@@ -12,7 +13,7 @@ from agr_literature_service.api.crud.reference_utils import get_reference
 from agr_literature_service.api.crud.ateam_db_helpers import \
     map_curies_to_names, search_ancestors_or_descendants
 from agr_literature_service.api.models import TopicEntityTagSourceModel, \
-    ReferenceModel, ModModel, TopicEntityTagModel
+    ReferenceModel, ModModel
 from agr_literature_service.api.user import add_user_if_not_exists
 
 logger = logging.getLogger(__name__)
@@ -39,14 +40,18 @@ class ExpiringCache:
     def __init__(self, expiration_time=3600):  # set default to 1hr
         # to store up to 50,000 items at any given time
         self.cache = TTLCache(maxsize=50_000, ttl=expiration_time)
+        # name lookups fill the cache from worker threads (TTLCache is not thread-safe)
+        self.lock = threading.Lock()
 
     def set(self, key, value):
         # set a value in the cache; it will automatically expire after the TTL
-        self.cache[key] = value
+        with self.lock:
+            self.cache[key] = value
 
     def get(self, key):
         # get a value from the cache; returns None if the key is expired or not found
-        return self.cache.get(key, None)
+        with self.lock:
+            return self.cache.get(key, None)
 
 
 id_to_name_cache = ExpiringCache(expiration_time=7200)
@@ -109,49 +114,6 @@ def add_source_obj_to_db_session(db: Session, source: Dict):
     return source_obj
 
 
-def get_sorted_column_values(reference_id: int, db: Session, column_name: str, desc: bool = False):
-
-    if column_name == "entity":
-        results = (
-            db.query(
-                TopicEntityTagModel.entity,
-                TopicEntityTagModel.entity_type
-            )
-            .filter_by(reference_id=reference_id)
-            .distinct()
-            .all()
-        )
-        entity_type_to_entities: Dict[str, List[str]] = {}
-        for result in results:
-            if result.entity_type in entity_type_to_entities:
-                entity_type_to_entities[result.entity_type].append(result.entity)
-            else:
-                entity_type_to_entities[result.entity_type] = [result.entity]
-        curie_name_map = _get_map_abc_entity_curies_to_names(db, entity_type_to_entities)
-    else:
-        curies = db.query(getattr(TopicEntityTagModel, column_name)).filter(
-            TopicEntityTagModel.reference_id == reference_id).distinct()
-        category = "atpterm" if column_name != "species" else "species"
-        curie_name_map = map_curies_to_names(category, [curie[0] for curie in curies if curie[0]])
-
-    return [curie for name, curie in sorted([(value, key) for key, value in curie_name_map.items()],
-                                            key=lambda x: x[0], reverse=desc)]
-
-
-def _get_map_abc_entity_curies_to_names(db, entity_type_to_entities):
-
-    entity_curie_to_name_map = {}
-    for entity_type in entity_type_to_entities:
-        entity_curies = entity_type_to_entities[entity_type]
-        curie_to_name_map = map_curies_to_names(entity_type, entity_curies)
-        entity_curie_to_name_map.update(curie_to_name_map)
-
-    """
-    {'SGD:S000001085': 'DOG2', 'SGD:S000001086': 'DOG1', 'SGD:S000001855': 'ACT1', 'SGD:S000002592': 'ATC1', 'WB:WBGene00003001': 'lin-12', 'ZFIN:ZDB-GENE-000607-29': 'id:ibd5038', 'ZFIN:ZDB-GENE-000816-1': 'fgfr3', 'ZFIN:ZDB-GENE-980526-255': 'fgfr1a', 'ZFIN:ZDB-GENE-980526-488': 'fgfr4', 'ZFIN:ZDB-GENE-990415-72': 'fgf8a', 'ZFIN:ZDB-GENE-991228-4': 'etv5b'}
-    """
-    return entity_curie_to_name_map
-
-
 def _get_map_sgd_curies_to_names(curies_category, curies):  # pragma: no cover
 
     curie_list = "|".join(curies).replace(" ", "+")
@@ -0,0 +1,326 @@
+"""
+Set-based validation of topic entity tags.
+
+A tag validates another tag of the same reference and secondary data provider
+according to the rules of ``topic_entity_tag_crud.validate_tags`` (topic,
+entity_type and data_novelty compared along the ATP hierarchy). Instead of
+replaying those rules tag by tag through the ORM, this module loads the tags
+of a whole set of references in one query, computes every (validated,
+validating) pair and the resulting validation values in memory, and writes
+only the differences back with a few bulk statements.
+
+When the ATP hierarchy or a source changes, only the references whose tags
+use the changed terms or source need revalidating. They are looked up in
+topic_entity_tag_reference_summary, whose per-reference topic, entity type,
+data novelty and source counts (GIN indexed) serve as the reverse index from
+a term or source to the references depending on it.
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from agr_literature_service.api.crud import ateam_db_helpers
+from agr_literature_service.api.crud.topic_entity_tag_utils import get_ancestors, get_descendants
+
+logger = logging.getLogger(__name__)
+
+ATP_ID_SOURCE_AUTHOR = "author"
+ATP_ID_SOURCE_CURATOR = "professional_biocurator"
+
+# references revalidated per transaction by revalidate_all_references
+REVALIDATION_BATCH_SIZE = 500
+
+Pair = Tuple[int, int]
+
+
+class AtpHierarchy:
+    """Memoized ATP ancestors/descendants of a term, including the term itself."""
+
+    def __init__(self):
+        self._ancestors: Dict[Optional[str], frozenset] = {}
+        self._descendants: Dict[Optional[str], frozenset] = {}
+
+    def ancestors(self, atp_id: Optional[str]) -> frozenset:
+        if atp_id not in self._ancestors:
+            self._ancestors[atp_id] = self._with_self(atp_id, get_ancestors)
+        return self._ancestors[atp_id]
+
+    def descendants(self, atp_id: Optional[str]) -> frozenset:
+        if atp_id not in self._descendants:
+            self._descendants[atp_id] = self._with_self(atp_id, get_descendants)
+        return self._descendants[atp_id]
+
+    @staticmethod
+    def _with_self(atp_id: Optional[str], related) -> frozenset:
+        if atp_id is None:
+            return frozenset()
+        return frozenset(related(onto_node=atp_id)) | {atp_id}
+
+
+def load_tags(db: Session, reference_ids: Sequence[int]) -> list:
+    """The validation-relevant columns of every tag of ``reference_ids``."""
+    return db.execute(text(
+        "SELECT tet.topic_entity_tag_id, tet.reference_id, tets.secondary_data_provider_id, "
+        "tet.topic, tet.entity_type, tet.entity, tet.species, tet.negated, tet.data_novelty, "
+        "tets.validation_type, tet.validation_by_author, tet.validation_by_professional_biocurator "
+        "FROM topic_entity_tag tet "
+        "JOIN topic_entity_tag_source tets ON tets.topic_entity_tag_source_id = tet.topic_entity_tag_source_id "
+        "WHERE tet.reference_id = ANY(:reference_ids)"),
+        {"reference_ids": list(reference_ids)}).fetchall()
+
+
+def _is_mixed(tag) -> bool:
+    return tag.entity is not None and tag.entity_type != tag.topic
+
+
+def _validated_by_positive(tag, candidates: Iterable, by_entity: Dict, hierarchy: AtpHierarchy) -> Iterator[int]:
+    """Tags validated by the positive ``tag``: the same or more generic ones."""
+    topics = hierarchy.ancestors(tag.topic)
+    novelties = hierarchy.ancestors(tag.data_novelty) | {tag.data_novelty}
+    entity_types = hierarchy.ancestors(tag.entity_type)
+    for other in candidates:
+        if (other.topic in topics and other.data_novelty in novelties
+                and (other.entity_type is None
+                     or (other.entity_type in entity_types and other.entity == tag.entity))
+                and (other.species is None or other.species == tag.species)):
+            yield other.topic_entity_tag_id
+    # a mixed topic + entity tag validates the pure entity tags of its entity
+    if _is_mixed(tag):
+        for other in by_entity.get(tag.entity, ()):
+            if (other.topic == other.entity_type and other.entity_type in entity_types
+                    and other.data_novelty in novelties):
+                yield other.topic_entity_tag_id
+
+
+def _validated_by_negative(tag, candidates: Iterable, by_entity: Dict, hierarchy: AtpHierarchy) -> Iterator[int]:
+    """Tags validated by the negative ``tag``: the same or more specific ones."""
+    topics = hierarchy.descendants(tag.topic)
+    novelties = hierarchy.descendants(tag.data_novelty) | {tag.data_novelty}
+    entity_types = hierarchy.descendants(tag.entity_type)
+    for other in candidates:
+        if (other.topic in topics and other.data_novelty in novelties
+                and (tag.entity_type is None
+                     or (other.entity_type in entity_types and other.entity == tag.entity))
+                and (tag.species is None or other.species == tag.species)):
+            yield other.topic_entity_tag_id
+    # a negative pure entity tag validates the positive mixed tags of its entity
+    if tag.topic == tag.entity_type:
+        for other in by_entity.get(tag.entity, ()):
+            if (other.negated is False and other.entity_type != other.topic
+                    and other.entity_type in entity_types and other.data_novelty in novelties):
+                yield other.topic_entity_tag_id
+
+
+def compute_validation_pairs(tags: Iterable, hierarchy: Optional[AtpHierarchy] = None) -> Set[Pair]:
+    """Every ``(validated_id, validating_id)`` pair among ``tags``. Only tags
+    with a negated value take part, and only tags from a source with a
+    validation_type validate others."""
+    hierarchy = hierarchy or AtpHierarchy()
+    groups: Dict[Tuple[int, int], list] = defaultdict(list)
+    for tag in tags:
+        if tag.negated is not None:
+            groups[(tag.reference_id, tag.secondary_data_provider_id)].append(tag)
+    pairs: Set[Pair] = set()
+    for group in groups.values():
+        by_entity: Dict[Optional[str], list] = defaultdict(list)
+        without_entity_type = []
+        for tag in group:
+            by_entity[tag.entity].append(tag)
+            if tag.entity_type is None:
+                without_entity_type.append(tag)
+        for tag in group:
+            if tag.validation_type is None:
+                continue
+            if tag.negated is False:
+                # an entity_type'd tag can only validate tags of its entity or
+                # tags without an entity_type
+                candidates = by_entity.get(tag.entity, []) + [
+                    t for t in without_entity_type if t.entity != tag.entity]
+                validated = _validated_by_positive(tag, candidates, by_entity, hierarchy)
+            else:
+                candidates = group if tag.entity_type is None else by_entity.get(tag.entity, [])
+                validated = _validated_by_negative(tag, candidates, by_entity, hierarchy)
+            pairs.update((validated_id, tag.topic_entity_tag_id) for validated_id in validated
+                         if validated_id != tag.topic_entity_tag_id)
+    return pairs
+
+
+def _validation_value(tag, validated_by: Dict[int, List[int]], tags_by_id: Dict, validation_type: str) -> str:
+    """Same result as ``calculate_validation_value_for_tag`` for one
+    validation_type, from the in-memory pairs."""
+    values = []
+    visited = {tag.topic_entity_tag_id}
+    to_visit = [tag.topic_entity_tag_id]
+    while to_visit:
+        for validating_id in validated_by.get(to_visit.pop(), ()):
+            validating = tags_by_id.get(validating_id)
+            if validating is None or validating_id in visited or validating.validation_type != validation_type:
+                continue
+            visited.add(validating_id)
+            values.append(validating.negated)
+            to_visit.append(validating_id)
+    if values:
+        if tag.validation_type == validation_type:
+            values.append(tag.negated)
+        if len(set(values)) == 1:
+            return "validated_right" if tag.negated == values[0] else "validated_wrong"
+        return "validation_conflict"
+    if tag.validation_type == validation_type:
+        return "validated_right_self"
+    return "not_validated"
+
+
+def compute_validation_values(tags: Iterable, pairs: Iterable[Pair]) -> Dict[int, Tuple[str, str]]:
+    """``(validation_by_professional_biocurator, validation_by_author)`` of every tag."""
+    tags_by_id = {tag.topic_entity_tag_id: tag for tag in tags}
+    validated_by: Dict[int, List[int]] = defaultdict(list)
+    for validated_id, validating_id in pairs:
+        validated_by[validated_id].append(validating_id)
+    return {tag_id: (_validation_value(tag, validated_by, tags_by_id, ATP_ID_SOURCE_CURATOR),
+                     _validation_value(tag, validated_by, tags_by_id, ATP_ID_SOURCE_AUTHOR))
+            for tag_id, tag in tags_by_id.items()}
+
+
+def _stored_pairs(db: Session, tag_ids: List[int]) -> Set[Pair]:
+    rows = db.execute(text(
+        "SELECT validated_topic_entity_tag_id, validating_topic_entity_tag_id "
+        "FROM topic_entity_tag_validation "
+        "WHERE validated_topic_entity_tag_id = ANY(:tag_ids) OR validating_topic_entity_tag_id = ANY(:tag_ids)"),
+        {"tag_ids": tag_ids}).fetchall()
+    return {(int(validated_id), int(validating_id)) for validated_id, validating_id in rows}
+
+
+def _write_pairs(db: Session, insert: Set[Pair], delete: Set[Pair]) -> None:
+    if delete:
+        validated, validating = zip(*delete)
+        db.execute(text(
+            "DELETE FROM topic_entity_tag_validation "
+            "WHERE (validated_topic_entity_tag_id, validating_topic_entity_tag_id) IN "
+            "(SELECT * FROM unnest(CAST(:validated AS integer[]), CAST(:validating AS integer[])))"),
+            {"validated": list(validated), "validating": list(validating)})
+    if insert:
+        validated, validating = zip(*insert)
+        db.execute(text(
+            "INSERT INTO topic_entity_tag_validation "
+            "(validated_topic_entity_tag_id, validating_topic_entity_tag_id) "
+            "SELECT * FROM unnest(CAST(:validated AS integer[]), CAST(:validating AS integer[])) "
+            "ON CONFLICT DO NOTHING"),
+            {"validated": list(validated), "validating": list(validating)})
+
+
+def _write_values(db: Session, tags: Iterable, values: Dict[int, Tuple[str, str]]) -> int:
+    """Update the validation values that changed, leaving the audit columns
+    alone (they are derived data, like set_validation_values_to_tag)."""
+    changed = [(tag.topic_entity_tag_id, *values[tag.topic_entity_tag_id]) for tag in tags
+               if values[tag.topic_entity_tag_id] != (tag.validation_by_professional_biocurator,
+                                                      tag.validation_by_author)]
+    if changed:
+        tag_ids, curator_values, author_values = zip(*changed)
+        db.execute(text(
+            "UPDATE topic_entity_tag tet "
+            "SET validation_by_professional_biocurator = v.curator, validation_by_author = v.author "
+            "FROM unnest(CAST(:tag_ids AS integer[]), CAST(:curator AS varchar[]), CAST(:author AS varchar[])) "
+            "AS v(topic_entity_tag_id, curator, author) "
+            "WHERE tet.topic_entity_tag_id = v.topic_entity_tag_id"),
+            {"tag_ids": list(tag_ids), "curator": list(curator_values), "author": list(author_values)})
+    return len(changed)
+
+
+def revalidate_references(db: Session, reference_ids: Sequence[int], update_pairs: bool = True,
+                          hierarchy: Optional[AtpHierarchy] = None) -> Dict[str, int]:
+    """Recompute the validation pairs (unless ``update_pairs`` is False) and
+    validation values of all tags of ``reference_ids``. Does not commit."""
+    tags = load_tags(db, reference_ids)
+    if not tags:
+        return {"tags": 0, "pairs_added": 0, "pairs_removed": 0, "values_updated": 0}
+    stored = _stored_pairs(db, [tag.topic_entity_tag_id for tag in tags])
+    pairs = compute_validation_pairs(tags, hierarchy) if update_pairs else stored
+    _write_pairs(db, insert=pairs - stored, delete=stored - pairs)
+    updated = _write_values(db, tags, compute_validation_values(tags, pairs))
+    return {"tags": len(tags), "pairs_added": len(pairs - stored), "pairs_removed": len(stored - pairs),
+            "values_updated": updated}
+
+
+def tagged_reference_batches(db: Session, batch_size: int = REVALIDATION_BATCH_SIZE) -> Iterator[List[int]]:
+    """reference_ids that have tags, in ascending batches (keyset paginated)."""
+    after = 0
+    while True:
+        batch = [row[0] for row in db.execute(text(
+            "SELECT DISTINCT reference_id FROM topic_entity_tag WHERE reference_id > :after "
+            "ORDER BY reference_id LIMIT :limit"), {"after": after, "limit": batch_size}).fetchall()]
+        if not batch:
+            return
+        yield batch
+        after = batch[-1]
+
+
+def revalidate_all_references(db: Session, update_pairs: bool = True,
+                              batch_size: int = REVALIDATION_BATCH_SIZE) -> Dict[str, int]:
+    """Revalidate every tagged reference, committing after each batch."""
+    hierarchy = AtpHierarchy()
+    totals: Dict[str, int] = defaultdict(int)
+    for batch in tagged_reference_batches(db, batch_size):
+        for key, value in revalidate_references(db, batch, update_pairs, hierarchy).items():
+            totals[key] += value
+        db.commit()
+        logger.info("Revalidated tags of references up to %s: %s", batch[-1], dict(totals))
+    return dict(totals)
+
+
+def affected_atp_terms(atp_ids: Iterable[str], hierarchy: Optional[AtpHierarchy] = None) -> Set[str]:
+    """The ATP terms whose validation relations can change when ``atp_ids``
+    are moved, added or removed: the terms and their descendants. Every
+    (validated, validating) pair that changes has a term below the changed
+    edge, so references without one of these terms are unaffected."""
+    hierarchy = hierarchy or AtpHierarchy()
+    terms: Set[str] = set()
+    for atp_id in atp_ids:
+        terms |= hierarchy.descendants(atp_id)
+    return terms
+
+
+def references_depending_on(db: Session, atp_terms: Iterable[str] = (),
+                            source_ids: Iterable[int] = ()) -> List[int]:
+    """Tagged references with a tag whose topic, entity type or data novelty
+    is one of ``atp_terms``, or whose source is one of ``source_ids``."""
+    terms = sorted(set(atp_terms))
+    sources = sorted({str(source_id) for source_id in source_ids})
+    if not terms and not sources:
+        return []
+    return [row[0] for row in db.execute(text(
+        "SELECT reference_id FROM topic_entity_tag_reference_summary "
+        "WHERE topic_counts ?| CAST(:terms AS text[]) "
+        "OR entity_type_counts ?| CAST(:terms AS text[]) "
+        "OR data_novelty_counts ?| CAST(:terms AS text[]) "
+        "OR source_counts ?| CAST(:sources AS text[]) "
+        "ORDER BY reference_id"), {"terms": terms, "sources": sources}).fetchall()]
+
+
+def revalidate_affected_references(db: Session, atp_ids: Iterable[str] = (), source_ids: Iterable[int] = (),
+                                   update_pairs: bool = True,
+                                   batch_size: int = REVALIDATION_BATCH_SIZE) -> Dict[str, int]:
+    """Revalidate the references depending on the changed ATP terms
+    ``atp_ids`` (and their descendants) or sources ``source_ids``,
+    committing after each batch.
+
+    The ATP maps of ateam_db_helpers are loaded once per process, so they
+    are reloaded first when terms changed; otherwise a long-lived worker
+    would revalidate against the hierarchy from before the change."""
+    atp_ids = list(atp_ids)
+    if atp_ids:
+        ateam_db_helpers.load_name_to_atp_and_relationships()
+    hierarchy = AtpHierarchy()
+    reference_ids = references_depending_on(db, affected_atp_terms(atp_ids, hierarchy), source_ids)
+    totals: Dict[str, int] = defaultdict(int)
+    totals["references"] = len(reference_ids)
+    for start in range(0, len(reference_ids), batch_size):
+        batch = reference_ids[start:start + batch_size]
+        for key, value in revalidate_references(db, batch, update_pairs, hierarchy).items():
+            totals[key] += value
+        db.commit()
+        logger.info("Revalidated tags of %d of %d affected references: %s",
+                    start + len(batch), len(reference_ids), dict(totals))
+    return dict(totals)
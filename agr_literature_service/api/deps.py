@@ -1,7 +1,7 @@
-import boto3
 from botocore.client import BaseClient
 
 from agr_literature_service.api.config import config
+from agr_literature_service.lit_processing.utils.s3_utils import get_s3_client
 
 
 def s3_auth() -> BaseClient:
@@ -10,8 +10,5 @@ def s3_auth() -> BaseClient:
     :return:
     """
 
-    s3 = boto3.client(service_name='s3', aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-                      aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY
-                      )
-
-    return s3
+    return get_s3_client(aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+                         aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY)
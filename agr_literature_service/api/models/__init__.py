@@ -28,10 +28,12 @@ from agr_literature_service.api.models.obsolete_model import ObsoleteReferenceMo
 from agr_literature_service.api.models.workflow_tag_model import WorkflowTagModel
 from agr_literature_service.api.models.workflow_tag_topic_model import WorkflowTagTopicModel
 from agr_literature_service.api.models.workflow_transition_model import WorkflowTransitionModel
-from agr_literature_service.api.models.topic_entity_tag_model import TopicEntityTagModel, TopicEntityTagSourceModel
+from agr_literature_service.api.models.topic_entity_tag_model import TopicEntityTagModel, TopicEntityTagSourceModel, \
+    TopicEntityTagReferenceSummaryModel
 from agr_literature_service.api.models.reference_mod_md5sum_model import ReferenceModMd5sumModel
 from agr_literature_service.api.models.referencefile_model import ReferencefileModel, ReferencefileModAssociationModel
 from agr_literature_service.api.models.embedding_file_model import EmbeddingFileModel
+from agr_literature_service.api.models.background_job_model import BackgroundJobModel
 from agr_literature_service.api.models.copyright_license_model import CopyrightLicenseModel
 from agr_literature_service.api.models.image_permission_model import ImagePermissionModel, ResourceImagePermissionModel
 from agr_literature_service.api.models.citation_model import CitationModel
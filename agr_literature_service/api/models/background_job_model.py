@@ -0,0 +1,46 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from agr_literature_service.api.database.base import Base
+
+
+class BackgroundJobModel(Base):
+    """Non-audited state of background jobs (file conversions, bulk uploads).
+
+    One row per job, keyed by the job_id the API hands out. ``state`` is the
+    job's own serialized snapshot (per-file progress, counters, log) and is
+    what status polls return; ``payload`` holds the arguments a queue worker
+    needs to run a ``queued`` job. Rows are claimed with
+    SELECT ... FOR UPDATE SKIP LOCKED, see api/utils/job_queue.py.
+    """
+    __tablename__ = "background_job"
+
+    job_id = Column(String, primary_key=True)
+    job_type = Column(String, nullable=False)
+    # 'queued', 'running', 'completed' or 'failed'
+    status = Column(String, nullable=False)
+
+    # not a foreign key: the row only describes the job and must not hold up
+    # (or be removed with) reference deletes
+    reference_id = Column(Integer, index=True, nullable=True)
+    user_id = Column(String, nullable=True)
+    mod_abbreviation = Column(String, nullable=True)
+
+    payload = Column(JSONB, nullable=False, server_default="{}")
+    state = Column(JSONB, nullable=False, server_default="{}")
+    error_message = Column(Text, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # "<host>:<pid>" of the process running the job
+    locked_by = Column(String, nullable=True)
+
+    date_created = Column(DateTime, nullable=False)
+    date_updated = Column(DateTime, nullable=False)
+    date_completed = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_background_job_type_status_created", "job_type", "status", "date_created"),
+    )
+
+    def __str__(self) -> str:
+        return f"{self.job_type} job {self.job_id} ({self.status})"
@@ -6,7 +6,8 @@ topic_entity_tag_model.py
 from typing import Dict, List
 
 from sqlalchemy import Column, ForeignKey, Integer, String, Float, \
-    and_, CheckConstraint, UniqueConstraint, Boolean, or_, Table
+    and_, CheckConstraint, UniqueConstraint, Boolean, or_, Table, DateTime, func, text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped
 
 from agr_literature_service.api.database.base import Base
@@ -197,6 +198,12 @@ class TopicEntityTagModel(AuditedModel, Base):
             ),
             name="valid_entity_type_dependencies"
         ),
+        # keyset order of the by_mod export; the included columns answer its
+        # source and reference filters from the index
+        Index('ix_topic_entity_tag_date_updated_id', 'date_updated', 'topic_entity_tag_id',
+              postgresql_include=['topic_entity_tag_source_id', 'reference_id']),
+        # default order of a reference's tag pages
+        Index('ix_topic_entity_tag_reference_id_id', 'reference_id', 'topic_entity_tag_id'),
     )
 
 
@@ -261,3 +268,45 @@ class TopicEntityTagSourceModel(AuditedModel, Base):
             'source_evidence_assertion', 'source_method', 'data_provider', 'secondary_data_provider_id',
             name='topic_entity_tag_source_unique'),
     )
+
+
+class TopicEntityTagReferenceSummaryModel(Base):
+    """Per-reference overview of its topic entity tags, one row per reference
+    with tags.
+
+    Not written by the API: the topic_entity_tag and topic_entity_tag_source
+    triggers in api/triggers/topic_entity_tag_summary_sql_func_triggers.py
+    refresh a reference's row whenever its tags, or the secondary data
+    provider of their source, change. The ``*_counts`` columns map a
+    value (a curie, or a topic_entity_tag_source_id for ``source_counts``) to
+    the number of tags carrying it; ``validation_counts`` holds one such map
+    per validation type and ``top_entities`` the most tagged entities.
+    """
+    __tablename__ = "topic_entity_tag_reference_summary"
+
+    reference_id = Column(
+        Integer,
+        ForeignKey("reference.reference_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    tag_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    topic_counts = Column(JSONB, nullable=False, server_default="{}")
+    entity_type_counts = Column(JSONB, nullable=False, server_default="{}")
+    species_counts = Column(JSONB, nullable=False, server_default="{}")
+    display_tag_counts = Column(JSONB, nullable=False, server_default="{}")
+    data_novelty_counts = Column(JSONB, nullable=False, server_default="{}")
+    source_counts = Column(JSONB, nullable=False, server_default="{}")
+    mod_counts = Column(JSONB, nullable=False, server_default="{}")
+    validation_counts = Column(JSONB, nullable=False, server_default="{}")
+    # [{"entity_type": ..., "entity": ..., "count": ...}], most tagged first
+    top_entities = Column(JSONB, nullable=False, server_default="[]")
+
+    date_updated = Column(DateTime, nullable=False, server_default=func.now())
+
+    # reverse index from a term or source to the references using it, for
+    # revalidating only the references a hierarchy or source change affects
+    __table_args__ = tuple(
+        Index(f"ix_topic_entity_tag_reference_summary_{column}", column, postgresql_using="gin")
+        for column in ("topic_counts", "entity_type_counts", "data_novelty_counts", "source_counts")
+    )
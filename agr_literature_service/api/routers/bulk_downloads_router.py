@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, Security
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Request, Security
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
 
@@ -7,6 +9,7 @@ from sqlalchemy.orm import Session
 from agr_literature_service.api import database
 from agr_literature_service.api.crud import reference_crud, resource_crud
 from agr_literature_service.api.auth import get_authenticated_user
+from agr_literature_service.api.util.streaming import accepts_gzip, streaming_response
 
 router = APIRouter(
     prefix="/bulk_download",
@@ -25,9 +28,39 @@ def show(db: Session = db_session,
                              media_type="application/json")
 
 
+@router.get('/references/external_ids/resumable/',
+            status_code=200)
+def show_resumable(request: Request,
+                   cursor: Optional[str] = None,
+                   since: Optional[datetime] = None,
+                   db: Session = db_session,
+                   user: Optional[Dict[str, Any]] = Security(get_authenticated_user)):
+    """
+    NDJSON, one reference per line with a cursor; pass the cursor of the last
+    line received to resume. since restricts to references updated since then.
+    """
+    return streaming_response(reference_crud.stream_references_external_ids_resumable(db, cursor, since),
+                              media_type="application/x-ndjson", gzip=accepts_gzip(request))
+
+
 @router.get('/resources/external_ids/',
             status_code=200)
 def show_ex_ids(db: Session = db_session,
                 user: Optional[Dict[str, Any]] = Security(get_authenticated_user)):
     return StreamingResponse(resource_crud.stream_all_resources_external_ids(db),
                              media_type="application/json")
+
+
+@router.get('/resources/external_ids/resumable/',
+            status_code=200)
+def show_ex_ids_resumable(request: Request,
+                          cursor: Optional[str] = None,
+                          since: Optional[datetime] = None,
+                          db: Session = db_session,
+                          user: Optional[Dict[str, Any]] = Security(get_authenticated_user)):
+    """
+    NDJSON, one resource per line with a cursor; pass the cursor of the last
+    line received to resume. since restricts to resources updated since then.
+    """
+    return streaming_response(resource_crud.stream_resources_external_ids_resumable(db, cursor, since),
+                              media_type="application/x-ndjson", gzip=accepts_gzip(request))
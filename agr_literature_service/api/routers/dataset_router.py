@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Security
+from fastapi import APIRouter, Depends, Request, Security
 from typing import Dict, Any, Optional
 
 from sqlalchemy.orm import Session
@@ -10,6 +10,7 @@ from agr_literature_service.api.schemas.dataset_schema import DatasetSchemaPost,
     DatasetSchemaUpdate, DatasetSchemaShow, DatasetEntrySchemaPost
 from agr_literature_service.api.user import set_global_user_from_cognito
 from agr_literature_service.api.auth import get_authenticated_user
+from agr_literature_service.api.util.streaming import accepts_gzip, streaming_response
 
 router = APIRouter(
     prefix='/datasets',
@@ -71,9 +72,21 @@ def patch_dataset(request: DatasetSchemaUpdate, mod_abbreviation: str, data_type
             response_model=DatasetSchemaDownload)
 @router.get("/download/{mod_abbreviation}/{data_type}/{dataset_type}/",
             response_model=DatasetSchemaDownload)
-def download_dataset(mod_abbreviation: str, data_type: str, dataset_type: str, version: int = None,
+def download_dataset(request: Request, mod_abbreviation: str, data_type: str, dataset_type: str,
+                     version: int = None, stream: bool = False, output_format: str = "json",
                      db: Session = db_session,
                      user: Optional[Dict[str, Any]] = Security(get_authenticated_user)):
+    """
+    stream=true sends the same payload as a chunked response built from a
+    server-side cursor (output_format=ndjson for one entry per line), gzip
+    content-encoded when the client accepts it.
+    """
+    if stream:
+        chunks = dataset_crud.stream_dataset_download(db, mod_abbreviation=mod_abbreviation, data_type=data_type,
+                                                      dataset_type=dataset_type, version=version,
+                                                      output_format=output_format)
+        media_type = "application/x-ndjson" if output_format == "ndjson" else "application/json"
+        return streaming_response(chunks, media_type=media_type, gzip=accepts_gzip(request))
     db_dataset = dataset_crud.download_dataset(db, mod_abbreviation=mod_abbreviation, data_type=data_type,
                                                dataset_type=dataset_type, version=version)
     return db_dataset
@@ -1,18 +1,19 @@
 from typing import Union, List, Dict, Any, Optional
 
-from fastapi import (APIRouter, Body, Depends, HTTPException, Response,
+from fastapi import (APIRouter, Body, Depends, HTTPException, Query, Response,
                      Security, status)
 from sqlalchemy.orm import Session
 from multiprocessing import Process, Manager, Lock
 
 from agr_literature_service.api import database
-from agr_literature_service.api.crud import cross_reference_crud, reference_crud
+from agr_literature_service.api.crud import cross_reference_crud, embedding_file_crud, reference_crud
 from agr_literature_service.api.s3 import download
 from agr_literature_service.api.deps import s3_auth
 from agr_literature_service.api.schemas import (ReferenceSchemaPost, ReferenceSchemaShow,
                                                 ReferenceSchemaUpdate)
 from agr_literature_service.api.schemas.reference_schemas import ReferenceSchemaAddPmid, \
     ReferenceEmailSchemaRelated
+from agr_literature_service.api.schemas.embedding_file_schemas import SimilarReferenceSchemaShow
 from agr_literature_service.api.user import set_global_user_from_cognito
 from agr_literature_service.api.auth import get_authenticated_user
 from agr_literature_service.api.util.resource_urls import reference_url
@@ -222,6 +223,25 @@ def show_versions(curie_or_reference_id: str,
     return reference_crud.show_changesets(db, curie_or_reference_id)
 
 
+@router.get('/{curie_or_reference_id}/similar',
+            status_code=200,
+            response_model=List[SimilarReferenceSchemaShow])
+def show_similar(curie_or_reference_id: str,
+                 limit: int = Query(10, ge=1, le=100),
+                 mod_abbreviation: Optional[str] = None,
+                 corpus: Optional[str] = Query(None, description="inside_corpus, needs_review or outside_corpus"),
+                 exact: bool = False,
+                 user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
+                 db: Session = db_session):
+    """
+    References most similar to this one by full-text embedding (cosine),
+    best first, optionally only those associated with a MOD and/or with a
+    corpus status for it. Approximate unless exact=true.
+    """
+    return embedding_file_crud.similar_references(db, curie_or_reference_id, limit,
+                                                  mod_abbreviation, corpus, exact)
+
+
 @router.get(
     "/{curie_or_reference_id}/emails",
     status_code=200,
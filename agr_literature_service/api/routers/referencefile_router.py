@@ -4,7 +4,7 @@ import logging
 from json import JSONDecodeError
 from typing import Union, List, Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, Response, Security, status, File, UploadFile, \
+from fastapi import APIRouter, Depends, Request, Response, Security, status, File, UploadFile, \
     BackgroundTasks, HTTPException
 from fastapi.responses import PlainTextResponse
 
@@ -24,6 +24,7 @@ from agr_literature_service.api.utils.bulk_upload_manager import upload_manager
 from agr_literature_service.api.utils.bulk_upload_processor import process_bulk_upload_async
 from agr_literature_service.api.user import set_global_user_from_cognito
 from agr_literature_service.api.auth import get_authenticated_user, read_auth_bypass
+from agr_literature_service.api.util.streaming import accepts_gzip
 
 logger = logging.getLogger(__name__)
 
@@ -128,9 +129,11 @@ def file_upload(reference_curie: str = None,
 @router.get('/download_file/{referencefile_id}',
             status_code=status.HTTP_200_OK)
 def download_file(referencefile_id: int,
+                  request: Request,
                   user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
                   db: Session = db_session):
-    return referencefile_crud.download_file(db, referencefile_id, get_mod_access(user) if user else [])
+    return referencefile_crud.download_file(db, referencefile_id, get_mod_access(user) if user else [],
+                                            accept_gzip=accepts_gzip(request))
 
 
 @router.get('/additional_files_tarball/{reference_id}',
@@ -1,4 +1,5 @@
-from multiprocessing import Process, Value
+import logging
+from multiprocessing import Process, SimpleQueue, Value
 from typing import List, Dict, Union, Any, Optional
 
 from agr_cognito_py import get_mod_access
@@ -7,12 +8,13 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from agr_literature_service.api import database
-from agr_literature_service.api.crud import topic_entity_tag_crud, \
+from agr_literature_service.api.crud import topic_entity_tag_bulk, topic_entity_tag_crud, \
     topic_entity_tag_utils
 from agr_literature_service.api.schemas import TopicEntityTagSchemaShow, TopicEntityTagSchemaPost
 from agr_literature_service.api.schemas.topic_entity_tag_schemas import TopicEntityTagSchemaRelated, \
     TopicEntityTagSourceSchemaUpdate, TopicEntityTagSchemaUpdate, \
-    TopicEntityTagSourceSchemaShow, TopicEntityTagSourceSchemaCreate
+    TopicEntityTagSourceSchemaShow, TopicEntityTagSourceSchemaCreate, TopicEntityTagSchemaBulkPost, \
+    TopicEntityTagBulkResponseSchema, TopicEntityTagReferenceSummarySchema, TopicEntityTagReferenceSummaryBatchRequest
 from agr_literature_service.api.user import set_global_user_from_cognito
 from agr_literature_service.api.auth import get_authenticated_user, no_read_auth_bypass
 from agr_literature_service.api.util.resource_urls import topic_entity_tag_url, topic_entity_tag_source_url
@@ -26,7 +28,12 @@ router = APIRouter(
 get_db = database.get_db
 db_session: Session = Depends(get_db)
 
+logger = logging.getLogger(__name__)
+
 revalidate_all_tags_already_running = Value('b', False)
+# ids of sources changed while a revalidation was running; their tags are
+# revalidated when it finishes
+pending_source_revalidations: SimpleQueue = SimpleQueue()
 
 
 @router.post('/',
@@ -46,6 +53,22 @@ def create_tag(request: TopicEntityTagSchemaPost,
     return topic_entity_tag_crud.show_tag(db, new_tag_id)
 
 
+@router.post('/bulk',
+             status_code=status.HTTP_200_OK,
+             response_model=TopicEntityTagBulkResponseSchema)
+def create_tags_bulk(request: TopicEntityTagSchemaBulkPost,
+                     user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
+                     db: Session = db_session):
+    """
+    Create up to 10000 tags in one request (e.g. ML pipeline or migration
+    loads). Each tag is checked like a single POST; results[i].status_code is
+    what that POST would have returned (201, 200 for a note appended to an
+    existing tag, 404/409/422), and a failing tag does not fail the others.
+    """
+    set_global_user_from_cognito(db, user)
+    return topic_entity_tag_bulk.create_tags_bulk(db, request.tags)
+
+
 class ValidateTopicRequest(BaseModel):
     # Thin curator-validation request for the TET grid's Validation column: just
     # the cell the curator acted on. The server resolves the curator source and
@@ -142,7 +165,9 @@ def patch_source(topic_entity_tag_source_id: int,
                  user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
                  db: Session = db_session):
     set_global_user_from_cognito(db, user)
-    topic_entity_tag_crud.patch_source(db, topic_entity_tag_source_id, request)
+    result = topic_entity_tag_crud.patch_source(db, topic_entity_tag_source_id, request)
+    if result["validation_changed"]:
+        queue_source_revalidation(revalidate_all_tags_already_running, topic_entity_tag_source_id)
     return topic_entity_tag_crud.show_source(db, topic_entity_tag_source_id)
 
 
@@ -307,13 +332,37 @@ def show_all_reference_tags_batch(
     )
 
 
+@router.get('/summary/{curie_or_reference_id}',
+            status_code=200,
+            response_model=TopicEntityTagReferenceSummarySchema)
+def show_reference_tag_summary(curie_or_reference_id: str,
+                               user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
+                               db: Session = db_session):
+    """Counts of the reference's tags by topic, entity type, source, MOD and
+    validation state plus its most tagged entities, read from the
+    trigger-maintained summary table."""
+    return topic_entity_tag_crud.show_reference_tag_summary(db, curie_or_reference_id)
+
+
+@router.post('/summary',
+             status_code=200,
+             response_model=Dict[str, TopicEntityTagReferenceSummarySchema])
+def show_reference_tag_summaries(request: TopicEntityTagReferenceSummaryBatchRequest,
+                                 user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
+                                 db: Session = db_session):
+    return topic_entity_tag_crud.show_reference_tag_summaries(db, request.curies_or_reference_ids)
+
+
 @router.get('/by_mod/{mod_abbreviation}',
             status_code=200)
 def get_reference_tags(mod_abbreviation: str,
                        days_updated: int = 7,
+                       page_size: Optional[int] = Query(None, ge=1),
+                       cursor: Optional[str] = None,
                        user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
                        db: Session = db_session):
-    return topic_entity_tag_crud.get_all_topic_entity_tags_by_mod(db, mod_abbreviation, days_updated)
+    return topic_entity_tag_crud.get_all_topic_entity_tags_by_mod(db, mod_abbreviation, days_updated,
+                                                                  page_size=page_size, cursor=cursor)
 
 
 @router.get('/get_curie_to_name_from_all_tets/',
@@ -328,17 +377,49 @@ def get_curie_to_name_from_all_tets(curie_or_reference_id: str,
 def revalidate_tags_process_wrapper(already_running, email: str,
                                     delete_all_validation_values_first: bool,
                                     curie_or_reference_id: str,
-                                    validation_values_only: bool):
+                                    validation_values_only: bool,
+                                    atp_ids: List[str] = None,
+                                    topic_entity_tag_source_ids: List[int] = None):
     try:
         already_running.value = True
         topic_entity_tag_crud.revalidate_all_tags(
             email=email,
             delete_all_first=delete_all_validation_values_first,
             curie_or_reference_id=curie_or_reference_id,
-            validation_values_only=validation_values_only
+            validation_values_only=validation_values_only,
+            atp_ids=atp_ids,
+            topic_entity_tag_source_ids=topic_entity_tag_source_ids
         )
     finally:
-        already_running.value = False
+        revalidate_pending_sources(already_running)
+
+
+def queue_source_revalidation(already_running, topic_entity_tag_source_id: int):
+    """Revalidate the tags of a changed source in the background: right
+    away, or after the revalidation that is running now."""
+    with already_running.get_lock():
+        pending_source_revalidations.put(topic_entity_tag_source_id)
+        if already_running.value:
+            return
+        already_running.value = True
+    Process(target=revalidate_pending_sources, args=(already_running,)).start()
+
+
+def revalidate_pending_sources(already_running):
+    """Revalidate the tags of the queued sources until none are left, then
+    clear the running flag."""
+    while True:
+        with already_running.get_lock():
+            source_ids = set()
+            while not pending_source_revalidations.empty():
+                source_ids.add(pending_source_revalidations.get())
+            if not source_ids:
+                already_running.value = False
+                return
+        try:
+            topic_entity_tag_crud.revalidate_all_tags(topic_entity_tag_source_ids=sorted(source_ids))
+        except Exception as e:
+            logger.error(f"Revalidation of the tags of sources {sorted(source_ids)} failed: {e}")
 
 
 @router.get('/revalidate_all_tags/',
@@ -365,6 +446,17 @@ def revalidate_all_tags(
             description="Set True to only rebuild validation relationships without reprocessing "
                         "tag data. Faster option when tag data is correct but values are stale."
         ),
+        atp_ids: str = Query(
+            default=None,
+            description="Comma-separated ATP terms whose place in the hierarchy changed (e.g. "
+                        "'ATP:0000005,ATP:0000122'). Only references with tags using these terms or their "
+                        "descendants are revalidated. When a term moved, its old parent need not be listed."
+        ),
+        topic_entity_tag_source_ids: str = Query(
+            default=None,
+            description="Comma-separated ids of changed sources. Only references with tags from these "
+                        "sources are revalidated."
+        ),
         user: Optional[Dict[str, Any]] = Security(get_authenticated_user),
         db: Session = db_session):
     # user is guaranteed to be non-None: get_authenticated_user raises 401 on auth failure
@@ -382,18 +474,27 @@ def revalidate_all_tags(
             "message": "You need to provide an email address to revalidate all tags. You will receive an email at "
                        "the end of the validation process"
         }
-    if revalidate_all_tags_already_running.value:
-        return {
-            "message": "Revalidation in progress, no need to submit the request again."
-        }
-    else:
-        p = Process(target=revalidate_tags_process_wrapper,
-                    args=(revalidate_all_tags_already_running, email, delete_all_validation_values_first,
-                          curie_or_reference_id, validation_values_only))
-        p.start()
-        return {
-            "message": "Revalidation of all tags started. You will receive an email when done."
-        }
+    try:
+        source_ids = [int(source_id) for source_id in topic_entity_tag_source_ids.split(',')] \
+            if topic_entity_tag_source_ids else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Invalid topic_entity_tag_source_ids {topic_entity_tag_source_ids}")
+    with revalidate_all_tags_already_running.get_lock():
+        if revalidate_all_tags_already_running.value:
+            return {
+                "message": "Revalidation in progress, no need to submit the request again."
+            }
+        # set here, not only in the process, so sources changed meanwhile are queued behind it
+        revalidate_all_tags_already_running.value = True
+    p = Process(target=revalidate_tags_process_wrapper,
+                args=(revalidate_all_tags_already_running, email, delete_all_validation_values_first,
+                      curie_or_reference_id, validation_values_only,
+                      atp_ids.split(',') if atp_ids else None, source_ids))
+    p.start()
+    return {
+        "message": "Revalidation of all tags started. You will receive an email when done."
+    }
 
 
 @router.delete('/delete_manual_tets/{reference_curie}/{mod_abbreviation}',
@@ -11,10 +11,12 @@ from markdown_it import MarkdownIt
 from starlette import status
 
 from agr_literature_service.api.auth import get_authenticated_user
-from agr_abc_document_parsers import (
-    convert_xml_to_markdown,
-    validate_markdown,
+from agr_literature_service.lit_processing.utils.xml_conversion_pool import (
+    XmlConversionBusy,
+    XmlConversionTimeout,
+    get_xml_conversion_pool,
 )
+from agr_abc_document_parsers import validate_markdown
 
 logger = logging.getLogger(__name__)
 
@@ -95,9 +97,23 @@ async def convert_xml_to_md(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
         )
 
+    # Conversions are CPU-bound and run in the shared process pool; when it is
+    # full the request is refused rather than queued behind large documents.
     try:
-        markdown = await asyncio.to_thread(
-            convert_xml_to_markdown, xml_content, source_format
+        markdown = await get_xml_conversion_pool().convert_async(
+            xml_content, source_format
+        )
+    except XmlConversionBusy:
+        return PlainTextResponse(
+            content="Too many conversions in progress, try again shortly.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "5"},
+        )
+    except XmlConversionTimeout:
+        logger.warning("XML-to-Markdown conversion timed out")
+        return PlainTextResponse(
+            content="Conversion took too long and was stopped.",
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
         )
     except ValueError as e:
         logger.warning("XML-to-Markdown conversion failed: %s", e)
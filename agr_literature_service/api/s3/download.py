@@ -1,4 +1,6 @@
 import logging
+import zlib
+from typing import Iterator
 
 from botocore.exceptions import ClientError
 from fastapi import HTTPException
@@ -33,6 +35,44 @@ def download_file_from_bucket(s3_client, bucket, folder, object_name=None):
                             detail=jsonable_encoder(e))
 
 
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_gunzipped_object(body, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Decompress a gzipped S3 StreamingBody on the fly and yield the
+    uncompressed content, member after member for concatenated gzip files.
+    Nothing touches the disk.
+
+    The uncompressed size is not known up front (the gzip ISIZE trailer only
+    covers the last member, modulo 2^32), so callers stream it without a
+    Content-Length, and a byte range could only be served by decompressing
+    from the start.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        for compressed in body.iter_chunks(chunk_size):
+            data = decompressor.decompress(compressed)
+            while decompressor.unused_data:
+                # concatenated gzip members
+                unused = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data += decompressor.decompress(unused)
+            if data:
+                yield data
+        data = decompressor.flush()
+        if data:
+            yield data
+    finally:
+        body.close()
+
+
+def fetch_gunzipped_object(s3_client, bucket, key) -> bytes:
+    """Whole uncompressed content of a gzipped S3 object, in memory."""
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    return b"".join(iter_gunzipped_object(body))
+
+
 def get_json_file(mod, json_file=None):
 
     subDir = None
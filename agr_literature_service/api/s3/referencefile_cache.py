@@ -0,0 +1,181 @@
+"""
+Optional on-disk cache of referencefile contents, shared by the API workers
+and the batch processors running on the same host.
+
+Entries are the uncompressed file contents stored under the md5sum the
+referencefile rows already carry, so a cached file is verified against its
+own name on every read. The cache is enabled by setting
+REFERENCEFILE_CACHE_DIR; REFERENCEFILE_CACHE_MAX_BYTES caps its size and the
+least recently used files are evicted first (a hit bumps the file's mtime).
+Writes go through a temporary file and os.replace, so several processes can
+share the directory.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+READ_BLOCK_SIZE = 1024 * 1024
+# eviction removes files until the cache is below this fraction of the cap
+EVICTION_LOW_WATER = 0.9
+
+
+class ReferencefileCache:
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # size estimate, refreshed from disk whenever it goes over the cap
+        self._approx_size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, md5sum: str) -> str:
+        return os.path.join(self.directory, md5sum[0:2], md5sum)
+
+    def get_path(self, md5sum: str) -> Optional[str]:
+        """Path of the verified cached file for md5sum, or None on a miss. A
+        file whose content does not match md5sum is removed."""
+        file_path = self.path_for(md5sum)
+        try:
+            with open(file_path, "rb") as f:
+                md5sum_hash = hashlib.md5()
+                for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+                    md5sum_hash.update(block)
+        except OSError:
+            return None
+        if md5sum_hash.hexdigest() != md5sum:
+            logger.warning(f"Removing corrupted cache entry {file_path}")
+            self._remove(file_path)
+            return None
+        try:
+            os.utime(file_path)
+        except OSError:
+            return None
+        return file_path
+
+    def get(self, md5sum: str) -> Optional[bytes]:
+        file_path = self.get_path(md5sum)
+        if file_path is None:
+            return None
+        try:
+            with open(file_path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, md5sum: str, content: bytes) -> bool:
+        """Cache content under md5sum; content that does not hash to md5sum
+        is not cached."""
+        return self._store(md5sum, [content])
+
+    def iter_and_cache(self, md5sum: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass chunks through while writing them to the cache; the entry is
+        only kept if the stream was consumed to the end and hashes to
+        md5sum. A cache write error never interrupts the stream."""
+        file_path = self.path_for(md5sum)
+        tmp_file = None
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(file_path), suffix=".tmp", delete=False)
+        except OSError as e:
+            logger.warning(f"Could not cache {md5sum}: {e}")
+        md5sum_hash = hashlib.md5()
+        size = 0
+        complete = False
+        try:
+            for chunk in chunks:
+                if tmp_file is not None:
+                    try:
+                        tmp_file.write(chunk)
+                    except OSError as e:
+                        logger.warning(f"Could not cache {md5sum}: {e}")
+                        tmp_file.close()
+                        self._remove(tmp_file.name)
+                        tmp_file = None
+                    md5sum_hash.update(chunk)
+                    size += len(chunk)
+                yield chunk
+            complete = True
+        finally:
+            if tmp_file is not None:
+                tmp_file.close()
+                if complete and md5sum_hash.hexdigest() == md5sum:
+                    os.replace(tmp_file.name, file_path)
+                    self._added(size)
+                else:
+                    self._remove(tmp_file.name)
+
+    def _store(self, md5sum: str, chunks: Iterable[bytes]) -> bool:
+        for _ in self.iter_and_cache(md5sum, chunks):
+            pass
+        return os.path.exists(self.path_for(md5sum))
+
+    def _added(self, size: int) -> None:
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = self._scan_size()
+            else:
+                self._approx_size += size
+            if self._approx_size > self.max_bytes:
+                self._approx_size = self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> int:
+        """Remove least recently used files until the cache is below the low
+        water mark; returns the remaining size."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_LOW_WATER
+        for _, size, file_path in entries:
+            if total <= target:
+                break
+            self._remove(file_path)
+            total -= size
+        return total
+
+    @staticmethod
+    def _remove(file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+_cache: Optional[ReferencefileCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_referencefile_cache() -> Optional[ReferencefileCache]:
+    """The process-wide cache, or None when REFERENCEFILE_CACHE_DIR is unset."""
+    global _cache
+    directory = os.environ.get("REFERENCEFILE_CACHE_DIR")
+    if not directory:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.directory != directory:
+            max_bytes = int(os.environ.get("REFERENCEFILE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+            _cache = ReferencefileCache(directory, max_bytes)
+        return _cache
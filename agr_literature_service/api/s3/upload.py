@@ -1,5 +1,7 @@
 from botocore.exceptions import ClientError
 
+from agr_literature_service.lit_processing.utils.s3_utils import S3_TRANSFER_CONFIG
+
 
 def upload_file_to_bucket(s3_client, file_obj, bucket, folder, object_name=None, **kwargs):
     """Upload a file to an S3 bucket
@@ -13,6 +15,7 @@ def upload_file_to_bucket(s3_client, file_obj, bucket, folder, object_name=None,
     if object_name is None:
         object_name = file_obj
 
+    kwargs.setdefault('Config', S3_TRANSFER_CONFIG)
     # Upload the file
     try:
         s3_client.upload_fileobj(file_obj, bucket, f"{folder}/{object_name}", **kwargs)
@@ -32,3 +32,12 @@ class EmbeddingFileSchemaShow(EmbeddingFileSchemaBase):
     """Returned representation of a catalog row with its keys."""
     embedding_file_id: int
     parquet_referencefile_id: int
+
+
+class SimilarReferenceSchemaShow(BaseModel):
+    """A reference ranked by embedding similarity to another one."""
+    model_config = ConfigDict(extra='forbid')
+
+    curie: str
+    title: Optional[str] = None
+    similarity: float
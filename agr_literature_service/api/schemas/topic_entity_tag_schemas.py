@@ -1,5 +1,6 @@
 
-from typing import Optional, List
+from datetime import datetime
+from typing import Any, Dict, Optional, List
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, constr, confloat
 
@@ -92,6 +93,69 @@ class TopicEntityTagSchemaPost(TopicEntityTagSchemaCreate):
     index_wft: Optional[str] = None
 
 
+TOPIC_ENTITY_TAG_BULK_MAX = 10000
+
+
+class TopicEntityTagSchemaBulkPost(BaseModel):
+    """Schema for posting many topic entity tags at once."""
+    model_config = ConfigDict(extra='forbid')
+
+    tags: List[TopicEntityTagSchemaPost] = Field(..., min_length=1, max_length=TOPIC_ENTITY_TAG_BULK_MAX)
+
+
+class TopicEntityTagBulkResultSchema(BaseModel):
+    """Outcome of one tag of a bulk post: the status code the single-tag
+    endpoint would have returned, the created/updated (or conflicting
+    existing) tag id, and the error detail if any."""
+    model_config = ConfigDict(extra='forbid')
+
+    index: int
+    status_code: int
+    topic_entity_tag_id: Optional[int] = None
+    detail: Optional[Any] = None
+
+
+class TopicEntityTagBulkResponseSchema(BaseModel):
+    """Schema for the bulk post response."""
+    model_config = ConfigDict(extra='forbid')
+
+    created: int
+    updated: int
+    failed: int
+    results: List[TopicEntityTagBulkResultSchema]
+
+
+TOPIC_ENTITY_TAG_SUMMARY_BATCH_MAX = 1000
+
+
+class TopicEntityTagReferenceSummarySchema(BaseModel):
+    """Per-reference tag overview: counts of the reference's tags by value
+    (``source_counts`` by topic_entity_tag_source_id, ``mod_counts`` by the
+    source's secondary_data_provider abbreviation, ``validation_counts`` by
+    validation type then value) and its most tagged entities."""
+    model_config = ConfigDict(extra='forbid', from_attributes=True)
+
+    reference_id: int
+    tag_count: int = 0
+    topic_counts: Dict[str, int] = {}
+    entity_type_counts: Dict[str, int] = {}
+    species_counts: Dict[str, int] = {}
+    display_tag_counts: Dict[str, int] = {}
+    data_novelty_counts: Dict[str, int] = {}
+    source_counts: Dict[str, int] = {}
+    mod_counts: Dict[str, int] = {}
+    validation_counts: Dict[str, Dict[str, int]] = {}
+    top_entities: List[Dict[str, Any]] = []
+    date_updated: Optional[datetime] = None
+
+
+class TopicEntityTagReferenceSummaryBatchRequest(BaseModel):
+    """Schema for requesting the summaries of many references."""
+    model_config = ConfigDict(extra='forbid')
+
+    curies_or_reference_ids: List[str] = Field(..., min_length=1, max_length=TOPIC_ENTITY_TAG_SUMMARY_BATCH_MAX)
+
+
 class TopicEntityTagSchemaRelated(ConfidenceMixin, AuditedObjectModelSchema):
     """Schema for related topic entity tags with audit fields."""
     model_config = ConfigDict(extra='ignore', from_attributes=True)
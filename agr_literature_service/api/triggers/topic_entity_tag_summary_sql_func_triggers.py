@@ -0,0 +1,251 @@
+"""
+topic_entity_tag_summary_sql_func_triggers.py
+=============================================
+
+SQL functions and triggers that keep ``topic_entity_tag_reference_summary``
+(one row per reference with tags) up to date.
+
+Each row holds the reference's tag count, counts of its tags by topic,
+entity type, species, display tag, data novelty, source, owning MOD
+(the source's secondary_data_provider) and validation state, and its most
+tagged entities. It lets list views, facets and the search indexer read a
+reference's tag overview with a primary-key lookup instead of aggregating
+the tags (and their sources) on every request.
+
+The triggers are statement-level with transition tables, so a statement
+touching many tags (bulk creation, revalidation, deletes) refreshes every
+affected reference once rather than once per tag. Updates that do not
+change a summarised column (notes, dates, confidence) are ignored.
+
+The owning MOD comes from the tag's source, so a statement changing the
+secondary_data_provider_id of sources refreshes the references with tags
+from them too.
+
+A refresh first locks the references' summary rows (inserting them if
+needed), so concurrent transactions tagging the same reference refresh it
+one after the other and the second one counts the first one's tags.
+References left without tags lose their row.
+"""
+from sqlalchemy import text
+
+# number of entities kept in top_entities
+TOP_ENTITIES = 20
+
+refresh_topic_entity_tag_reference_summary_function = r"""
+CREATE OR REPLACE FUNCTION refresh_topic_entity_tag_reference_summary(p_reference_ids INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- references deleted in this transaction (cascading to their tags) get no row
+    INSERT INTO topic_entity_tag_reference_summary (reference_id)
+    SELECT r.reference_id
+    FROM reference r
+    WHERE r.reference_id = ANY(p_reference_ids)
+    ON CONFLICT (reference_id) DO NOTHING;
+
+    PERFORM 1
+    FROM topic_entity_tag_reference_summary
+    WHERE reference_id = ANY(p_reference_ids)
+    ORDER BY reference_id
+    FOR UPDATE;
+
+    WITH tags AS MATERIALIZED (
+        SELECT t.reference_id, t.topic, t.entity_type, t.entity, t.species, t.display_tag, t.data_novelty,
+               t.topic_entity_tag_source_id, m.abbreviation AS mod_abbreviation,
+               t.validation_by_professional_biocurator, t.validation_by_author
+        FROM topic_entity_tag t
+        JOIN topic_entity_tag_source src ON src.topic_entity_tag_source_id = t.topic_entity_tag_source_id
+        JOIN mod m ON m.mod_id = src.secondary_data_provider_id
+        WHERE t.reference_id = ANY(p_reference_ids)
+    ),
+    value_counts AS (
+        SELECT reference_id, dimension, jsonb_object_agg(value, n) AS counts
+        FROM (
+            SELECT reference_id, 'topic' AS dimension, topic AS value, count(*) AS n
+            FROM tags GROUP BY reference_id, topic
+            UNION ALL
+            SELECT reference_id, 'entity_type', entity_type, count(*)
+            FROM tags WHERE entity_type IS NOT NULL GROUP BY reference_id, entity_type
+            UNION ALL
+            SELECT reference_id, 'species', species, count(*)
+            FROM tags WHERE species IS NOT NULL GROUP BY reference_id, species
+            UNION ALL
+            SELECT reference_id, 'display_tag', display_tag, count(*)
+            FROM tags WHERE display_tag IS NOT NULL GROUP BY reference_id, display_tag
+            UNION ALL
+            SELECT reference_id, 'data_novelty', data_novelty, count(*)
+            FROM tags GROUP BY reference_id, data_novelty
+            UNION ALL
+            SELECT reference_id, 'source', topic_entity_tag_source_id::TEXT, count(*)
+            FROM tags GROUP BY reference_id, topic_entity_tag_source_id
+            UNION ALL
+            SELECT reference_id, 'mod', mod_abbreviation, count(*)
+            FROM tags GROUP BY reference_id, mod_abbreviation
+            UNION ALL
+            SELECT reference_id, 'professional_biocurator', validation_by_professional_biocurator, count(*)
+            FROM tags WHERE validation_by_professional_biocurator IS NOT NULL
+            GROUP BY reference_id, validation_by_professional_biocurator
+            UNION ALL
+            SELECT reference_id, 'author', validation_by_author, count(*)
+            FROM tags WHERE validation_by_author IS NOT NULL
+            GROUP BY reference_id, validation_by_author
+        ) c
+        GROUP BY reference_id, dimension
+    ),
+    summaries AS (
+        SELECT reference_id,
+               count(*) AS tag_count,
+               (SELECT jsonb_object_agg(dimension, counts) FROM value_counts v
+                WHERE v.reference_id = tags.reference_id) AS counts
+        FROM tags
+        GROUP BY reference_id
+    ),
+    top_entities AS (
+        SELECT reference_id,
+               jsonb_agg(jsonb_build_object('entity_type', entity_type, 'entity', entity, 'count', n)
+                         ORDER BY n DESC, entity, entity_type) AS entities
+        FROM (
+            SELECT reference_id, entity_type, entity, count(*) AS n,
+                   row_number() OVER (PARTITION BY reference_id
+                                      ORDER BY count(*) DESC, entity, entity_type) AS entity_rank
+            FROM tags
+            WHERE entity IS NOT NULL
+            GROUP BY reference_id, entity_type, entity
+        ) e
+        WHERE entity_rank <= {top_entities}
+        GROUP BY reference_id
+    )
+    UPDATE topic_entity_tag_reference_summary summary
+    SET tag_count = s.tag_count,
+        topic_counts = COALESCE(s.counts -> 'topic', '{{}}'),
+        entity_type_counts = COALESCE(s.counts -> 'entity_type', '{{}}'),
+        species_counts = COALESCE(s.counts -> 'species', '{{}}'),
+        display_tag_counts = COALESCE(s.counts -> 'display_tag', '{{}}'),
+        data_novelty_counts = COALESCE(s.counts -> 'data_novelty', '{{}}'),
+        source_counts = COALESCE(s.counts -> 'source', '{{}}'),
+        mod_counts = COALESCE(s.counts -> 'mod', '{{}}'),
+        validation_counts = jsonb_build_object(
+            'professional_biocurator', COALESCE(s.counts -> 'professional_biocurator', '{{}}'),
+            'author', COALESCE(s.counts -> 'author', '{{}}')),
+        top_entities = COALESCE(e.entities, '[]'),
+        date_updated = now()
+    FROM summaries s
+    LEFT JOIN top_entities e ON e.reference_id = s.reference_id
+    WHERE summary.reference_id = s.reference_id;
+
+    DELETE FROM topic_entity_tag_reference_summary summary
+    WHERE summary.reference_id = ANY(p_reference_ids)
+      AND NOT EXISTS (SELECT 1 FROM topic_entity_tag t WHERE t.reference_id = summary.reference_id);
+END;
+$$;
+""".format(top_entities=TOP_ENTITIES)
+
+topic_entity_tag_refresh_reference_summary_function = r"""
+CREATE OR REPLACE FUNCTION topic_entity_tag_refresh_reference_summary()
+  RETURNS TRIGGER
+  LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_topic_entity_tag_reference_summary(
+            ARRAY(SELECT DISTINCT reference_id FROM new_tags));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_topic_entity_tag_reference_summary(
+            ARRAY(SELECT DISTINCT reference_id FROM old_tags));
+    ELSE
+        PERFORM refresh_topic_entity_tag_reference_summary(ARRAY(
+            SELECT o.reference_id
+            FROM old_tags o JOIN new_tags n ON n.topic_entity_tag_id = o.topic_entity_tag_id
+            WHERE (o.reference_id, o.topic, o.entity_type, o.entity, o.species, o.display_tag,
+                   o.data_novelty, o.topic_entity_tag_source_id,
+                   o.validation_by_professional_biocurator, o.validation_by_author)
+                  IS DISTINCT FROM
+                  (n.reference_id, n.topic, n.entity_type, n.entity, n.species, n.display_tag,
+                   n.data_novelty, n.topic_entity_tag_source_id,
+                   n.validation_by_professional_biocurator, n.validation_by_author)
+            UNION
+            SELECT n.reference_id
+            FROM old_tags o JOIN new_tags n ON n.topic_entity_tag_id = o.topic_entity_tag_id
+            WHERE o.reference_id IS DISTINCT FROM n.reference_id));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+topic_entity_tag_source_refresh_reference_summary_function = r"""
+CREATE OR REPLACE FUNCTION topic_entity_tag_source_refresh_reference_summary()
+  RETURNS TRIGGER
+  LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM refresh_topic_entity_tag_reference_summary(ARRAY(
+        SELECT DISTINCT t.reference_id
+        FROM old_sources o
+        JOIN new_sources n ON n.topic_entity_tag_source_id = o.topic_entity_tag_source_id
+        JOIN topic_entity_tag t ON t.topic_entity_tag_source_id = n.topic_entity_tag_source_id
+        WHERE o.secondary_data_provider_id IS DISTINCT FROM n.secondary_data_provider_id));
+    RETURN NULL;
+END;
+$$;
+"""
+
+topic_entity_tag_summary_insert_trigger = """
+DROP TRIGGER IF EXISTS topic_entity_tag_summary_insert_trigger ON public.topic_entity_tag;
+CREATE TRIGGER topic_entity_tag_summary_insert_trigger
+AFTER INSERT ON topic_entity_tag
+    REFERENCING NEW TABLE AS new_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.topic_entity_tag_refresh_reference_summary();
+"""
+
+topic_entity_tag_summary_update_trigger = """
+DROP TRIGGER IF EXISTS topic_entity_tag_summary_update_trigger ON public.topic_entity_tag;
+CREATE TRIGGER topic_entity_tag_summary_update_trigger
+AFTER UPDATE ON topic_entity_tag
+    REFERENCING OLD TABLE AS old_tags NEW TABLE AS new_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.topic_entity_tag_refresh_reference_summary();
+"""
+
+topic_entity_tag_summary_delete_trigger = """
+DROP TRIGGER IF EXISTS topic_entity_tag_summary_delete_trigger ON public.topic_entity_tag;
+CREATE TRIGGER topic_entity_tag_summary_delete_trigger
+AFTER DELETE ON topic_entity_tag
+    REFERENCING OLD TABLE AS old_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.topic_entity_tag_refresh_reference_summary();
+"""
+
+# transition tables cannot be combined with a column list (UPDATE OF ...),
+# so the function itself skips sources whose provider did not change
+topic_entity_tag_source_summary_update_trigger = """
+DROP TRIGGER IF EXISTS topic_entity_tag_source_summary_update_trigger ON public.topic_entity_tag_source;
+CREATE TRIGGER topic_entity_tag_source_summary_update_trigger
+AFTER UPDATE ON topic_entity_tag_source
+    REFERENCING OLD TABLE AS old_sources NEW TABLE AS new_sources
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.topic_entity_tag_source_refresh_reference_summary();
+"""
+
+# Ordered so that every function exists before anything that calls it.
+topic_entity_tag_summary_sql_statements = [
+    refresh_topic_entity_tag_reference_summary_function,
+    topic_entity_tag_refresh_reference_summary_function,
+    topic_entity_tag_summary_insert_trigger,
+    topic_entity_tag_summary_update_trigger,
+    topic_entity_tag_summary_delete_trigger,
+]
+
+# The topic_entity_tag_source trigger, installed by a migration of its own.
+topic_entity_tag_source_summary_sql_statements = [
+    topic_entity_tag_source_refresh_reference_summary_function,
+    topic_entity_tag_source_summary_update_trigger,
+]
+
+
+def add_topic_entity_tag_summary_triggers(db_session):
+    for statement in topic_entity_tag_summary_sql_statements + topic_entity_tag_source_summary_sql_statements:
+        db_session.execute(text(statement))
+    db_session.commit()
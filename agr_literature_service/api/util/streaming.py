@@ -0,0 +1,132 @@
+# Helpers for endpoints that stream their payload (bulk downloads, dataset
+# downloads, file downloads) instead of building it in memory first.
+
+import io
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+
+def _accept_encoding_qvalues(accept_encoding: str) -> Dict[str, float]:
+    """Coding -> q-value of an Accept-Encoding header; entries with an
+    unparsable q-value are left out."""
+    qvalues = {}
+    for entry in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        if not coding:
+            continue
+        qvalue = 1.0
+        try:
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    qvalue = float(value)
+        except ValueError:
+            continue
+        qvalues[coding.lower()] = qvalue
+    return qvalues
+
+
+def accepts_gzip(request: Optional[Request]) -> bool:
+    """Whether the client accepts a gzip content-encoding: gzip (or a
+    wildcard, when gzip is not listed) with a q-value above 0."""
+    if request is None:
+        return False
+    qvalues = _accept_encoding_qvalues(request.headers.get("accept-encoding", ""))
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qvalues:
+            return qvalues[coding] > 0
+    return False
+
+
+def gzip_chunks(chunks: Iterable[Union[str, bytes]], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of chunks on the fly; output is yielded as soon as zlib
+    emits it so memory stays bounded by the compressor window."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode_chunks(chunks: Iterable[Union[str, bytes]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def streaming_response(chunks: Iterable[Union[str, bytes]], media_type: str,
+                       gzip: bool = False, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """StreamingResponse over ``chunks``, gzip content-encoded when ``gzip``
+    is set (callers decide with accepts_gzip)."""
+    response_headers = dict(headers or {})
+    if gzip:
+        response_headers["Content-Encoding"] = "gzip"
+        response_headers["Vary"] = "Accept-Encoding"
+        body = gzip_chunks(chunks)
+    else:
+        body = encode_chunks(chunks)
+    return StreamingResponse(body, media_type=media_type, headers=response_headers)
+
+
+class _ChunkSink:
+    """Write-only file object that collects whatever is written to it until
+    the streaming generator drains it."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        yield from chunks
+
+
+def iter_tar_stream(members: Iterable[Tuple[str, str]], fetch: Callable[[str], bytes],
+                    max_workers: int = 4) -> Iterator[bytes]:
+    """
+    Build a .tar.gz as a stream. ``members`` are (arcname, key) pairs and
+    ``fetch(key)`` returns the member's content; at most ``max_workers``
+    fetches run ahead of the writer and every member is appended, in the
+    order given, as soon as its content is there. Output is yielded while
+    the archive is still being assembled.
+    """
+    sink = _ChunkSink()
+    pending: Deque = deque()
+    member_iter = iter(members)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next() -> None:
+            for arcname, key in member_iter:
+                pending.append((arcname, executor.submit(fetch, key)))
+                return
+
+        try:
+            for _ in range(max_workers):
+                submit_next()
+            with tarfile.open(fileobj=sink, mode="w|gz") as tar:  # type: ignore
+                while pending:
+                    arcname, future = pending.popleft()
+                    data = future.result()
+                    submit_next()
+                    tarinfo = tarfile.TarInfo(name=arcname)
+                    tarinfo.size = len(data)
+                    tarinfo.mtime = int(time.time())
+                    tarinfo.mode = 0o644
+                    tar.addfile(tarinfo, io.BytesIO(data))
+                    del data
+                    yield from sink.drain()
+            yield from sink.drain()
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -1,12 +1,21 @@
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, asdict, field, fields
 from threading import Lock
 import logging
 
+from agr_literature_service.api.utils.job_queue import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_RUNNING,
+    JobStore,
+)
+
 logger = logging.getLogger(__name__)
 
+BULK_UPLOAD_JOB_TYPE = "bulk_upload"
+
 
 @dataclass
 class BulkUploadJob:
@@ -39,6 +48,18 @@ class BulkUploadJob:
         data['duration_seconds'] = self.duration_seconds
         return data
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BulkUploadJob':
+        """Rebuild a job from its to_dict() output (computed fields are ignored)."""
+        names = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in names}
+        for t in ('start_time', 'end_time', 'last_update'):
+            if values.get(t):
+                values[t] = datetime.fromisoformat(values[t])
+            else:
+                values.pop(t, None)
+        return cls(**values)
+
     def update_progress(self,
                         processed: Optional[int] = None,
                         current_file: str = "",
@@ -81,11 +102,22 @@ class BulkUploadJob:
 
 
 class BulkUploadManager:
-    """Thread-safe in-memory manager for bulk upload jobs."""
+    """Thread-safe manager for bulk upload jobs; jobs are kept in memory and,
+    when a ``store`` is given, written through to it so that any worker can
+    answer a status poll."""
 
-    def __init__(self) -> None:
+    def __init__(self, store: Optional[JobStore] = None) -> None:
         self._jobs: Dict[str, BulkUploadJob] = {}
         self._lock = Lock()
+        # held from taking a job's snapshot until it is saved, so the store
+        # receives the updates in the order they were made; reads only take
+        # _lock and are not held up by the write
+        self._save_lock = Lock()
+        self._store = store
+
+    def _persist(self, data: Dict[str, Any], status: Optional[str] = None, **columns: Any) -> None:
+        if self._store is not None:
+            self._store.save(data['job_id'], data, status=status, **columns)
 
     def create_job(self,
                    user_id: str,
@@ -94,35 +126,46 @@ class BulkUploadManager:
                    total_files: int = 0) -> str:
         """Create a new bulk upload job and return its ID."""
         job_id = str(uuid.uuid4())
-        with self._lock:
-            job = BulkUploadJob(
-                job_id=job_id,
-                user_id=user_id,
-                mod_abbreviation=mod_abbreviation,
-                filename=filename,
-                status='running',
-                total_files=total_files
-            )
-            self._jobs[job_id] = job
+        with self._save_lock:
+            with self._lock:
+                job = BulkUploadJob(
+                    job_id=job_id,
+                    user_id=user_id,
+                    mod_abbreviation=mod_abbreviation,
+                    filename=filename,
+                    status='running',
+                    total_files=total_files
+                )
+                self._jobs[job_id] = job
+                data = job.to_dict()
+            self._persist(data, status=JOB_STATUS_RUNNING, user_id=user_id,
+                          mod_abbreviation=mod_abbreviation)
         logger.info(f"Created bulk upload job {job_id} for user {user_id}, MOD {mod_abbreviation}")
         return job_id
 
     def get_job(self, job_id: str) -> Optional[BulkUploadJob]:
         """Retrieve a job by its ID."""
         with self._lock:
-            return self._jobs.get(job_id)
+            job = self._jobs.get(job_id)
+        if job is not None or self._store is None:
+            return job
+        data = self._store.load(job_id)
+        return BulkUploadJob.from_dict(data) if data else None
 
     def update_job(self, job_id: str, **kwargs: Any) -> bool:
         """Update metadata fields for an existing job."""
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return False
-            for key, val in kwargs.items():
-                if hasattr(job, key):
-                    setattr(job, key, val)
-            job.last_update = datetime.utcnow()
-            return True
+        with self._save_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return False
+                for key, val in kwargs.items():
+                    if hasattr(job, key):
+                        setattr(job, key, val)
+                job.last_update = datetime.utcnow()
+                data = job.to_dict()
+            self._persist(data)
+        return True
 
     def update_progress(self,
                         job_id: str,
@@ -131,24 +174,31 @@ class BulkUploadManager:
                         success: bool = True,
                         error: str = "") -> bool:
         """Thread-safe progress update wrapper."""
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return False
-            job.update_progress(processed, current_file, success, error)
-            return True
+        with self._save_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return False
+                job.update_progress(processed, current_file, success, error)
+                data = job.to_dict()
+            self._persist(data)
+        return True
 
     def complete_job(self, job_id: str, success: bool = True, error: str = "") -> None:
         """Mark a job as completed or failed."""
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return
-            job.status = 'completed' if success else 'failed'
-            job.end_time = datetime.utcnow()
-            job.last_update = job.end_time
-            if error:
-                job.error_message = error
+        with self._save_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return
+                job.status = 'completed' if success else 'failed'
+                job.end_time = datetime.utcnow()
+                job.last_update = job.end_time
+                if error:
+                    job.error_message = error
+                data = job.to_dict()
+            self._persist(data, status=JOB_STATUS_COMPLETED if success else JOB_STATUS_FAILED,
+                          error_message=error or None)
         logger.info(
             f"Completed bulk upload job {job_id}: "
             f"{job.successful_files}/{job.total_files} successful, "
@@ -207,4 +257,4 @@ class BulkUploadManager:
 
 
 # Singleton instance
-upload_manager = BulkUploadManager()
+upload_manager = BulkUploadManager(store=JobStore(BULK_UPLOAD_JOB_TYPE))
@@ -1,7 +1,13 @@
 import asyncio
+import contextvars
+import functools
 import tempfile
 import shutil
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, List, Optional, Set, Tuple
+
+from agr_literature_service.api.crud.reference_utils import normalize_reference_curies
 from agr_literature_service.api.utils.bulk_upload_utils import (
     extract_and_classify_files,
     classify_and_parse_file,
@@ -9,7 +15,49 @@ from agr_literature_service.api.utils.bulk_upload_utils import (
 )
 from agr_literature_service.api.utils.bulk_upload_manager import upload_manager
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
+
+# archive members uploaded concurrently; each holds a DB connection while
+# it runs, so keep this well below the engine's pool size
+BULK_UPLOAD_WORKERS = int(os.environ.get('BULK_UPLOAD_WORKERS', 4))
+
+
+def _save_and_extract(archive: UploadFile, temp_dir: str) -> List[Tuple[str, bool]]:
+    # Save archive to temp file instead of reading into memory
+    archive_path = os.path.join(temp_dir, archive.filename or "archive")
+    with open(archive_path, "wb") as f:
+        shutil.copyfileobj(archive.file, f)
+    with open(archive_path, "rb") as f:
+        return extract_and_classify_files(f, temp_dir, archive.filename)
+
+
+def _parse_files(files: List[Tuple[str, bool]], temp_dir: str,
+                 mod_abbreviation: str) -> Tuple[List[Tuple[str, Dict[str, Any]]], Optional[Exception]]:
+    """Metadata of the files in archive order, up to the first file whose
+    name cannot be parsed; that error is returned with them."""
+    parsed = []
+    for path, _ in files:
+        try:
+            parsed.append((path, classify_and_parse_file(path, temp_dir, mod_abbreviation)))
+        except Exception as e:
+            return parsed, e
+    return parsed, None
+
+
+def _resolve_reference_curies(session_factory: sessionmaker,
+                              parsed: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, str]:
+    with session_factory() as db:
+        return normalize_reference_curies(db, {metadata['reference_curie'] for _, metadata in parsed})
+
+
+def _process_file(session_factory: sessionmaker, path: str, metadata: Dict[str, Any],
+                  agrkb_curies: Dict[str, str]) -> Dict[str, Any]:
+    curie = metadata['reference_curie']
+    if curie not in agrkb_curies:
+        return {'status': 'error', 'error': f"404: The XREF {curie} is not in the cross_reference table"}
+    metadata = dict(metadata, reference_curie=agrkb_curies[curie])
+    with session_factory() as db:
+        return process_single_file(path, metadata, db)
 
 
 async def process_bulk_upload_async(
@@ -20,50 +68,72 @@ async def process_bulk_upload_async(
 ):
     """
     Background task to process a bulk upload:
-     - read the entire UploadFile into memory
-     - extract to a fresh temp subdir
-     - parse & upload each file
-     - update progress
+     - save the UploadFile to a fresh temp subdir and extract it there
+     - resolve the reference curies of all files with one query
+     - upload the files through a pool of BULK_UPLOAD_WORKERS threads, each
+       file with its own DB session
+     - update progress as files finish
      - clean up
+    The blocking work runs in the pool, and the job updates (which are
+    saved to the DB) in a thread of their own, in order and without
+    queueing behind the uploads, so the event loop stays free.
     """
     temp_dir = tempfile.mkdtemp(prefix=job_id + '_', dir=base_dir if (base_dir := os.environ.get('LOG_PATH')) else None)
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=True)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=1) as job_executor:
+
+        def save_job(method, *args, **kwargs) -> Awaitable[Any]:
+            return loop.run_in_executor(job_executor, functools.partial(method, *args, **kwargs))
+
+        try:
+            with ThreadPoolExecutor(max_workers=BULK_UPLOAD_WORKERS) as executor:
+                # 1) Save and extract the archive
+                files = await loop.run_in_executor(executor, _save_and_extract, archive, temp_dir)
+                await save_job(upload_manager.update_job, job_id, total_files=len(files))
+
+                # 2) Parse file names and look up their references in one go
+                parsed, parse_error = _parse_files(files, temp_dir, mod_abbreviation)
+                agrkb_curies = await loop.run_in_executor(
+                    executor, _resolve_reference_curies, session_factory, parsed)
+
+                # 3) Process the files concurrently; each task runs in a copy of
+                # this context so the current user set by the router is kept
+                futures: Dict["asyncio.Future[Dict[str, Any]]", str] = {
+                    asyncio.wrap_future(executor.submit(contextvars.copy_context().run, _process_file,
+                                                        session_factory, path, metadata, agrkb_curies)): path
+                    for path, metadata in parsed
+                }
+                processed = 0
+                pending: Set["asyncio.Future[Dict[str, Any]]"] = set(futures)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        processed += 1
+
+                        # 4) Update progress
+                        success = (result.get('status') == 'success')
+                        error = '' if success else result.get('error', '')
+                        await save_job(
+                            upload_manager.update_progress,
+                            job_id=job_id,
+                            processed=processed,
+                            current_file=os.path.basename(futures[future]),
+                            success=success,
+                            error=error
+                        )
+
+            if parse_error is not None:
+                raise parse_error
+
+            # 5) Mark complete
+            await save_job(upload_manager.complete_job, job_id, success=True)
+
+        except Exception as e:
+            await save_job(upload_manager.complete_job, job_id, success=False, error=str(e))
 
-    try:
-        # 1) Save archive to temp file instead of reading into memory
-        archive_path = os.path.join(temp_dir, archive.filename or "archive")
-        with open(archive_path, "wb") as f:
-            shutil.copyfileobj(archive.file, f)
-
-        # 2) Process using the saved file
-        with open(archive_path, "rb") as f:
-            files = extract_and_classify_files(f, temp_dir, archive.filename)
-        upload_manager.update_job(job_id, total_files=len(files))
-
-        # 3) Process each file
-        for idx, (path, _) in enumerate(files, start=1):
-            metadata = classify_and_parse_file(path, temp_dir, mod_abbreviation)
-            result = process_single_file(path, metadata, db)
-
-            # 4) Update progress
-            success = (result.get('status') == 'success')
-            error = '' if success else result.get('error', '')
-            upload_manager.update_progress(
-                job_id=job_id,
-                processed=idx,
-                current_file=os.path.basename(path),
-                success=success,
-                error=error
-            )
-
-            # Let the loop occasionally yield
-            await asyncio.sleep(0)
-
-        # 5) Mark complete
-        upload_manager.complete_job(job_id, success=True)
-
-    except Exception as e:
-        upload_manager.complete_job(job_id, success=False, error=str(e))
-
-    finally:
-        # 7) Clean up only the directory we created
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        finally:
+            # 7) Clean up only the directory we created
+            shutil.rmtree(temp_dir, ignore_errors=True)
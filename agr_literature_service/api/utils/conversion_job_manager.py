@@ -5,9 +5,12 @@ Mirrors BulkUploadManager but is keyed by reference_id for idempotency:
 two concurrent requests to convert the same reference share a single job
 rather than launching duplicate PDFX runs.
 
-Job state is per-process and lost on restart (same tradeoff as
-BulkUploadManager). Under multi-worker uvicorn the worst case is one
-duplicate job per worker; acceptable for the current use case.
+The singleton writes every job through to the background_job table and
+falls back to it for jobs it does not hold in memory, so a job started by
+one gunicorn worker (or handed to the job worker pool with ``enqueue``) is
+visible to all of them and survives worker recycling. Idempotency across
+workers is best effort: two workers racing on the same reference may still
+each start a job.
 """
 import logging
 import uuid
@@ -16,8 +19,21 @@ from datetime import datetime, timedelta
 from threading import Lock
 from typing import Any, Dict, List, Optional
 
+from agr_literature_service.api.utils.job_queue import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_RUNNING,
+    JobStore,
+)
+
 logger = logging.getLogger(__name__)
 
+CONVERSION_JOB_TYPE = "file_conversion"
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
 
 @dataclass
 class PerFileProgress:
@@ -75,15 +91,65 @@ class ConversionJob:
         end = self.completed_at or datetime.utcnow()
         return (end - self.started_at).total_seconds()
 
+    def to_state(self) -> Dict[str, Any]:
+        """to_dict() plus the fields from_dict() needs to rebuild the job."""
+        return dict(self.to_dict(), user_id=self.user_id,
+                    last_update=self.last_update.isoformat())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversionJob":
+        started_at = _parse_datetime(data.get("started_at")) or datetime.utcnow()
+        return cls(
+            job_id=data["job_id"],
+            reference_id=data["reference_id"],
+            reference_curie=data["reference_curie"],
+            user_id=data.get("user_id") or "",
+            status=data["status"],
+            started_at=started_at,
+            completed_at=_parse_datetime(data.get("completed_at")),
+            last_update=_parse_datetime(data.get("last_update")) or started_at,
+            error_message=data.get("error_message") or "",
+            per_file_progress=[PerFileProgress(**p) for p in data.get("per_file_progress", [])],
+        )
+
 
 class ConversionJobManager:
-    """Thread-safe in-memory manager for file-conversion jobs."""
+    """Thread-safe manager for file-conversion jobs; jobs are kept in memory
+    and, when a ``store`` is given, persisted to it."""
 
-    def __init__(self) -> None:
+    def __init__(self, store: Optional[JobStore] = None) -> None:
         self._jobs: Dict[str, ConversionJob] = {}
         self._active_by_reference: Dict[int, str] = {}
         self._last_by_reference: Dict[int, str] = {}
         self._lock = Lock()
+        # held from taking a job's snapshot until it is saved, so the store
+        # receives the updates in the order they were made; reads only take
+        # _lock and are not held up by the write
+        self._save_lock = Lock()
+        self._store = store
+
+    def _persist(self, state: Dict[str, Any], status: Optional[str] = None, **columns: Any) -> None:
+        if self._store is not None:
+            self._store.save(state["job_id"], state, status=status, **columns)
+
+    def _load(self, job_id: str) -> Optional[ConversionJob]:
+        if self._store is None:
+            return None
+        state = self._store.load(job_id)
+        return ConversionJob.from_dict(state) if state else None
+
+    def _get_or_adopt(self, job_id: str) -> Optional[ConversionJob]:
+        """The in-memory job, or the stored one taken over by this process
+        (a queue worker running a job another process created)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        stored = self._load(job_id)
+        if stored is None:
+            return None
+        with self._lock:
+            return self._jobs.setdefault(job_id, stored)
 
     def create_or_get_job(self, reference_id: int, reference_curie: str, user_id: str,
                           expected_source_files: Optional[List[Dict[str, Optional[str]]]] = None) -> ConversionJob:
@@ -99,67 +165,108 @@ class ConversionJobManager:
         ``expected_converted_display_name``, ``expected_converted_file_class``.
         Seeding is skipped when an existing running job is returned.
         """
-        with self._lock:
-            existing_job_id = self._active_by_reference.get(reference_id)
-            if existing_job_id:
-                existing = self._jobs.get(existing_job_id)
-                if existing and existing.status == "running":
-                    return existing
-                # Stale entry (job was completed/failed but not cleaned up) — fall through.
-                self._active_by_reference.pop(reference_id, None)
-
-            job_id = str(uuid.uuid4())
-            job = ConversionJob(
-                job_id=job_id,
-                reference_id=reference_id,
-                reference_curie=reference_curie,
-                user_id=user_id,
-                status="running",
-            )
-            if expected_source_files:
-                for ef in expected_source_files:
-                    source_id = ef.get("source_referencefile_id")
-                    source_id_int = int(source_id) if source_id is not None else None
-                    job.per_file_progress.append(
-                        PerFileProgress(
-                            source_display_name=str(ef["source_display_name"]),
-                            source_file_class=str(ef["source_file_class"]),
-                            source_referencefile_id=source_id_int,
-                            converted_display_name=ef.get("expected_converted_display_name"),
-                            converted_file_class=ef.get("expected_converted_file_class"),
-                            status="pending",
+        stored = None
+        if self._store is not None and reference_id not in self._active_by_reference:
+            stored = self._store.find_for_reference(reference_id, active_only=True)
+        with self._save_lock:
+            with self._lock:
+                existing_job_id = self._active_by_reference.get(reference_id)
+                if existing_job_id:
+                    existing = self._jobs.get(existing_job_id)
+                    if existing and existing.status == "running":
+                        return existing
+                    # Stale entry (job was completed/failed but not cleaned up) — fall through.
+                    self._active_by_reference.pop(reference_id, None)
+                elif stored is not None:
+                    # running in another process
+                    return ConversionJob.from_dict(stored)
+
+                job_id = str(uuid.uuid4())
+                job = ConversionJob(
+                    job_id=job_id,
+                    reference_id=reference_id,
+                    reference_curie=reference_curie,
+                    user_id=user_id,
+                    status="running",
+                )
+                if expected_source_files:
+                    for ef in expected_source_files:
+                        source_id = ef.get("source_referencefile_id")
+                        source_id_int = int(source_id) if source_id is not None else None
+                        job.per_file_progress.append(
+                            PerFileProgress(
+                                source_display_name=str(ef["source_display_name"]),
+                                source_file_class=str(ef["source_file_class"]),
+                                source_referencefile_id=source_id_int,
+                                converted_display_name=ef.get("expected_converted_display_name"),
+                                converted_file_class=ef.get("expected_converted_file_class"),
+                                status="pending",
+                            )
                         )
-                    )
-            self._jobs[job_id] = job
-            self._active_by_reference[reference_id] = job_id
-            self._last_by_reference[reference_id] = job_id
+                self._jobs[job_id] = job
+                self._active_by_reference[reference_id] = job_id
+                self._last_by_reference[reference_id] = job_id
+                state = job.to_state()
+            self._persist(state, status=JOB_STATUS_RUNNING, reference_id=reference_id, user_id=user_id)
         logger.info(
             f"Created conversion job {job_id} for reference_id={reference_id} "
             f"(curie={reference_curie}, user={user_id})"
         )
         return job
 
+    def enqueue(self, job_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Hand a job created by create_or_get_job to the job worker pool; the
+        worker reports progress through its own manager and this process
+        reads it back from the store. Returns False (and keeps the job here)
+        when there is no store or the write failed, so the caller can run the
+        job itself.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or self._store is None:
+                return False
+            state = job.to_state()
+        if not self._store.enqueue(job_id, state, payload):
+            return False
+        self.forget(job_id)
+        logger.info(f"Queued conversion job {job_id} (reference_id={job.reference_id})")
+        return True
+
+    def forget(self, job_id: str) -> None:
+        """Drop the in-memory copy of a job; a stored job stays readable."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and self._active_by_reference.get(job.reference_id) == job_id:
+                self._active_by_reference.pop(job.reference_id, None)
+
     def get_job(self, job_id: str) -> Optional[ConversionJob]:
         with self._lock:
-            return self._jobs.get(job_id)
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
 
     def get_active_job_for_reference(self, reference_id: int) -> Optional[ConversionJob]:
         with self._lock:
             job_id = self._active_by_reference.get(reference_id)
-            if not job_id:
-                return None
-            job = self._jobs.get(job_id)
+            job = self._jobs.get(job_id) if job_id else None
             if job and job.status == "running":
                 return job
+            if job_id:
+                return None
+        if self._store is None:
             return None
+        stored = self._store.find_for_reference(reference_id, active_only=True)
+        return ConversionJob.from_dict(stored) if stored else None
 
     def get_last_job_for_reference(self, reference_id: int) -> Optional[ConversionJob]:
         """Return the most recent job for this reference, regardless of status."""
         with self._lock:
             job_id = self._last_by_reference.get(reference_id)
-            if not job_id:
-                return None
-            return self._jobs.get(job_id)
+            job = self._jobs.get(job_id) if job_id else None
+        if job is not None or self._store is None:
+            return job
+        stored = self._store.find_for_reference(reference_id)
+        return ConversionJob.from_dict(stored) if stored else None
 
     def record_file_progress(self, job_id: str, *,
                              source_display_name: str,
@@ -174,58 +281,69 @@ class ConversionJobManager:
         ``source_display_name`` + ``source_file_class``). If no pending entry
         was seeded, a new entry is appended (defensive)."""
         new_status = "success" if success else "failed"
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return
-            existing: Optional[PerFileProgress] = None
-            for p in job.per_file_progress:
-                if (p.source_display_name == source_display_name
-                        and p.source_file_class == source_file_class):
-                    existing = p
-                    break
-            if existing is not None:
-                existing.status = new_status
-                existing.error = error
-                if source_referencefile_id is not None:
-                    existing.source_referencefile_id = source_referencefile_id
-                if success:
-                    if converted_display_name is not None:
-                        existing.converted_display_name = converted_display_name
-                    if converted_file_class is not None:
-                        existing.converted_file_class = converted_file_class
-                    if converted_referencefile_id is not None:
-                        existing.converted_referencefile_id = converted_referencefile_id
+        if self._get_or_adopt(job_id) is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return
+                existing: Optional[PerFileProgress] = None
+                for p in job.per_file_progress:
+                    if (p.source_display_name == source_display_name
+                            and p.source_file_class == source_file_class):
+                        existing = p
+                        break
+                if existing is not None:
+                    existing.status = new_status
+                    existing.error = error
+                    if source_referencefile_id is not None:
+                        existing.source_referencefile_id = source_referencefile_id
+                    if success:
+                        if converted_display_name is not None:
+                            existing.converted_display_name = converted_display_name
+                        if converted_file_class is not None:
+                            existing.converted_file_class = converted_file_class
+                        if converted_referencefile_id is not None:
+                            existing.converted_referencefile_id = converted_referencefile_id
+                    else:
+                        existing.converted_display_name = None
+                        existing.converted_file_class = None
+                        existing.converted_referencefile_id = None
                 else:
-                    existing.converted_display_name = None
-                    existing.converted_file_class = None
-                    existing.converted_referencefile_id = None
-            else:
-                job.per_file_progress.append(
-                    PerFileProgress(
-                        source_display_name=source_display_name,
-                        source_file_class=source_file_class,
-                        source_referencefile_id=source_referencefile_id,
-                        converted_display_name=converted_display_name if success else None,
-                        converted_file_class=converted_file_class if success else None,
-                        converted_referencefile_id=converted_referencefile_id if success else None,
-                        status=new_status,
-                        error=error,
+                    job.per_file_progress.append(
+                        PerFileProgress(
+                            source_display_name=source_display_name,
+                            source_file_class=source_file_class,
+                            source_referencefile_id=source_referencefile_id,
+                            converted_display_name=converted_display_name if success else None,
+                            converted_file_class=converted_file_class if success else None,
+                            converted_referencefile_id=converted_referencefile_id if success else None,
+                            status=new_status,
+                            error=error,
+                        )
                     )
-                )
-            job.last_update = datetime.utcnow()
+                job.last_update = datetime.utcnow()
+                state = job.to_state()
+            self._persist(state)
 
     def complete_job(self, job_id: str, success: bool, error: str = "") -> None:
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return
-            job.status = "completed" if success else "failed"
-            job.completed_at = datetime.utcnow()
-            job.last_update = job.completed_at
-            if error:
-                job.error_message = error
-            self._active_by_reference.pop(job.reference_id, None)
+        if self._get_or_adopt(job_id) is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return
+                job.status = "completed" if success else "failed"
+                job.completed_at = datetime.utcnow()
+                job.last_update = job.completed_at
+                if error:
+                    job.error_message = error
+                self._active_by_reference.pop(job.reference_id, None)
+                state = job.to_state()
+            self._persist(state, status=JOB_STATUS_COMPLETED if success else JOB_STATUS_FAILED,
+                          error_message=error or None)
         logger.info(f"Conversion job {job_id} {job.status} (reference_id={job.reference_id})")
 
     def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
@@ -246,4 +364,4 @@ class ConversionJobManager:
         return removed
 
 
-conversion_manager = ConversionJobManager()
+conversion_manager = ConversionJobManager(store=JobStore(CONVERSION_JOB_TYPE))
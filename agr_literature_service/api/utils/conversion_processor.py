@@ -222,14 +222,11 @@ def run_conversion_job(job_id: str, reference_id: int, reference_curie: str,
 
         # Lazily fetch the PDFX token: we only need it when there's at
         # least one pending PDF source (main or supplement). nXML-only
-        # conversions skip this.
-        cached_token: Dict[str, str] = {}
-
+        # conversions skip this. The shared provider caches the token and
+        # refreshes it before it expires, so a long job never holds a stale one.
         def get_token() -> str:
-            if "token" not in cached_token:
-                from agr_cognito_py import get_admin_token
-                cached_token["token"] = get_admin_token()
-            return cached_token["token"]
+            from agr_literature_service.lit_processing.utils.http_utils import get_service_token
+            return get_service_token()
 
         main_failure, main_errors = _convert_pending_main(
             db, job_id, reference_id, reference_curie, assessment, get_token,
@@ -0,0 +1,232 @@
+"""
+Postgres-backed state and queue for background jobs (file conversions and
+bulk uploads), one background_job row per job.
+
+The in-process managers (ConversionJobManager, BulkUploadManager) write their
+job snapshot through to the row on every change and read it back for jobs
+they do not hold in memory, so a status poll answered by another gunicorn
+worker -- or after the worker that ran the job was recycled -- still finds
+the job. Jobs saved as 'queued' together with a payload are run by
+api/utils/job_worker.py processes, which claim rows with
+SELECT ... FOR UPDATE SKIP LOCKED so any number of them can share the table
+without two picking up the same job.
+
+Persistence is best effort: a failed write is logged and never fails the job
+itself.
+"""
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from agr_literature_service.api.database.main import SessionLocal
+from agr_literature_service.api.models import BackgroundJobModel
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING)
+
+# a running job whose row has not been touched for this long is taken to
+# have lost its process; job snapshots and the worker heartbeat refresh it
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 3600))
+# finished jobs are kept this long for status polls and history
+JOB_RETENTION_HOURS = int(os.environ.get("JOB_RETENTION_HOURS", 7 * 24))
+JOB_MAX_ATTEMPTS = 3
+
+
+def job_queue_enabled() -> bool:
+    """True when a job worker pool is deployed (JOB_QUEUE_ENABLED=true) and
+    queueable work should be handed to it instead of running in the request
+    process."""
+    return os.environ.get("JOB_QUEUE_ENABLED", "").lower() == "true"
+
+
+def current_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _row_snapshot(row: BackgroundJobModel) -> Dict[str, Any]:
+    snapshot = dict(row.state or {})
+    snapshot["user_id"] = row.user_id
+    return snapshot
+
+
+class JobStore:
+    """Write-through persistence of the snapshots of one job type."""
+
+    def __init__(self, job_type: str,
+                 session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.job_type = job_type
+        self._session_factory = session_factory
+
+    def save(self, job_id: str, state: Dict[str, Any], status: Optional[str] = None,
+             **columns: Any) -> bool:
+        """
+        Insert or update the row of job_id with the job snapshot ``state``.
+        ``status`` (the queue status) is only changed when given; a new row
+        defaults to 'running', owned by this process. Other keyword arguments
+        are BackgroundJobModel columns (reference_id, user_id, payload, ...).
+        """
+        now = datetime.utcnow()
+        values: Dict[str, Any] = dict(columns, state=state, date_updated=now)
+        if status is not None:
+            values["status"] = status
+            if status in (JOB_STATUS_COMPLETED, JOB_STATUS_FAILED):
+                values["date_completed"] = now
+                values["locked_by"] = None
+        insert_values = dict(values, job_id=job_id, job_type=self.job_type, date_created=now)
+        insert_values.setdefault("status", JOB_STATUS_RUNNING)
+        if insert_values["status"] == JOB_STATUS_RUNNING:
+            insert_values.setdefault("locked_by", current_worker_id())
+        statement = insert(BackgroundJobModel).values(**insert_values).on_conflict_do_update(
+            index_elements=[BackgroundJobModel.job_id], set_=values)
+        try:
+            with self._session_factory() as db:
+                db.execute(statement)
+                db.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not persist {self.job_type} job {job_id}: {e}")
+            return False
+
+    def enqueue(self, job_id: str, state: Dict[str, Any], payload: Dict[str, Any],
+                **columns: Any) -> bool:
+        """Hand the job to the worker pool."""
+        return self.save(job_id, state, status=JOB_STATUS_QUEUED, payload=payload,
+                         locked_by=None, **columns)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The stored snapshot of job_id (with user_id), or None."""
+        try:
+            with self._session_factory() as db:
+                row = db.query(BackgroundJobModel).filter(
+                    BackgroundJobModel.job_id == job_id,
+                    BackgroundJobModel.job_type == self.job_type).one_or_none()
+                return _row_snapshot(row) if row is not None else None
+        except Exception as e:
+            logger.warning(f"Could not load {self.job_type} job {job_id}: {e}")
+            return None
+
+    def find_for_reference(self, reference_id: int,
+                           active_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Snapshot of the newest job of the reference; with ``active_only``,
+        only a queued or running job that is not stale."""
+        try:
+            with self._session_factory() as db:
+                query = db.query(BackgroundJobModel).filter(
+                    BackgroundJobModel.job_type == self.job_type,
+                    BackgroundJobModel.reference_id == reference_id)
+                if active_only:
+                    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+                    query = query.filter(BackgroundJobModel.status.in_(ACTIVE_JOB_STATUSES),
+                                         BackgroundJobModel.date_updated >= cutoff)
+                row = query.order_by(BackgroundJobModel.date_created.desc()).first()
+                return _row_snapshot(row) if row is not None else None
+        except Exception as e:
+            logger.warning(f"Could not look up {self.job_type} jobs of reference_id={reference_id}: {e}")
+            return None
+
+
+def claim_next_job(db: Session, job_types: Sequence[str],
+                   worker_id: Optional[str] = None) -> Optional[BackgroundJobModel]:
+    """
+    Atomically take the oldest queued job of one of ``job_types`` and mark it
+    running for ``worker_id``. Rows locked by a concurrent claim are skipped,
+    so workers never block on each other. Returns None when nothing is queued.
+    """
+    row = db.query(BackgroundJobModel).filter(
+        BackgroundJobModel.job_type.in_(list(job_types)),
+        BackgroundJobModel.status == JOB_STATUS_QUEUED,
+    ).order_by(BackgroundJobModel.date_created).with_for_update(skip_locked=True).first()
+    if row is None:
+        db.rollback()
+        return None
+    row.status = JOB_STATUS_RUNNING
+    row.locked_by = worker_id or current_worker_id()
+    row.attempts = (row.attempts or 0) + 1
+    row.date_updated = datetime.utcnow()
+    db.commit()
+    return row
+
+
+def heartbeat(db: Session, job_id: str) -> None:
+    db.query(BackgroundJobModel).filter(
+        BackgroundJobModel.job_id == job_id,
+        BackgroundJobModel.status == JOB_STATUS_RUNNING,
+    ).update({BackgroundJobModel.date_updated: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def fail_job(db: Session, job_id: str, error: str) -> None:
+    """Mark a job failed unless it already finished."""
+    row = db.query(BackgroundJobModel).filter(
+        BackgroundJobModel.job_id == job_id,
+        BackgroundJobModel.status.in_(ACTIVE_JOB_STATUSES)).with_for_update().one_or_none()
+    if row is not None:
+        _mark_failed(row, error)
+    db.commit()
+
+
+def _mark_failed(row: BackgroundJobModel, error: str) -> None:
+    now = datetime.utcnow()
+    row.status = JOB_STATUS_FAILED
+    row.error_message = error
+    row.locked_by = None
+    row.date_updated = now
+    row.date_completed = now
+    # keep the snapshot the status polls read consistent with the row
+    row.state = dict(row.state or {}, status=JOB_STATUS_FAILED, error_message=error,
+                     completed_at=now.isoformat())
+
+
+def requeue_stale_jobs(db: Session, stale_seconds: Optional[int] = None,
+                       requeueable_types: Sequence[str] = (),
+                       max_attempts: int = JOB_MAX_ATTEMPTS) -> Tuple[int, int]:
+    """
+    Recover running jobs whose process went away without finishing them. A
+    job of one of ``requeueable_types`` with attempts left is put back in the
+    queue, any other is marked failed. Returns (requeued, failed).
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds or JOB_STALE_SECONDS)
+    rows: List[BackgroundJobModel] = db.query(BackgroundJobModel).filter(
+        BackgroundJobModel.status == JOB_STATUS_RUNNING,
+        BackgroundJobModel.date_updated < cutoff,
+    ).with_for_update(skip_locked=True).all()
+    requeued = failed = 0
+    for row in rows:
+        if row.job_type in requeueable_types and row.payload and (row.attempts or 0) < max_attempts:
+            row.status = JOB_STATUS_QUEUED
+            row.locked_by = None
+            row.date_updated = datetime.utcnow()
+            requeued += 1
+        else:
+            _mark_failed(row, f"Job abandoned by {row.locked_by or 'unknown process'}")
+            failed += 1
+    db.commit()
+    if requeued or failed:
+        logger.info(f"Stale background jobs: {requeued} requeued, {failed} failed")
+    return requeued, failed
+
+
+def purge_finished_jobs(db: Session, retention_hours: Optional[int] = None) -> int:
+    """Delete completed and failed jobs older than the retention period."""
+    hours = retention_hours if retention_hours is not None else JOB_RETENTION_HOURS
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    removed = db.query(BackgroundJobModel).filter(
+        BackgroundJobModel.status.in_((JOB_STATUS_COMPLETED, JOB_STATUS_FAILED)),
+        or_(BackgroundJobModel.date_completed < cutoff,
+            BackgroundJobModel.date_completed.is_(None) & (BackgroundJobModel.date_updated < cutoff)),
+    ).delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        logger.info(f"Purged {removed} finished background jobs")
+    return removed
@@ -0,0 +1,139 @@
+"""
+Worker process for queued background jobs.
+
+Runs outside the API's gunicorn workers, e.g.
+
+    python -m agr_literature_service.api.utils.job_worker --threads 4
+
+Each thread claims the oldest queued job (SELECT ... FOR UPDATE SKIP LOCKED,
+see job_queue.claim_next_job), runs the handler registered for its type and
+keeps the row's heartbeat fresh while it does. Between jobs the workers
+requeue or fail jobs whose process went away and purge finished jobs past
+the retention period. Enable handing work to the pool with
+JOB_QUEUE_ENABLED=true on the API side.
+"""
+import argparse
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from agr_literature_service.api.database.main import SessionLocal
+from agr_literature_service.api.utils.conversion_job_manager import CONVERSION_JOB_TYPE
+from agr_literature_service.api.utils.job_queue import (
+    JOB_STALE_SECONDS,
+    claim_next_job,
+    current_worker_id,
+    fail_job,
+    heartbeat,
+    purge_finished_jobs,
+    requeue_stale_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5.0
+MAINTENANCE_SECONDS = 300.0
+
+
+def _run_conversion(job_id: str, payload: Dict[str, Any]) -> None:
+    from agr_literature_service.api.utils.conversion_job_manager import conversion_manager
+    from agr_literature_service.api.utils.conversion_processor import run_conversion_job
+
+    try:
+        run_conversion_job(job_id, payload["reference_id"], payload["reference_curie"],
+                           payload.get("overwrite_tei_md", False))
+    finally:
+        conversion_manager.forget(job_id)
+
+
+JOB_HANDLERS: Dict[str, Callable[[str, Dict[str, Any]], None]] = {
+    CONVERSION_JOB_TYPE: _run_conversion,
+}
+
+
+class _Heartbeat:
+    """Touches the job row every interval while the handler runs."""
+
+    def __init__(self, job_id: str, interval: float) -> None:
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with SessionLocal() as db:
+                    heartbeat(db, self.job_id)
+            except Exception as e:
+                logger.warning(f"Heartbeat of job {self.job_id} failed: {e}")
+
+
+def run_next_job(job_types: Sequence[str], worker_id: Optional[str] = None) -> bool:
+    """Claim and run one queued job; False when the queue was empty."""
+    with SessionLocal() as db:
+        row = claim_next_job(db, job_types, worker_id)
+        if row is None:
+            return False
+        job_id, job_type, payload = row.job_id, row.job_type, dict(row.payload or {})
+    logger.info(f"Running {job_type} job {job_id}")
+    try:
+        with _Heartbeat(job_id, JOB_STALE_SECONDS / 4):
+            JOB_HANDLERS[job_type](job_id, payload)
+    except Exception as e:
+        logger.exception(f"{job_type} job {job_id} failed")
+        with SessionLocal() as db:
+            fail_job(db, job_id, str(e))
+    return True
+
+
+def run_maintenance() -> None:
+    with SessionLocal() as db:
+        requeue_stale_jobs(db, requeueable_types=list(JOB_HANDLERS))
+        purge_finished_jobs(db)
+
+
+def run_worker(job_types: Sequence[str], poll_seconds: float = POLL_SECONDS,
+               stop: Optional[threading.Event] = None) -> None:
+    """Run jobs until ``stop`` is set, sleeping poll_seconds when idle."""
+    stop = stop or threading.Event()
+    worker_id = f"{current_worker_id()}:{threading.current_thread().name}"
+    last_maintenance = 0.0
+    while not stop.is_set():
+        try:
+            if time.time() - last_maintenance > MAINTENANCE_SECONDS:
+                last_maintenance = time.time()
+                run_maintenance()
+            if run_next_job(job_types, worker_id):
+                continue
+        except Exception:
+            logger.exception("Job worker iteration failed")
+        stop.wait(poll_seconds)
+
+
+if __name__ == "__main__":
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-t', '--threads', action='store', type=int, default=1,
+                        help="number of jobs run concurrently by this process")
+    parser.add_argument('--job-type', action='append', choices=sorted(JOB_HANDLERS),
+                        help="only run jobs of this type; can be repeated (default: all)")
+    parser.add_argument('--poll-seconds', action='store', type=float, default=POLL_SECONDS)
+    args = parser.parse_args()
+    job_types = args.job_type or list(JOB_HANDLERS)
+    threads = [threading.Thread(target=run_worker, args=(job_types, args.poll_seconds),
+                                name=f"job-worker-{i}") for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -1,11 +1,10 @@
 from collections.abc import Hashable
 import functools
 from os import environ
-import requests
 from sqlalchemy import text
 # from agr_literature_service.lit_processing.utils.sqlalchemy_utils import \
 #    create_postgres_session
-from agr_cognito_py import get_authentication_token, generate_headers
+from agr_literature_service.lit_processing.utils.http_utils import get_auth_headers, get_http_session
 
 
 class memoized(object):
@@ -51,12 +50,11 @@ def execute_once(f):
 def get_next_curie(subdomain, db=None):  # pragma: no cover
 
     if environ.get('ENV_STATE') and environ.get('ENV_STATE') != 'test':
-        token = get_authentication_token()
-        headers = generate_headers(token)
+        headers = get_auth_headers()
         headers['subdomain'] = subdomain
         url = environ['ID_MATI_URL']
         headers['value'] = '1'
-        res = requests.post(url, headers=headers)
+        res = get_http_session().post(url, headers=headers)
         res_json = res.json()
         new_curie = res_json['first']['curie']
         return new_curie
@@ -1,10 +1,16 @@
 import argparse
 import logging
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from os import environ
 from dotenv import load_dotenv
-from agr_literature_service.lit_processing.utils.s3_utils import upload_file_to_s3
+from botocore.exceptions import ClientError  # type: ignore
+from agr_literature_service.lit_processing.utils.s3_utils import upload_file_to_s3, open_s3_upload_stream, \
+    copy_file_in_s3, delete_files_from_s3, STREAM_READ_SIZE
 from datetime import datetime, date
 import os
+import shutil
 
 logging.basicConfig(format='%(message)s')
 log = logging.getLogger(__name__)
@@ -17,40 +23,253 @@ lastweek_bucket = sub_bucket + 'last_week/'
 monthly_bucket = sub_bucket + 'monthly_archive/'
 ondemand_bucket = sub_bucket + 'ondemand/'
 
+# data of the sqlalchemy-continuum history tables churns constantly and is
+# not needed to bring the service back up; their schema is still dumped
+version_table_patterns = ['public.*_version', 'public.transaction']
 
-def dump_database(dump_type="ondemand"):  # noqa: C901
+# a per-table file of a directory dump is only uploaded once it has not been
+# modified for this many seconds (pg_dump never reopens a finished file)
+settle_seconds = 30
+poll_seconds = 5
+upload_workers = 4
+
+
+class PgDumpFailed(Exception):
+    """pg_dump exited with an error while its output was being uploaded."""
+
+
+def get_connection_params():
+
+    return {
+        'database': environ.get('PSQL_DATABASE', ""),
+        'host': environ.get('PSQL_HOST', ""),
+        'username': environ.get('PSQL_USERNAME', ""),
+        'password': environ.get('PSQL_PASSWORD', ""),
+        'port': environ.get('PSQL_PORT', "")
+    }
+
+
+def get_pg_env(password):
+
+    # pass the password through the environment instead of the command line
+    env = dict(os.environ)
+    env['PGPASSWORD'] = password
+    return env
+
+
+def build_pg_dump_command(params, dump_format='custom', jobs=1, output=None, exclude_table_data=None):
+    """
+    Build the pg_dump argument list.
+
+    :param params: connection parameters from get_connection_params()
+    :param dump_format: 'custom' (single archive) or 'directory' (one file per table, allows --jobs)
+    :param jobs: number of parallel dump jobs, directory format only
+    :param output: output file/directory; custom format dumps to stdout if None
+    :param exclude_table_data: table patterns whose data (not schema) is left out
+    """
+    cmd = ['pg_dump', '--format=' + dump_format, '--clean',
+           '-h', params['host'], '-p', params['port'], '-U', params['username']]
+    if dump_format == 'directory':
+        cmd.append('--jobs=' + str(jobs))
+    for pattern in exclude_table_data or []:
+        cmd.append('--exclude-table-data=' + pattern)
+    if output is not None:
+        cmd += ['--file', output]
+    cmd.append(params['database'])
+    return cmd
+
+
+def get_finished_files(dump_dir, uploaded, now=None):
+    """
+    Return the files of a directory dump that pg_dump is done writing and
+    that have not been uploaded in their current state yet. toc.dat is
+    written last and is left for the final pass.
+    """
+    if now is None:
+        now = time.time()
+    finished = []
+    for name in sorted(os.listdir(dump_dir)):
+        if name == 'toc.dat':
+            continue
+        stat = os.stat(os.path.join(dump_dir, name))
+        if now - stat.st_mtime < settle_seconds:
+            continue
+        if uploaded.get(name) != (stat.st_size, stat.st_mtime):
+            finished.append(name)
+    return finished
+
+
+def upload_dump_directory(dump_dir, process, s3_prefix):
+    """
+    Upload the per-table files of a running directory dump concurrently as
+    pg_dump finishes them, then the remaining files (and any file changed
+    after its upload) once pg_dump exits. A file is only uploaded again
+    once its previous upload is done, so a late stale upload cannot
+    overwrite the newer object. Returns (pg_dump returncode, list of
+    uploaded s3 keys); the returncode is 1 if any upload failed. When the
+    dump or an upload failed, the files already uploaded are deleted again.
+    """
+    uploaded = {}
+    futures = {}
+    failed = set()
+
+    def submit(executor, name):
+        previous = futures.get(name)
+        if previous is not None and not previous.result():
+            failed.add(name)
+        stat = os.stat(os.path.join(dump_dir, name))
+        uploaded[name] = (stat.st_size, stat.st_mtime)
+        futures[name] = executor.submit(upload_file_to_s3, os.path.join(dump_dir, name), s3_bucket,
+                                        s3_prefix + name)
+
+    with ThreadPoolExecutor(max_workers=upload_workers) as executor:
+        while process.poll() is None:
+            if os.path.isdir(dump_dir):
+                for name in get_finished_files(dump_dir, uploaded):
+                    submit(executor, name)
+            time.sleep(poll_seconds)
+        if process.returncode == 0:
+            for name in sorted(os.listdir(dump_dir)):
+                if uploaded.get(name) is None or name in get_finished_files(dump_dir, uploaded, now=float('inf')):
+                    submit(executor, name)
+    failed.update(name for name, future in futures.items() if not future.result())
+    if failed:
+        log.info("failed to upload " + ", ".join(sorted(failed)))
+    if failed or process.returncode != 0:
+        # a partial dump cannot be restored; do not leave its files behind
+        delete_files_from_s3(s3_bucket, [s3_prefix + name for name in sorted(futures) if name not in failed])
+        return process.returncode or 1, []
+    return process.returncode, [s3_prefix + name for name in sorted(futures)]
+
+
+def check_restore(dump_path, jobs=1):
+    """
+    Restore a directory dump into a scratch database on a local Postgres
+    (RESTORE_PSQL_HOST/PORT, default localhost:5432, same credentials) and
+    log how long it took, so a regression in restore time is noticed before
+    the dump is actually needed. Returns the elapsed seconds or None.
+    """
+    params = get_connection_params()
+    host = environ.get('RESTORE_PSQL_HOST', 'localhost')
+    port = environ.get('RESTORE_PSQL_PORT', '5432')
+    scratch_db = 'restore_check_' + datetime.now().strftime("%Y%m%d%H%M%S")
+    env = get_pg_env(params['password'])
+    conn_args = ['-h', host, '-p', port, '-U', params['username']]
+    try:
+        subprocess.run(['createdb'] + conn_args + [scratch_db], env=env, check=True)
+        start = time.time()
+        subprocess.run(['pg_restore', '--jobs=' + str(jobs), '--no-owner', '-d', scratch_db] + conn_args
+                       + [dump_path], env=env, check=True)
+        elapsed = time.time() - start
+        log.info(f"restore check: {dump_path} restored in {elapsed:.0f} seconds with {jobs} jobs")
+        return elapsed
+    except (subprocess.CalledProcessError, OSError) as e:
+        log.info(f"restore check failed: {e}")
+        return None
+    finally:
+        subprocess.run(['dropdb', '--if-exists'] + conn_args + [scratch_db], env=env)
+
+
+def dump_database_directory(dump_type, file_name, jobs, exclude_table_data, verify_restore):
+    """
+    Parallel pg_dump in directory format. For cron dumps the per-table files
+    are uploaded while the dump is still running and the local directory is
+    removed afterwards; on-demand dumps stay local.
+
+    latest/<db>_latest.sql is left alone (it stays the last custom-format
+    dump): a cron directory dump instead writes latest/<db>_latest_directory.txt,
+    holding the s3 prefix of its table files, for pg_restore after a download
+    of that prefix.
+    """
+    params = get_connection_params()
+    cmd = build_pg_dump_command(params, 'directory', jobs, file_name, exclude_table_data)
+    process = subprocess.Popen(cmd, env=get_pg_env(params['password']))
+    if dump_type != 'cron':
+        if process.wait() != 0:
+            log.info("pg_dump failed")
+            return False
+        if verify_restore:
+            check_restore(file_name, jobs)
+        return True
+    s3_prefix = lastweek_bucket + file_name + '/'
+    returncode, s3_keys = upload_dump_directory(file_name, process, s3_prefix)
+    if returncode != 0:
+        log.info("pg_dump failed")
+        return False
+    if verify_restore:
+        check_restore(file_name, jobs)
+    # point latest at this dump instead of copying every table file
+    latest_pointer = file_name + '.latest'
+    with open(latest_pointer, 'w') as fw:
+        fw.write(s3_prefix + '\n')
+    upload_file_to_s3(latest_pointer, s3_bucket, latest_bucket + params['database'] + '_latest_directory.txt')
+    os.remove(latest_pointer)
+    # copy files to monthly bucket if it is first day of the month
+    if date.today().day == 1:
+        for s3_key in s3_keys:
+            copy_file_in_s3(s3_bucket, s3_key, s3_key.replace(lastweek_bucket, monthly_bucket, 1), 'GLACIER_IR')
+    # delete local dump after upload to s3
+    try:
+        shutil.rmtree(file_name)
+    except OSError:
+        log.info("fail to delete local dump directory")
+        return False
+    return True
+
+
+def dump_database_custom(dump_type, file_name, exclude_table_data):
+    """
+    Single custom-format archive. Cron dumps are piped from pg_dump straight
+    to S3 without a local copy; on-demand dumps are written locally.
+    """
+    params = get_connection_params()
+    env = get_pg_env(params['password'])
+    if dump_type != 'cron':
+        cmd = build_pg_dump_command(params, 'custom', output=file_name, exclude_table_data=exclude_table_data)
+        return subprocess.run(cmd, env=env).returncode == 0
+    s3_filename = lastweek_bucket + file_name
+    cmd = build_pg_dump_command(params, 'custom', exclude_table_data=exclude_table_data)
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE)
+    try:
+        with open_s3_upload_stream(s3_bucket, s3_filename) as s3_stream:
+            shutil.copyfileobj(process.stdout, s3_stream, STREAM_READ_SIZE)
+            # raising inside the block aborts the upload of a truncated dump
+            if process.wait() != 0:
+                raise PgDumpFailed(f"pg_dump exited with {process.returncode}")
+    except (ClientError, PgDumpFailed) as e:
+        log.info(f"pg_dump or upload failed: {e}")
+        return False
+    finally:
+        # nothing reads the pipe any more: do not leave pg_dump blocked on it
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+    # copy to latest bucket (overwrites previous latest)
+    copy_file_in_s3(s3_bucket, s3_filename, latest_bucket + params['database'] + "_latest.sql")
+    # copy file to monthly bucket if it is first day of the month
+    if date.today().day == 1:
+        copy_file_in_s3(s3_bucket, s3_filename, monthly_bucket + file_name, 'GLACIER_IR')
+    return True
+
+
+def dump_database(dump_type="ondemand", dump_format="custom", jobs=1, exclude_version_tables=False,
+                  exclude_table_data=None, verify_restore=False):
     env_state = environ.get('ENV_STATE', "")
     if dump_type == 'cron' and env_state != 'prod':
         log.info("dump for production database only")
         return False
     database = environ.get('PSQL_DATABASE', "")
-    host = environ.get('PSQL_HOST', "")
-    username = environ.get('PSQL_USERNAME', "")
-    password = environ.get('PSQL_PASSWORD', "")
-    port = environ.get('PSQL_PORT', "")
     now = datetime.now()  # current date and time
-    file_name = database + "_" + now.strftime("%Y-%m-%d-%H-%M-%S") + ".sql"
-    cmd = "PGPASSWORD=" + password + " pg_dump -Fc --clean -h " + host + " -p " + port + " -U " + username + " " + database + "   > " + file_name
-    os.system(cmd)
-    if dump_type == 'cron' and env_state == 'prod':
-        s3_filename = lastweek_bucket + file_name
-        upload_file_to_s3(file_name, s3_bucket, s3_filename)
-        # upload to latest bucket (overwrites previous latest)
-        latest_file_name = database + "_latest.sql"
-        s3_filename_latest = latest_bucket + latest_file_name
-        upload_file_to_s3(file_name, s3_bucket, s3_filename_latest)
-        # upload file to monthly bucket if it is first day of the month
-        todayDate = date.today()
-        if todayDate.day == 1:
-            s3_filename_monthly = monthly_bucket + file_name
-            upload_file_to_s3(file_name, s3_bucket, s3_filename_monthly, 'GLACIER_IR')
-        # delete local file after upload to s3
-        try:
-            os.remove(file_name)
-        except OSError:
-            log.info("fail to delete local file")
-            return False
-    return True
+    file_name = database + "_" + now.strftime("%Y-%m-%d-%H-%M-%S")
+    exclude_table_data = list(exclude_table_data or [])
+    if exclude_version_tables:
+        exclude_table_data += version_table_patterns
+    if dump_format == 'directory':
+        return dump_database_directory(dump_type, file_name + ".dir", jobs, exclude_table_data, verify_restore)
+    if verify_restore:
+        log.info("restore check is only available for directory dumps")
+    return dump_database_custom(dump_type, file_name + ".sql", exclude_table_data)
 
 
 if __name__ == "__main__":
@@ -58,5 +277,16 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-t', '--type', action='store', type=str, help="either cron or ondemand dump",
                         choices=['cron', 'ondemand'], required=True)
+    parser.add_argument('-f', '--format', action='store', type=str, default='custom',
+                        choices=['custom', 'directory'], help="pg_dump format; directory allows --jobs")
+    parser.add_argument('-j', '--jobs', action='store', type=int, default=1,
+                        help="number of parallel pg_dump jobs (directory format)")
+    parser.add_argument('--exclude-version-tables', action='store_true',
+                        help="leave out the data of the *_version and transaction history tables")
+    parser.add_argument('--exclude-table-data', action='append', default=[],
+                        help="table pattern whose data is left out; can be repeated")
+    parser.add_argument('--verify-restore', action='store_true',
+                        help="time a pg_restore of the dump into a scratch database on a local Postgres")
     args = vars(parser.parse_args())
-    dump_database(args['type'])
+    dump_database(args['type'], args['format'], args['jobs'], args['exclude_version_tables'],
+                  args['exclude_table_data'], args['verify_restore'])
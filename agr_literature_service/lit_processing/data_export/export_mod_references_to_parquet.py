@@ -0,0 +1,308 @@
+"""
+Columnar (Parquet) export of the reference corpus for analytics consumers.
+
+Companion of export_single_mod_references_to_json.py: instead of one big nested
+JSON per MOD, every table is written as its own Parquet dataset, partitioned by
+MOD in the hive layout understood by pyarrow/pandas/duckdb/spark:
+
+    <XML_PATH>parquet_data/<table>/mod=<MOD>/part-<datestamp>.parquet
+
+Rows are read through a server-side (streaming) cursor and flushed to the
+Parquet writer one bounded row group at a time, so memory use does not depend
+on the size of the corpus.
+"""
+import argparse
+import logging
+from os import environ, makedirs, path, remove
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from agr_literature_service.lit_processing.utils.sqlalchemy_utils import create_postgres_session
+from agr_literature_service.lit_processing.utils.s3_utils import upload_file_to_s3
+from agr_literature_service.lit_processing.utils.db_read_utils import get_mod_abbreviations
+from agr_literature_service.lit_processing.utils.tmp_files_utils import init_tmp_dir
+
+init_tmp_dir()
+
+logging.basicConfig(format='%(message)s')
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
+load_dotenv()
+
+s3_bucket = 'agr-literature'
+sub_bucket = 'develop/reference/dumps/parquet/'
+latest_bucket = sub_bucket + 'latest/'
+
+row_group_size = 50000
+parquet_compression = 'zstd'
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+STRING_LIST = pa.list_(pa.string())
+
+# every query is restricted to references in the corpus of the MOD being
+# exported (:mod_id); ORDER BY keeps the files deterministic between runs
+CORPUS_FILTER = """
+    JOIN mod_corpus_association mca
+      ON mca.reference_id = {alias}.reference_id
+     AND mca.mod_id = :mod_id
+     AND mca.corpus IS TRUE
+"""
+
+# table name -> (list of (column expression, output name, arrow type), FROM clause, ORDER BY)
+TABLES: Dict[str, Tuple[List[Tuple[str, str, pa.DataType]], str, str]] = {
+    'references': (
+        [('r.reference_id', 'reference_id', pa.int64()),
+         ('r.curie', 'curie', pa.string()),
+         ('r.resource_id', 'resource_id', pa.int64()),
+         ('rs.curie', 'resource_curie', pa.string()),
+         ('r.title', 'title', pa.string()),
+         ('r.language', 'language', pa.string()),
+         ('r.date_published', 'date_published', pa.string()),
+         ('r.date_published_start', 'date_published_start', pa.string()),
+         ('r.date_published_end', 'date_published_end', pa.string()),
+         ('r.date_arrived_in_pubmed', 'date_arrived_in_pubmed', pa.string()),
+         ('r.date_last_modified_in_pubmed', 'date_last_modified_in_pubmed', pa.string()),
+         ('r.volume', 'volume', pa.string()),
+         ('r.issue_name', 'issue_name', pa.string()),
+         ('r.page_range', 'page_range', pa.string()),
+         ('r.abstract', 'abstract', pa.string()),
+         ('r.plain_language_abstract', 'plain_language_abstract', pa.string()),
+         ('r.pubmed_abstract_languages', 'pubmed_abstract_languages', STRING_LIST),
+         ('r.keywords', 'keywords', STRING_LIST),
+         ('r.pubmed_types', 'pubmed_types', STRING_LIST),
+         ('r.publisher', 'publisher', pa.string()),
+         ('r.category::text', 'category', pa.string()),
+         ('r.pubmed_publication_status::text', 'pubmed_publication_status', pa.string()),
+         ('r.retraction_status', 'retraction_status', pa.string()),
+         ('c.citation', 'citation', pa.string()),
+         ('c.short_citation', 'short_citation', pa.string()),
+         ('cl.name', 'copyright_license_name', pa.string()),
+         ('cl.open_access', 'copyright_license_open_access', pa.bool_()),
+         ('r.date_created', 'date_created', TIMESTAMP),
+         ('r.date_updated', 'date_updated', TIMESTAMP)],
+        """reference r
+           LEFT JOIN resource rs ON rs.resource_id = r.resource_id
+           LEFT JOIN citation c ON c.citation_id = r.citation_id
+           LEFT JOIN copyright_license cl ON cl.copyright_license_id = r.copyright_license_id"""
+        + CORPUS_FILTER.format(alias='r'),
+        'r.reference_id'
+    ),
+    'authors': (
+        [('a.author_id', 'author_id', pa.int64()),
+         ('a.reference_id', 'reference_id', pa.int64()),
+         ('a.author_order', 'author_order', pa.int32()),
+         ('a.name', 'name', pa.string()),
+         ('a.first_name', 'first_name', pa.string()),
+         ('a.last_name', 'last_name', pa.string()),
+         ('a.first_initial', 'first_initial', pa.string()),
+         ('a.orcid', 'orcid', pa.string()),
+         ('a.first_author', 'first_author', pa.bool_()),
+         ('a.corresponding_author', 'corresponding_author', pa.bool_()),
+         ('a.affiliations', 'affiliations', STRING_LIST),
+         ('a.person_id', 'person_id', pa.int64())],
+        "author a" + CORPUS_FILTER.format(alias='a'),
+        'a.reference_id, a.author_order, a.author_id'
+    ),
+    'cross_references': (
+        [('x.cross_reference_id', 'cross_reference_id', pa.int64()),
+         ('x.reference_id', 'reference_id', pa.int64()),
+         ('x.curie', 'curie', pa.string()),
+         ('x.curie_prefix', 'curie_prefix', pa.string()),
+         ('x.is_obsolete', 'is_obsolete', pa.bool_()),
+         ('x.pages', 'pages', STRING_LIST)],
+        "cross_reference x" + CORPUS_FILTER.format(alias='x'),
+        'x.reference_id, x.cross_reference_id'
+    ),
+    'mesh_terms': (
+        [('m.mesh_detail_id', 'mesh_detail_id', pa.int64()),
+         ('m.reference_id', 'reference_id', pa.int64()),
+         ('m.heading_term', 'heading_term', pa.string()),
+         ('m.qualifier_term', 'qualifier_term', pa.string())],
+        "mesh_detail m" + CORPUS_FILTER.format(alias='m'),
+        'm.reference_id, m.mesh_detail_id'
+    ),
+    'mod_corpus_association': (
+        [('a.mod_corpus_association_id', 'mod_corpus_association_id', pa.int64()),
+         ('a.reference_id', 'reference_id', pa.int64()),
+         ('md.abbreviation', 'mod_abbreviation', pa.string()),
+         ('a.corpus', 'corpus', pa.bool_()),
+         ('a.mod_corpus_sort_source::text', 'mod_corpus_sort_source', pa.string()),
+         ('a.date_created', 'date_created', TIMESTAMP),
+         ('a.date_updated', 'date_updated', TIMESTAMP)],
+        """mod_corpus_association a
+           JOIN mod md ON md.mod_id = a.mod_id""" + CORPUS_FILTER.format(alias='a'),
+        'a.reference_id, a.mod_corpus_association_id'
+    ),
+    'topic_entity_tags': (
+        [('t.topic_entity_tag_id', 'topic_entity_tag_id', pa.int64()),
+         ('t.reference_id', 'reference_id', pa.int64()),
+         ('t.topic', 'topic', pa.string()),
+         ('t.entity_type', 'entity_type', pa.string()),
+         ('t.entity', 'entity', pa.string()),
+         ('t.entity_id_validation', 'entity_id_validation', pa.string()),
+         ('t.species', 'species', pa.string()),
+         ('t.display_tag', 'display_tag', pa.string()),
+         ('t.negated', 'negated', pa.bool_()),
+         ('t.data_novelty', 'data_novelty', pa.string()),
+         ('t.confidence_score', 'confidence_score', pa.float64()),
+         ('t.confidence_level', 'confidence_level', pa.string()),
+         ('t.validation_by_author', 'validation_by_author', pa.string()),
+         ('t.validation_by_professional_biocurator', 'validation_by_professional_biocurator', pa.string()),
+         ('t.ml_model_id', 'ml_model_id', pa.int64()),
+         ('s.source_evidence_assertion', 'source_evidence_assertion', pa.string()),
+         ('s.source_method', 'source_method', pa.string()),
+         ('s.data_provider', 'data_provider', pa.string()),
+         ('s.validation_type', 'validation_type', pa.string()),
+         ('t.created_by', 'created_by', pa.string()),
+         ('t.date_created', 'date_created', TIMESTAMP),
+         ('t.date_updated', 'date_updated', TIMESTAMP)],
+        """topic_entity_tag t
+           JOIN topic_entity_tag_source s
+             ON s.topic_entity_tag_source_id = t.topic_entity_tag_source_id
+            AND s.secondary_data_provider_id = :mod_id""" + CORPUS_FILTER.format(alias='t'),
+        't.reference_id, t.topic_entity_tag_id'
+    ),
+    'workflow_tags': (
+        [('w.reference_workflow_tag_id', 'reference_workflow_tag_id', pa.int64()),
+         ('w.reference_id', 'reference_id', pa.int64()),
+         ('w.workflow_tag_id', 'workflow_tag_id', pa.string()),
+         ('w.curation_tag', 'curation_tag', pa.string()),
+         ('w.note', 'note', pa.string()),
+         ('w.created_by', 'created_by', pa.string()),
+         ('w.date_created', 'date_created', TIMESTAMP),
+         ('w.date_updated', 'date_updated', TIMESTAMP)],
+        "workflow_tag w" + CORPUS_FILTER.format(alias='w') + " AND w.mod_id = :mod_id",
+        'w.reference_id, w.reference_workflow_tag_id'
+    )
+}
+
+
+def get_table_names():
+
+    return list(TABLES.keys())
+
+
+def get_table_schema(table_name):
+
+    columns, _, _ = TABLES[table_name]
+    return pa.schema([(name, arrow_type) for _, name, arrow_type in columns])
+
+
+def get_table_query(table_name):
+
+    columns, from_clause, order_by = TABLES[table_name]
+    select_list = ",\n       ".join(f"{expr} AS {name}" for expr, name, _ in columns)
+    return f"SELECT {select_list}\n  FROM {from_clause}\n ORDER BY {order_by}"
+
+
+def rows_to_record_batch(rows, schema):
+    """
+    Build a RecordBatch column by column from a list of result rows; the
+    explicit schema keeps the types stable across row groups even when a
+    column happens to be all NULL in one of them.
+    """
+    arrays = [pa.array([row[i] for row in rows], type=field.type)
+              for i, field in enumerate(schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_table_to_parquet(db, table_name, mod_id, filename_with_path, batch_size=row_group_size):
+    """
+    Stream the rows of one table for one MOD into a Parquet file, one row
+    group per batch_size rows. Returns the number of rows written.
+    """
+    schema = get_table_schema(table_name)
+    result = db.execute(
+        text(get_table_query(table_name)).execution_options(stream_results=True,
+                                                            yield_per=batch_size),
+        {'mod_id': mod_id}
+    )
+    count = 0
+    with pq.ParquetWriter(filename_with_path, schema, compression=parquet_compression) as writer:
+        for rows in result.partitions(batch_size):
+            writer.write_batch(rows_to_record_batch(rows, schema), row_group_size=batch_size)
+            count += len(rows)
+    result.close()
+    return count
+
+
+def upload_parquet_file_to_s3(parquet_path, relative_path):  # pragma: no cover
+
+    env_state = environ.get('ENV_STATE', 'develop')
+    if env_state == 'build':
+        env_state = 'develop'
+    if env_state == 'test':
+        return None
+
+    s3_filename = latest_bucket.replace('develop', env_state) + relative_path
+    upload_file_to_s3(parquet_path + relative_path, s3_bucket, s3_filename)
+    remove(parquet_path + relative_path)
+    return s3_filename
+
+
+def dump_parquet_data(mod, tables: Optional[List[str]] = None, upload=True):
+    """
+    Write one Parquet file per table for the given MOD under
+    <XML_PATH>parquet_data/<table>/mod=<mod>/ and (unless running the
+    tests) upload them to the latest parquet bucket.
+
+    Returns a dict of table name -> number of rows written.
+    """
+    if tables is None:
+        tables = get_table_names()
+    datestamp = date.today().strftime('%Y%m%d')
+    base = environ.get('XML_PATH', '') + 'parquet_data/'
+
+    db = create_postgres_session(False)
+    row = db.execute(text("SELECT mod_id FROM mod WHERE abbreviation = :mod"),
+                     {'mod': mod}).fetchone()
+    if row is None:
+        db.close()
+        log.info(f"Unknown MOD {mod}")
+        return {}
+    mod_id = row[0]
+
+    counts = {}
+    try:
+        for table_name in tables:
+            relative_dir = f"{table_name}/mod={mod}/"
+            makedirs(base + relative_dir, exist_ok=True)
+            relative_path = relative_dir + f"part-{datestamp}.parquet"
+            counts[table_name] = write_table_to_parquet(db, table_name, mod_id, base + relative_path)
+            log.info(f"{mod} {table_name}: {counts[table_name]} rows written to {relative_path}")
+            if upload and path.exists(base + relative_path):
+                upload_parquet_file_to_s3(base, relative_path)
+    finally:
+        db.close()
+
+    return counts
+
+
+def dump_all_parquet_data():
+
+    for mod in get_mod_abbreviations():
+        log.info("Dumping parquet data for " + mod)
+        try:
+            dump_parquet_data(mod)
+        except Exception as e:
+            log.info("Error occurred when dumping parquet data for " + mod + ": " + str(e))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--mod', action='store', type=str, help='MOD to dump; all MODs if omitted',
+                        choices=['SGD', 'WB', 'FB', 'ZFIN', 'MGI', 'RGD', 'XB'])
+    parser.add_argument('-t', '--tables', action='store', type=str, nargs='+', help='tables to dump',
+                        choices=get_table_names())
+    args = vars(parser.parse_args())
+    if args['mod']:
+        dump_parquet_data(args['mod'], args['tables'])
+    else:
+        dump_all_parquet_data()
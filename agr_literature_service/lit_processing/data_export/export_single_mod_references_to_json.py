@@ -5,11 +5,9 @@ from os import environ, makedirs, path, remove
 from dotenv import load_dotenv
 from datetime import datetime, date
 import json
-import gzip
-import shutil
 
 from agr_literature_service.lit_processing.utils.sqlalchemy_utils import create_postgres_session
-from agr_literature_service.lit_processing.utils.s3_utils import upload_file_to_s3
+from agr_literature_service.lit_processing.utils.s3_utils import upload_stream_to_s3, copy_file_in_s3
 from agr_literature_service.lit_processing.utils.db_read_utils import get_journal_by_resource_id,\
     get_all_reference_relation_data, get_mod_corpus_association_data_for_ref_ids, \
     get_cross_reference_data_for_ref_ids, get_author_data_for_ref_ids, \
@@ -76,32 +74,33 @@ def upload_json_file_to_s3(json_path, json_file, datestamp, ondemand):  # pragma
 
     gzip_json_file = json_file + ".gz"
 
-    with open(json_path + json_file, 'rb') as f_in, gzip.open(json_path + gzip_json_file, 'wb') as f_out:
-        shutil.copyfileobj(f_in, f_out)
-
+    # gzip on the fly while multipart-uploading; copies to the other
+    # buckets are done server-side, so the JSON is only read once
     if ondemand:
         s3_filename = ondemand_bucket.replace('develop', env_state) + gzip_json_file
-        upload_file_to_s3(json_path + gzip_json_file, s3_bucket, s3_filename)
+        with open(json_path + json_file, 'rb') as f_in:
+            upload_stream_to_s3(f_in, s3_bucket, s3_filename, compress=True)
+        remove(json_path + json_file)
         return gzip_json_file
 
     gzip_json_file_with_datestamp = gzip_json_file.replace('.json.gz', '_' + datestamp + '.json.gz')
 
     ## upload file to recent bucket
-    s3_filename = recent_bucket.replace('develop', env_state) + gzip_json_file_with_datestamp
-    upload_file_to_s3(json_path + gzip_json_file, s3_bucket, s3_filename)
+    recent_s3_filename = recent_bucket.replace('develop', env_state) + gzip_json_file_with_datestamp
+    with open(json_path + json_file, 'rb') as f_in:
+        upload_stream_to_s3(f_in, s3_bucket, recent_s3_filename, compress=True)
 
-    ## upload file to latest bucket
+    ## copy file to latest bucket
     s3_filename = latest_bucket.replace('develop', env_state) + gzip_json_file
-    upload_file_to_s3(json_path + gzip_json_file, s3_bucket, s3_filename)
+    copy_file_in_s3(s3_bucket, recent_s3_filename, s3_filename)
 
-    ## upload file to monthly bucket if it is first day of the month
+    ## copy file to monthly bucket if it is first day of the month
     todayDate = date.today()
     if todayDate.day == 1:
         s3_filename = monthly_bucket.replace('develop', env_state) + gzip_json_file_with_datestamp
-        upload_file_to_s3(json_path + gzip_json_file, s3_bucket, s3_filename, 'GLACIER_IR')
+        copy_file_in_s3(s3_bucket, recent_s3_filename, s3_filename, 'GLACIER_IR')
 
     remove(json_path + json_file)
-    remove(json_path + gzip_json_file)
 
     return None
 
@@ -24,12 +24,12 @@ from typing import Dict, List, Optional, Set, Tuple
 from sqlalchemy import text
 
 from agr_abc_document_parsers import (
-    convert_xml_to_markdown,
     extract_plain_text,
     read_markdown,
 )
 
 from agr_literature_service.lit_processing.utils.sqlalchemy_utils import create_postgres_session
+from agr_literature_service.lit_processing.utils.xml_conversion_pool import convert_xml_to_markdown
 from agr_literature_service.api.crud.reference_crud import set_reference_emails
 from agr_literature_service.api.crud.workflow_tag_crud import transition_to_workflow_status
 from agr_literature_service.api.crud.referencefile_crud import download_file
@@ -16,6 +16,7 @@ from botocore import UNSIGNED  # type: ignore
 from botocore.config import Config  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
 
+from agr_literature_service.lit_processing.utils.s3_utils import S3_TRANSFER_CONFIG, get_s3_client
 from agr_literature_service.lit_processing.utils.tmp_files_utils import init_tmp_dir
 
 init_tmp_dir()
@@ -149,8 +150,8 @@ def download_s3_file(bucket, key, file):
     """
     try:
         logger.info(f"Downloading s3://{bucket}/{key}")
-        s3 = boto3.client('s3')
-        s3.download_file(bucket, key, file)
+        s3 = get_s3_client()
+        s3.download_file(bucket, key, file, Config=S3_TRANSFER_CONFIG)
         return True
     except ClientError as e:
         logger.error(f"Error downloading S3 file: {bucket}/{key}. Error={str(e)}")
@@ -0,0 +1,132 @@
+"""Cross-reference batching of chunk embeddings.
+
+Embedding one source at a time sends one small, underfilled request per
+Markdown, so a bulk run is dominated by round trips. :func:`embed_chunks_batched`
+takes the chunks of many sources at once, packs them into full requests
+(``batch_size`` inputs, at most ``max_batch_tokens`` tokens each) and sends
+``concurrency`` requests at a time under a shared :class:`RateLimiter`.
+Vectors are written back onto the chunk objects, so each source's own chunk
+list is complete again afterwards and can be written to its parquet as before.
+
+Works with any :class:`agr_abc_document_parsers.embeddings.Embedder`; tests use
+a deterministic local one.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts up to 2048 inputs / 300k tokens per embeddings request; the
+# rate limits are the account's tier limits for text-embedding-3-small.
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.environ.get("EMBEDDING_BATCH_MAX_TOKENS", 250000))
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", 4))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.environ.get("EMBEDDING_REQUESTS_PER_MINUTE", 3000))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.environ.get("EMBEDDING_TOKENS_PER_MINUTE", 1000000))
+
+
+class RateLimiter:
+    """Token bucket for requests and tokens per minute, shared by the
+    embedding threads. :meth:`acquire` blocks until both budgets allow the
+    request; each bucket holds at most one minute's worth."""
+
+    def __init__(self, requests_per_minute: float = EMBEDDING_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = EMBEDDING_TOKENS_PER_MINUTE,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self._rates = (requests_per_minute / 60.0, tokens_per_minute / 60.0)
+        self._capacity = (float(requests_per_minute), float(tokens_per_minute))
+        self._available = list(self._capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 0) -> None:
+        # a request larger than the whole bucket waits for a full bucket
+        tokens = min(tokens, self._capacity[1])
+        while True:
+            with self._lock:
+                now = self._clock()
+                elapsed, self._updated = now - self._updated, now
+                for i in (0, 1):
+                    self._available[i] = min(self._capacity[i], self._available[i] + elapsed * self._rates[i])
+                if self._available[0] >= 1 and self._available[1] >= tokens:
+                    self._available[0] -= 1
+                    self._available[1] -= tokens
+                    return
+                wait = max((1 - self._available[0]) / self._rates[0],
+                           (tokens - self._available[1]) / self._rates[1])
+            self._sleep(wait)
+
+
+def _chunk_tokens(chunk, count_tokens: Optional[Callable[[str], int]]) -> int:
+    if chunk.n_tokens is not None:
+        return chunk.n_tokens
+    return count_tokens(chunk.content) if count_tokens else len(chunk.content.split())
+
+
+def plan_batches(chunks: Sequence, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_batch_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                 count_tokens: Optional[Callable[[str], int]] = None) -> List[Tuple[list, int]]:
+    """Pack ``chunks`` in order into ``(chunks, tokens)`` batches of at most
+    ``batch_size`` chunks and ``max_batch_tokens`` tokens. A single chunk over
+    the token budget gets a batch of its own."""
+    batches: List[Tuple[list, int]] = []
+    batch: list = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = _chunk_tokens(chunk, count_tokens)
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_batch_tokens):
+            batches.append((batch, batch_tokens))
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        batches.append((batch, batch_tokens))
+    return batches
+
+
+def embed_chunks_batched(embedder, chunks: Sequence, *,
+                         batch_size: int = EMBEDDING_BATCH_SIZE,
+                         max_batch_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                         concurrency: int = EMBEDDING_CONCURRENCY,
+                         rate_limiter: Optional[RateLimiter] = None) -> List[Tuple[list, Exception]]:
+    """Fill ``chunk.embedding`` for all ``chunks`` with full, concurrent batches.
+
+    A failed batch does not stop the others: its chunks keep ``embedding=None``
+    and ``(batch_chunks, exception)`` is returned, so callers can fail just
+    the sources those chunks belong to.
+    """
+    batches = plan_batches(chunks, batch_size, max_batch_tokens, getattr(embedder, "count_tokens", None))
+    if not batches:
+        return []
+    limiter = rate_limiter or RateLimiter()
+
+    def embed_batch(batch: list, tokens: int) -> None:
+        limiter.acquire(tokens)
+        vectors = embedder.embed([c.content for c in batch])
+        if len(vectors) != len(batch):
+            raise ValueError(f"embedder returned {len(vectors)} vectors for {len(batch)} chunks")
+        for vector in vectors:
+            if len(vector) != embedder.dimension:
+                raise ValueError(f"vector dim {len(vector)} != declared dimension {embedder.dimension}")
+        for chunk, vector in zip(batch, vectors):
+            chunk.embedding = [float(x) for x in vector]
+
+    failures: List[Tuple[list, Exception]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as executor:
+        futures = [(batch, executor.submit(embed_batch, batch, tokens)) for batch, tokens in batches]
+        for batch, future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                logger.error("Embedding batch of %d chunks failed: %s", len(batch), exc)
+                failures.append((batch, exc))
+    logger.debug("Embedded %d chunks in %d batches (%d failed)", len(chunks), len(batches), len(failures))
+    return failures
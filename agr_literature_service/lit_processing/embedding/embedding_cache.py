@@ -0,0 +1,158 @@
+"""Optional on-disk cache of chunk embeddings, keyed by (model, chunk text).
+
+Regenerated Markdown is mostly unchanged text, and a chunk's vector depends
+only on its ``content`` and the model, so vectors are looked up here before
+any chunk is sent to the embedder and only the misses are embedded.
+
+The cache is one SQLite file (enabled by setting EMBEDDING_CACHE_PATH) holding
+each vector as packed float32 -- the precision the embedding parquet stores --
+under the SHA-256 of the chunk text, so several processes on the same host can
+share it. EMBEDDING_CACHE_MAX_ENTRIES caps its size; the least recently used
+vectors are evicted first.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_ENTRIES = 2000000
+# eviction removes vectors until the cache is below this fraction of the cap
+EVICTION_LOW_WATER = 0.9
+# SQLite's default limit on bound parameters is 999
+QUERY_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def model_key(embedder) -> str:
+    """Cache namespace of an embedder: its model id and vector length."""
+    return f"{embedder.model_name}/{embedder.dimension}"
+
+
+class EmbeddingCache:
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # entry count estimate, refreshed from disk whenever it goes over the cap
+        self._approx_entries: Optional[int] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embedding ("
+            " model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL, PRIMARY KEY (model, text_hash)) WITHOUT ROWID")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_embedding_last_used ON embedding (last_used)")
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vector for each of ``texts`` (None on a miss), order preserved."""
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        now = int(time.time())
+        with self._lock:
+            for start in range(0, len(hashes), QUERY_BATCH_SIZE):
+                batch = list(set(hashes[start:start + QUERY_BATCH_SIZE]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embedding WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]).fetchall()
+                for key, vector in rows:
+                    found[key] = array("f", vector).tolist()
+                if rows:
+                    self._connection.execute(
+                        "UPDATE embedding SET last_used = ? WHERE model = ? AND text_hash IN "
+                        f"({','.join('?' * len(rows))})", [now, model, *[key for key, _ in rows]])
+        return [found.get(key) for key in hashes]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = int(time.time())
+        rows = [(model, text_hash(text), array("f", vector).tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embedding (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)", rows)
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            if self._approx_entries is None:
+                self._approx_entries = self._count()
+            else:
+                self._approx_entries += len(rows)
+            if self._approx_entries > self.max_entries:
+                self._approx_entries = self._evict()
+
+    def _count(self) -> int:
+        return self._connection.execute("SELECT count(*) FROM embedding").fetchone()[0]
+
+    def _evict(self) -> int:
+        """Remove least recently used vectors until the cache is below the
+        low water mark; returns the remaining count."""
+        total = self._count()
+        excess = total - int(self.max_entries * EVICTION_LOW_WATER)
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM embedding WHERE (model, text_hash) IN "
+                "(SELECT model, text_hash FROM embedding ORDER BY last_used LIMIT ?)", [excess])
+            total -= excess
+        return total
+
+
+def fill_from_cache(cache: EmbeddingCache, embedder, chunks: Sequence) -> list:
+    """Set ``embedding`` on the chunks whose vector is cached; returns the
+    chunks still to embed. A cache read error just means no hits."""
+    try:
+        vectors = cache.get_many(model_key(embedder), [c.content for c in chunks])
+    except sqlite3.Error as exc:
+        logger.warning("Embedding cache lookup failed: %s", exc)
+        return list(chunks)
+    misses = []
+    for chunk, vector in zip(chunks, vectors):
+        if vector is None:
+            misses.append(chunk)
+        else:
+            chunk.embedding = vector
+    return misses
+
+
+def store_in_cache(cache: EmbeddingCache, embedder, chunks: Sequence) -> None:
+    """Cache the vectors of the embedded ``chunks``; best effort."""
+    embedded = [c for c in chunks if c.embedding is not None]
+    try:
+        cache.put_many(model_key(embedder), [c.content for c in embedded], [c.embedding for c in embedded])
+    except sqlite3.Error as exc:
+        logger.warning("Embedding cache write failed: %s", exc)
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """The process-wide cache, or None when EMBEDDING_CACHE_PATH is unset."""
+    global _cache
+    path = os.environ.get("EMBEDDING_CACHE_PATH")
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            max_entries = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES))
+            _cache = EmbeddingCache(path, max_entries)
+        return _cache
@@ -7,10 +7,15 @@ outputs) — chunk it (``paragraph_pack``: paragraph-level, non-overlapping,
 references excluded), embed the chunks with OpenAI, write the canonical parquet,
 and register it via :func:`embedding_file_crud.create_or_update`. So a reference
 yields one embedding file per merged Markdown (main + each supplement).
+:func:`generate_classifier_embeddings_for_references` does the same for many
+references, pooling their chunks into full embedding batches.
 
 Idempotent: a source that already has an ``embedding_file`` row for this
 ``(profile, version)`` is skipped, so re-running the conversion job never
-re-spends OpenAI. Per-source isolation: a failure on one source is logged and
+re-spends OpenAI. When a source is re-embedded (regenerated Markdown), chunks
+whose text is unchanged are served from the local embedding cache
+(:mod:`.embedding_cache`, enabled by ``EMBEDDING_CACHE_PATH``); the per-reference
+result counts ``chunks`` and ``cache_hits``. Per-source isolation: a failure on one source is logged and
 counted, never aborting the others.
 
 The embedding stack (``agr_abc_document_parsers.embeddings`` + ``openai``) is
@@ -23,7 +28,7 @@ import logging
 import os
 import tempfile
 from io import BytesIO
-from typing import Mapping, Optional
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
 from fastapi import UploadFile
 
@@ -38,6 +43,16 @@ from agr_literature_service.api.models import (
     ReferencefileModel,
 )
 from agr_literature_service.api.schemas.embedding_file_schemas import EmbeddingFileSchemaCreate
+from agr_literature_service.lit_processing.embedding.embedding_batcher import (
+    EMBEDDING_BATCH_SIZE,
+    RateLimiter,
+    embed_chunks_batched,
+)
+from agr_literature_service.lit_processing.embedding.embedding_cache import (
+    fill_from_cache,
+    get_embedding_cache,
+    store_in_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +71,10 @@ VERSION = 1
 # separate embedding files and must not reuse it.
 ML_CLASSIFIER_MODS = ("WB", "FB")
 
+# Chunks pooled across references before they are embedded and their parquets
+# written; bounds memory (vectors included) on bulk runs.
+EMBEDDING_WINDOW_CHUNKS = int(os.environ.get("EMBEDDING_WINDOW_CHUNKS", 5000))
+
 
 def _reference_has_classifier_mod(db, reference_id: int) -> bool:
     """True iff the reference is in corpus for at least one MOD that has an ML
@@ -73,6 +92,13 @@ def _reference_has_classifier_mod(db, reference_id: int) -> bool:
     )
 
 
+class _PendingSource(NamedTuple):
+    result: Dict[str, int]
+    reference_curie: str
+    source: ReferencefileModel
+    chunks: list
+
+
 def generate_classifier_embeddings_for_reference(
     db,
     reference_id: int,
@@ -86,10 +112,33 @@ def generate_classifier_embeddings_for_reference(
     Returns a small result dict (counts / skip reason). Never raises for the
     normal disabled/unavailable paths; per-source errors are caught and counted.
     """
+    return generate_classifier_embeddings_for_references(
+        db, [(reference_id, reference_curie)], api_key=api_key,
+        include_document_vector=include_document_vector,
+    )[reference_id]
+
+
+def generate_classifier_embeddings_for_references(
+    db,
+    references: Sequence[Tuple[int, Optional[str]]],
+    *,
+    api_key: Optional[str] = None,
+    include_document_vector: bool = True,
+    embedder=None,
+) -> Dict[int, Mapping[str, object]]:
+    """Embed the merged Markdown of many references with pooled batches.
+
+    ``references`` is a list of ``(reference_id, reference_curie)``. Chunks of
+    all sources are pooled and embedded in full, concurrent, rate-limited
+    batches (:mod:`.embedding_batcher`) every ``EMBEDDING_WINDOW_CHUNKS``
+    chunks, then each source's parquet is written and registered as before.
+    Returns the per-reference result dict of
+    :func:`generate_classifier_embeddings_for_reference`, keyed by reference_id.
+    """
     api_key = api_key or config.OPENAI_API_KEY
-    if not api_key:
+    if not api_key and embedder is None:
         logger.debug("OPENAI_API_KEY not set; skipping embedding generation")
-        return {"skipped": "no_api_key"}
+        return {reference_id: {"skipped": "no_api_key"} for reference_id, _ in references}
 
     try:
         from agr_abc_document_parsers.embeddings import (
@@ -103,8 +152,64 @@ def generate_classifier_embeddings_for_reference(
             "Embedding stack unavailable (%s); skipping. Install "
             "'agr-abc-document-parsers[embeddings]' and 'openai' to enable.", exc
         )
-        return {"skipped": "deps_unavailable"}
+        return {reference_id: {"skipped": "deps_unavailable"} for reference_id, _ in references}
+
+    profile_name = DEFAULT_PROFILE
+    chunker = ParagraphPackChunker(profile_name=profile_name)
+    if embedder is None:
+        assert api_key is not None
+        embedder = OpenAIEmbedder(api_key, batch_size=EMBEDDING_BATCH_SIZE)
+    rate_limiter = RateLimiter()
+
+    results: Dict[int, Mapping[str, object]] = {}
+    pending: List[_PendingSource] = []
+    pending_chunks = 0
+    for reference_id, reference_curie in references:
+        skipped, result, sources = _sources_to_embed(db, reference_id, reference_curie, profile_name)
+        if skipped:
+            results[reference_id] = {"skipped": skipped}
+            continue
+        results[reference_id] = result
+        for curie, source in sources:
+            try:
+                chunks = _chunk_source(db, curie, source, chunker, embedder, profile_name,
+                                       include_document_vector=include_document_vector)
+            except Exception as exc:
+                logger.error(
+                    "Embedding generation failed for referencefile %s (%s): %s",
+                    source.referencefile_id, curie, exc
+                )
+                result["failed"] += 1
+                continue
+            if not chunks:
+                # nothing to embed; counted as done, like an embedded source
+                result["embedded"] += 1
+                continue
+            pending.append(_PendingSource(result, curie, source, chunks))
+            pending_chunks += len(chunks)
+        if pending_chunks >= EMBEDDING_WINDOW_CHUNKS:
+            _embed_and_register_pending(db, pending, chunker, embedder, profile_name, rate_limiter)
+            pending, pending_chunks = [], 0
+    _embed_and_register_pending(db, pending, chunker, embedder, profile_name, rate_limiter)
+    _log_cache_hits(results)
+    return results
+
+
+def _log_cache_hits(results: Mapping[int, Mapping[str, object]]) -> None:
+    chunks = sum(int(r.get("chunks", 0)) for r in results.values())  # type: ignore
+    if chunks:
+        hits = sum(int(r.get("cache_hits", 0)) for r in results.values())  # type: ignore
+        logger.info(
+            "Embedding cache: %d of %d chunks cached (%.1f%%), %d embedded",
+            hits, chunks, 100.0 * hits / chunks, chunks - hits
+        )
 
+
+def _sources_to_embed(db, reference_id: int, reference_curie: Optional[str],
+                      profile_name: str) -> Tuple[Optional[str], Dict[str, int], list]:
+    """The skip reason of ``reference_id`` (or None), its counts and the
+    ``(curie, source)`` pairs still to embed; skipped and failed sources are
+    already counted."""
     # Only embed references belonging to a MOD that actually has an ML classifier
     # — otherwise the embeddings would never be consumed.
     if not _reference_has_classifier_mod(db, reference_id):
@@ -112,7 +217,7 @@ def generate_classifier_embeddings_for_reference(
             "Reference %s is not in a classifier MOD corpus (%s); skipping "
             "classifier embedding generation", reference_id, ML_CLASSIFIER_MODS
         )
-        return {"skipped": "no_classifier_mod"}
+        return "no_classifier_mod", {}, []
 
     sources = (
         db.query(ReferencefileModel)
@@ -125,50 +230,35 @@ def generate_classifier_embeddings_for_reference(
         .all()
     )
     if not sources:
-        return {"skipped": "no_merged_markdown"}
-
-    profile_name = DEFAULT_PROFILE
-    chunker = ParagraphPackChunker(profile_name=profile_name)
-    embedder = OpenAIEmbedder(api_key)
+        return "no_merged_markdown", {}, []
 
     existing_by_source = embedding_file_crud.get_embeddings_for_sources(
         db, [int(s.referencefile_id) for s in sources]
     )
 
-    embedded = skipped_existing = failed = 0
+    result = {
+        "embedded": 0, "skipped_existing": 0, "failed": 0, "sources": len(sources),
+        "chunks": 0, "cache_hits": 0,
+    }
+    to_embed = []
     for source in sources:
         source_id = int(source.referencefile_id)
         existing = existing_by_source.get(source_id, [])
         if any(e.profile_name == profile_name and e.version == VERSION for e in existing):
-            skipped_existing += 1
+            result["skipped_existing"] += 1
             continue
         curie = reference_curie or (source.reference.curie if source.reference else None)
         if curie is None:
             logger.error("No reference curie for referencefile %s; skipping", source_id)
-            failed += 1
+            result["failed"] += 1
             continue
-        try:
-            _embed_and_register(
-                db, curie, source, chunker, embedder, profile_name,
-                include_document_vector=include_document_vector,
-            )
-            embedded += 1
-        except Exception as exc:
-            logger.error(
-                "Embedding generation failed for referencefile %s (%s): %s",
-                source_id, curie, exc
-            )
-            failed += 1
-    return {
-        "embedded": embedded, "skipped_existing": skipped_existing,
-        "failed": failed, "sources": len(sources),
-    }
+        to_embed.append((curie, source))
+    return None, result, to_embed
 
 
-def _embed_and_register(db, reference_curie, source, chunker, embedder, profile_name,
-                        *, include_document_vector: bool) -> None:
-    """Chunk + embed one merged Markdown and register its parquet."""
-    from agr_abc_document_parsers.embeddings import EmbeddingRecipe, write_chunks_parquet
+def _chunk_source(db, reference_curie, source, chunker, embedder, profile_name,
+                  *, include_document_vector: bool) -> list:
+    """Download and chunk one merged Markdown; no chunks for an empty one."""
     from agr_abc_document_parsers.embeddings.models import Chunk
 
     source_id = int(source.referencefile_id)
@@ -179,18 +269,17 @@ def _embed_and_register(db, reference_curie, source, chunker, embedder, profile_
         content = content.decode("utf-8", errors="replace")
     if not content or not content.strip():
         logger.info("Empty markdown for referencefile %s; skipping", source_id)
-        return
+        return []
 
     chunks = chunker.chunk(content, reference_curie=reference_curie)
     if not chunks:
         logger.info("No chunks produced for referencefile %s; skipping", source_id)
-        return
+        return []
 
     # Append the optional whole-document vector as one more chunk BEFORE embedding,
-    # so the document text is embedded in the same batched request as the
-    # paragraph chunks — one OpenAI round trip per source instead of two. This
-    # matters for bulk runs where OpenAI round-trip latency dominates per-source
-    # cost. document_text() must be computed on the paragraph chunks only.
+    # so the document text is embedded in the same batched requests as the
+    # paragraph chunks instead of a request of its own. document_text() must be
+    # computed on the paragraph chunks only.
     if include_document_vector:
         doc_input = embedder.truncate_to_limit(chunker.document_text(chunks))
         chunks.append(Chunk(
@@ -199,9 +288,45 @@ def _embed_and_register(db, reference_curie, source, chunker, embedder, profile_
             section_title="__document__", is_document_level=True,
             n_tokens=embedder.count_tokens(doc_input),
         ))
+    return chunks
 
-    embedder.embed_chunks(chunks)
 
+def _embed_and_register_pending(db, pending: List[_PendingSource], chunker, embedder,
+                                profile_name, rate_limiter: RateLimiter) -> None:
+    """Embed the pooled chunks of ``pending`` and register each source whose
+    chunks all got a vector; sources hit by a failed batch count as failed."""
+    if not pending:
+        return
+    chunks = [chunk for item in pending for chunk in item.chunks]
+    cache = get_embedding_cache()
+    misses = fill_from_cache(cache, embedder, chunks) if cache is not None else chunks
+    miss_ids = {id(chunk) for chunk in misses}
+    embed_chunks_batched(embedder, misses, rate_limiter=rate_limiter)
+    if cache is not None:
+        store_in_cache(cache, embedder, misses)
+    for item in pending:
+        source_id = int(item.source.referencefile_id)
+        item.result["chunks"] += len(item.chunks)
+        item.result["cache_hits"] += sum(1 for chunk in item.chunks if id(chunk) not in miss_ids)
+        try:
+            if any(chunk.embedding is None for chunk in item.chunks):
+                raise RuntimeError("embedding batch failed")
+            _register_parquet(db, item.reference_curie, item.source, item.chunks,
+                              chunker, embedder, profile_name)
+            item.result["embedded"] += 1
+        except Exception as exc:
+            logger.error(
+                "Embedding generation failed for referencefile %s (%s): %s",
+                source_id, item.reference_curie, exc
+            )
+            item.result["failed"] += 1
+
+
+def _register_parquet(db, reference_curie, source, chunks, chunker, embedder, profile_name) -> None:
+    """Write one source's embedded chunks to its parquet and register it."""
+    from agr_abc_document_parsers.embeddings import EmbeddingRecipe, write_chunks_parquet
+
+    source_id = int(source.referencefile_id)
     recipe = EmbeddingRecipe(
         profile_name=profile_name, version=VERSION,
         embedding_model=embedder.model, embedding_dim=embedder.dimension,
@@ -0,0 +1,510 @@
+"""In-process similarity index over the stored reference embeddings.
+
+The classifier embeddings (:mod:`.embedding_generation`) are stored as parquet
+``embedding`` referencefiles, one per merged Markdown. This module keeps one
+vector per reference -- the whole-document vector of its
+``converted_merged_main`` parquet, or the mean of its chunk vectors when the
+parquet has none -- in a local index directory (EMBEDDING_INDEX_DIR):
+
+- ``vectors.<n>.f32``: L2-normalised float32 rows, memory-mapped, so every
+  process on the host shares the page cache instead of holding its own copy;
+  rows are only ever appended to it
+- ``rows.<n>.npy``: reference_id and parquet referencefile_id per row
+- ``ivf.<n>.npz``: coarse k-means centroids and the centroid of every row, for
+  the approximate (inverted file) search
+- ``manifest.json``: row count, dimension, the names of the files above and a
+  generation number readers use to notice that another process has updated
+  the index
+
+:meth:`ReferenceEmbeddingIndex.refresh` syncs the index with the embedding_file
+table incrementally: new and re-pointed parquets are downloaded and appended
+as new rows, and rows whose embedding_file is gone are dropped. Search is
+exact (one matrix-vector product) or approximate (only the rows of the
+``nprobe`` centroids nearest to the query are scored).
+
+Run ``python -m agr_literature_service.lit_processing.embedding.embedding_index``
+from cron to build/refresh the index; the API refreshes it in small steps from
+a background thread.
+"""
+
+import argparse
+import fcntl
+import io
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from agr_abc_document_parsers.embeddings import DEFAULT_PROFILE
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from agr_literature_service.api.crud.referencefile_utils import fetch_referencefile_content
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_INDEX_PROFILE = DEFAULT_PROFILE
+EMBEDDING_INDEX_VERSION = 1
+# seconds between the API's background refreshes from the embedding_file table
+EMBEDDING_INDEX_REFRESH_SECONDS = int(os.environ.get("EMBEDDING_INDEX_REFRESH_SECONDS", 300))
+# parquets the API fetches per refresh; cron catches up on the rest
+EMBEDDING_INDEX_REFRESH_BATCH = int(os.environ.get("EMBEDDING_INDEX_REFRESH_BATCH", 200))
+EMBEDDING_INDEX_DOWNLOAD_WORKERS = 8
+# approximate search: the IVF is (re)trained once the index has this many
+# rows and whenever it has doubled since the last training
+IVF_MIN_ROWS = 2000
+IVF_DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 20000
+# dropped rows are compacted away once they make up this fraction of the file
+COMPACT_FRACTION = 0.25
+
+REMOVED = -1
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of (a sample of) ``vectors``."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE_SIZE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE_SIZE, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class _Snapshot(NamedTuple):
+    """One generation of the index as loaded by a reader. Never modified,
+    on disk either (see :class:`VectorIndex`): :meth:`VectorIndex.load`
+    builds a new one and swaps it in with a single assignment, so a search
+    started on one generation finishes on it."""
+    generation: int
+    dimension: int
+    row_count: int
+    files: Dict[str, Optional[str]]
+    vectors: Optional[np.ndarray]
+    rows: np.ndarray
+    row_of: Dict[int, int]
+    centroids: Optional[np.ndarray]
+    assignment: np.ndarray
+    trained_count: int
+
+
+_EMPTY_SNAPSHOT = _Snapshot(generation=-1, dimension=0, row_count=0,
+                            files={"vectors": None, "rows": None, "ivf": None},
+                            vectors=None, rows=np.zeros((0, 2), dtype=np.int64), row_of={},
+                            centroids=None, assignment=np.zeros(0, dtype=np.int32), trained_count=0)
+_INDEX_FILE = re.compile(r"^(vectors|rows|ivf)\.\d+\.(f32|npy|npz)$")
+
+
+class VectorIndex:
+    """Memory-mapped matrix of unit vectors keyed by reference_id. One
+    writer at a time (see :meth:`ReferenceEmbeddingIndex.refresh`); any
+    number of readers.
+
+    The row mapping and the IVF are written to new files named after the
+    generation, and manifest.json, which names the files of the current
+    generation, is replaced last; so a reader never combines files of
+    different generations. The rows of a vectors file are never
+    rewritten: a changed vector is appended past the count older readers
+    use, and the row it replaces, like that of a dropped reference, is only
+    marked removed in the new row mapping. The removed rows are reclaimed by
+    writing a new vectors file once there are enough of them."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._snapshot = _EMPTY_SNAPSHOT
+        self.load()
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    @property
+    def dimension(self) -> int:
+        return self._snapshot.dimension
+
+    @property
+    def count(self) -> int:
+        return self._snapshot.row_count
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self._path("manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"generation": -1, "dimension": 0, "count": 0, "vectors": None, "rows": None, "ivf": None}
+
+    def is_stale(self) -> bool:
+        return self._read_manifest()["generation"] != self.generation
+
+    def load(self) -> None:
+        """(Re)load the index files as last saved by any process."""
+        for attempt in range(3):
+            try:
+                self._snapshot = self._load_snapshot(self._read_manifest())
+                return
+            except FileNotFoundError:
+                # a writer removed this generation's files after we read the
+                # manifest; the manifest now names newer ones
+                if attempt == 2:
+                    raise
+
+    def _load_snapshot(self, manifest: Dict) -> _Snapshot:
+        count, dimension = manifest["count"], manifest["dimension"]
+        files = {name: manifest.get(name) for name in ("vectors", "rows", "ivf")}
+        if not count or files["vectors"] is None or files["rows"] is None:
+            return _EMPTY_SNAPSHOT._replace(generation=manifest["generation"], dimension=dimension, files=files)
+        vectors = np.memmap(self._path(files["vectors"]), dtype=np.float32, mode="r", shape=(count, dimension))
+        rows = np.load(self._path(files["rows"]))[:count]
+        centroids, assignment, trained_count = None, np.zeros(0, dtype=np.int32), 0
+        if files["ivf"] is not None:
+            with np.load(self._path(files["ivf"])) as ivf:
+                centroids = ivf["centroids"]
+                assignment = ivf["assignment"][:count]
+                trained_count = int(ivf["trained_count"])
+        row_of = {int(reference_id): row for row, reference_id in enumerate(rows[:, 0]) if reference_id != REMOVED}
+        return _Snapshot(generation=manifest["generation"], dimension=dimension, row_count=count, files=files,
+                         vectors=vectors, rows=rows, row_of=row_of, centroids=centroids,
+                         assignment=assignment, trained_count=trained_count)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.row_of)
+
+    def __contains__(self, reference_id: int) -> bool:
+        return reference_id in self._snapshot.row_of
+
+    def sources(self) -> Dict[int, int]:
+        """parquet referencefile_id currently indexed for each reference_id."""
+        snapshot = self._snapshot
+        return {reference_id: int(snapshot.rows[row, 1]) for reference_id, row in snapshot.row_of.items()}
+
+    def vector(self, reference_id: int) -> Optional[np.ndarray]:
+        return self._vector(self._snapshot, reference_id)
+
+    @staticmethod
+    def _vector(snapshot: _Snapshot, reference_id: int) -> Optional[np.ndarray]:
+        row = snapshot.row_of.get(reference_id)
+        if row is None or snapshot.vectors is None:
+            return None
+        return np.array(snapshot.vectors[row])
+
+    def update(self, upserts: Sequence[Tuple[int, int, np.ndarray]], removals: Sequence[int] = ()) -> None:
+        """Write ``(reference_id, parquet_referencefile_id, vector)`` rows and
+        drop ``removals``. New and changed vectors are appended to the vectors
+        file and the rows they replace marked removed, so an update costs the
+        changed rows only and leaves the rows older readers use untouched."""
+        if not upserts and not removals:
+            return
+        snapshot = self._snapshot
+        dimension = snapshot.dimension or (len(upserts[0][2]) if upserts else 0)
+        rows = snapshot.rows.copy()
+        removed_ids = set(removals)
+        # the last vector of a reference listed twice wins
+        latest = {reference_id: (parquet_id, vector) for reference_id, parquet_id, vector in upserts
+                  if reference_id not in removed_ids}
+        for reference_id in removed_ids | set(latest):
+            row = snapshot.row_of.get(reference_id)
+            if row is not None:
+                rows[row] = (REMOVED, REMOVED)
+        appended_vectors = [_normalize(vector) for _, vector in latest.values()]
+        appended_rows = [(reference_id, parquet_id) for reference_id, (parquet_id, _) in latest.items()]
+        if appended_rows:
+            rows = np.vstack([rows, np.array(appended_rows, dtype=np.int64)])
+
+        removed = int(np.sum(rows[:, 0] == REMOVED))
+        if removed and removed >= COMPACT_FRACTION * len(rows):
+            self._compact(snapshot, dimension, rows, appended_vectors)
+            return
+        vectors_name = snapshot.files["vectors"] or f"vectors.{snapshot.generation + 1}.f32"
+        if appended_vectors:
+            with open(self._path(vectors_name), "ab") as f:
+                # drop anything an interrupted update left past the last row
+                f.truncate(snapshot.row_count * dimension * 4)
+                f.write(np.array(appended_vectors, dtype=np.float32).tobytes())
+        self._save(snapshot, dimension, vectors_name, rows, list(range(snapshot.row_count, len(rows))))
+
+    def _compact(self, snapshot: _Snapshot, dimension: int, rows: np.ndarray,
+                 appended_vectors: List[np.ndarray]) -> None:
+        """Write a new vectors file without the removed rows."""
+        vectors = np.array(snapshot.vectors) if snapshot.vectors is not None \
+            else np.zeros((0, dimension), dtype=np.float32)
+        if appended_vectors:
+            vectors = np.vstack([vectors, np.array(appended_vectors, dtype=np.float32)])
+        keep = rows[:, 0] != REMOVED
+        vectors_name = f"vectors.{snapshot.generation + 1}.f32"
+        vectors[keep].astype(np.float32).tofile(self._path(vectors_name))
+        self._save(snapshot._replace(centroids=None), dimension, vectors_name, rows[keep], None)
+
+    def _save(self, snapshot: _Snapshot, dimension: int, vectors_name: str,
+              rows: np.ndarray, changed_rows: Optional[List[int]]) -> None:
+        """Write the row mapping and IVF of the next generation and swap in
+        its manifest, then remove the files no longer named by it or by the
+        previous manifest. ``changed_rows`` None means every row changed."""
+        generation = snapshot.generation + 1
+        files: Dict[str, Optional[str]] = {"vectors": vectors_name, "rows": f"rows.{generation}.npy", "ivf": None}
+        with open(self._path(f"rows.{generation}.npy"), "wb") as binary_file:
+            np.save(binary_file, rows)
+        ivf = self._update_ivf(snapshot, self._path(vectors_name), dimension, rows, changed_rows)
+        if ivf is not None:
+            files["ivf"] = f"ivf.{generation}.npz"
+            with open(self._path(f"ivf.{generation}.npz"), "wb") as binary_file:
+                np.savez(binary_file, centroids=ivf[0], assignment=ivf[1], trained_count=ivf[2])
+        tmp = self._path(f"manifest.json.{os.getpid()}.tmp")
+        with open(tmp, "w") as text_file:
+            json.dump({"generation": generation, "dimension": dimension, "count": len(rows), **files}, text_file)
+        os.replace(tmp, self._path("manifest.json"))
+        self.load()
+        # readers that just read the previous manifest can still open its files
+        in_use = set(files.values()) | set(snapshot.files.values())
+        for name in os.listdir(self.directory):
+            if _INDEX_FILE.match(name) and name not in in_use:
+                os.remove(self._path(name))
+
+    def _update_ivf(self, snapshot: _Snapshot, vectors_path: str, dimension: int, rows: np.ndarray,
+                    changed_rows: Optional[List[int]]) -> Optional[Tuple[np.ndarray, np.ndarray, int]]:
+        count = len(rows)
+        if count < IVF_MIN_ROWS:
+            return None
+        vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dimension))
+        centroids = snapshot.centroids
+        if centroids is None or count >= 2 * snapshot.trained_count:
+            centroids = _kmeans(np.asarray(vectors), int(min(1024, max(1, np.sqrt(count)))))
+            return centroids, np.argmax(vectors @ centroids.T, axis=1).astype(np.int32), count
+        assignment = np.zeros(count, dtype=np.int32)
+        assignment[:len(snapshot.assignment)] = snapshot.assignment
+        changed = np.array(sorted(changed_rows or []), dtype=np.int64)
+        if len(changed):
+            assignment[changed] = np.argmax(np.asarray(vectors[changed]) @ centroids.T, axis=1)
+        return centroids, assignment, snapshot.trained_count
+
+    def search(self, query: np.ndarray, k: int = 10, exact: bool = True,
+               nprobe: int = IVF_DEFAULT_NPROBE, exclude: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """The ``k`` most similar references as ``(reference_id, cosine)``,
+        best first; none for an all-zero query, which has no direction.
+        ``exact=False`` scores only the rows of the ``nprobe`` centroids
+        nearest to the query (falls back to exact search while the index is
+        too small to have centroids)."""
+        return self._search(self._snapshot, query, k, exact, nprobe, exclude)
+
+    def search_similar(self, reference_id: int, k: int = 10, exact: bool = True,
+                       nprobe: int = IVF_DEFAULT_NPROBE) -> Optional[List[Tuple[int, float]]]:
+        """:meth:`search` with the vector of ``reference_id``, excluding it,
+        on one generation; None if it is not indexed."""
+        snapshot = self._snapshot
+        query = self._vector(snapshot, reference_id)
+        if query is None:
+            return None
+        return self._search(snapshot, query, k, exact, nprobe, [reference_id])
+
+    @staticmethod
+    def _search(snapshot: _Snapshot, query: np.ndarray, k: int, exact: bool,
+                nprobe: int, exclude: Sequence[int]) -> List[Tuple[int, float]]:
+        if snapshot.vectors is None or not snapshot.row_of or not np.any(query):
+            return []
+        query = _normalize(query)
+        if exact or snapshot.centroids is None:
+            candidates = np.arange(snapshot.row_count)
+        else:
+            probes = np.argsort(-(snapshot.centroids @ query))[:nprobe]
+            candidates = np.flatnonzero(np.isin(snapshot.assignment, probes))
+        scores = np.asarray(snapshot.vectors[candidates] @ query)
+        references = snapshot.rows[candidates, 0]
+        valid = references != REMOVED
+        if exclude:
+            valid &= ~np.isin(references, np.asarray(list(exclude)))
+        scores, references = scores[valid], references[valid]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+            scores, references = scores[top], references[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(references[i]), float(scores[i])) for i in order]
+
+
+def parquet_vector(content: bytes) -> Optional[np.ndarray]:
+    """The reference-level vector of an embedding parquet: its whole-document
+    chunk, or the mean of its chunks when it has none."""
+    import pyarrow.parquet as pq  # type: ignore
+
+    table = pq.read_table(io.BytesIO(content), columns=["embedding", "is_document_level"])
+    embeddings = [e for e in table.column("embedding").to_pylist()]
+    document_level = table.column("is_document_level").to_pylist()
+    for embedding, is_document in zip(embeddings, document_level):
+        if is_document and embedding:
+            return np.asarray(embedding, dtype=np.float32)
+    vectors = [e for e in embeddings if e]
+    if not vectors:
+        return None
+    return np.asarray(vectors, dtype=np.float32).mean(axis=0)
+
+
+class ReferenceEmbeddingIndex:
+    """A :class:`VectorIndex` kept in sync with the embedding_file table for
+    one (profile_name, version)."""
+
+    def __init__(self, directory: str, profile_name: str = EMBEDDING_INDEX_PROFILE,
+                 version: int = EMBEDDING_INDEX_VERSION,
+                 fetch: Callable[[str], bytes] = fetch_referencefile_content):
+        self.base_directory = directory
+        self.directory = os.path.join(directory, f"{profile_name}_v{version}")
+        self.profile_name = profile_name
+        self.version = version
+        self.fetch = fetch
+        self.index = VectorIndex(self.directory)
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    @contextmanager
+    def _writer_lock(self) -> Iterator[None]:
+        """Host-wide lock so only one process updates the files at a time."""
+        with open(os.path.join(self.directory, "lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _registered(self, db: Session) -> Dict[int, Tuple[int, str]]:
+        """parquet (referencefile_id, md5sum) of every reference's main
+        embedding file."""
+        rows = db.execute(text(
+            "SELECT ef.reference_id, pq.referencefile_id, pq.md5sum "
+            "FROM embedding_file ef "
+            "JOIN referencefile src ON src.referencefile_id = ef.source_referencefile_id "
+            "JOIN referencefile pq ON pq.referencefile_id = ef.parquet_referencefile_id "
+            "WHERE ef.profile_name = :profile_name AND ef.version = :version "
+            "AND src.file_class = 'converted_merged_main' "
+            "ORDER BY ef.reference_id, pq.referencefile_id"),
+            {"profile_name": self.profile_name, "version": self.version}).fetchall()
+        # the newest parquet wins if a reference has several main sources
+        return {int(reference_id): (int(parquet_id), md5sum) for reference_id, parquet_id, md5sum in rows}
+
+    def refresh(self, db: Session, limit: Optional[int] = None) -> Dict[str, int]:
+        """Bring the index up to date with embedding_file: index new and
+        re-pointed parquets (at most ``limit`` of them) and drop references
+        that no longer have one."""
+        with self._lock, self._writer_lock():
+            self.index.load()
+            registered = self._registered(db)
+            indexed = self.index.sources()
+            changed = [(reference_id, parquet_id, md5sum)
+                       for reference_id, (parquet_id, md5sum) in registered.items()
+                       if indexed.get(reference_id) != parquet_id]
+            removals = [reference_id for reference_id in indexed if reference_id not in registered]
+            pending = len(changed)
+            if limit is not None:
+                changed = changed[:limit]
+
+            def load(item: Tuple[int, int, str]) -> Optional[Tuple[int, int, np.ndarray]]:
+                reference_id, parquet_id, md5sum = item
+                try:
+                    vector = parquet_vector(self.fetch(md5sum))
+                except Exception as exc:
+                    logger.warning("Could not index embedding parquet %s of reference %s: %s",
+                                   parquet_id, reference_id, exc)
+                    return None
+                return None if vector is None else (reference_id, parquet_id, vector)
+
+            with ThreadPoolExecutor(max_workers=EMBEDDING_INDEX_DOWNLOAD_WORKERS) as executor:
+                upserts = [u for u in executor.map(load, changed) if u is not None]
+            if self.index.dimension:
+                upserts = [u for u in upserts if len(u[2]) == self.index.dimension]
+            self.index.update(upserts, removals)
+        result = {"indexed": len(upserts), "removed": len(removals), "pending": pending - len(changed),
+                  "failed": len(changed) - len(upserts), "size": len(self.index)}
+        logger.info("Embedding index %s refreshed: %s", self.directory, result)
+        return result
+
+    def start_background_refresh(self, session_factory: Callable[[], Session]) -> None:
+        """Start (once) a daemon thread that refreshes the index in small
+        steps every EMBEDDING_INDEX_REFRESH_SECONDS, or right after
+        :meth:`mark_stale`, which also picks up files another process saved.
+        Searches keep using the loaded snapshot meanwhile."""
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, args=(session_factory,),
+                                               name="embedding-index-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self, session_factory: Callable[[], Session]) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                with session_factory() as db:
+                    self.refresh(db, limit=EMBEDDING_INDEX_REFRESH_BATCH)
+            except Exception as exc:
+                logger.warning("Embedding index refresh failed: %s", exc)
+            self._wakeup.wait(EMBEDDING_INDEX_REFRESH_SECONDS)
+
+    def mark_stale(self) -> None:
+        self._wakeup.set()
+
+    def search(self, reference_id: int, k: int = 10, exact: bool = True,
+               nprobe: int = IVF_DEFAULT_NPROBE) -> Optional[List[Tuple[int, float]]]:
+        """References most similar to ``reference_id``; None if it is not
+        indexed."""
+        return self.index.search_similar(reference_id, k=k, exact=exact, nprobe=nprobe)
+
+
+_index: Optional[ReferenceEmbeddingIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_embedding_index() -> Optional[ReferenceEmbeddingIndex]:
+    """The process-wide index, or None when EMBEDDING_INDEX_DIR is unset."""
+    global _index
+    directory = os.environ.get("EMBEDDING_INDEX_DIR")
+    if not directory:
+        return None
+    with _index_lock:
+        if _index is None or _index.base_directory != directory:
+            _index = ReferenceEmbeddingIndex(directory)
+        return _index
+
+
+def mark_embedding_index_stale() -> None:
+    """Called when an embedding file is registered, so this process's index
+    picks it up on its next use."""
+    if _index is not None:
+        _index.mark_stale()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from agr_literature_service.lit_processing.utils.sqlalchemy_utils import create_postgres_session
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or refresh the local reference embedding index")
+    parser.add_argument("--limit", type=int, default=None, help="Index at most this many new parquets")
+    args = parser.parse_args()
+    embedding_index = get_embedding_index()
+    if embedding_index is None:
+        parser.error("EMBEDDING_INDEX_DIR is not set")
+    session = create_postgres_session(False)
+    try:
+        embedding_index.refresh(session, limit=args.limit)  # type: ignore[union-attr]
+    finally:
+        session.close()
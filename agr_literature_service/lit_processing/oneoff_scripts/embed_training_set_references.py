@@ -82,6 +82,9 @@ logger.setLevel(logging.INFO)
 # dataset rows with dataset_type='document' whose data_type is the topic.
 TOPIC_CLASSIFIER_TASK_TYPE = "biocuration_topic_classification"
 DOCUMENT_DATASET_TYPE = "document"
+# Already-converted references embedded per call; their chunks are pooled
+# into shared embedding batches (embedding_batcher).
+EMBED_REFERENCES_PER_CALL = 200
 
 # Robust parse of a free-form (PubMed-style) reference date. Mirrors the
 # classifier trainer's utils.date_utils.parse_reference_date so --filter-date-before
@@ -259,6 +262,39 @@ def get_converted_reference_ids(db: Session, reference_ids: List[int]) -> Set[in
     return {int(r[0]) for r in rows}
 
 
+def embed_converted_references(db: Session, mod: str, reference_ids: List[int],
+                               id_to_curie: Dict[int, str], counts: Dict[str, int]) -> None:
+    """Embed already-converted references a slice at a time, so their chunks
+    share full embedding batches instead of one request per reference."""
+    from agr_literature_service.lit_processing.embedding.embedding_generation import (
+        generate_classifier_embeddings_for_references,
+    )
+
+    for start in range(0, len(reference_ids), EMBED_REFERENCES_PER_CALL):
+        batch = reference_ids[start:start + EMBED_REFERENCES_PER_CALL]
+        try:
+            results = generate_classifier_embeddings_for_references(
+                db, [(rid, id_to_curie.get(rid)) for rid in batch])
+        except Exception as exc:  # never let one slice abort the run
+            logger.error("[%s] embed %d-%d/%d: unexpected error: %s",
+                         mod, start + 1, start + len(batch), len(reference_ids), exc)
+            counts["failed"] += len(batch)
+            continue
+        for idx, rid in enumerate(batch, start + 1):
+            result = results[rid]
+            logger.info("[%s] %d/%d embed %s -> %s",
+                        mod, idx, len(reference_ids), id_to_curie.get(rid, str(rid)), result)
+            # A {"skipped": reason} result means nothing was embedded (e.g.
+            # no source markdown / not a classifier MOD); don't count it as a
+            # success so the summary reflects what actually happened.
+            if isinstance(result, dict) and "skipped" in result:
+                counts["embed_skipped"] += 1
+            else:
+                counts["embedded_ok"] += 1
+                counts["chunks"] += result.get("chunks", 0)
+                counts["cache_hits"] += result.get("cache_hits", 0)
+
+
 def process_mod(db: Session, mod: str, args: argparse.Namespace,
                 explicit_curies: Optional[List[str]] = None) -> Dict[str, int]:
     """Enumerate + (unless dry-run) embed one MOD's references. Returns counts.
@@ -298,7 +334,8 @@ def process_mod(db: Session, mod: str, args: argparse.Namespace,
                 " (will be skipped: --skip-conversion)" if args.skip_conversion else "")
 
     counts = {"targets": len(ordered_ids), "embedded_ok": 0, "embed_skipped": 0,
-              "converted_ok": 0, "skipped_unconverted": 0, "resolve_failed": 0, "failed": 0}
+              "converted_ok": 0, "skipped_unconverted": 0, "resolve_failed": 0, "failed": 0,
+              "chunks": 0, "cache_hits": 0}
 
     if not args.commit:
         logger.info("[%s] DRY RUN — no embeddings generated. Re-run with --commit to execute.", mod)
@@ -307,61 +344,49 @@ def process_mod(db: Session, mod: str, args: argparse.Namespace,
     # Lazy imports: only needed for the real run, and keep the embedding stack
     # optional for enumeration/dry-run environments.
     from agr_cognito_py import get_admin_token
-    from agr_literature_service.lit_processing.embedding.embedding_generation import (
-        generate_classifier_embeddings_for_reference,
-    )
     from agr_literature_service.lit_processing.pdf2md.pdf2md import (
         process_single_reference, _resolve_workflow_ref_file_info,
     )
 
+    embed_converted_references(db, mod, to_embed_only, id_to_curie, counts)
+
+    if args.skip_conversion:
+        counts["skipped_unconverted"] = len(to_convert)
+        to_convert = []
+
     token: Optional[str] = None
     prefer_nxml = not args.force_pdfx
     process_supplements = not args.no_supplements
 
-    for idx, rid in enumerate(ordered_ids, 1):
+    for idx, rid in enumerate(to_convert, 1):
         curie = id_to_curie.get(rid, str(rid))
         try:
-            if rid in converted_ids:
-                result = generate_classifier_embeddings_for_reference(db, rid, curie)
-                logger.info("[%s] %d/%d embed %s -> %s",
-                            mod, idx, len(ordered_ids), curie, result)
-                # A {"skipped": reason} result means nothing was embedded (e.g.
-                # no source markdown / not a classifier MOD); don't count it as a
-                # success so the summary reflects what actually happened.
-                if isinstance(result, dict) and "skipped" in result:
-                    counts["embed_skipped"] += 1
-                else:
-                    counts["embedded_ok"] += 1
-            elif args.skip_conversion:
-                counts["skipped_unconverted"] += 1
+            ref_file_info, resolve_error = _resolve_workflow_ref_file_info(
+                db=db, ref_id=rid, reference_curie=curie,
+                mod_abbreviation=mod, prefer_nxml=prefer_nxml,
+            )
+            if ref_file_info is None:
+                logger.warning("[%s] %d/%d %s: %s; skipping",
+                               mod, idx, len(to_convert), curie, resolve_error)
+                counts["resolve_failed"] += 1
                 continue
+            if token is None:
+                token = get_admin_token()
+            success, error_msg = process_single_reference(
+                db, ref_file_info, token,
+                prefer_nxml=prefer_nxml, process_supplements=process_supplements,
+            )
+            if success:
+                logger.info("[%s] %d/%d convert+embed %s: ok",
+                            mod, idx, len(to_convert), curie)
+                counts["converted_ok"] += 1
             else:
-                ref_file_info, resolve_error = _resolve_workflow_ref_file_info(
-                    db=db, ref_id=rid, reference_curie=curie,
-                    mod_abbreviation=mod, prefer_nxml=prefer_nxml,
-                )
-                if ref_file_info is None:
-                    logger.warning("[%s] %d/%d %s: %s; skipping",
-                                   mod, idx, len(ordered_ids), curie, resolve_error)
-                    counts["resolve_failed"] += 1
-                    continue
-                if token is None:
-                    token = get_admin_token()
-                success, error_msg = process_single_reference(
-                    db, ref_file_info, token,
-                    prefer_nxml=prefer_nxml, process_supplements=process_supplements,
-                )
-                if success:
-                    logger.info("[%s] %d/%d convert+embed %s: ok",
-                                mod, idx, len(ordered_ids), curie)
-                    counts["converted_ok"] += 1
-                else:
-                    logger.error("[%s] %d/%d convert %s failed: %s",
-                                 mod, idx, len(ordered_ids), curie, error_msg)
-                    counts["failed"] += 1
+                logger.error("[%s] %d/%d convert %s failed: %s",
+                             mod, idx, len(to_convert), curie, error_msg)
+                counts["failed"] += 1
         except Exception as exc:  # never let one reference abort the batch
             logger.error("[%s] %d/%d %s: unexpected error: %s",
-                         mod, idx, len(ordered_ids), curie, exc)
+                         mod, idx, len(to_convert), curie, exc)
             counts["failed"] += 1
 
     logger.info("[%s] DONE: %s", mod, counts)
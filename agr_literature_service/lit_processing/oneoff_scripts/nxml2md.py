@@ -41,7 +41,6 @@ from botocore.config import Config as BotoConfig
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
-from agr_abc_document_parsers import convert_xml_to_markdown
 from agr_literature_service.api.crud.referencefile_crud import create_metadata
 from agr_literature_service.api.crud.referencefile_utils import (
     get_s3_folder_from_md5sum,
@@ -52,6 +51,9 @@ from agr_literature_service.api.s3.upload import upload_file_to_bucket
 from agr_literature_service.api.schemas.referencefile_schemas import (
     ReferencefileSchemaPost,
 )
+from agr_literature_service.lit_processing.utils.xml_conversion_pool import (
+    convert_xml_to_markdown,
+)
 
 logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s",
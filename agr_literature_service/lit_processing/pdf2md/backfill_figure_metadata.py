@@ -53,7 +53,7 @@ from typing import Callable, Dict, List, Optional, Tuple
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, aliased
 
-from agr_cognito_py import ModAccess, get_admin_token
+from agr_cognito_py import ModAccess
 
 from agr_literature_service.api.crud.referencefile_crud import (
     download_file,
@@ -81,6 +81,7 @@ from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import (
     resolve_curie_to_reference,
     submit_pdf_to_pdfx,
 )
+from agr_literature_service.lit_processing.utils.http_utils import get_service_token
 from agr_literature_service.lit_processing.utils.sqlalchemy_utils import (
     create_postgres_session,
 )
@@ -494,7 +495,7 @@ def backfill(  # pragma: no cover
 
     def get_token() -> str:
         # Re-fetch per source PDF so a long run never trips an expired token.
-        return get_admin_token()
+        return get_service_token()
 
     try:
         if reference:
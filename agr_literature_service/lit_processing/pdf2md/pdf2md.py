@@ -12,7 +12,9 @@ stores each output as a separate file; nXML conversion produces a single
 merged-style markdown output.
 """
 import logging
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 from typing import Dict, List, Optional, Tuple
 
@@ -28,7 +30,8 @@ from agr_literature_service.api.database.config import SQLALCHEMY_DATABASE_URL
 from agr_literature_service.api.models import (
     ModModel, ReferencefileModel, ReferenceModel, CrossReferenceModel
 )
-from agr_cognito_py import ModAccess, get_admin_token
+from agr_cognito_py import ModAccess
+from agr_literature_service.lit_processing.utils.http_utils import get_service_token
 from agr_literature_service.lit_processing.utils.report_utils import send_report
 
 from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import (
@@ -41,11 +44,18 @@ from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import (
     process_extracted_images,
     process_nxml_to_markdown,
     process_supplemental_pdfs,
+    shared_pdfx_poller,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# number of references _process_reference_list converts at the same time;
+# each worker has its own db session and all PDFX jobs are polled together
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("PDF2MD_MAX_IN_FLIGHT", 4))
+# PDFX results (one per extraction method) downloaded in parallel
+RESULT_DOWNLOAD_WORKERS = 4
+
 
 def get_newest_main_pdfs(db: Session, limit: int = 50, skip_xml: bool = False) -> List[Dict]:  # pragma: no cover
     """
@@ -214,7 +224,8 @@ def _process_reference_list(  # pragma: no cover
     summary_suffix: str = "",
     report_subject: str = "pdf2md conversion errors",
     prefer_nxml: bool = True,
-    process_supplements: bool = True
+    process_supplements: bool = True,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
 ) -> Dict:
     """
     Common processing loop for reference-to-Markdown conversion.
@@ -233,6 +244,8 @@ def _process_reference_list(  # pragma: no cover
         report_subject: Subject line for error report email.
         prefer_nxml: Prefer nXML over PDFX for main-file conversion.
         process_supplements: Also convert supplemental PDFs.
+        max_in_flight: Number of references converted concurrently, each in
+            its own db session; 1 processes them one by one on db.
 
     Returns:
         Dict with processing statistics.
@@ -242,8 +255,10 @@ def _process_reference_list(  # pragma: no cover
     failure_count = 0
     objects_with_errors: List[Dict] = []
     ref_times: List[float] = []
+    concurrent = max_in_flight > 1 and total_count > 1
+    new_session = sessionmaker(bind=db.get_bind(), autoflush=True) if concurrent else None
 
-    for idx, ref_file_info in enumerate(reference_list, 1):
+    def convert(idx: int, ref_file_info: Dict) -> Tuple[bool, Optional[str], Optional[float]]:
         ref_start_time = time.time()
         reference_curie = ref_file_info["reference_curie"]
 
@@ -251,27 +266,34 @@ def _process_reference_list(  # pragma: no cover
 
         # Refresh token if needed
         try:
-            token = get_admin_token()
+            token = get_service_token()
         except Exception as e:
             logger.error(f"Failed to refresh token: {e}")
-            failure_count += 1
-            objects_with_errors.append({
-                "reference_curie": reference_curie,
-                "display_name": ref_file_info["display_name"],
-                "file_extension": ref_file_info["file_extension"],
-                "mod_abbreviation": ref_file_info.get("mod_abbreviation", "N/A"),
-                "error": f"Failed to refresh token: {e}"
-            })
-            continue
+            return False, f"Failed to refresh token: {e}", None
 
-        success, error_msg = process_single_reference(
-            db, ref_file_info, token,
-            prefer_nxml=prefer_nxml,
-            process_supplements=process_supplements
-        )
-
-        ref_elapsed = time.time() - ref_start_time
-        ref_times.append(ref_elapsed)
+        # sessions are not thread safe: concurrent workers get their own
+        worker_db = new_session() if new_session is not None else db
+        try:
+            success, error_msg = process_single_reference(
+                worker_db, ref_file_info, token,
+                prefer_nxml=prefer_nxml,
+                process_supplements=process_supplements
+            )
+        except Exception as e:
+            if not concurrent:
+                raise
+            worker_db.rollback()
+            success, error_msg = False, str(e)
+        finally:
+            if worker_db is not db:
+                worker_db.close()
+        return success, error_msg, time.time() - ref_start_time
+
+    def record(ref_file_info: Dict, success: bool, error_msg: Optional[str], ref_elapsed: Optional[float]):
+        nonlocal success_count, failure_count
+        reference_curie = ref_file_info["reference_curie"]
+        if ref_elapsed is not None:
+            ref_times.append(ref_elapsed)
 
         if success:
             success_count += 1
@@ -285,7 +307,21 @@ def _process_reference_list(  # pragma: no cover
                 "mod_abbreviation": ref_file_info.get("mod_abbreviation", "N/A"),
                 "error": error_msg
             })
-            logger.error(f"Failed {reference_curie} after {ref_elapsed:.2f}s: {error_msg}")
+            if ref_elapsed is not None:
+                logger.error(f"Failed {reference_curie} after {ref_elapsed:.2f}s: {error_msg}")
+
+    if not concurrent:
+        for idx, ref_file_info in enumerate(reference_list, 1):
+            record(ref_file_info, *convert(idx, ref_file_info))
+    else:
+        # at most max_in_flight references (and their PDFX jobs) are in
+        # flight; one shared poller tracks every PDFX job with backoff
+        with shared_pdfx_poller(get_service_token), \
+                ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            futures = {executor.submit(convert, idx, ref_file_info): ref_file_info
+                       for idx, ref_file_info in enumerate(reference_list, 1)}
+            for future in as_completed(futures):
+                record(futures[future], *future.result())
 
     # Calculate timing statistics
     total_elapsed = time.time() - start_time
@@ -371,7 +407,7 @@ def process_references_since_year(  # pragma: no cover
 
         # Get token
         try:
-            token = get_admin_token()
+            token = get_service_token()
         except Exception as e:
             logger.error(f"Failed to obtain PDFX token: {e}")
             return None
@@ -445,9 +481,13 @@ def _convert_main_pdf_via_pdfx(  # pragma: no cover
         poll_pdfx_status(process_id, token)
 
         successful_methods = []
+        # fetch all method outputs in parallel, upload them in order
+        with ThreadPoolExecutor(max_workers=RESULT_DOWNLOAD_WORKERS) as executor:
+            result_futures = {method: executor.submit(download_pdfx_result, process_id, method, token)
+                              for method in methods_to_extract}
         for method in methods_to_extract:
             try:
-                markdown_content = download_pdfx_result(process_id, method, token)
+                markdown_content = result_futures[method].result()
 
                 if not markdown_content or len(markdown_content) < 10:
                     logger.warning(f"Empty or minimal content for {method} on {reference_curie}")
@@ -712,7 +752,7 @@ def process_newest_references(  # pragma: no cover
 
         # Get token
         try:
-            token = get_admin_token()
+            token = get_service_token()
         except Exception as e:
             logger.error(f"Failed to obtain PDFX token: {e}")
             return None
@@ -925,7 +965,7 @@ def main(  # pragma: no cover
             file_extension = ref_file_info["file_extension"]
 
             # Refresh token if needed
-            token = get_admin_token()
+            token = get_service_token()
 
             success, error_msg = process_single_reference(
                 db, ref_file_info, token,
@@ -10,31 +10,35 @@ import json
 import logging
 import os
 import re
+import threading
 import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 from io import BytesIO
-from typing import Dict, List, Literal, Optional, Tuple, TypedDict
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple, TypedDict
 
-import boto3
 import requests
 from fastapi import HTTPException, UploadFile
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from agr_abc_document_parsers import convert_xml_to_markdown
-
 from agr_literature_service.api.crud.referencefile_crud import download_file, file_upload
 from agr_literature_service.api.crud.referencefile_utils import get_s3_folder_from_md5sum
+from agr_literature_service.api.s3.referencefile_cache import get_referencefile_cache
 from agr_literature_service.api.crud.reference_utils import (
     normalize_reference_curie,
     get_reference,
 )
+from agr_literature_service.lit_processing.utils.http_utils import get_http_session, get_service_token
+from agr_literature_service.lit_processing.utils.s3_utils import get_s3_client
+from agr_literature_service.lit_processing.utils.xml_conversion_pool import convert_xml_to_markdown
 from agr_literature_service.api.models import (
     ModCorpusAssociationModel,
     ModModel,
     ReferencefileModel,
     ReferenceModel,
 )
-from agr_cognito_py import ModAccess, get_admin_token
+from agr_cognito_py import ModAccess
 
 logger = logging.getLogger(__name__)
 
@@ -587,7 +591,7 @@ def submit_pdf_to_pdfx(  # pragma: no cover
             files = {
                 "file": ("document.pdf", file_content, "application/pdf")
             }
-            response = requests.post(
+            response = get_http_session().post(
                 url, headers=headers, files=files, data=data, timeout=120
             )
             response.raise_for_status()
@@ -621,6 +625,26 @@ def submit_pdf_to_pdfx(  # pragma: no cover
     raise RuntimeError("PDFX submission failed: no exception captured")
 
 
+PDFX_COMPLETED_STATUSES = ("completed", "complete")
+# PdfxStatusPoller schedule: first status request after PDFX_POLL_INTERVAL
+# seconds, then backing off up to PDFX_MAX_POLL_INTERVAL
+PDFX_POLL_INTERVAL = 5.0
+PDFX_MAX_POLL_INTERVAL = 60.0
+
+
+def get_pdfx_job_status(process_id: str, token: str, session: Optional[requests.Session] = None) -> Dict:
+    """Fetch the current status document of a PDFX job."""
+    pdfx_api_url = os.environ.get("PDFX_API_URL", "https://pdfx.alliancegenome.org")
+    url = f"{pdfx_api_url}/api/v1/extract/{process_id}"
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    http = session if session is not None else get_http_session()
+    response = http.get(url, headers=headers, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
 def poll_pdfx_status(  # pragma: no cover
     process_id: str,
     token: str,
@@ -630,6 +654,9 @@ def poll_pdfx_status(  # pragma: no cover
     """
     Poll the PDFX service for job completion.
 
+    Inside shared_pdfx_poller() the job is handed to the shared poller
+    instead, so concurrent conversions don't each sleep-poll PDFX.
+
     Args:
         process_id: The process ID to check.
         token: The bearer token for authentication.
@@ -643,28 +670,21 @@ def poll_pdfx_status(  # pragma: no cover
         TimeoutError: If job doesn't complete within timeout.
         requests.RequestException: If polling request fails.
     """
-    pdfx_api_url = os.environ.get("PDFX_API_URL", "https://pdfx.alliancegenome.org")
-    url = f"{pdfx_api_url}/api/v1/extract/{process_id}"
-
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
+    if _shared_pdfx_poller is not None:
+        return _shared_pdfx_poller.wait(process_id, timeout=timeout)
 
     start_time = time.time()
     last_status = None
 
     while time.time() - start_time < timeout:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-
-        status_data = response.json()
+        status_data = get_pdfx_job_status(process_id, token)
         current_status = status_data.get("status")
 
         if current_status != last_status:
             logger.info(f"PDFX job {process_id} status: {current_status}")
             last_status = current_status
 
-        if current_status in ["completed", "complete"]:
+        if current_status in PDFX_COMPLETED_STATUSES:
             return status_data
         elif current_status == "failed":
             error_msg = status_data.get("error", "Unknown error")
@@ -680,6 +700,137 @@ def poll_pdfx_status(  # pragma: no cover
     raise TimeoutError(f"PDFX job {process_id} timed out after {timeout} seconds")
 
 
+class PdfxStatusPoller:
+    """
+    Track many PDFX jobs from a single background thread.
+
+    Each job is polled on its own schedule, starting at poll_interval and
+    backing off by backoff_factor up to max_poll_interval, so a batch of
+    long-running jobs costs a handful of status requests per minute
+    instead of one sleeping thread per job. track() returns a Future that
+    resolves to the final status document, or fails with RuntimeError
+    (job failed), TimeoutError, or the request error after max_errors
+    consecutive failed status requests.
+    """
+
+    def __init__(
+        self,
+        token_provider: Callable[[], str],
+        poll_interval: Optional[float] = None,
+        max_poll_interval: Optional[float] = None,
+        backoff_factor: float = 1.5,
+        max_errors: int = 3
+    ):
+        self.token_provider = token_provider
+        self.poll_interval = poll_interval if poll_interval is not None else PDFX_POLL_INTERVAL
+        self.max_poll_interval = max_poll_interval if max_poll_interval is not None else PDFX_MAX_POLL_INTERVAL
+        self.backoff_factor = backoff_factor
+        self.max_errors = max_errors
+        self._jobs: Dict[str, Dict] = {}
+        self._closed = False
+        self._condition = threading.Condition()
+        self._session = get_http_session()
+        self._thread = threading.Thread(target=self._run, name="pdfx-status-poller", daemon=True)
+        self._thread.start()
+
+    def track(self, process_id: str, timeout: float = 900) -> Future:
+        future: Future = Future()
+        now = time.monotonic()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("PDFX status poller is closed")
+            self._jobs[process_id] = {
+                "future": future,
+                "deadline": now + timeout,
+                "next_poll": now + self.poll_interval,
+                "interval": self.poll_interval,
+                "errors": 0,
+                "status": None,
+            }
+            self._condition.notify()
+        return future
+
+    def wait(self, process_id: str, timeout: float = 900) -> Dict:
+        return self.track(process_id, timeout=timeout).result()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            for job in self._jobs.values():
+                job["future"].set_exception(RuntimeError("PDFX status poller closed"))
+            self._jobs.clear()
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [process_id for process_id, job in self._jobs.items() if job["next_poll"] <= now]
+                if not due:
+                    next_poll = min((job["next_poll"] for job in self._jobs.values()), default=None)
+                    self._condition.wait(None if next_poll is None else next_poll - now)
+                    continue
+            for process_id in due:
+                self._poll(process_id)
+
+    def _poll(self, process_id: str) -> None:
+        with self._condition:
+            job = self._jobs.get(process_id)
+        if job is None:
+            return
+        outcome: Optional[BaseException] = None
+        status_data: Optional[Dict] = None
+        try:
+            status_data = get_pdfx_job_status(process_id, self.token_provider(), session=self._session)
+            job["errors"] = 0
+        except Exception as e:
+            job["errors"] += 1
+            logger.warning(f"PDFX status request for {process_id} failed ({job['errors']}/{self.max_errors}): {e}")
+            if job["errors"] >= self.max_errors:
+                outcome = e
+        current_status = status_data.get("status") if status_data is not None else None
+        if status_data is not None and current_status != job["status"]:
+            logger.info(f"PDFX job {process_id} status: {current_status}")
+            job["status"] = current_status
+        if outcome is None and current_status == "failed":
+            outcome = RuntimeError(f"PDFX job failed: {status_data.get('error', 'Unknown error')}")  # type: ignore
+        elif outcome is None and current_status not in PDFX_COMPLETED_STATUSES \
+                and time.monotonic() >= job["deadline"]:
+            outcome = TimeoutError(f"PDFX job {process_id} timed out")
+        with self._condition:
+            if self._jobs.get(process_id) is not job:
+                return
+            if outcome is not None:
+                del self._jobs[process_id]
+                job["future"].set_exception(outcome)
+            elif current_status in PDFX_COMPLETED_STATUSES:
+                del self._jobs[process_id]
+                job["future"].set_result(status_data)
+            else:
+                job["next_poll"] = time.monotonic() + job["interval"]
+                job["interval"] = min(job["interval"] * self.backoff_factor, self.max_poll_interval)
+
+
+_shared_pdfx_poller: Optional[PdfxStatusPoller] = None
+
+
+@contextmanager
+def shared_pdfx_poller(token_provider: Callable[[], str], **kwargs) -> Iterator[PdfxStatusPoller]:
+    """Route every poll_pdfx_status() call made inside the block, from any
+    thread, through one PdfxStatusPoller."""
+    global _shared_pdfx_poller
+    poller = PdfxStatusPoller(token_provider, **kwargs)
+    _shared_pdfx_poller = poller
+    try:
+        yield poller
+    finally:
+        _shared_pdfx_poller = None
+        poller.close()
+
+
 def download_pdfx_result(process_id: str, method: str, token: str) -> bytes:  # pragma: no cover
     """
     Download the markdown result for a specific extraction method.
@@ -702,7 +853,7 @@ def download_pdfx_result(process_id: str, method: str, token: str) -> bytes:  #
         "Authorization": f"Bearer {token}"
     }
 
-    response = requests.get(url, headers=headers, timeout=60)
+    response = get_http_session().get(url, headers=headers, timeout=60)
     response.raise_for_status()
 
     return response.content
@@ -721,7 +872,7 @@ def download_pdfx_image_manifest(process_id: str, token: str) -> Dict:  # pragma
     pdfx_api_url = os.environ.get("PDFX_API_URL", "https://pdfx.alliancegenome.org")
     url = f"{pdfx_api_url}/api/v1/extract/{process_id}/images/urls"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers, timeout=60)
+    response = get_http_session().get(url, headers=headers, timeout=60)
     response.raise_for_status()
     payload = response.json()
     if not isinstance(payload, dict):
@@ -739,7 +890,7 @@ def download_pdfx_image(image_url: str) -> bytes:  # pragma: no cover
 
     No bearer token is needed — the URL is already pre-signed.
     """
-    response = requests.get(image_url, timeout=60)
+    response = get_http_session().get(image_url, timeout=60)
     response.raise_for_status()
     return response.content
 
@@ -1218,7 +1369,7 @@ def process_pdf_for_reference(  # pragma: no cover
     # Get token if not provided
     if token is None:
         try:
-            token = get_admin_token()
+            token = get_service_token()
         except Exception as e:
             error_msg = f"Failed to obtain PDFX token: {e}"
             logger.error(error_msg)
@@ -1622,14 +1773,22 @@ def download_xml_from_s3(s3_client, md5sum: str) -> bytes:  # pragma: no cover
     Returns:
         The file content as bytes (decompressed if it was gzipped).
     """
+    cache = get_referencefile_cache()
+    if cache is not None:
+        content = cache.get(md5sum)
+        if content is not None:
+            return content
     folder = get_s3_folder_from_md5sum(md5sum)
     s3_key = f"{folder}/{md5sum}.gz"
     response = s3_client.get_object(Bucket="agr-literature", Key=s3_key)
     compressed = response["Body"].read()
     try:
-        return gzip.decompress(compressed)
+        content = gzip.decompress(compressed)
     except (gzip.BadGzipFile, OSError):
         return compressed
+    if cache is not None:
+        cache.put(md5sum, content)
+    return content
 
 
 def process_nxml_to_markdown(  # pragma: no cover
@@ -1643,10 +1802,10 @@ def process_nxml_to_markdown(  # pragma: no cover
     Convert an nXML file to Markdown and store the result.
 
     The nXML is downloaded from S3, converted to markdown via
-    agr_abc_document_parsers.convert_xml_to_markdown (JATS format), and the
-    result is uploaded with file_class='converted_merged_main' and a '_nxml'
-    display_name suffix so the UI can group it under the source file alongside
-    PDFX method outputs.
+    agr_abc_document_parsers.convert_xml_to_markdown (JATS format) in the
+    shared XML conversion process pool, and the result is uploaded with
+    file_class='converted_merged_main' and a '_nxml' display_name suffix so the
+    UI can group it under the source file alongside PDFX method outputs.
 
     Args:
         db: Database session.
@@ -1660,7 +1819,7 @@ def process_nxml_to_markdown(  # pragma: no cover
     """
     try:
         if s3_client is None:
-            s3_client = boto3.client("s3")
+            s3_client = get_s3_client()
 
         xml_content = download_xml_from_s3(s3_client, nxml_ref_file.md5sum)
         if not xml_content:
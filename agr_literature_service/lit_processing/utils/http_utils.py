@@ -0,0 +1,161 @@
+"""
+Shared HTTP plumbing for service-to-service calls (ABC API, PDFX, A-team,
+ID minting).
+
+get_http_session() is one requests.Session per process whose keep-alive
+connection pool is reused by every caller, instead of a new TCP/TLS
+handshake per request. get_service_token() returns the Cognito admin token,
+cached until shortly before it expires and refreshed by a background thread
+before callers ever see it expire, so batch jobs do not stall on a token
+request every hour.
+"""
+from os import environ, register_at_fork
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from agr_cognito_py import generate_headers, get_admin_token
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAXSIZE = int(environ.get('HTTP_POOL_MAXSIZE', 20))
+# idempotent requests are retried on connection errors and gateway errors;
+# POSTs are left to the callers, which know whether a retry is safe
+HTTP_RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                   allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']), raise_on_status=False)
+# refresh the token this many seconds before it expires; the background
+# refresh starts at twice that
+TOKEN_REFRESH_MARGIN = 120
+DEFAULT_TOKEN_LIFETIME = 3600
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide requests session with a pooled, retrying adapter."""
+
+    global _session
+    session = _session
+    if session is None:
+        with _session_lock:
+            session = _session
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE,
+                                      max_retries=HTTP_RETRY)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return session
+
+
+def _token_expiry(token: str) -> float:
+    """Expiry (epoch seconds) from the token's exp claim, read without
+    verifying the signature; we only use it to schedule the refresh."""
+
+    try:
+        from jose import jwt
+        return float(jwt.get_unverified_claims(token)['exp'])
+    except Exception:
+        return time.time() + DEFAULT_TOKEN_LIFETIME
+
+
+class ServiceTokenProvider:
+    """
+    Thread-safe token cache. get_token() returns the cached token while it
+    has more than refresh_margin seconds left; inside 2 * refresh_margin a
+    single background thread fetches the next one, and only an expired (or
+    invalidated) token makes the caller wait for a fetch.
+    """
+
+    def __init__(self, fetch_token: Optional[Callable[[], str]] = None,
+                 refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        self.fetch_token = fetch_token or (lambda: get_admin_token(force_refresh=True))
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_token(self) -> str:
+        now = time.time()
+        token = self._token
+        if token is not None and now < self._expires_at - self.refresh_margin:
+            if now >= self._expires_at - 2 * self.refresh_margin:
+                self._refresh_in_background()
+            return token
+        with self._lock:
+            if self._token is None or time.time() >= self._expires_at - self.refresh_margin:
+                self._refresh()
+            return self._token  # type: ignore
+
+    def invalidate(self) -> None:
+        """Forget the cached token, e.g. after the server rejected it."""
+
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _refresh(self) -> None:
+        token = self.fetch_token()
+        self._token = token
+        self._expires_at = _token_expiry(token)
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                # the current token is still valid; the next call retries
+                logger.warning(f"Background token refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="service-token-refresh", daemon=True).start()
+
+
+_token_provider = ServiceTokenProvider()
+
+
+def get_service_token() -> str:
+    """Cognito admin token for calls to Alliance services."""
+
+    return _token_provider.get_token()
+
+
+def invalidate_service_token() -> None:
+    _token_provider.invalidate()
+
+
+def get_auth_headers() -> Dict[str, str]:
+    """generate_headers() for the cached service token."""
+
+    return generate_headers(get_service_token())
+
+
+def reset_http_sessions():
+    """
+    Drop the shared session and token so that a forked child (gunicorn
+    worker, multiprocessing) builds its own instead of sharing sockets and
+    locks with the parent.
+    """
+
+    global _session, _session_lock, _token_provider
+    _session = None
+    _session_lock = threading.Lock()
+    _token_provider = ServiceTokenProvider()
+
+
+register_at_fork(after_in_child=reset_http_sessions)
@@ -1,11 +1,19 @@
 # needs AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY in environment.
 
 
-from os import environ, path
+from os import environ, path, register_at_fork
+import gzip
+import shutil
 import sys
+import threading
 import logging
 import logging.config
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import RawIOBase
 import boto3  # type: ignore
+from boto3.s3.transfer import TransferConfig  # type: ignore
+from botocore.config import Config  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
 
 from dotenv import load_dotenv
@@ -23,6 +31,60 @@ logging.getLogger("s3transfer.utils").setLevel(logging.WARNING)
 logging.getLogger("s3transfer.tasks").setLevel(logging.WARNING)
 logging.getLogger("s3transfer.futures").setLevel(logging.WARNING)
 
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+DEFAULT_UPLOAD_WORKERS = 4
+STREAM_READ_SIZE = 1024 * 1024
+
+# one client per process is shared by the API workers and the batch scripts:
+# boto3 client construction (endpoint resolution, credential chain) is slow
+# and every client has its own connection pool
+S3_MAX_POOL_CONNECTIONS = int(environ.get('S3_MAX_POOL_CONNECTIONS', 50))
+S3_CLIENT_CONFIG = Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                          retries={'max_attempts': 5, 'mode': 'adaptive'})
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=DEFAULT_PART_SIZE, multipart_chunksize=DEFAULT_PART_SIZE,
+                                    max_concurrency=10, use_threads=True)
+
+_s3_clients: dict = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(aws_access_key_id=None, aws_secret_access_key=None):
+    """
+    Process-wide boto3 s3 client (thread safe), created on first use with a
+    tuned connection pool and retry policy. Explicit credentials get their
+    own client; by default the usual credential chain is used.
+    """
+
+    key = (aws_access_key_id, aws_secret_access_key)
+    client = _s3_clients.get(key)
+    if client is None:
+        with _s3_clients_lock:
+            client = _s3_clients.get(key)
+            if client is None:
+                session = boto3.session.Session(aws_access_key_id=aws_access_key_id,
+                                                aws_secret_access_key=aws_secret_access_key)
+                client = session.client('s3', config=S3_CLIENT_CONFIG)
+                _s3_clients[key] = client
+    return client
+
+
+def reset_s3_clients():
+    """
+    Drop the cached clients so the next get_s3_client() builds new ones.
+    Runs in every forked child (gunicorn workers, multiprocessing) so that
+    processes never share the sockets of a connection pool.
+    """
+
+    global _s3_clients_lock
+    _s3_clients.clear()
+    # the lock may have been held by another thread of the parent at fork time
+    _s3_clients_lock = threading.Lock()
+
+
+register_at_fork(after_in_child=reset_s3_clients)
+
 
 def file_exist_from_s3(bucketname, s3_file_location):
     """
@@ -32,7 +94,7 @@ def file_exist_from_s3(bucketname, s3_file_location):
     :return: True/False
     """
 
-    s3_client = boto3.client('s3')
+    s3_client = get_s3_client()
     try:
         s3_client.head_object(Bucket=bucketname, Key=s3_file_location)
     except ClientError as e:
@@ -54,9 +116,9 @@ def download_file_from_s3(filepath, bucketname, s3_file_location):
     :return:
     """
 
-    s3_client = boto3.client('s3')
+    s3_client = get_s3_client()
     try:
-        response = s3_client.download_file(bucketname, s3_file_location, filepath)
+        response = s3_client.download_file(bucketname, s3_file_location, filepath, Config=S3_TRANSFER_CONFIG)
         if response is not None:
             logger.info("boto 3 downloaded response: %s", response)
     except ClientError as e:
@@ -76,9 +138,10 @@ def upload_file_to_s3(filepath, bucketname, s3_file_location, storage_class='STA
     :return: True if file was uploaded, else False
     """
 
-    s3_client = boto3.client('s3')
+    s3_client = get_s3_client()
     try:
-        response = s3_client.upload_file(filepath, bucketname, s3_file_location, ExtraArgs={'StorageClass': storage_class})
+        response = s3_client.upload_file(filepath, bucketname, s3_file_location,
+                                         ExtraArgs={'StorageClass': storage_class}, Config=S3_TRANSFER_CONFIG)
         if response is not None:
             logger.info("boto 3 uploaded response: %s", response)
     except ClientError as e:
@@ -88,6 +151,223 @@ def upload_file_to_s3(filepath, bucketname, s3_file_location, storage_class='STA
     return True
 
 
+def copy_file_in_s3(bucketname, source_s3_file_location, s3_file_location, storage_class='STANDARD'):
+    """
+    Server-side copy of an object, so an artifact uploaded once can be
+    published under several keys without uploading it again.
+
+    :param bucketname: s3 bucket holding both objects
+    :param source_s3_file_location: s3 object name to copy from
+    :param s3_file_location: s3 object name to copy to
+    :param storage_class: s3 storage class of the copy
+    :return: True if the object was copied, else False
+    """
+
+    s3_client = get_s3_client()
+    try:
+        s3_client.copy({'Bucket': bucketname, 'Key': source_s3_file_location}, bucketname,
+                       s3_file_location, ExtraArgs={'StorageClass': storage_class}, Config=S3_TRANSFER_CONFIG)
+    except ClientError as e:
+        logging.error(e)
+        return False
+
+    return True
+
+
+def delete_files_from_s3(bucketname, s3_file_locations):
+    """
+    Delete objects, up to 1000 per request.
+
+    :param bucketname: s3 bucket holding the objects
+    :param s3_file_locations: s3 object names to delete
+    :return: True if every object was deleted, else False
+    """
+
+    s3_client = get_s3_client()
+    s3_file_locations = list(s3_file_locations)
+    deleted = True
+    for start in range(0, len(s3_file_locations), 1000):
+        batch = s3_file_locations[start:start + 1000]
+        try:
+            response = s3_client.delete_objects(Bucket=bucketname,
+                                                Delete={'Objects': [{'Key': key} for key in batch],
+                                                        'Quiet': True})
+        except ClientError as e:
+            logging.error(e)
+            deleted = False
+            continue
+        for error in response.get('Errors', []):
+            logging.error(f"failed to delete {error.get('Key')}: {error.get('Message')}")
+            deleted = False
+    return deleted
+
+
+class S3MultipartUploadStream(RawIOBase):
+    """
+    Writable file-like object that multipart-uploads everything written to it.
+
+    Data is cut into part_size parts which are uploaded by a pool of
+    max_workers threads while the caller keeps writing; at most
+    max_workers + 1 parts are held in memory at any time, so the size of the
+    artifact never matters. Objects smaller than one part are sent with a
+    single put_object on close. If the block exits with an exception (or
+    abort() is called) the multipart upload is aborted so no partial object
+    is left behind.
+    """
+
+    def __init__(self, bucketname, s3_file_location, storage_class='STANDARD', part_size=DEFAULT_PART_SIZE,
+                 max_workers=DEFAULT_UPLOAD_WORKERS, s3_client=None):
+        super().__init__()
+        self.bucketname = bucketname
+        self.s3_file_location = s3_file_location
+        self.storage_class = storage_class
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.s3_client = s3_client if s3_client is not None else get_s3_client()
+        self.upload_id = None
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._part_number = 0
+        self._parts = []
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_workers + 1)
+        self._parts_lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed S3 upload stream")
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._submit_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, part_number, data):
+        try:
+            response = self.s3_client.upload_part(Bucket=self.bucketname, Key=self.s3_file_location,
+                                                  UploadId=self.upload_id, PartNumber=part_number, Body=data)
+            with self._parts_lock:
+                self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        finally:
+            self._slots.release()
+
+    def _submit_part(self, data):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucketname, Key=self.s3_file_location,
+                                                              StorageClass=self.storage_class)
+            self.upload_id = response['UploadId']
+        # raise the first failed part now rather than after the whole stream is read
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        self._slots.acquire()
+        self._part_number += 1
+        self._futures.append(self._executor.submit(self._upload_part, self._part_number, data))
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucketname, Key=self.s3_file_location,
+                                          Body=bytes(self._buffer), StorageClass=self.storage_class)
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                for future in self._futures:
+                    future.result()
+                parts = sorted(self._parts, key=lambda part: part['PartNumber'])
+                self.s3_client.complete_multipart_upload(Bucket=self.bucketname, Key=self.s3_file_location,
+                                                         UploadId=self.upload_id,
+                                                         MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            self._executor.shutdown(wait=True)
+            super().close()
+
+    def abort(self):
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        if self.upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=self.bucketname, Key=self.s3_file_location,
+                                                      UploadId=self.upload_id)
+            except ClientError as e:
+                logging.error(e)
+            self.upload_id = None
+        self._buffer = bytearray()
+        if not self.closed:
+            RawIOBase.close(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+@contextmanager
+def open_s3_upload_stream(bucketname, s3_file_location, compress=False, storage_class='STANDARD',
+                          part_size=DEFAULT_PART_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS, s3_client=None):
+    """
+    Context manager yielding a writable binary stream whose content ends up
+    in s3://bucketname/s3_file_location, gzip-compressed on the fly when
+    compress is True. Nothing is written to local disk.
+
+    :param bucketname: s3 bucket to upload to
+    :param s3_file_location: s3 object name
+    :param compress: gzip the stream before uploading
+    :param storage_class: s3 storage class, STANDARD for default, GLACIER_IR for glacier instand retrieval
+    :param part_size: size of each multipart part (at least 5 MiB)
+    :param max_workers: number of parts uploaded in parallel
+    :param s3_client: boto3 s3 client to use, the shared one if None
+    """
+
+    sink = S3MultipartUploadStream(bucketname, s3_file_location, storage_class=storage_class,
+                                   part_size=part_size, max_workers=max_workers, s3_client=s3_client)
+    with sink:
+        if compress:
+            with gzip.GzipFile(fileobj=sink, mode='wb') as gzip_stream:
+                yield gzip_stream
+        else:
+            yield sink
+
+
+def upload_stream_to_s3(stream, bucketname, s3_file_location, compress=False, storage_class='STANDARD',
+                        part_size=DEFAULT_PART_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS):
+    """
+    Upload everything readable from a binary file-like object (an open file,
+    a subprocess stdout pipe...) to s3 with parallel multipart uploads.
+
+    :param stream: readable binary file-like object
+    :param bucketname: s3 bucket to upload to
+    :param s3_file_location: s3 object name
+    :param compress: gzip the stream before uploading
+    :param storage_class: s3 storage class, STANDARD for default, GLACIER_IR for glacier instand retrieval
+    :param part_size: size of each multipart part (at least 5 MiB)
+    :param max_workers: number of parts uploaded in parallel
+    :return: True if the stream was uploaded, else False
+    """
+
+    try:
+        with open_s3_upload_stream(bucketname, s3_file_location, compress=compress, storage_class=storage_class,
+                                   part_size=part_size, max_workers=max_workers) as s3_stream:
+            shutil.copyfileobj(stream, s3_stream, STREAM_READ_SIZE)
+    except ClientError as e:
+        logging.error(e)
+        return False
+
+    return True
+
+
 def upload_xml_file_to_s3(pmid, subDir=None):
     base_path = environ.get('XML_PATH')
     env_state = environ.get('ENV_STATE', 'develop')
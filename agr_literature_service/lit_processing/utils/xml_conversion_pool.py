@@ -0,0 +1,183 @@
+"""
+Process pool for the nXML/TEI-to-Markdown conversions
+(agr_abc_document_parsers.convert_xml_to_markdown).
+
+The parsers are pure Python and CPU-bound, so running them in threads
+(asyncio.to_thread in the xml2md router, the pdf2md thread pools) serialises
+them on the GIL and a single large nXML holds up every other conversion in the
+process. XmlConversionPool runs them in XML_CONVERSION_WORKERS worker
+processes shared by the API and the batch jobs:
+
+ - at most XML_CONVERSION_WORKERS conversions run at a time and at most
+   XML_CONVERSION_MAX_PENDING more wait for a worker; beyond that batch
+   callers block until a slot frees up and API requests are refused with
+   XmlConversionBusy instead of piling up
+ - a conversion running longer than XML_CONVERSION_TIMEOUT seconds raises
+   XmlConversionTimeout and the workers are replaced, so a runaway document
+   cannot keep a worker; conversions cut off by the restart are retried once
+
+convert_xml_to_markdown() here is a drop-in for the parser function of the
+same name. With XML_CONVERSION_WORKERS=0 it converts in the calling thread.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from os import environ, getpid, kill, register_at_fork
+import asyncio
+import logging
+import multiprocessing
+import signal
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from agr_abc_document_parsers import convert_xml_to_markdown as parse_xml_to_markdown
+
+logger = logging.getLogger(__name__)
+
+XML_CONVERSION_WORKERS = int(environ.get('XML_CONVERSION_WORKERS', 4))
+XML_CONVERSION_MAX_PENDING = int(environ.get('XML_CONVERSION_MAX_PENDING', 16))
+XML_CONVERSION_TIMEOUT = float(environ.get('XML_CONVERSION_TIMEOUT', 300))
+# workers are started with spawn: forking a process that already runs
+# threads (uvicorn, the pdf2md pools) can copy held locks into the child
+XML_CONVERSION_START_METHOD = environ.get('XML_CONVERSION_START_METHOD', 'spawn')
+
+
+class XmlConversionBusy(RuntimeError):
+    """All conversion slots are taken."""
+
+
+class XmlConversionTimeout(TimeoutError):
+    """A conversion ran longer than its timeout and was killed."""
+
+
+def _report_worker_pid(worker_pids):
+    # pool initializer: lets the parent kill this worker on a timeout
+    worker_pids.put(getpid())
+
+
+class XmlConversionPool:
+
+    def __init__(self, max_workers: int = XML_CONVERSION_WORKERS,
+                 max_pending: int = XML_CONVERSION_MAX_PENDING,
+                 timeout: Optional[float] = XML_CONVERSION_TIMEOUT,
+                 convert: Callable[[bytes, str], str] = parse_xml_to_markdown,
+                 start_method: str = XML_CONVERSION_START_METHOD):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.convert_function = convert
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._worker_pids: Dict[ProcessPoolExecutor, Any] = {}
+        self._init_locks()
+
+    def _init_locks(self):
+        # admission (running + waiting) and the running conversions are
+        # bounded separately so that the timeout only counts time in a worker
+        self._admitted = threading.BoundedSemaphore(max(self.max_workers, 1) + self.max_pending)
+        self._running = threading.BoundedSemaphore(max(self.max_workers, 1))
+        self._lock = threading.Lock()
+
+    def convert(self, xml_content: bytes, source_format: str = "auto",
+                timeout: Optional[float] = None, wait: bool = True) -> str:
+        """
+        Convert xml_content to markdown in a worker process.
+
+        wait=False raises XmlConversionBusy instead of waiting when all
+        slots are taken. timeout defaults to the pool's timeout.
+        Parser errors (ValueError for unsupported input) are re-raised as is.
+        """
+        if not self._admitted.acquire(blocking=wait):
+            raise XmlConversionBusy("XML conversion queue is full")
+        try:
+            with self._running:
+                if self.max_workers <= 0:
+                    return self.convert_function(xml_content, source_format)
+                return self._run(xml_content, source_format, self.timeout if timeout is None else timeout)
+        finally:
+            self._admitted.release()
+
+    async def convert_async(self, xml_content: bytes, source_format: str = "auto",
+                            timeout: Optional[float] = None) -> str:
+        """convert() for the event loop; refuses rather than queues when
+        the pool is full. The waiting thread does no parsing itself."""
+        return await asyncio.to_thread(self.convert, xml_content, source_format, timeout, False)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, xml_content: bytes, source_format: str, timeout: Optional[float]) -> str:
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                future = executor.submit(self.convert_function, xml_content, source_format)
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logger.warning(f"XML conversion ({source_format}) exceeded {timeout}s; restarting workers")
+                self._restart(executor)
+                raise XmlConversionTimeout(f"XML conversion exceeded {timeout}s")
+            except BrokenProcessPool:
+                # a worker died (or was killed for another conversion's
+                # timeout); a conversion that crashes its worker twice fails
+                self._restart(executor)
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                worker_pids = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context,
+                    initializer=_report_worker_pid, initargs=(worker_pids,))
+                self._worker_pids[self._executor] = worker_pids
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """
+        Drop executor and kill its workers; the next conversion builds a new
+        pool. Conversions still running in it fail with BrokenProcessPool
+        and are retried by _run.
+        """
+        with self._lock:
+            worker_pids = self._worker_pids.pop(executor, None)
+            if self._executor is executor:
+                self._executor = None
+        if worker_pids is None:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        while not worker_pids.empty():
+            try:
+                kill(worker_pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        worker_pids.close()
+
+    def _reset_after_fork(self):
+        # the executor, its workers and the slots taken by other threads
+        # belong to the parent process
+        self._executor = None
+        self._worker_pids = {}
+        self._init_locks()
+
+
+_pool = XmlConversionPool()
+
+
+def get_xml_conversion_pool() -> XmlConversionPool:
+    return _pool
+
+
+def convert_xml_to_markdown(xml_content: bytes, source_format: str = "auto",
+                            timeout: Optional[float] = None) -> str:
+    """Pooled agr_abc_document_parsers.convert_xml_to_markdown; blocks
+    while the pool is full."""
+
+    return _pool.convert(xml_content, source_format, timeout=timeout)
+
+
+register_at_fork(after_in_child=_pool._reset_after_fork)
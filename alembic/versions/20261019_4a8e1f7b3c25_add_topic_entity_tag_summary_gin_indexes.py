@@ -0,0 +1,30 @@
+"""add topic_entity_tag_reference_summary gin indexes
+
+Revision ID: 4a8e1f7b3c25
+Revises: 9d3f6a1c2e84
+Create Date: 2026-10-19
+
+GIN indexes on the summary's topic, entity type, data novelty and source
+counts, so the references using a changed ATP term or source can be found
+without scanning topic_entity_tag.
+"""
+from alembic import op
+
+revision = '4a8e1f7b3c25'
+down_revision = '9d3f6a1c2e84'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['topic_counts', 'entity_type_counts', 'data_novelty_counts', 'source_counts']
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.create_index(f'ix_topic_entity_tag_reference_summary_{column}', 'topic_entity_tag_reference_summary',
+                        [column], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for column in COLUMNS:
+        op.drop_index(f'ix_topic_entity_tag_reference_summary_{column}',
+                      table_name='topic_entity_tag_reference_summary')
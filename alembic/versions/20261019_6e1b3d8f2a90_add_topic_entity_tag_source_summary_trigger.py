@@ -0,0 +1,32 @@
+"""add topic_entity_tag_source summary trigger
+
+Revision ID: 6e1b3d8f2a90
+Revises: 4a8e1f7b3c25
+Create Date: 2026-10-19
+
+The summary's mod_counts come from the secondary_data_provider of each
+tag's source, which can now be changed. Installs the trigger that refreshes
+the summary of the references with tags from sources whose provider
+changed.
+"""
+from alembic import op
+
+from agr_literature_service.api.triggers.topic_entity_tag_summary_sql_func_triggers import (
+    topic_entity_tag_source_summary_sql_statements,
+)
+
+revision = '6e1b3d8f2a90'
+down_revision = '4a8e1f7b3c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for statement in topic_entity_tag_source_summary_sql_statements:
+        op.execute(statement)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS topic_entity_tag_source_summary_update_trigger "
+               "ON public.topic_entity_tag_source")
+    op.execute("DROP FUNCTION IF EXISTS topic_entity_tag_source_refresh_reference_summary()")
@@ -0,0 +1,63 @@
+"""add topic_entity_tag_reference_summary
+
+Revision ID: 7c4e2b9d1a63
+Revises: 5b2e8c4d7f61
+Create Date: 2026-10-19
+
+Adds the per-reference topic entity tag summary table, installs the SQL
+functions and triggers that keep it up to date on topic_entity_tag inserts,
+updates and deletes, then backfills it for every tagged reference.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from agr_literature_service.api.triggers.topic_entity_tag_summary_sql_func_triggers import (
+    topic_entity_tag_summary_sql_statements,
+)
+
+revision = '7c4e2b9d1a63'
+down_revision = '5b2e8c4d7f61'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade():
+    # 1. Create the table
+    json_columns = ['topic_counts', 'entity_type_counts', 'species_counts', 'display_tag_counts',
+                    'data_novelty_counts', 'source_counts', 'mod_counts', 'validation_counts']
+    op.create_table(
+        'topic_entity_tag_reference_summary',
+        sa.Column('reference_id', sa.Integer(), nullable=False),
+        sa.Column('tag_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        *[sa.Column(column, postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False)
+          for column in json_columns],
+        sa.Column('top_entities', postgresql.JSONB(astext_type=sa.Text()), server_default='[]', nullable=False),
+        sa.Column('date_updated', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['reference_id'], ['reference.reference_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('reference_id')
+    )
+
+    # 2. Install the SQL functions and triggers (same statements the API
+    #    installs at startup via create_all_triggers())
+    for statement in topic_entity_tag_summary_sql_statements:
+        op.execute(statement)
+
+    # 3. Backfill, a batch of references at a time
+    bind = op.get_bind()
+    reference_ids = [row[0] for row in bind.execute(sa.text(
+        "SELECT DISTINCT reference_id FROM topic_entity_tag ORDER BY reference_id"))]
+    for start in range(0, len(reference_ids), BACKFILL_BATCH_SIZE):
+        bind.execute(sa.text("SELECT refresh_topic_entity_tag_reference_summary(:reference_ids)"),
+                     {"reference_ids": reference_ids[start:start + BACKFILL_BATCH_SIZE]})
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS topic_entity_tag_summary_insert_trigger ON public.topic_entity_tag")
+    op.execute("DROP TRIGGER IF EXISTS topic_entity_tag_summary_update_trigger ON public.topic_entity_tag")
+    op.execute("DROP TRIGGER IF EXISTS topic_entity_tag_summary_delete_trigger ON public.topic_entity_tag")
+    op.execute("DROP FUNCTION IF EXISTS topic_entity_tag_refresh_reference_summary()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_topic_entity_tag_reference_summary(INTEGER[])")
+    op.drop_table('topic_entity_tag_reference_summary')
@@ -0,0 +1,29 @@
+"""add topic_entity_tag keyset indexes
+
+Revision ID: 9d3f6a1c2e84
+Revises: 7c4e2b9d1a63
+Create Date: 2026-10-19
+
+Indexes for the keyset-paginated topic entity tag listings: the by_mod
+export pages on (date_updated, topic_entity_tag_id) and a reference's tags
+page on (reference_id, topic_entity_tag_id).
+"""
+from alembic import op
+
+revision = '9d3f6a1c2e84'
+down_revision = '7c4e2b9d1a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_topic_entity_tag_date_updated_id', 'topic_entity_tag',
+                    ['date_updated', 'topic_entity_tag_id'], unique=False,
+                    postgresql_include=['topic_entity_tag_source_id', 'reference_id'])
+    op.create_index('ix_topic_entity_tag_reference_id_id', 'topic_entity_tag',
+                    ['reference_id', 'topic_entity_tag_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_topic_entity_tag_reference_id_id', table_name='topic_entity_tag')
+    op.drop_index('ix_topic_entity_tag_date_updated_id', table_name='topic_entity_tag')
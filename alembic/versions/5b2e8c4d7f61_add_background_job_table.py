@@ -0,0 +1,47 @@
+"""create background_job table
+
+Revision ID: 5b2e8c4d7f61
+Revises: 9a1c7f2e4d10
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8c4d7f61'
+down_revision = '9a1c7f2e4d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'background_job',
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('job_type', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('reference_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('mod_abbreviation', sa.String(), nullable=True),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('date_created', sa.DateTime(), nullable=False),
+        sa.Column('date_updated', sa.DateTime(), nullable=False),
+        sa.Column('date_completed', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_background_job_reference_id'), 'background_job', ['reference_id'], unique=False)
+    op.create_index('ix_background_job_type_status_created', 'background_job',
+                    ['job_type', 'status', 'date_created'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_background_job_type_status_created', table_name='background_job')
+    op.drop_index(op.f('ix_background_job_reference_id'), table_name='background_job')
+    op.drop_table('background_job')
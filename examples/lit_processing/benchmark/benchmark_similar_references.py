@@ -0,0 +1,73 @@
+"""Latency and recall of the reference similarity index on a synthetic corpus.
+
+Builds a VectorIndex of --size random clustered vectors (500k by default, the
+dimension of text-embedding-3-small) in a temporary directory, then times
+exact and approximate (IVF) top-k searches for --queries references and
+reports the approximate search's recall against the exact one.
+
+    python benchmark_similar_references.py --size 500000 --dimension 1536
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from agr_literature_service.lit_processing.embedding import embedding_index
+from agr_literature_service.lit_processing.embedding.embedding_index import VectorIndex
+
+
+def synthetic_vectors(size, dimension, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    for start in range(0, size, 50000):
+        n = min(50000, size - start)
+        members = centers[rng.integers(0, clusters, n)]
+        yield start, members + rng.normal(scale=1.0, size=(n, dimension)).astype(np.float32)
+
+
+def percentiles(latencies):
+    return "p50 %.1f ms, p95 %.1f ms" % tuple(np.percentile(latencies, [50, 95]) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=500000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=2000, help="topic clusters in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[embedding_index.IVF_DEFAULT_NPROBE])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(directory)
+        start_time = time.time()
+        # appends keep the IVF in step; training happens whenever the size doubles
+        for start, vectors in synthetic_vectors(args.size, args.dimension, args.clusters):
+            index.update([(start + i + 1, start + i + 1, v) for i, v in enumerate(vectors)])
+        print("built %d x %d index in %.1f s" % (len(index), args.dimension, time.time() - start_time))
+
+        queries = np.random.default_rng(1).choice(np.arange(1, args.size + 1), args.queries, replace=False)
+        exact_hits, latencies = {}, []
+        for reference_id in queries:
+            started = time.perf_counter()
+            hits = index.search(index.vector(reference_id), k=args.k, exclude=[reference_id])
+            exact_hits[reference_id] = {r for r, _ in hits}
+            latencies.append(time.perf_counter() - started)
+        print("exact:            %s" % percentiles(latencies))
+
+        for nprobe in args.nprobe:
+            latencies, recall = [], []
+            for reference_id in queries:
+                started = time.perf_counter()
+                hits = {r for r, _ in index.search(index.vector(reference_id), k=args.k, exact=False,
+                                                   nprobe=nprobe, exclude=[reference_id])}
+                latencies.append(time.perf_counter() - started)
+                recall.append(len(hits & exact_hits[reference_id]) / args.k)
+            print("approx nprobe %3d: %s, recall@%d %.3f" % (nprobe, percentiles(latencies), args.k,
+                                                             float(np.mean(recall))))
+
+
+if __name__ == "__main__":
+    main()
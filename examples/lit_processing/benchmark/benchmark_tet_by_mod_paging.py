@@ -0,0 +1,123 @@
+"""Per-page latency of the topic entity tag by_mod export, keyset vs offset.
+
+Builds a synthetic corpus of --size tags (2M by default) for one MOD in
+temporary tables that shadow topic_entity_tag, topic_entity_tag_source and
+cross_reference for this connection only, then reads pages of --page-size
+tags at increasing depths: once through get_all_topic_entity_tags_by_mod
+(keyset cursor) and once with the equivalent LIMIT/OFFSET query, to check
+whether the keyset page latency stays flat with the depth while the offset
+page latency grows with it. The tag names are put in the name cache first,
+so no A-team lookup is timed.
+
+Needs a database with the schema (and a mod and a users row) but no data:
+
+    python benchmark_tet_by_mod_paging.py --size 2000000 --page-size 1000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from agr_literature_service.api.crud import topic_entity_tag_crud
+from agr_literature_service.api.crud.topic_entity_tag_utils import id_to_name_cache
+from agr_literature_service.api.database.config import SQLALCHEMY_DATABASE_URL
+
+TOPICS = ["ATP:0000005", "ATP:0000006", "ATP:0000009", "ATP:0000011", "ATP:0000012"]
+SOURCE_EVIDENCE_ASSERTION = "ECO:0000302"
+
+SETUP = [
+    "CREATE TEMP TABLE topic_entity_tag_source (LIKE public.topic_entity_tag_source INCLUDING DEFAULTS)",
+    "CREATE TEMP TABLE cross_reference (LIKE public.cross_reference INCLUDING DEFAULTS)",
+    "CREATE TEMP TABLE topic_entity_tag (LIKE public.topic_entity_tag INCLUDING DEFAULTS)",
+    "INSERT INTO topic_entity_tag_source (topic_entity_tag_source_id, source_evidence_assertion, source_method,"
+    " validation_type, description, data_provider, secondary_data_provider_id, created_by, updated_by)"
+    " VALUES (1, '" + SOURCE_EVIDENCE_ASSERTION + "', 'abc_literature_system', 'professional_biocurator',"
+    " 'benchmark', :mod, :mod_id, :user_id, :user_id)",
+    "INSERT INTO cross_reference (cross_reference_id, curie, curie_prefix, reference_id, is_obsolete,"
+    " created_by, updated_by)"
+    " SELECT r, :mod || ':' || r, :mod, r, FALSE, :user_id, :user_id"
+    " FROM generate_series(1, :references) r",
+    # tags updated over the last six days, a few per reference
+    "INSERT INTO topic_entity_tag (topic_entity_tag_id, reference_id, topic, topic_entity_tag_source_id,"
+    " negated, data_novelty, created_by, updated_by, date_created, date_updated)"
+    " SELECT i, 1 + i % :references, (:topics)[1 + i % cardinality(:topics)], 1, FALSE, 'ATP:0000335',"
+    " :user_id, :user_id, now() - interval '6 days', now() - interval '6 days' * random()"
+    " FROM generate_series(1, :size) i",
+    "CREATE INDEX ON cross_reference (reference_id, curie_prefix)",
+    "CREATE INDEX ON topic_entity_tag (date_updated, topic_entity_tag_id)"
+    " INCLUDE (topic_entity_tag_source_id, reference_id)",
+    "ANALYZE topic_entity_tag_source",
+    "ANALYZE cross_reference",
+    "ANALYZE topic_entity_tag",
+]
+
+OFFSET_PAGE = text(
+    "SELECT cr.curie, tet.*, get_most_current_email(u.person_id) AS email "
+    "FROM topic_entity_tag tet "
+    "JOIN LATERAL (SELECT curie FROM cross_reference "
+    "              WHERE reference_id = tet.reference_id AND curie_prefix = :mod "
+    "              ORDER BY is_obsolete, curie LIMIT 1) cr ON TRUE "
+    "JOIN users u ON tet.updated_by = u.id "
+    "WHERE tet.topic_entity_tag_source_id = ANY(:source_ids) "
+    "AND tet.date_updated >= :last_date_updated "
+    "ORDER BY tet.date_updated, tet.topic_entity_tag_id "
+    "LIMIT :limit OFFSET :offset")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--references", type=int, default=500000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--depths", type=float, nargs="+", default=[0, 0.1, 0.25, 0.5, 0.75, 0.99],
+                        help="fractions of the tags skipped before the timed page")
+    parser.add_argument("--mod", default="WB")
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=engine)()
+    mod_id = db.execute(text("SELECT mod_id FROM mod WHERE abbreviation = :mod"), {"mod": args.mod}).scalar_one()
+    user_id = db.execute(text("SELECT id FROM users ORDER BY id LIMIT 1")).scalar_one()
+    for curie in TOPICS + [SOURCE_EVIDENCE_ASSERTION]:
+        id_to_name_cache.set(curie, curie.lower())
+
+    start_time = time.time()
+    params = {"mod": args.mod, "mod_id": mod_id, "user_id": user_id, "references": args.references,
+              "size": args.size, "topics": TOPICS}
+    for statement in SETUP:
+        db.execute(text(statement), params)
+    print("built %d tags in %.1f s" % (args.size, time.time() - start_time))
+
+    last_date_updated = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    for depth in args.depths:
+        offset = int(depth * args.size)
+        cursor = None
+        if offset:
+            # the cursor a client would hold after reading the first offset tags
+            last_tag = db.execute(text("SELECT date_updated, topic_entity_tag_id FROM topic_entity_tag "
+                                       "ORDER BY date_updated, topic_entity_tag_id "
+                                       "OFFSET :offset LIMIT 1"), {"offset": offset - 1}).one()
+            cursor = topic_entity_tag_crud.encode_tags_by_mod_cursor(*last_tag)
+
+        keyset, paged = [], []
+        for _ in range(5):
+            started = time.perf_counter()
+            page = topic_entity_tag_crud.get_all_topic_entity_tags_by_mod(
+                db, args.mod, days_updated=7, page_size=args.page_size, cursor=cursor)
+            keyset.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            db.execute(OFFSET_PAGE, {"mod": args.mod, "source_ids": [1], "last_date_updated": last_date_updated,
+                                     "limit": args.page_size, "offset": offset}).fetchall()
+            paged.append(time.perf_counter() - started)
+        assert len(page["data"]) == min(args.page_size, args.size - offset)
+        print("depth %8d: keyset p50 %7.1f ms, offset p50 %7.1f ms" % (
+            offset, np.median(keyset) * 1000, np.median(paged) * 1000))
+    db.rollback()
+
+
+if __name__ == "__main__":
+    main()
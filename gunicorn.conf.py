@@ -54,6 +54,10 @@ def pre_fork(server, worker):  # noqa: ARG001
 
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
+    # preload_app imports the app in the master; make sure the worker builds
+    # its own S3 client instead of sharing the master's pooled sockets
+    from agr_literature_service.lit_processing.utils.s3_utils import reset_s3_clients
+    reset_s3_clients()
     msg = f"Worker spawned (pid: {worker.pid})"
     server.log.info(msg)
     print(msg, flush=True)
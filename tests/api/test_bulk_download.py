@@ -1,10 +1,13 @@
 import json
+from datetime import datetime, timedelta, timezone
 
 from fastapi import status
 from starlette.testclient import TestClient
 
 import agr_literature_service.api.resource_descriptor_cache as rdc
+from agr_literature_service.api.crud import cross_reference_crud
 from agr_literature_service.api.main import app
+from agr_literature_service.api.models import ResourceModel
 from ..fixtures import db  # noqa
 from .fixtures import auth_headers  # noqa
 
@@ -93,3 +96,56 @@ class TestBulkDownloadResourcesExternalIds:
             assert resource_curie in by_curie
             xrefs = {x["curie"]: x["is_obsolete"] for x in by_curie[resource_curie]["cross_references"]}
             assert xrefs == {"XREF:resA-active": False}
+
+
+class TestBulkDownloadExternalIdsResumable:
+
+    def test_cursor_round_trip(self):
+        token = cross_reference_crud.encode_external_ids_cursor(12345)
+        assert cross_reference_crud.decode_external_ids_cursor(token) == 12345
+        assert cross_reference_crud.decode_external_ids_cursor(None) == 0
+
+    def test_invalid_cursor_returns_400(self, db, auth_headers):  # noqa
+        with TestClient(app) as client:
+            response = client.get(url="/bulk_download/references/external_ids/resumable/",
+                                  params={"cursor": "not-a-cursor"}, headers=auth_headers)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_references_external_ids_resume(self, db, auth_headers):  # noqa
+        _insert_xref_descriptor(db, "XREF")
+        with TestClient(app) as client:
+            curies = []
+            for i in range(3):
+                curie = client.post(url="/reference/",
+                                    json={"title": f"Ref {i}", "category": "research_article"},
+                                    headers=auth_headers).json()["curie"]
+                client.post(url="/cross_reference/",
+                            json={"curie": f"XREF:resumable-{i}", "reference_curie": curie,
+                                  "pages": ["reference"], "is_obsolete": False},
+                            headers=auth_headers)
+                curies.append(curie)
+
+            response = client.get(url="/bulk_download/references/external_ids/resumable/",
+                                  headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [line["curie"] for line in lines] == curies
+            assert lines[0]["cross_references"] == [{"curie": "XREF:resumable-0", "is_obsolete": False}]
+
+            # resume after the first reference
+            response = client.get(url="/bulk_download/references/external_ids/resumable/",
+                                  params={"cursor": lines[0]["cursor"]}, headers=auth_headers)
+            assert [json.loads(line)["curie"] for line in response.text.splitlines()] == curies[1:]
+
+            # nothing was updated in the future
+            response = client.get(url="/bulk_download/references/external_ids/resumable/",
+                                  params={"since": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()},
+                                  headers=auth_headers)
+            assert response.text == ""
+
+    def test_keyset_chunks(self, db):  # noqa
+        for i in range(5):
+            db.add(ResourceModel(curie=f"AGRKB:10200000000000{i}", title=f"Res {i}"))
+        db.commit()
+        lines = list(cross_reference_crud.stream_external_ids_by_keyset(db, ResourceModel, chunk_size=2))
+        assert [json.loads(line)["curie"] for line in lines] == [f"AGRKB:10200000000000{i}" for i in range(5)]
@@ -2,8 +2,12 @@
 Simplified tests for BulkUploadManager and BulkUploadJob.
 """
 
-import pytest
+import threading
+import time
 from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
 
 from agr_literature_service.api.utils.bulk_upload_manager import (
     BulkUploadJob,
@@ -170,6 +174,26 @@ class TestBulkUploadManagerEdgeCases:
         recent = manager.get_recent_jobs(user_id="alice")
         assert len(recent) == 1 and recent[0].user_id == "alice"
 
+    def test_updates_reach_the_store_in_order(self):
+        saved = []
+        progress_saving = threading.Event()
+
+        def save(job_id, data, status=None, **columns):
+            if data["processed_files"] == 1 and status is None:
+                progress_saving.set()
+                time.sleep(0.2)  # the job is completed meanwhile
+            saved.append(status)
+
+        manager = BulkUploadManager(store=MagicMock(save=MagicMock(side_effect=save)))
+        job_id = manager.create_job("u", "WB", "a.tar.gz", total_files=1)
+        progress = threading.Thread(target=manager.update_progress, args=(job_id, 1, "a.pdf"))
+        progress.start()
+        progress_saving.wait()
+        manager.complete_job(job_id)
+        progress.join()
+        assert saved == ["running", None, "completed"]
+        assert manager.get_job(job_id).status == "completed"
+
 
 class TestGlobalManager:
     def test_global_instance(self):
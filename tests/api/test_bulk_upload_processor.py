@@ -0,0 +1,115 @@
+"""
+Tests for process_bulk_upload_async; the DB lookups and the per-file upload
+are patched, so no DB or S3 is needed.
+"""
+import asyncio
+import io
+import tarfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agr_literature_service.api.utils import bulk_upload_processor as bp
+from agr_literature_service.api.utils.bulk_upload_manager import upload_manager
+
+
+@pytest.fixture(autouse=True)
+def clear_global_manager():
+    upload_manager._jobs.clear()
+    yield
+    upload_manager._jobs.clear()
+
+
+def _archive(names):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name in names:
+            info = tarfile.TarInfo(name=name)
+            info.size = len(b"%PDF-1.4")
+            tar.addfile(info, io.BytesIO(b"%PDF-1.4"))
+    buffer.seek(0)
+    archive = MagicMock()
+    archive.filename = "archive.tar.gz"
+    archive.file = buffer
+    return archive
+
+
+def _run(archive, mod_abbreviation="FB"):
+    job_id = upload_manager.create_job("curator", mod_abbreviation, archive.filename)
+    asyncio.run(bp.process_bulk_upload_async(job_id, archive, mod_abbreviation, MagicMock()))
+    return upload_manager.get_job(job_id)
+
+
+class TestProcessBulkUpload:
+
+    def test_files_are_uploaded_concurrently(self):
+        names = [f"{100 + i}_Doe2020.pdf" for i in range(6)]
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def fake_upload(path, metadata, db):
+            with lock:
+                running.append(path)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(path)
+            return {"status": "success"}
+
+        with patch.object(bp, "normalize_reference_curies",
+                          side_effect=lambda db, curies: {c: "AGRKB:1" for c in curies}) as mock_lookup, \
+                patch.object(bp, "process_single_file", side_effect=fake_upload) as mock_upload:
+            job = _run(_archive(names))
+
+        assert mock_lookup.call_count == 1
+        assert mock_upload.call_count == 6
+        assert all(call.args[1]["reference_curie"] == "AGRKB:1" for call in mock_upload.call_args_list)
+        assert 1 < max(max_running) <= bp.BULK_UPLOAD_WORKERS
+        assert job.status == "completed"
+        assert job.processed_files == 6
+        assert job.successful_files == 6
+
+    def test_unknown_reference_fails_file_without_upload(self):
+        with patch.object(bp, "normalize_reference_curies",
+                          return_value={"PMID:100": "AGRKB:101000000000100"}), \
+                patch.object(bp, "process_single_file",
+                             return_value={"status": "success"}) as mock_upload:
+            job = _run(_archive(["100_Doe2020.pdf", "200_Roe2021.pdf"]))
+
+        assert mock_upload.call_count == 1
+        assert job.status == "completed"
+        assert job.successful_files == 1
+        assert job.failed_files == 1
+        assert "PMID:200" in job.error_message
+
+    def test_unparsable_name_fails_job_after_earlier_files(self):
+        with patch.object(bp, "normalize_reference_curies",
+                          side_effect=lambda db, curies: {c: "AGRKB:1" for c in curies}), \
+                patch.object(bp, "process_single_file",
+                             return_value={"status": "success"}) as mock_upload:
+            job = _run(_archive(["100_Doe2020.pdf", "not-a-paper.pdf"]))
+
+        assert mock_upload.call_count == 1
+        assert job.status == "failed"
+        assert "not-a-paper" in job.error_message
+
+    def test_job_updates_are_saved_off_the_event_loop_in_order(self):
+        saved = []
+
+        def persist(data, status=None, **columns):
+            saved.append((threading.current_thread() is threading.main_thread(), data['processed_files'], status))
+
+        with patch.object(bp, "normalize_reference_curies",
+                          side_effect=lambda db, curies: {c: "AGRKB:1" for c in curies}), \
+                patch.object(bp, "process_single_file", return_value={"status": "success"}), \
+                patch.object(upload_manager, "_persist", side_effect=persist):
+            job = _run(_archive([f"{100 + i}_Doe2020.pdf" for i in range(4)]))
+
+        assert job.status == "completed"
+        # the first save is create_job's, made by the test itself
+        assert not any(on_loop for on_loop, _, _ in saved[1:])
+        assert [processed for _, processed, _ in saved[1:]] == [0, 1, 2, 3, 4, 4]
+        assert saved[-1][2] == "completed"
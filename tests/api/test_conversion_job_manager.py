@@ -4,7 +4,10 @@
 A fresh ConversionJobManager is instantiated per test so the module-level
 singleton is never touched.
 """
+import threading
+import time
 from datetime import datetime, timedelta
+from unittest.mock import MagicMock
 
 import pytest
 
@@ -182,6 +185,27 @@ class TestCompleteJob:
         assert job.status == "failed"
         assert job.error_message == "boom"
 
+    def test_completion_is_stored_after_earlier_progress(self):
+        saved = []
+        progress_saving = threading.Event()
+
+        def save(job_id, state, status=None, **columns):
+            if state["per_file_progress"] and status is None:
+                progress_saving.set()
+                time.sleep(0.2)  # the job is completed meanwhile
+            saved.append(status)
+
+        mgr = ConversionJobManager(store=MagicMock(save=MagicMock(side_effect=save),
+                                                   find_for_reference=MagicMock(return_value=None)))
+        job = mgr.create_or_get_job(3, "AGRKB:1", "user")
+        progress = threading.Thread(target=mgr.record_file_progress, args=(job.job_id,),
+                                    kwargs=dict(source_display_name="a", source_file_class="main", success=True))
+        progress.start()
+        progress_saving.wait()
+        mgr.complete_job(job.job_id, success=True)
+        progress.join()
+        assert saved == ["running", None, "completed"]
+
 
 class TestCleanupOldJobs:
     def test_removes_old_completed_keeps_running(self, mgr):
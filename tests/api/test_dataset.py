@@ -1,3 +1,4 @@
+import json
 from collections import namedtuple
 from typing import Type
 
@@ -178,6 +179,50 @@ class TestDataset:
             assert dataset['data_training'][test_topic_entity_tag.related_ref_curie] == "class_1"
             assert len(dataset['data_testing']) == 0
 
+    def test_download_dataset_stream(self, test_mod, test_dataset, auth_headers, test_topic_entity_tag):  # noqa
+        with TestClient(app) as client:
+            dataset_entry_data = {
+                "mod_abbreviation": test_dataset.mod_abbreviation,
+                "data_type": test_dataset.data_type,
+                "dataset_type": test_dataset.dataset_type,
+                "version": test_dataset.version,
+                "reference_curie": test_topic_entity_tag.related_ref_curie,
+                "classification_value": "class_1",
+                "entity": None,
+                "supporting_topic_entity_tag_id": test_topic_entity_tag.new_tet_id
+            }
+            client.post(url="/datasets/data_entry/", json=dataset_entry_data, headers=auth_headers)
+            url = f"/datasets/download/{test_mod.new_mod_abbreviation}/{test_dataset.data_type}/" \
+                  f"{test_dataset.dataset_type}/{test_dataset.version}/"
+            expected = client.get(url=url, headers=auth_headers).json()
+
+            response = client.get(url=url, params={"stream": True},
+                                  headers={**auth_headers, "Accept-Encoding": "identity"})
+            assert response.status_code == status.HTTP_200_OK
+            assert "content-encoding" not in response.headers
+            assert response.json() == expected
+
+            # httpx transparently decodes the gzip content-encoding
+            response = client.get(url=url, params={"stream": True},
+                                  headers={**auth_headers, "Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.json() == expected
+
+            response = client.get(url=url, params={"stream": True, "output_format": "ndjson"},
+                                  headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert lines[0]["dataset_id"] == expected["dataset_id"]
+            assert lines[1:] == [{"set_type": "training",
+                                  "reference_curie": test_topic_entity_tag.related_ref_curie,
+                                  "value": "class_1"}]
+
+    def test_download_dataset_stream_wrong(self, auth_headers):  # noqa
+        with TestClient(app) as client:
+            response = client.get(url="/datasets/download/NONEXISTENT/INVALID/document/",
+                                  params={"stream": True}, headers=auth_headers)
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_download_dataset_wrong(self, auth_headers):  # noqa
         with TestClient(app) as client:
             response = client.get(url="/datasets/NONEXISTENT/INVALID/FAKE/", headers=auth_headers)
@@ -10,15 +10,18 @@ from starlette.testclient import TestClient
 from agr_literature_service.api.main import app
 from agr_literature_service.api.models import (
     EmbeddingFileModel,
+    ModCorpusAssociationModel,
     ModModel,
     ReferenceModel,
     ReferencefileModAssociationModel,
     ReferencefileModel,
 )
 from agr_literature_service.api.crud import embedding_file_crud, file_conversion_crud
+from agr_literature_service.api.schemas import ModCorpusSortSourceType
 from agr_literature_service.api.schemas.embedding_file_schemas import (
     EmbeddingFileSchemaCreate,
 )
+from agr_literature_service.lit_processing.embedding.embedding_index import ReferenceEmbeddingIndex
 from agr_literature_service.lit_processing.tests.mod_populate_load import populate_test_mods
 from .fixtures import auth_headers  # noqa
 from .test_reference import test_reference  # noqa
@@ -618,3 +621,43 @@ def test_direct_mod_changes_on_embedding_parquet_rejected(db, test_reference):
     # access unchanged by any of the rejected attempts
     assert _mods_of(db, pq_id) == {"WB"}
     assert _mods_of(db, md.referencefile_id) == {"WB"}
+
+
+def test_similar_references_filters_by_mod_and_corpus(db, test_reference, auth_headers, tmp_path):  # noqa
+    populate_test_mods()
+    wb = db.query(ModModel).filter(ModModel.abbreviation == "WB").one()
+    query_ref = db.query(ReferenceModel).filter(ReferenceModel.curie == test_reference.new_ref_curie).one()
+    # three neighbours, nearest first: outside WB, needs review for WB, inside WB
+    neighbours = []
+    for i, corpus in enumerate([None, None, True]):
+        ref = ReferenceModel(curie=f"AGRKB:10100000099990{i}", category="research_article",
+                             title=f"Neighbour {i}")
+        db.add(ref)
+        db.commit()
+        if i > 0:
+            db.add(ModCorpusAssociationModel(reference_id=ref.reference_id, mod_id=wb.mod_id, corpus=corpus,
+                                             mod_corpus_sort_source=ModCorpusSortSourceType.Mod_pubmed_search))
+            db.commit()
+        neighbours.append(ref)
+
+    index = ReferenceEmbeddingIndex(str(tmp_path))
+    index.index.update([(query_ref.reference_id, 1, [1.0, 0.0]), (neighbours[0].reference_id, 2, [1.0, 0.1]),
+                        (neighbours[1].reference_id, 3, [1.0, 0.5]), (neighbours[2].reference_id, 4, [1.0, 1.0])])
+    with patch.object(embedding_file_crud, "get_embedding_index", return_value=index), \
+            patch.object(ReferenceEmbeddingIndex, "start_background_refresh"), TestClient(app) as client:
+        url = f"/reference/{query_ref.curie}/similar"
+        resp = client.get(url, params={"limit": 2}, headers=auth_headers)
+        assert resp.status_code == 200, resp.text
+        assert [r["curie"] for r in resp.json()] == [neighbours[0].curie, neighbours[1].curie]
+        assert resp.json()[0]["title"] == "Neighbour 0"
+
+        resp = client.get(url, params={"mod_abbreviation": "WB", "exact": True}, headers=auth_headers)
+        assert [r["curie"] for r in resp.json()] == [neighbours[1].curie, neighbours[2].curie]
+
+        resp = client.get(url, params={"mod_abbreviation": "WB", "corpus": "needs_review"}, headers=auth_headers)
+        assert [r["curie"] for r in resp.json()] == [neighbours[1].curie]
+
+        assert client.get(url, params={"corpus": "maybe"}, headers=auth_headers).status_code == 422
+        assert client.get(f"/reference/{neighbours[0].curie}x/similar", headers=auth_headers).status_code == 404
+    with patch.object(embedding_file_crud, "get_embedding_index", return_value=None), TestClient(app) as client:
+        assert client.get(url, headers=auth_headers).status_code == 503
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from agr_literature_service.api.models import BackgroundJobModel
+from agr_literature_service.api.utils.bulk_upload_manager import BULK_UPLOAD_JOB_TYPE, BulkUploadManager
+from agr_literature_service.api.utils.conversion_job_manager import CONVERSION_JOB_TYPE, ConversionJobManager
+from agr_literature_service.api.utils.job_queue import JobStore, claim_next_job, purge_finished_jobs, \
+    requeue_stale_jobs
+from ..fixtures import db  # noqa: F401
+
+
+def _age_job(db, job_id, **kwargs):  # noqa: F811
+    db.query(BackgroundJobModel).filter(BackgroundJobModel.job_id == job_id).update(kwargs)
+    db.commit()
+
+
+class TestJobQueue:
+
+    def test_store_save_and_load(self, db):  # noqa: F811
+        store = JobStore(CONVERSION_JOB_TYPE)
+        assert store.save("job-1", {"job_id": "job-1", "status": "running"}, status="running",
+                          reference_id=1, user_id="curator")
+        assert store.save("job-1", {"job_id": "job-1", "status": "running", "step": 2})
+        row = db.query(BackgroundJobModel).filter_by(job_id="job-1").one()
+        assert row.status == "running"
+        assert row.locked_by is not None
+        assert store.load("job-1") == {"job_id": "job-1", "status": "running", "step": 2,
+                                       "user_id": "curator"}
+        assert JobStore(BULK_UPLOAD_JOB_TYPE).load("job-1") is None
+        assert store.find_for_reference(1, active_only=True)["job_id"] == "job-1"
+
+        store.save("job-1", {"job_id": "job-1", "status": "completed"}, status="completed")
+        db.expire_all()
+        row = db.query(BackgroundJobModel).filter_by(job_id="job-1").one()
+        assert row.date_completed is not None
+        assert row.locked_by is None
+        assert store.find_for_reference(1, active_only=True) is None
+        assert store.find_for_reference(1)["status"] == "completed"
+
+    def test_claim_skips_locked_jobs(self, db):  # noqa: F811
+        store = JobStore(CONVERSION_JOB_TYPE)
+        store.enqueue("first", {"job_id": "first"}, {"reference_id": 1})
+        store.enqueue("second", {"job_id": "second"}, {"reference_id": 2})
+        _age_job(db, "first", date_created=datetime.utcnow() - timedelta(minutes=1))
+
+        other_session = sessionmaker(bind=db.get_bind())()
+        try:
+            # another worker holds the oldest job while it claims it
+            other_session.query(BackgroundJobModel).filter_by(job_id="first").with_for_update().one()
+            row = claim_next_job(db, [CONVERSION_JOB_TYPE], "worker-a")
+            assert row.job_id == "second"
+            assert row.status == "running"
+            assert row.locked_by == "worker-a"
+            assert row.attempts == 1
+        finally:
+            other_session.rollback()
+            other_session.close()
+        assert claim_next_job(db, [CONVERSION_JOB_TYPE], "worker-b").job_id == "first"
+        assert claim_next_job(db, [CONVERSION_JOB_TYPE], "worker-b") is None
+        assert claim_next_job(db, [BULK_UPLOAD_JOB_TYPE]) is None
+
+    def test_requeue_stale_jobs(self, db):  # noqa: F811
+        JobStore(CONVERSION_JOB_TYPE).enqueue("conversion", {"job_id": "conversion"}, {"reference_id": 1})
+        claim_next_job(db, [CONVERSION_JOB_TYPE])
+        JobStore(BULK_UPLOAD_JOB_TYPE).save("upload", {"job_id": "upload", "status": "running"})
+        JobStore(BULK_UPLOAD_JOB_TYPE).save("fresh", {"job_id": "fresh", "status": "running"})
+        stale = datetime.utcnow() - timedelta(hours=2)
+        _age_job(db, "conversion", date_updated=stale)
+        _age_job(db, "upload", date_updated=stale)
+
+        assert requeue_stale_jobs(db, 3600, requeueable_types=[CONVERSION_JOB_TYPE]) == (1, 1)
+        db.expire_all()
+        statuses = {row.job_id: row for row in db.query(BackgroundJobModel).all()}
+        assert statuses["conversion"].status == "queued"
+        assert statuses["conversion"].locked_by is None
+        assert statuses["upload"].status == "failed"
+        assert statuses["upload"].state["status"] == "failed"
+        assert statuses["fresh"].status == "running"
+
+    def test_purge_finished_jobs(self, db):  # noqa: F811
+        store = JobStore(BULK_UPLOAD_JOB_TYPE)
+        store.save("old", {"job_id": "old"}, status="completed")
+        store.save("new", {"job_id": "new"}, status="failed")
+        store.save("running", {"job_id": "running"})
+        _age_job(db, "old", date_completed=datetime.utcnow() - timedelta(days=10))
+
+        assert purge_finished_jobs(db, retention_hours=24) == 1
+        assert {row.job_id for row in db.query(BackgroundJobModel).all()} == {"new", "running"}
+
+
+class TestPersistentManagers:
+
+    def test_conversion_job_visible_to_other_process(self, db):  # noqa: F811
+        api_worker = ConversionJobManager(store=JobStore(CONVERSION_JOB_TYPE))
+        job_worker = ConversionJobManager(store=JobStore(CONVERSION_JOB_TYPE))
+        job = api_worker.create_or_get_job(
+            reference_id=42, reference_curie="AGRKB:101000000000042", user_id="curator",
+            expected_source_files=[{"source_display_name": "paper", "source_file_class": "main"}])
+        assert api_worker.enqueue(job.job_id, {"reference_id": 42})
+
+        assert api_worker.get_active_job_for_reference(42).job_id == job.job_id
+        assert job_worker.create_or_get_job(42, "AGRKB:101000000000042", "other").job_id == job.job_id
+
+        job_worker.record_file_progress(job.job_id, source_display_name="paper", source_file_class="main",
+                                        success=False, error="pdfx 500")
+        polled = api_worker.get_job(job.job_id)
+        assert polled.user_id == "curator"
+        assert polled.per_file_progress[0].status == "failed"
+        assert polled.per_file_progress[0].error == "pdfx 500"
+
+        job_worker.complete_job(job.job_id, success=False, error="pdfx 500")
+        assert api_worker.get_active_job_for_reference(42) is None
+        assert api_worker.get_last_job_for_reference(42).status == "failed"
+        row = db.query(BackgroundJobModel).filter_by(job_id=job.job_id).one()
+        assert row.status == "failed"
+        assert row.payload == {"reference_id": 42}
+
+    def test_bulk_upload_status_from_other_process(self, db):  # noqa: F811
+        api_worker = BulkUploadManager(store=JobStore(BULK_UPLOAD_JOB_TYPE))
+        other_worker = BulkUploadManager(store=JobStore(BULK_UPLOAD_JOB_TYPE))
+        job_id = api_worker.create_job("curator", "WB", "archive.tar.gz", total_files=2)
+        api_worker.update_progress(job_id, processed=1, current_file="a.pdf")
+
+        polled = other_worker.get_job(job_id)
+        assert polled.processed_files == 1
+        assert polled.successful_files == 1
+        assert polled.progress_log[0]["file"] == "a.pdf"
+
+        api_worker.complete_job(job_id, success=True)
+        assert other_worker.get_job(job_id).status == "completed"
+        assert other_worker.get_job("no-such-job") is None
@@ -1,3 +1,6 @@
+import hashlib
+import io
+
 import pytest
 from starlette.testclient import TestClient
 
@@ -11,7 +14,7 @@ from .test_reference import test_reference # noqa
 from .test_reference import test_reference as test_reference2 # noqa
 from ..fixtures import db # noqa
 from .fixtures import auth_headers # noqa
-from agr_literature_service.api.crud.referencefile_crud import create_metadata
+from agr_literature_service.api.crud.referencefile_crud import create_metadata, get_md5sum
 
 
 @pytest.fixture
@@ -329,3 +332,10 @@ class TestReferencefile:
             assert derived[0]["referencefile_id"] == converted_id
             assert derived[0]["file_class"] == "converted_merged_main"
             assert derived[0]["display_name"].startswith(test_referencefile.display_name)
+
+    def test_get_md5sum(self):
+        data = b"%PDF-1.4 " * 300000
+        fileobj = io.BytesIO(data)
+        fileobj.seek(1234)
+        # always hashes the whole file, whatever the current position
+        assert get_md5sum(fileobj) == hashlib.md5(data).hexdigest()
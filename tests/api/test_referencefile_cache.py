@@ -0,0 +1,74 @@
+import hashlib
+import os
+
+import pytest
+
+from agr_literature_service.api.s3.referencefile_cache import ReferencefileCache, get_referencefile_cache
+
+
+def md5(content):
+    return hashlib.md5(content).hexdigest()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReferencefileCache(str(tmp_path / "cache"), max_bytes=1000)
+
+
+class TestReferencefileCache:
+
+    def test_put_and_get(self, cache):
+        content = b"%PDF-1.4 main pdf"
+        assert cache.get(md5(content)) is None
+        assert cache.put(md5(content), content)
+        assert cache.get(md5(content)) == content
+        assert cache.get_path(md5(content)) == cache.path_for(md5(content))
+
+    def test_content_not_matching_md5sum_is_not_cached(self, cache):
+        assert not cache.put(md5(b"other content"), b"content")
+        assert cache.get(md5(b"other content")) is None
+
+    def test_corrupted_entry_is_removed_on_read(self, cache):
+        content = b"<article>nxml</article>"
+        cache.put(md5(content), content)
+        with open(cache.path_for(md5(content)), "wb") as f:
+            f.write(b"<article>truncated")
+        assert cache.get(md5(content)) is None
+        assert not os.path.exists(cache.path_for(md5(content)))
+
+    def test_least_recently_used_files_are_evicted(self, cache):
+        contents = [bytes([i]) * 300 for i in range(3)]
+        for i, content in enumerate(contents):
+            cache.put(md5(content), content)
+            # distinct mtimes without sleeping
+            os.utime(cache.path_for(md5(content)), (1000 + i, 1000 + i))
+        # a hit makes the oldest entry the most recently used one
+        assert cache.get(md5(contents[0])) == contents[0]
+        cache.put(md5(b"x" * 300), b"x" * 300)
+        assert cache.get(md5(contents[1])) is None
+        assert cache.get(md5(contents[0])) == contents[0]
+        assert cache.get(md5(b"x" * 300)) == b"x" * 300
+
+    def test_iter_and_cache(self, cache):
+        chunks = [b"chunk1", b"chunk2", b"chunk3"]
+        content = b"".join(chunks)
+        assert list(cache.iter_and_cache(md5(content), iter(chunks))) == chunks
+        assert cache.get(md5(content)) == content
+
+        # an abandoned stream leaves nothing behind, not even the temp file
+        other = [b"a" * 10, b"b" * 10]
+        stream = cache.iter_and_cache(md5(b"".join(other)), iter(other))
+        next(stream)
+        stream.close()
+        assert cache.get(md5(b"".join(other))) is None
+        assert not any(name.endswith(".tmp") for _, _, names in os.walk(cache.directory) for name in names)
+
+    def test_get_referencefile_cache_from_environment(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("REFERENCEFILE_CACHE_DIR", raising=False)
+        assert get_referencefile_cache() is None
+        monkeypatch.setenv("REFERENCEFILE_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("REFERENCEFILE_CACHE_MAX_BYTES", "2048")
+        cache = get_referencefile_cache()
+        assert cache is get_referencefile_cache()
+        assert cache.directory == str(tmp_path)
+        assert cache.max_bytes == 2048
@@ -0,0 +1,41 @@
+import gzip
+import os
+
+import boto3  # type: ignore
+import pytest
+from moto import mock_s3  # type: ignore
+
+from agr_literature_service.api.s3.download import iter_gunzipped_object
+
+BUCKET = "agr-literature"
+CONTENT = os.urandom(300000) + b"%%EOF"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_s3():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key="a/b/c/d/abcd.gz", Body=gzip.compress(CONTENT))
+        yield client
+
+
+def get_body(s3_client):
+    return s3_client.get_object(Bucket=BUCKET, Key="a/b/c/d/abcd.gz")["Body"]
+
+
+class TestS3Download:
+
+    def test_iter_gunzipped_object_full(self, s3_client):
+        chunks = list(iter_gunzipped_object(get_body(s3_client), chunk_size=4096))
+        assert len(chunks) > 1
+        assert b"".join(chunks) == CONTENT
+
+    def test_iter_gunzipped_object_multi_member(self, s3_client):
+        body = gzip.compress(CONTENT[:1000]) + gzip.compress(CONTENT[1000:])
+        s3_client.put_object(Bucket=BUCKET, Key="a/b/c/d/multi.gz", Body=body)
+        multi = s3_client.get_object(Bucket=BUCKET, Key="a/b/c/d/multi.gz")["Body"]
+        assert b"".join(iter_gunzipped_object(multi, chunk_size=4096)) == CONTENT
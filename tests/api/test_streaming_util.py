@@ -0,0 +1,82 @@
+import gzip
+import io
+import tarfile
+import threading
+import time
+
+import pytest
+
+from starlette.datastructures import Headers
+
+from agr_literature_service.api.util.streaming import accepts_gzip, gzip_chunks, iter_tar_stream, \
+    streaming_response
+
+
+class FakeRequest:
+    def __init__(self, headers):
+        self.headers = Headers(headers)
+
+
+class TestStreamingUtil:
+
+    def test_accepts_gzip(self):
+        assert accepts_gzip(FakeRequest({"accept-encoding": "gzip, deflate, br"}))
+        assert accepts_gzip(FakeRequest({"accept-encoding": "br;q=1.0, gzip;q=0.8"}))
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "identity"}))
+        # q=0 means the client refuses the coding
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "gzip;q=0, br"}))
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "br, gzip; q=0.000"}))
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "*, gzip;q=0"}))
+        assert accepts_gzip(FakeRequest({"accept-encoding": "br;q=0.5, *;q=0.1"}))
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "*;q=0"}))
+        assert not accepts_gzip(FakeRequest({"accept-encoding": "gzip;q=bogus"}))
+        assert not accepts_gzip(FakeRequest({}))
+        assert not accepts_gzip(None)
+
+    def test_gzip_chunks_round_trip(self):
+        chunks = ["[", '{"curie": "AGRKB:101000000000001"}', ",", b'{"curie": "AGRKB:101000000000002"}', "]"]
+        compressed = b"".join(gzip_chunks(chunks))
+        assert gzip.decompress(compressed) == \
+            b'[{"curie": "AGRKB:101000000000001"},{"curie": "AGRKB:101000000000002"}]'
+
+    def test_streaming_response_headers(self):
+        response = streaming_response(iter(["{}"]), media_type="application/json", gzip=True)
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        response = streaming_response(iter(["{}"]), media_type="application/json")
+        assert "content-encoding" not in response.headers
+
+    def test_iter_tar_stream_keeps_member_order(self):
+        contents = {"key%d" % i: ("file %d " % i).encode() * (i + 1) * 1000 for i in range(10)}
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def fetch(key):
+            with lock:
+                running.append(key)
+                max_running.append(len(running))
+            # later members finish first
+            time.sleep(0.01 * (10 - int(key[3:])))
+            with lock:
+                running.remove(key)
+            return contents[key]
+
+        members = [("supp_%d.txt" % i, "key%d" % i) for i in range(10)]
+        chunks = list(iter_tar_stream(members, fetch, max_workers=3))
+        assert len(chunks) > 1
+        assert max(max_running) <= 3
+        with tarfile.open(fileobj=io.BytesIO(b"".join(chunks)), mode="r:gz") as tar:
+            assert tar.getnames() == [name for name, _ in members]
+            for name, key in members:
+                assert tar.extractfile(name).read() == contents[key]
+
+    def test_iter_tar_stream_empty_and_failing_fetch(self):
+        with tarfile.open(fileobj=io.BytesIO(b"".join(iter_tar_stream([], bytes))), mode="r:gz") as tar:
+            assert tar.getnames() == []
+
+        def fetch(key):
+            raise RuntimeError("s3 failure")
+
+        with pytest.raises(RuntimeError):
+            list(iter_tar_stream([("a.txt", "a")], fetch))
@@ -1,13 +1,18 @@
 from collections import namedtuple
 from datetime import datetime
+from multiprocessing import Value
 from unittest.mock import patch
 
 import pytest
 from starlette.testclient import TestClient
 from fastapi import status, HTTPException
 
+from agr_literature_service.api.crud import topic_entity_tag_crud
+from agr_literature_service.api.crud.topic_entity_tag_validation import references_depending_on
 from agr_literature_service.api.main import app
-from agr_literature_service.api.models import TopicEntityTagModel
+from agr_literature_service.api.models import TopicEntityTagModel, TopicEntityTagSourceModel, CrossReferenceModel, \
+    ModModel
+from agr_literature_service.api.routers import topic_entity_tag_router
 from agr_cognito_py import get_authentication_token
 from ..fixtures import db # noqa
 from .fixtures import auth_headers # noqa
@@ -687,6 +692,140 @@ class TestTopicEntityTag:
             response = client.get(f"/topic_entity_tag/{test_topic_entity_tag.new_tet_id}", headers=auth_headers)
             assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_reference_tag_summary(self, db, test_topic_entity_tag, test_topic_entity_tag_source, test_mod, auth_headers):  # noqa
+        # the summary row is kept current by the topic_entity_tag triggers
+        ref_curie = test_topic_entity_tag.related_ref_curie
+        source_id = str(test_topic_entity_tag_source.new_source_id)
+        with TestClient(app) as client:
+            response = client.get(f"/topic_entity_tag/summary/{ref_curie}", headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            summary = response.json()
+            assert summary["tag_count"] == 1
+            assert summary["topic_counts"] == {"ATP:0000122": 1}
+            assert summary["species_counts"] == {"NCBITaxon:6239": 1}
+            assert summary["source_counts"] == {source_id: 1}
+            assert summary["mod_counts"] == {test_mod.new_mod_abbreviation: 1}
+            assert summary["top_entities"] == [{"entity_type": "ATP:0000005", "entity": "WB:WBGene00003001",
+                                                "count": 1}]
+
+            # a topic-only tag; notes do not change the summary
+            response = client.post(url="/topic_entity_tag/", json={
+                "reference_curie": ref_curie,
+                "topic": "ATP:0000009",
+                "species": "NCBITaxon:6239",
+                "topic_entity_tag_source_id": test_topic_entity_tag_source.new_source_id,
+                "negated": False,
+                "data_novelty": "ATP:0000334",
+                "created_by": "WBPerson1"
+            }, headers=auth_headers)
+            assert response.status_code == status.HTTP_201_CREATED
+            topic_tag_id = response.json()["topic_entity_tag_id"]
+            client.patch(f"/topic_entity_tag/{test_topic_entity_tag.new_tet_id}", json={"note": "new note"},
+                         headers=auth_headers)
+            response = client.post(url="/topic_entity_tag/summary",
+                                   json={"curies_or_reference_ids": [ref_curie, "AGRKB:999999999999999"]},
+                                   headers=auth_headers)
+            summaries = response.json()
+            assert list(summaries) == [ref_curie]
+            assert summaries[ref_curie]["tag_count"] == 2
+            assert summaries[ref_curie]["topic_counts"] == {"ATP:0000122": 1, "ATP:0000009": 1}
+            assert summaries[ref_curie]["species_counts"] == {"NCBITaxon:6239": 2}
+            assert len(summaries[ref_curie]["top_entities"]) == 1
+            response = client.get(f"/topic_entity_tag/by_reference/{ref_curie}", params={"count_only": True},
+                                  headers=auth_headers)
+            assert response.json() == 2
+            response = client.get(f"/topic_entity_tag/by_reference/{ref_curie}", params={"column_only": "species"},
+                                  headers=auth_headers)
+            assert response.json() == ["NCBITaxon:6239"]
+
+            # moving the source to another MOD moves its tags' mod counts
+            other_mod = ModModel(abbreviation="0015_OtherDB", short_name="OtherDB", full_name="Other database")
+            db.add(other_mod)
+            db.flush()
+            db.query(TopicEntityTagSourceModel).filter_by(
+                topic_entity_tag_source_id=test_topic_entity_tag_source.new_source_id).update(
+                {"secondary_data_provider_id": other_mod.mod_id})
+            db.commit()
+            summary = client.get(f"/topic_entity_tag/summary/{ref_curie}", headers=auth_headers).json()
+            assert summary["mod_counts"] == {"0015_OtherDB": 2}
+
+            # deleting the tags empties the summary
+            for tag_id in (test_topic_entity_tag.new_tet_id, topic_tag_id):
+                client.delete(f"/topic_entity_tag/{tag_id}", headers=auth_headers)
+            summary = client.get(f"/topic_entity_tag/summary/{ref_curie}", headers=auth_headers).json()
+            assert summary["tag_count"] == 0
+            assert summary["topic_counts"] == {}
+
+    def test_get_all_tags_by_mod_keyset_pages(self, db, test_reference, test_mod, auth_headers):  # noqa
+        mod_abbreviation = test_mod.new_mod_abbreviation
+        db.add(CrossReferenceModel(curie=f"{mod_abbreviation}:keyset1", curie_prefix=mod_abbreviation,
+                                   reference_id=test_reference.related_ref_id))
+        db.commit()
+        with TestClient(app) as client:
+            response = client.post(url="/topic_entity_tag/source", json={
+                "source_evidence_assertion": "ECO:0000302",
+                "source_method": "abc_literature_system",
+                "validation_type": "professional_biocurator",
+                "description": "curated in the ABC",
+                "data_provider": mod_abbreviation,
+                "secondary_data_provider_abbreviation": mod_abbreviation,
+                "created_by": "somebody"
+            }, headers=auth_headers)
+            source_id = response.json()["topic_entity_tag_source_id"]
+            tag_ids = []
+            for topic in ["ATP:0000009", "ATP:0000011", "ATP:0000012"]:
+                response = client.post(url="/topic_entity_tag/", json={
+                    "reference_curie": test_reference.new_ref_curie,
+                    "topic": topic,
+                    "topic_entity_tag_source_id": source_id,
+                    "negated": False,
+                    "data_novelty": "ATP:0000334",
+                    "created_by": "WBPerson1"
+                }, headers=auth_headers)
+                assert response.status_code == status.HTTP_201_CREATED
+                tag_ids.append(response.json()["topic_entity_tag_id"])
+
+            url = f"/topic_entity_tag/by_mod/{mod_abbreviation}"
+            everything = client.get(url, headers=auth_headers).json()
+            assert [tag["topic_entity_tag_id"] for tag in everything["data"]] == tag_ids
+            assert everything["data"][0]["curie"] == f"{mod_abbreviation}:keyset1"
+            assert everything["next_cursor"] is None
+
+            paged_ids = []
+            cursor = None
+            while True:
+                params = {"page_size": 2, **({"cursor": cursor} if cursor else {})}
+                page = client.get(url, params=params, headers=auth_headers).json()
+                assert len(page["data"]) <= 2
+                paged_ids.extend(tag["topic_entity_tag_id"] for tag in page["data"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert paged_ids == tag_ids
+
+            response = client.get(url, params={"page_size": 2, "cursor": "not-a-cursor"}, headers=auth_headers)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_tags_by_mod_cursor_round_trip(self):
+        date_updated = datetime(2026, 10, 19, 8, 30, 15, 123456)
+        cursor = topic_entity_tag_crud.encode_tags_by_mod_cursor(date_updated, 42)
+        assert "=" not in cursor
+        assert topic_entity_tag_crud.decode_tags_by_mod_cursor(cursor) == (date_updated, 42)
+        assert topic_entity_tag_crud.decode_tags_by_mod_cursor(None) is None
+        with pytest.raises(HTTPException) as exc_info:
+            topic_entity_tag_crud.decode_tags_by_mod_cursor("eyJhZnRlciI6IDF9")  # {"after": 1}
+        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_references_depending_on_terms_and_sources(self, db, test_topic_entity_tag, test_topic_entity_tag_source, test_reference):  # noqa
+        reference_id = test_reference.related_ref_id
+        source_id = test_topic_entity_tag_source.new_source_id
+        # the tag's topic, entity type and data novelty, and its source
+        for atp_terms, source_ids in [(["ATP:0000122"], []), (["ATP:0000005"], []), (["ATP:0000334"], []),
+                                      ([], [source_id])]:
+            assert reference_id in references_depending_on(db, atp_terms, source_ids)
+        assert reference_id not in references_depending_on(db, ["ATP:0000009"], [source_id + 1])
+        assert references_depending_on(db) == []
+
     def test_create_tet_creates_mca_and_workflow(self, db, auth_headers, test_reference, test_topic_entity_tag_source, test_mod): # noqa
         load_name_to_atp_and_relationships_mock()
         with TestClient(app) as client:
@@ -3201,3 +3340,20 @@ class TestMixedTagCompanionEntityTag:
             mixed = db.query(TopicEntityTagModel).filter(
                 TopicEntityTagModel.topic_entity_tag_id == resp.json()["topic_entity_tag_id"]).one()
             assert self._companions(db, mixed.reference_id, "ATP:0000005", "WB:WBGene00003001") == []
+
+
+def test_source_revalidation_waits_for_the_running_revalidation():
+    already_running = Value('b', False)
+    with patch.object(topic_entity_tag_router, "Process") as process, \
+            patch.object(topic_entity_tag_crud, "revalidate_all_tags") as revalidate:
+        topic_entity_tag_router.queue_source_revalidation(already_running, 1)
+        assert already_running.value
+        process.assert_called_once()
+        # changed while the first revalidation runs: queued, no second process
+        topic_entity_tag_router.queue_source_revalidation(already_running, 2)
+        topic_entity_tag_router.queue_source_revalidation(already_running, 2)
+        process.assert_called_once()
+
+        topic_entity_tag_router.revalidate_pending_sources(already_running)
+        revalidate.assert_called_once_with(topic_entity_tag_source_ids=[1, 2])
+        assert not already_running.value
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+from fastapi import status
+
+from agr_literature_service.api.crud import topic_entity_tag_bulk as bulk
+from agr_literature_service.api.main import app
+from agr_literature_service.api.schemas.topic_entity_tag_schemas import TopicEntityTagSchemaPost
+from ..fixtures import db # noqa
+from .fixtures import auth_headers # noqa
+from .test_reference import test_reference # noqa
+from .test_mod import test_mod # noqa
+from .test_topic_entity_tag_source import test_topic_entity_tag_source # noqa
+from .test_topic_entity_tag import test_topic_entity_tag # noqa
+from ..fixtures import load_name_to_atp_and_relationships_mock
+
+
+def _tag(reference_curie, source_id, **fields):
+    tag = {
+        "reference_curie": reference_curie,
+        "topic": "ATP:0000122",
+        "entity_type": "ATP:0000005",
+        "entity": "WB:WBGene00003001",
+        "entity_id_validation": "alliance",
+        "species": "NCBITaxon:6239",
+        "topic_entity_tag_source_id": source_id,
+        "negated": False,
+        "data_novelty": "ATP:0000334",
+        "created_by": "WBPerson1"
+    }
+    tag.update(fields)
+    return tag
+
+
+class TestTopicEntityTagBulk:
+
+    def test_create_bulk(self, test_topic_entity_tag, test_topic_entity_tag_source, auth_headers):  # noqa
+        load_name_to_atp_and_relationships_mock()
+        ref_curie = test_topic_entity_tag.related_ref_curie
+        source_id = test_topic_entity_tag_source.new_source_id
+        with TestClient(app) as client, \
+                patch("agr_literature_service.api.crud.topic_entity_tag_validation.get_ancestors") as \
+                mock_get_ancestors, \
+                patch("agr_literature_service.api.crud.topic_entity_tag_validation.get_descendants") as \
+                mock_get_descendants:
+            mock_get_ancestors.return_value = []
+            mock_get_descendants.return_value = []
+            tags = [
+                # new tag
+                _tag(ref_curie, source_id, entity="WB:WBGene00003002", note="new"),
+                # same as the fixture tag with a new note: appended to it
+                _tag(ref_curie, source_id, note="another note"),
+                # exact duplicate of the fixture tag
+                _tag(ref_curie, source_id, note="test note"),
+                # unknown reference
+                _tag("AGRKB:999999999999999", source_id),
+                # unknown source
+                _tag(ref_curie, -1),
+                # the first tag again, within the same batch
+                _tag(ref_curie, source_id, entity="WB:WBGene00003002", note="new")
+            ]
+            response = client.post(url="/topic_entity_tag/bulk", json={"tags": tags}, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert [r["status_code"] for r in data["results"]] == [
+                status.HTTP_201_CREATED, status.HTTP_200_OK, status.HTTP_409_CONFLICT,
+                status.HTTP_404_NOT_FOUND, status.HTTP_404_NOT_FOUND, status.HTTP_409_CONFLICT]
+            assert (data["created"], data["updated"], data["failed"]) == (1, 1, 4)
+            new_tet_id = data["results"][0]["topic_entity_tag_id"]
+            assert data["results"][5]["topic_entity_tag_id"] == new_tet_id
+            assert data["results"][1]["topic_entity_tag_id"] == int(test_topic_entity_tag.new_tet_id)
+            assert data["results"][2]["detail"]["reason"] == "duplicate"
+
+            response = client.get(f"/topic_entity_tag/{new_tet_id}", headers=auth_headers)
+            assert response.json()["entity"] == "WB:WBGene00003002"
+            response = client.get(f"/topic_entity_tag/{test_topic_entity_tag.new_tet_id}", headers=auth_headers)
+            assert response.json()["note"] == "test note | another note"
+
+    def test_create_bulk_empty(self, auth_headers):  # noqa
+        with TestClient(app) as client:
+            response = client.post(url="/topic_entity_tag/bulk", json={"tags": []}, headers=auth_headers)
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_plan_inserts_dedups_within_the_batch():
+    # no DB: the existing-tag lookup is patched away
+    source = SimpleNamespace(source_method="some_method", validation_type=None)
+    requests = [
+        TopicEntityTagSchemaPost(**_tag("AGRKB:1", 1, note="first")),
+        TopicEntityTagSchemaPost(**_tag("AGRKB:1", 1, note="second")),
+        TopicEntityTagSchemaPost(**_tag("AGRKB:1", 1, note="first")),
+        TopicEntityTagSchemaPost(**_tag("AGRKB:1", 1, entity="WB:WBGene00003002")),
+        TopicEntityTagSchemaPost(**_tag("AGRKB:1", 1, created_by="WBPerson2"))
+    ]
+    items = [bulk._Item(index, request) for index, request in enumerate(requests)]
+    for item in items:
+        item.data["reference_id"] = 1
+        item.source = source
+    with patch.object(bulk, "_load_candidates", return_value={}):
+        to_insert = bulk._plan_inserts(None, items)
+    assert to_insert == [items[0], items[3], items[4]]
+    # the second note is folded into the first tag, the third item duplicates it
+    assert items[0].data["note"] == "first | second"
+    assert items[1].status_code == status.HTTP_200_OK and items[1].absorbed_by is items[0]
+    assert items[2].status_code == status.HTTP_409_CONFLICT and items[2].absorbed_by is items[0]
+    # a different creator only conflicts with tags already in the database
+    assert items[4].pending
@@ -0,0 +1,76 @@
+"""build_curie_to_name_map collects every curie first and resolves the cache
+misses with one fetch per category / entity group (no DB or A-team needed)."""
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from agr_literature_service.api.crud import topic_entity_tag_crud as crud
+from agr_literature_service.api.crud.topic_entity_tag_utils import ExpiringCache
+
+NAMES = {"ATP:topic": "topic", "ATP:gene": "gene", "ECO:1": "eco one", "NCBITaxon:6239": "worm",
+         "WB:g1": "unc-1", "WB:g2": "unc-2", "SGD:g3": "ACT1"}
+
+
+def _tet(topic, entity_type=None, entity=None, entity_id_validation=None, species=None, evidence="ECO:1"):
+    return SimpleNamespace(topic=topic, display_tag=None, entity_type=entity_type, entity=entity,
+                           entity_id_validation=entity_id_validation, species=species,
+                           topic_entity_tag_source=SimpleNamespace(source_evidence_assertion=evidence))
+
+
+@pytest.fixture
+def name_lookups():
+    calls = []
+    lock = threading.Lock()
+
+    def ateam(category, curies):
+        with lock:
+            calls.append((category, sorted(curies)))
+        return {curie: NAMES.get(curie, curie) for curie in curies}
+
+    def entities(db, entity_id_validation, curies_category, curies):
+        with lock:
+            calls.append((f"{entity_id_validation}:{curies_category}", sorted(curies)))
+        return {curie: NAMES[curie] for curie in curies}
+
+    with patch.object(crud, "id_to_name_cache", ExpiringCache()), \
+            patch.object(crud, "get_map_ateam_curies_to_names", side_effect=ateam), \
+            patch.object(crud, "get_map_entity_curies_to_names", side_effect=entities):
+        yield calls
+
+
+TETS = [
+    _tet("ATP:topic", species="NCBITaxon:6239"),
+    _tet("ATP:topic", "ATP:gene", "WB:g1", "WB"),
+    _tet("ATP:topic", "ATP:gene", "WB:g2", "WB"),
+    _tet("ATP:topic", "ATP:gene", "SGD:g3", "sgd")
+]
+
+
+def test_one_fetch_per_category_and_entity_group(name_lookups):
+    curie_to_name = crud.build_curie_to_name_map(None, TETS)
+    assert curie_to_name == {curie: name for curie, name in NAMES.items()}
+    assert sorted(name_lookups) == [
+        ("WB:gene", ["WB:g1", "WB:g2"]), ("atpterm", ["ATP:gene", "ATP:topic"]), ("ecoterm", ["ECO:1"]),
+        ("sgd:gene", ["SGD:g3"]), ("species", ["NCBITaxon:6239"])]
+
+    # everything is cached now: no more fetches
+    name_lookups.clear()
+    assert crud.build_curie_to_name_map(None, TETS) == curie_to_name
+    assert name_lookups == []
+
+
+def test_cached_entity_type_names_resolve_entities_in_the_first_round(name_lookups):
+    crud.id_to_name_cache.set("ATP:gene", "gene")
+    with patch.object(crud, "_get_cached_curie_names_bulk", wraps=crud._get_cached_curie_names_bulk) as bulk:
+        crud.build_curie_to_name_map(None, TETS)
+    assert bulk.call_count == 1
+    assert ("atpterm", ["ATP:topic"]) in name_lookups
+
+
+def test_identity_fallbacks_are_not_cached(name_lookups):
+    assert crud.build_curie_to_name_map(None, [_tet("ATP:unknown", evidence="ECO:1")]) == {
+        "ATP:unknown": "ATP:unknown", "ECO:1": "eco one"}
+    assert crud.id_to_name_cache.get("ATP:unknown") is None
+    assert crud.id_to_name_cache.get("ECO:1") == "eco one"
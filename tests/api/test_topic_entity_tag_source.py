@@ -61,6 +61,13 @@ class TestTopicEntityTagSource:
             assert response.json()["source_evidence_assertion"] == "ECO:0008021"
             assert response.json()["created_by"] == "me"
 
+    def test_patch_source_secondary_data_provider(self, test_topic_entity_tag_source, auth_headers): # noqa
+        with TestClient(app) as client:
+            url = f"/topic_entity_tag/source/{test_topic_entity_tag_source.new_source_id}"
+            response = client.patch(url=url, json={"secondary_data_provider_abbreviation": "NOSUCHMOD"},
+                                    headers=auth_headers)
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_destroy_source(self, test_topic_entity_tag_source, auth_headers):  # noqa
         with TestClient(app) as client:
             response = client.delete(f"/topic_entity_tag/source/{test_topic_entity_tag_source.new_source_id}",
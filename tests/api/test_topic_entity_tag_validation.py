@@ -0,0 +1,193 @@
+"""The set-based validation engine must produce exactly the pairs and values
+of the per-tag rules in topic_entity_tag_crud (no DB needed)."""
+import random
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from agr_literature_service.api.crud import ateam_db_helpers
+from agr_literature_service.api.crud import topic_entity_tag_crud as crud
+from agr_literature_service.api.crud import topic_entity_tag_validation as validation
+
+# a small ATP tree: child -> parent
+PARENT = {
+    "ATP:topic_child": "ATP:topic", "ATP:topic_grandchild": "ATP:topic_child",
+    "ATP:gene": "ATP:entity", "ATP:allele": "ATP:entity",
+    "ATP:novel": "ATP:novelty", "ATP:existing": "ATP:novelty",
+}
+
+
+def fake_ancestors(onto_node):
+    ancestors = []
+    while onto_node in PARENT:
+        onto_node = PARENT[onto_node]
+        ancestors.append(onto_node)
+    return ancestors
+
+
+def fake_descendants(onto_node):
+    return [child for child in PARENT if onto_node in fake_ancestors(child)]
+
+
+def _random_tags(rng, count):
+    tags = []
+    for tag_id in range(1, count + 1):
+        topic = rng.choice(["ATP:topic", "ATP:topic_child", "ATP:topic_grandchild", "ATP:gene"])
+        entity_type = rng.choice([None, "ATP:entity", "ATP:gene", "ATP:allele"])
+        if topic == "ATP:gene" and rng.random() < 0.5:
+            entity_type = "ATP:gene"
+        tags.append(SimpleNamespace(
+            topic_entity_tag_id=tag_id, reference_id=rng.choice([1, 2]),
+            secondary_data_provider_id=rng.choice([10, 20]), topic=topic, entity_type=entity_type,
+            entity=None if entity_type is None else rng.choice(["WB:g1", "WB:g2"]),
+            species=rng.choice([None, "NCBITaxon:6239"]), negated=rng.choice([None, False, True]),
+            data_novelty=rng.choice(["ATP:novelty", "ATP:novel", "ATP:existing"]),
+            validation_type=rng.choice([None, "author", "professional_biocurator"]),
+            validation_by_author=None, validation_by_professional_biocurator=None))
+    return tags
+
+
+def _pairs_from_per_tag_rules(tags):
+    pairs = set()
+
+    def record(db, validated_tag, validating_tag, calculate_validation_values=True):
+        pairs.add((validated_tag.topic_entity_tag_id, validating_tag.topic_entity_tag_id))
+
+    with patch.object(crud, "add_validation_to_db", side_effect=record):
+        for tag in tags:
+            if tag.negated is None or tag.validation_type is None:
+                continue
+            related = [t for t in tags if t.topic_entity_tag_id != tag.topic_entity_tag_id
+                       and t.reference_id == tag.reference_id and t.negated is not None
+                       and t.secondary_data_provider_id == tag.secondary_data_provider_id]
+            if tag.negated is False:
+                crud.validate_tags_already_in_db_with_positive_tag(None, tag, related, False)
+            else:
+                crud.validate_tags_already_in_db_with_negative_tag(None, tag, related, False)
+    return pairs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_matches_per_tag_rules(seed):
+    tags = _random_tags(random.Random(seed), 60)
+    with patch.object(crud, "get_ancestors", side_effect=fake_ancestors), \
+            patch.object(crud, "get_descendants", side_effect=fake_descendants):
+        expected = _pairs_from_per_tag_rules(tags)
+    with patch.object(validation, "get_ancestors", side_effect=fake_ancestors), \
+            patch.object(validation, "get_descendants", side_effect=fake_descendants):
+        pairs = validation.compute_validation_pairs(tags)
+    assert expected
+    assert pairs == expected
+
+    # validation values, against calculate_validation_value_for_tag on
+    # objects wired up with the same pairs
+    objects = {t.topic_entity_tag_id: SimpleNamespace(
+        topic_entity_tag_id=t.topic_entity_tag_id, negated=t.negated, validated_by=[],
+        topic_entity_tag_source=SimpleNamespace(validation_type=t.validation_type)) for t in tags}
+    for validated_id, validating_id in pairs:
+        objects[validated_id].validated_by.append(objects[validating_id])
+    values = validation.compute_validation_values(tags, pairs)
+    for tag_id, obj in objects.items():
+        assert values[tag_id] == (crud.calculate_validation_value_for_tag(obj, crud.ATP_ID_SOURCE_CURATOR),
+                                  crud.calculate_validation_value_for_tag(obj, crud.ATP_ID_SOURCE_AUTHOR))
+
+
+def test_only_changed_pairs_and_values_are_written():
+    tags = [
+        SimpleNamespace(topic_entity_tag_id=1, reference_id=1, secondary_data_provider_id=10, topic="ATP:topic",
+                        entity_type=None, entity=None, species=None, negated=False, data_novelty="ATP:novelty",
+                        validation_type=None, validation_by_author="not_validated",
+                        validation_by_professional_biocurator="not_validated"),
+        SimpleNamespace(topic_entity_tag_id=2, reference_id=1, secondary_data_provider_id=10,
+                        topic="ATP:topic_child", entity_type=None, entity=None, species=None, negated=False,
+                        data_novelty="ATP:novel", validation_type="professional_biocurator",
+                        validation_by_author="not_validated",
+                        validation_by_professional_biocurator="validated_right_self"),
+    ]
+    written = {}
+    with patch.object(validation, "load_tags", return_value=tags), \
+            patch.object(validation, "_stored_pairs", return_value={(1, 3)}), \
+            patch.object(validation, "_write_pairs", side_effect=lambda db, insert, delete: written.update(
+                insert=insert, delete=delete)), \
+            patch.object(validation, "get_ancestors", side_effect=fake_ancestors), \
+            patch.object(validation, "get_descendants", side_effect=fake_descendants):
+        db = SimpleNamespace(execute=lambda *args: written.setdefault("update", args[1]))
+        result = validation.revalidate_references(db, [1])
+    assert written["insert"] == {(1, 2)}
+    assert written["delete"] == {(1, 3)}
+    # only tag 1's curator value changed
+    assert written["update"] == {"tag_ids": [1], "curator": ["validated_right"], "author": ["not_validated"]}
+    assert result == {"tags": 2, "pairs_added": 1, "pairs_removed": 1, "values_updated": 1}
+
+
+def test_affected_atp_terms_are_the_changed_subtrees():
+    with patch.object(validation, "get_ancestors", side_effect=fake_ancestors), \
+            patch.object(validation, "get_descendants", side_effect=fake_descendants):
+        assert validation.affected_atp_terms(["ATP:topic_child", "ATP:novel"]) == {
+            "ATP:topic_child", "ATP:topic_grandchild", "ATP:novel"}
+        assert validation.affected_atp_terms([]) == set()
+
+
+def test_only_affected_references_are_revalidated():
+    revalidated = []
+    commits = []
+
+    def revalidate(db, reference_ids, update_pairs, hierarchy):
+        revalidated.append(list(reference_ids))
+        return {"tags": len(reference_ids), "pairs_added": 0, "pairs_removed": 0, "values_updated": 1}
+
+    db = SimpleNamespace(commit=lambda: commits.append(True))
+    with patch.object(validation, "get_descendants", side_effect=fake_descendants), \
+            patch.object(ateam_db_helpers, "load_name_to_atp_and_relationships"), \
+            patch.object(validation, "references_depending_on", return_value=[3, 5, 8]) as depending_on, \
+            patch.object(validation, "revalidate_references", side_effect=revalidate):
+        result = validation.revalidate_affected_references(db, atp_ids=["ATP:topic_child"], source_ids=[7],
+                                                           batch_size=2)
+    depending_on.assert_called_once_with(db, {"ATP:topic_child", "ATP:topic_grandchild"}, [7])
+    assert revalidated == [[3, 5], [8]]
+    assert len(commits) == 2
+    assert result == {"references": 3, "tags": 3, "pairs_added": 0, "pairs_removed": 0, "values_updated": 2}
+
+
+def _atp_maps(children):
+    """ateam_db_helpers ATP maps for a tree given as parent -> children."""
+    parent = {child: parent for parent, kids in children.items() for child in kids}
+    terms = set(children) | set(parent)
+    return {term: term for term in terms}, children, parent
+
+
+def test_targeted_revalidation_reloads_the_atp_hierarchy():
+    # ATP:moved goes from under ATP:elsewhere to under ATP:topic
+    old_maps = _atp_maps({"ATP:topic": [], "ATP:elsewhere": ["ATP:moved"], "ATP:moved": [], "ATP:novelty": []})
+    new_maps = _atp_maps({"ATP:topic": ["ATP:moved"], "ATP:elsewhere": [], "ATP:moved": [], "ATP:novelty": []})
+    tags = [
+        SimpleNamespace(topic_entity_tag_id=tag_id, reference_id=1, secondary_data_provider_id=10, topic=topic,
+                        entity_type=None, entity=None, species=None, negated=False, data_novelty="ATP:novelty",
+                        validation_type=validation_type, validation_by_author="not_validated",
+                        validation_by_professional_biocurator="not_validated")
+        for tag_id, topic, validation_type in [(1, "ATP:topic", None),
+                                               (2, "ATP:moved", "professional_biocurator")]]
+
+    def reload_atp_maps():
+        for current, new in zip((ateam_db_helpers.atp_to_name, ateam_db_helpers.atp_to_children,
+                                 ateam_db_helpers.atp_to_parent), new_maps):
+            current.clear()
+            current.update(new)
+
+    written = {}
+    with patch.dict(ateam_db_helpers.atp_to_name, old_maps[0], clear=True), \
+            patch.dict(ateam_db_helpers.atp_to_children, old_maps[1], clear=True), \
+            patch.dict(ateam_db_helpers.atp_to_parent, old_maps[2], clear=True), \
+            patch.object(ateam_db_helpers, "load_name_to_atp_and_relationships",
+                         side_effect=reload_atp_maps) as reload:
+        assert validation.compute_validation_pairs(tags) == set()
+        with patch.object(validation, "references_depending_on", return_value=[1]), \
+                patch.object(validation, "load_tags", return_value=tags), \
+                patch.object(validation, "_stored_pairs", return_value=set()), \
+                patch.object(validation, "_write_pairs", side_effect=lambda db, insert, delete: written.update(
+                    insert=insert, delete=delete)):
+            db = SimpleNamespace(execute=lambda *args: None, commit=lambda: None)
+            validation.revalidate_affected_references(db, atp_ids=["ATP:moved"])
+    reload.assert_called_once_with()
+    assert written == {"insert": {(1, 2)}, "delete": set()}
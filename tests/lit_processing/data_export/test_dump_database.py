@@ -0,0 +1,175 @@
+import os
+import sys
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from agr_literature_service.lit_processing.data_export import dump_database as dump_module
+from agr_literature_service.lit_processing.data_export.dump_database import build_pg_dump_command, \
+    get_finished_files, upload_dump_directory, dump_database, dump_database_custom, version_table_patterns
+
+PARAMS = {'database': 'literature', 'host': 'db-host', 'username': 'postgres', 'password': 'secret',
+          'port': '5432'}
+
+
+class TestDumpDatabase:
+
+    def test_build_pg_dump_command_custom_to_stdout(self):
+
+        cmd = build_pg_dump_command(PARAMS)
+        assert cmd[:2] == ['pg_dump', '--format=custom']
+        assert '--file' not in cmd
+        assert not any(arg.startswith('--jobs') for arg in cmd)
+        assert cmd[-1] == 'literature'
+        # the password never ends up on the command line
+        assert 'secret' not in ' '.join(cmd)
+
+    def test_build_pg_dump_command_directory_with_excludes(self):
+
+        cmd = build_pg_dump_command(PARAMS, 'directory', jobs=8, output='dump.dir',
+                                    exclude_table_data=version_table_patterns)
+        assert '--format=directory' in cmd
+        assert '--jobs=8' in cmd
+        assert cmd[cmd.index('--file') + 1] == 'dump.dir'
+        assert '--exclude-table-data=public.*_version' in cmd
+        assert '--exclude-table-data=public.transaction' in cmd
+
+    def test_get_finished_files(self, tmp_path):
+
+        for name in ['3001.dat.gz', '3002.dat.gz', 'toc.dat']:
+            (tmp_path / name).write_bytes(b'data')
+        old = os.stat(tmp_path / '3001.dat.gz').st_mtime - 3600
+        os.utime(tmp_path / '3001.dat.gz', (old, old))
+        os.utime(tmp_path / 'toc.dat', (old, old))
+
+        # only the settled table file; toc.dat waits for the final pass
+        assert get_finished_files(str(tmp_path), {}) == ['3001.dat.gz']
+        stat = os.stat(tmp_path / '3001.dat.gz')
+        uploaded = {'3001.dat.gz': (stat.st_size, stat.st_mtime)}
+        assert get_finished_files(str(tmp_path), uploaded) == []
+        assert get_finished_files(str(tmp_path), uploaded, now=float('inf')) == ['3002.dat.gz']
+
+    def test_upload_dump_directory(self, tmp_path):
+
+        (tmp_path / '3001.dat.gz').write_bytes(b'table data')
+        (tmp_path / 'toc.dat').write_bytes(b'toc')
+        process = MagicMock()
+        process.poll.return_value = 0
+        process.returncode = 0
+
+        with patch.object(dump_module, 'upload_file_to_s3', return_value=True) as mock_upload:
+            returncode, keys = upload_dump_directory(str(tmp_path), process, 'prefix/')
+
+        assert returncode == 0
+        assert keys == ['prefix/3001.dat.gz', 'prefix/toc.dat']
+        assert mock_upload.call_count == 2
+
+    def test_upload_dump_directory_reports_failed_upload(self, tmp_path):
+
+        (tmp_path / 'toc.dat').write_bytes(b'toc')
+        process = MagicMock()
+        process.poll.return_value = 0
+        process.returncode = 0
+
+        with patch.object(dump_module, 'upload_file_to_s3', return_value=False), \
+                patch.object(dump_module, 'delete_files_from_s3') as mock_delete:
+            assert upload_dump_directory(str(tmp_path), process, 'prefix/') == (1, [])
+        mock_delete.assert_called_once_with(dump_module.s3_bucket, [])
+
+    def test_upload_dump_directory_waits_for_and_checks_earlier_upload(self, tmp_path):
+
+        table_file = tmp_path / '3001.dat.gz'
+        table_file.write_bytes(b'partial')
+        old = os.stat(table_file).st_mtime - 3600
+        os.utime(table_file, (old, old))
+        (tmp_path / 'toc.dat').write_bytes(b'toc')
+        process = MagicMock()
+        process.returncode = 0
+        calls = []
+
+        def poll():
+            # the table file changes after its first upload was submitted
+            if calls:
+                table_file.write_bytes(b'complete table data')
+                return 0
+            return None
+
+        def upload(path, bucket, key):
+            calls.append(key)
+            # the first upload fails
+            return len(calls) > 1
+
+        process.poll.side_effect = poll
+        with patch.object(dump_module, 'upload_file_to_s3', side_effect=upload), \
+                patch.object(dump_module, 'delete_files_from_s3') as mock_delete, \
+                patch.object(dump_module, 'poll_seconds', 0):
+            assert upload_dump_directory(str(tmp_path), process, 'prefix/') == (1, [])
+        assert calls.count('prefix/3001.dat.gz') == 2
+        # the file's last upload succeeded, the dump is incomplete anyway
+        mock_delete.assert_called_once()
+
+    def test_upload_dump_directory_deletes_files_of_failed_dump(self, tmp_path):
+
+        (tmp_path / '3001.dat.gz').write_bytes(b'table data')
+        process = MagicMock()
+        process.poll.return_value = 1
+        process.returncode = 1
+        old = os.stat(tmp_path / '3001.dat.gz').st_mtime - 3600
+        os.utime(tmp_path / '3001.dat.gz', (old, old))
+
+        with patch.object(dump_module, 'upload_file_to_s3', return_value=True), \
+                patch.object(dump_module, 'delete_files_from_s3') as mock_delete:
+            # the loop is skipped (pg_dump already exited), so nothing was uploaded yet
+            assert upload_dump_directory(str(tmp_path), process, 'prefix/') == (1, [])
+        mock_delete.assert_called_once_with(dump_module.s3_bucket, [])
+
+        process.poll.side_effect = [None, 1]
+        with patch.object(dump_module, 'upload_file_to_s3', return_value=True), \
+                patch.object(dump_module, 'delete_files_from_s3') as mock_delete, \
+                patch.object(dump_module, 'poll_seconds', 0):
+            assert upload_dump_directory(str(tmp_path), process, 'prefix/') == (1, [])
+        mock_delete.assert_called_once_with(dump_module.s3_bucket, ['prefix/3001.dat.gz'])
+
+    @staticmethod
+    def _fake_upload_stream(outcome, fail_write=False):
+
+        @contextmanager
+        def open_stream(bucket, key):
+            sink = MagicMock()
+            if fail_write:
+                sink.write.side_effect = ClientError({'Error': {'Code': '500'}}, 'UploadPart')
+            try:
+                yield sink
+            except Exception as e:
+                outcome['aborted'] = e
+                raise
+            outcome['completed'] = key
+        return open_stream
+
+    def test_cron_custom_dump_aborts_upload_when_pg_dump_fails(self):
+
+        outcome = {}
+        cmd = [sys.executable, '-c', 'import sys; sys.stdout.write("partial"); sys.exit(1)']
+        with patch.object(dump_module, 'build_pg_dump_command', return_value=cmd), \
+                patch.object(dump_module, 'open_s3_upload_stream', self._fake_upload_stream(outcome)), \
+                patch.object(dump_module, 'copy_file_in_s3') as mock_copy:
+            assert dump_database_custom('cron', 'literature.sql', []) is False
+        assert 'aborted' in outcome and 'completed' not in outcome
+        mock_copy.assert_not_called()
+
+    def test_cron_custom_dump_stops_pg_dump_when_upload_fails(self):
+
+        outcome = {}
+        # more output than a pipe buffer holds: pg_dump would block forever
+        cmd = [sys.executable, '-c', 'import sys; sys.stdout.buffer.write(b"x" * 50000000)']
+        with patch.object(dump_module, 'build_pg_dump_command', return_value=cmd), \
+                patch.object(dump_module, 'open_s3_upload_stream',
+                             self._fake_upload_stream(outcome, fail_write=True)):
+            assert dump_database_custom('cron', 'literature.sql', []) is False
+        assert isinstance(outcome['aborted'], ClientError)
+
+    def test_cron_dump_only_in_prod(self, monkeypatch):
+
+        monkeypatch.setenv('ENV_STATE', 'test')
+        assert dump_database('cron') is False
@@ -0,0 +1,71 @@
+import pyarrow.parquet as pq  # type: ignore
+from sqlalchemy import text
+
+from agr_literature_service.lit_processing.data_export.export_mod_references_to_parquet import \
+    get_table_names, get_table_schema, get_table_query, rows_to_record_batch, \
+    write_table_to_parquet, dump_parquet_data
+
+from ...fixtures import cleanup_tmp_files_when_done, load_sanitized_references, db, populate_test_mod_reference_types # noqa
+
+
+class TestExportModReferencesToParquet:
+
+    def test_table_definitions(self):
+
+        assert get_table_names() == ['references', 'authors', 'cross_references', 'mesh_terms',
+                                     'mod_corpus_association', 'topic_entity_tags', 'workflow_tags']
+        for table_name in get_table_names():
+            schema = get_table_schema(table_name)
+            query = get_table_query(table_name)
+            assert 'reference_id' in schema.names
+            assert ':mod_id' in query
+            assert 'ORDER BY' in query
+
+    def test_rows_to_record_batch_keeps_schema_for_null_columns(self):
+
+        schema = get_table_schema('cross_references')
+        rows = [(1, 10, 'PMID:1', 'PMID', False, None),
+                (2, 10, 'DOI:10.1/x', 'DOI', None, None)]
+        batch = rows_to_record_batch(rows, schema)
+        assert batch.schema == schema
+        assert batch.num_rows == 2
+        assert batch.column(2).to_pylist() == ['PMID:1', 'DOI:10.1/x']
+
+    def test_write_table_to_parquet(self, db, load_sanitized_references, tmp_path): # noqa
+
+        mod_id = db.execute(text("SELECT mod_id FROM mod WHERE abbreviation = 'ZFIN'")).scalar()
+        expected = db.execute(text("""
+            SELECT count(*) FROM cross_reference x
+              JOIN mod_corpus_association mca ON mca.reference_id = x.reference_id
+             WHERE mca.mod_id = :mod_id AND mca.corpus IS TRUE
+        """), {'mod_id': mod_id}).scalar()
+        assert expected > 0
+
+        out_file = str(tmp_path / "cross_references.parquet")
+        # a tiny batch size forces several row groups
+        count = write_table_to_parquet(db, 'cross_references', mod_id, out_file, batch_size=2)
+        assert count == expected
+
+        parquet_file = pq.ParquetFile(out_file)
+        assert parquet_file.metadata.num_rows == expected
+        assert parquet_file.metadata.num_row_groups == (expected + 1) // 2
+        assert parquet_file.schema_arrow == get_table_schema('cross_references')
+
+    def test_dump_parquet_data(self, db, load_sanitized_references, tmp_path, monkeypatch): # noqa
+
+        monkeypatch.setenv('XML_PATH', str(tmp_path) + '/')
+        counts = dump_parquet_data('ZFIN', tables=['references', 'authors'], upload=False)
+        assert set(counts.keys()) == {'references', 'authors'}
+        assert counts['references'] > 0
+
+        references_dir = tmp_path / 'parquet_data' / 'references' / 'mod=ZFIN'
+        files = list(references_dir.glob('part-*.parquet'))
+        assert len(files) == 1
+        table = pq.read_table(str(files[0]))
+        assert table.num_rows == counts['references']
+        assert all(curie.startswith('AGRKB:') for curie in table.column('curie').to_pylist())
+
+    def test_dump_parquet_data_unknown_mod(self, db, tmp_path, monkeypatch): # noqa
+
+        monkeypatch.setenv('XML_PATH', str(tmp_path) + '/')
+        assert dump_parquet_data('NOT_A_MOD', upload=False) == {}
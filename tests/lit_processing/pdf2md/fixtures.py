@@ -0,0 +1,85 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FakePdfxServer:
+    """
+    Minimal local stand-in for the PDFX API: submissions get a new job id,
+    a job reports "processing" for `polls_before_done` status requests and
+    then "completed" (or "failed" if its id starts with "fail"), and
+    results are "# <method> <job id>".
+    """
+
+    def __init__(self, polls_before_done=2):
+        self.polls_before_done = polls_before_done
+        self.lock = threading.Lock()
+        self.submitted = []
+        self.polls = {}
+        self.running = 0
+        self.max_running = 0
+        self.next_job_prefix = "job"
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server.lock:
+                    process_id = f"{server.next_job_prefix}-{len(server.submitted)}"
+                    server.submitted.append(process_id)
+                    server.polls[process_id] = 0
+                    server.running += 1
+                    server.max_running = max(server.max_running, server.running)
+                self.send_json({"process_id": process_id})
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                process_id = parts[3]
+                if len(parts) == 6 and parts[4] == "download":
+                    body = f"# {parts[5]} {process_id}".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                with server.lock:
+                    server.polls[process_id] += 1
+                    done = server.polls[process_id] > server.polls_before_done
+                    if done and server.polls[process_id] == server.polls_before_done + 1:
+                        server.running -= 1
+                if not done:
+                    self.send_json({"status": "processing"})
+                elif process_id.startswith("fail"):
+                    self.send_json({"status": "failed", "error": "bad pdf"})
+                else:
+                    self.send_json({"status": "completed"})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_pdfx_server(monkeypatch):
+    server = FakePdfxServer()
+    monkeypatch.setenv("PDFX_API_URL", server.url)
+    yield server
+    server.shutdown()
@@ -5,15 +5,20 @@ Tests cover:
 - get_newest_main_pdfs
 - get_unprocessed_pdfs_since_year
 - process_single_reference (nXML preference, PDFX fallback, supplements)
+- _process_reference_list (concurrent pipeline against a fake PDFX server)
 """
 from unittest.mock import MagicMock, patch
 
+from agr_literature_service.lit_processing.pdf2md import pdf2md_utils
 from agr_literature_service.lit_processing.pdf2md.pdf2md import (
+    _process_reference_list,
     get_newest_main_pdfs,
     get_unprocessed_pdfs_since_year,
     process_single_reference,
     EXTRACTION_METHODS,
 )
+from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import poll_pdfx_status, submit_pdf_to_pdfx
+from .fixtures import fake_pdfx_server  # noqa
 
 
 class TestGetNewestMainPdfs:
@@ -557,3 +562,62 @@ class TestExtractionMethodsConstant:
         assert "docling" in EXTRACTION_METHODS
         assert "marker" in EXTRACTION_METHODS
         assert "merged" in EXTRACTION_METHODS
+
+
+class TestProcessReferenceList:
+    """Test the concurrent conversion pipeline of _process_reference_list."""
+
+    @staticmethod
+    def _reference_list(count):
+        return [{
+            "reference_id": i,
+            "reference_curie": f"AGRKB:10100000000000{i}",
+            "referencefile_id": 100 + i,
+            "display_name": f"paper{i}",
+            "file_extension": "pdf",
+            "mod_abbreviation": "WB",
+        } for i in range(count)]
+
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md.send_report")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md.get_service_token", return_value="test_token")
+    def test_references_run_concurrently(self, mock_token, mock_report, fake_pdfx_server):  # noqa
+        sessions = []
+
+        def fake_process_single_reference(db, ref_file_info, token, **kwargs):
+            sessions.append(db)
+            process_id = submit_pdf_to_pdfx(b"%PDF", token)
+            poll_pdfx_status(process_id, token)
+            if ref_file_info["reference_id"] == 3:
+                return False, "no markdown"
+            return True, None
+
+        mock_db = MagicMock()
+        with patch("agr_literature_service.lit_processing.pdf2md.pdf2md.process_single_reference",
+                   side_effect=fake_process_single_reference), \
+                patch.object(pdf2md_utils, "PDFX_POLL_INTERVAL", 0.01), \
+                patch.object(pdf2md_utils, "PDFX_MAX_POLL_INTERVAL", 0.05):
+            result = _process_reference_list(mock_db, self._reference_list(6), "test_token", 0.0,
+                                             max_in_flight=3)
+
+        assert result["total"] == 6
+        assert result["success"] == 5
+        assert result["failed"] == 1
+        assert fake_pdfx_server.max_running > 1
+        assert fake_pdfx_server.max_running <= 3
+        # workers never share the caller's session
+        assert all(session is not mock_db for session in sessions)
+        mock_report.assert_called_once()
+        assert "no markdown" in mock_report.call_args[0][1]
+
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md.send_report")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md.get_service_token", return_value="test_token")
+    def test_single_in_flight_is_sequential(self, mock_token, mock_report):
+        mock_db = MagicMock()
+        with patch("agr_literature_service.lit_processing.pdf2md.pdf2md.process_single_reference",
+                   return_value=(True, None)) as mock_psr:
+            result = _process_reference_list(mock_db, self._reference_list(3), "test_token", 0.0,
+                                             max_in_flight=1)
+        assert result["success"] == 3
+        assert [call.args[0] for call in mock_psr.call_args_list] == [mock_db] * 3
+        assert [call.args[1]["reference_id"] for call in mock_psr.call_args_list] == [0, 1, 2]
+        mock_report.assert_not_called()
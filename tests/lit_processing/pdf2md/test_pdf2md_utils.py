@@ -43,7 +43,10 @@ from agr_literature_service.lit_processing.pdf2md.pdf2md_utils import (
     get_nxml_referencefile,
     process_nxml_to_markdown,
     process_supplemental_pdfs,
+    PdfxStatusPoller,
+    shared_pdfx_poller,
 )
+from .fixtures import fake_pdfx_server  # noqa
 
 
 class TestExtractionMethods:
@@ -96,7 +99,7 @@ class TestTypedDicts:
 class TestSubmitPdfToPdfx:
     """Test submit_pdf_to_pdfx function."""
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_successful_submission(self, mock_post):
         """Test successful PDF submission."""
         mock_response = MagicMock()
@@ -123,7 +126,7 @@ class TestSubmitPdfToPdfx:
         # image manifest can't silently produce zero-image results.
         assert sent_data["clear_cache_scope"] == "extraction"
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_extract_images_can_be_disabled(self, mock_post):
         """Caller can opt out of image extraction explicitly."""
         mock_response = MagicMock()
@@ -142,7 +145,7 @@ class TestSubmitPdfToPdfx:
         assert sent_data["extract_images"] == "false"
         assert sent_data["review_images"] == "false"
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_clear_cache_scope_can_be_disabled(self, mock_post):
         """Passing clear_cache_scope=None omits the field entirely."""
         mock_response = MagicMock()
@@ -159,7 +162,7 @@ class TestSubmitPdfToPdfx:
         sent_data = mock_post.call_args.kwargs["data"]
         assert "clear_cache_scope" not in sent_data
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_raises_error_when_no_process_id(self, mock_post):
         """Test that ValueError is raised when no process_id returned."""
         mock_response = MagicMock()
@@ -175,7 +178,7 @@ class TestSubmitPdfToPdfx:
         assert "No process_id" in str(exc_info.value)
 
     @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.time.sleep")
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_retries_on_connection_error(self, mock_post, mock_sleep):
         """Test that connection errors trigger retries."""
         mock_response = MagicMock()
@@ -200,7 +203,7 @@ class TestSubmitPdfToPdfx:
         assert mock_post.call_count == 3
         assert mock_sleep.call_count == 2
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.post")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.post")
     def test_raises_after_max_retries(self, mock_post):
         """Test that exception is raised after max retries."""
         mock_post.side_effect = requests.exceptions.ConnectionError("Failed")
@@ -216,10 +219,59 @@ class TestSubmitPdfToPdfx:
         assert mock_post.call_count == 2
 
 
+class TestPdfxStatusPoller:
+    """Test the shared PDFX job poller against a fake local PDFX server."""
+
+    def test_tracks_many_jobs_together(self, fake_pdfx_server):  # noqa
+        process_ids = [submit_pdf_to_pdfx(b"%PDF", "test_token") for _ in range(5)]
+        poller = PdfxStatusPoller(lambda: "test_token", poll_interval=0.01, max_poll_interval=0.05)
+        try:
+            futures = [poller.track(process_id) for process_id in process_ids]
+            assert [future.result(timeout=10)["status"] for future in futures] == ["completed"] * 5
+        finally:
+            poller.close()
+        # done jobs are not polled again
+        assert all(count == fake_pdfx_server.polls_before_done + 1
+                   for count in fake_pdfx_server.polls.values())
+        assert download_pdfx_result(process_ids[0], "merged", "test_token") == f"# merged {process_ids[0]}".encode()
+
+    def test_failed_and_timed_out_jobs(self, fake_pdfx_server):  # noqa
+        fake_pdfx_server.next_job_prefix = "fail"
+        failing_id = submit_pdf_to_pdfx(b"%PDF", "test_token")
+        fake_pdfx_server.next_job_prefix = "job"
+        slow_id = submit_pdf_to_pdfx(b"%PDF", "test_token")
+        poller = PdfxStatusPoller(lambda: "test_token", poll_interval=0.01, max_poll_interval=0.01)
+        try:
+            with pytest.raises(RuntimeError, match="bad pdf"):
+                poller.wait(failing_id)
+            fake_pdfx_server.polls_before_done = 1000
+            with pytest.raises(TimeoutError):
+                poller.wait(slow_id, timeout=0.1)
+        finally:
+            poller.close()
+
+    def test_request_errors_fail_the_job_after_max_errors(self):
+        poller = PdfxStatusPoller(lambda: "test_token", poll_interval=0.01, max_poll_interval=0.01, max_errors=2)
+        try:
+            with patch.object(pdf2md_utils, "get_pdfx_job_status",
+                              side_effect=requests.exceptions.ConnectionError("refused")) as mock_status:
+                with pytest.raises(requests.exceptions.ConnectionError):
+                    poller.wait("abc123")
+            assert mock_status.call_count == 2
+        finally:
+            poller.close()
+
+    def test_poll_pdfx_status_uses_shared_poller(self, fake_pdfx_server):  # noqa
+        process_id = submit_pdf_to_pdfx(b"%PDF", "test_token")
+        with shared_pdfx_poller(lambda: "test_token", poll_interval=0.01):
+            assert poll_pdfx_status(process_id, "test_token")["status"] == "completed"
+        assert pdf2md_utils._shared_pdfx_poller is None
+
+
 class TestPollPdfxStatus:
     """Test poll_pdfx_status function."""
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_returns_completed_status(self, mock_get):
         """Test that completed status is returned."""
         mock_response = MagicMock()
@@ -237,7 +289,7 @@ class TestPollPdfxStatus:
 
     @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.time.sleep")
     @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.time.time")
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_polls_until_complete(self, mock_get, mock_time, mock_sleep):
         """Test that polling continues until complete."""
         # Simulate time passing
@@ -258,7 +310,7 @@ class TestPollPdfxStatus:
         assert status["status"] == "completed"
         assert mock_get.call_count == 3
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_raises_runtime_error_on_failed_status(self, mock_get):
         """Test that RuntimeError is raised on failed status."""
         mock_response = MagicMock()
@@ -274,7 +326,7 @@ class TestPollPdfxStatus:
         assert "PDFX job failed" in str(exc_info.value)
 
     @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.time.time")
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_raises_timeout_error(self, mock_get, mock_time):
         """Test that TimeoutError is raised when timeout exceeded."""
         # Simulate time passing beyond timeout
@@ -292,7 +344,7 @@ class TestPollPdfxStatus:
 class TestDownloadPdfxResult:
     """Test download_pdfx_result function."""
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_successful_download(self, mock_get):
         """Test successful result download."""
         mock_response = MagicMock()
@@ -685,7 +737,7 @@ class TestFigureFileClasses:
 class TestDownloadPdfxImageManifest:
     """Test download_pdfx_image_manifest function."""
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_returns_parsed_manifest(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -705,7 +757,7 @@ class TestDownloadPdfxImageManifest:
         assert "/images/urls" in call_args[0][0]
         assert call_args.kwargs["headers"]["Authorization"] == "Bearer test_token"
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_rejects_non_dict_payload(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = ["not", "a", "dict"]
@@ -719,7 +771,7 @@ class TestDownloadPdfxImageManifest:
 class TestDownloadPdfxImage:
     """Test download_pdfx_image function."""
 
-    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.get")
+    @patch("agr_literature_service.lit_processing.pdf2md.pdf2md_utils.requests.Session.get")
     def test_returns_image_bytes(self, mock_get):
         mock_response = MagicMock()
         mock_response.content = b"\x89PNGfake"
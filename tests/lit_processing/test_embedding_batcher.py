@@ -0,0 +1,177 @@
+"""Tests for cross-reference embedding batching; a deterministic local
+embedder stands in for OpenAI, and the DB side of embedding_generation is
+patched out."""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from agr_literature_service.lit_processing.embedding import embedding_generation as eg
+from agr_literature_service.lit_processing.embedding.embedding_batcher import RateLimiter, \
+    embed_chunks_batched, plan_batches
+
+
+class FakeEmbedder:
+    """Vector = [len(text), number of words]; records every request."""
+
+    model = "text-embedding-3-small"
+    model_name = "openai:text-embedding-3-small"
+    dimension = 2
+
+    def __init__(self, fail_on=None, delay=0.0):
+        self.requests = []
+        self.fail_on = fail_on
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def embed(self, texts):
+        with self.lock:
+            self.requests.append(list(texts))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on is not None and self.fail_on in texts:
+                raise RuntimeError("rate limited")
+            return [[float(len(t)), float(len(t.split()))] for t in texts]
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def count_tokens(self, text):
+        return len((text or "").split())
+
+    def truncate_to_limit(self, text):
+        return text
+
+
+def _chunk(content, n_tokens=None):
+    return SimpleNamespace(content=content, n_tokens=n_tokens, embedding=None)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_plan_batches_fills_by_count_and_tokens():
+    chunks = [_chunk(f"c{i}", n_tokens=10) for i in range(7)]
+    assert [len(b) for b, _ in plan_batches(chunks, batch_size=3, max_batch_tokens=1000)] == [3, 3, 1]
+    assert [t for _, t in plan_batches(chunks, batch_size=100, max_batch_tokens=25)] == [20, 20, 20, 10]
+    # an oversized chunk still gets a batch of its own
+    assert [len(b) for b, _ in plan_batches([_chunk("big", n_tokens=50)], max_batch_tokens=25)] == [1]
+
+
+def test_embed_chunks_batched_concurrent_full_batches():
+    chunks = [_chunk(f"chunk number {i}") for i in range(10)]
+    embedder = FakeEmbedder(delay=0.05)
+    failures = embed_chunks_batched(embedder, chunks, batch_size=4, concurrency=3,
+                                    rate_limiter=RateLimiter(6000, 10 ** 7))
+    assert failures == []
+    assert [len(r) for r in embedder.requests if len(r) == 4] == [4, 4]
+    assert sum(len(r) for r in embedder.requests) == 10
+    assert embedder.max_running > 1
+    assert all(c.embedding == [float(len(c.content)), 3.0] for c in chunks)
+
+
+def test_failed_batch_only_leaves_its_chunks_unembedded():
+    chunks = [_chunk(f"chunk {i}") for i in range(6)]
+    failures = embed_chunks_batched(FakeEmbedder(fail_on="chunk 4"), chunks, batch_size=3,
+                                    rate_limiter=RateLimiter(6000, 10 ** 7))
+    assert len(failures) == 1
+    assert [c.embedding is None for c in chunks] == [False] * 3 + [True] * 3
+
+
+def test_rate_limiter_waits_for_request_and_token_budget():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    limiter.acquire(600)
+    # bucket drained: the next request waits for 100 tokens at 10 tokens/s
+    limiter.acquire(100)
+    assert clock.now == pytest.approx(10.0)
+    for _ in range(59):
+        limiter.acquire()
+    limiter.acquire()
+    assert clock.now > 10.0
+
+
+MERGED_MD = """# daf-16 regulates longevity
+
+## Abstract
+
+We studied daf-16 and found it extends lifespan in N2 worms.
+
+## Introduction
+
+The daf-16 gene was studied. We measured expression in N2 worms.
+
+## Results
+
+Mutant worms lived longer than N2 controls in every assay we ran.
+"""
+
+
+class FakeChunker:
+    """One chunk per paragraph (the real chunker needs tiktoken's encodings)."""
+
+    name = "paragraph_pack"
+    target_tokens = 400
+
+    def __init__(self, profile_name):
+        self.profile_name = profile_name
+
+    def chunk(self, content, reference_curie):
+        from agr_abc_document_parsers.embeddings import Chunk
+        paragraphs = [p for p in content.split("\n\n") if p and not p.startswith("#")]
+        return [Chunk(reference_curie=reference_curie, chunk_index=i, content=p,
+                      profile_name=self.profile_name, n_tokens=len(p.split()))
+                for i, p in enumerate(paragraphs)]
+
+    def document_text(self, chunks):
+        return "\n".join(c.content for c in chunks)
+
+
+def test_references_share_batches_and_split_back_per_source():
+    pytest.importorskip("agr_abc_document_parsers.embeddings",
+                        reason="embeddings extra / shared release not installed")
+    references = [(rid, f"AGRKB:10100000000000{rid}") for rid in range(1, 6)]
+
+    def sources_to_embed(db, reference_id, reference_curie, profile_name):
+        result = {"embedded": 0, "skipped_existing": 0, "failed": 0, "sources": 1,
+                  "chunks": 0, "cache_hits": 0}
+        return None, result, [(reference_curie, SimpleNamespace(referencefile_id=100 + reference_id))]
+
+    registered = {}
+
+    def register(db, curie, source, chunks, *args):
+        registered[curie] = chunks
+
+    embedder = FakeEmbedder()
+    with patch.object(eg, "_sources_to_embed", side_effect=sources_to_embed), \
+            patch.object(eg, "download_file", return_value=MERGED_MD), \
+            patch.object(eg, "_register_parquet", side_effect=register), \
+            patch("agr_abc_document_parsers.embeddings.ParagraphPackChunker", FakeChunker):
+        results = eg.generate_classifier_embeddings_for_references(None, references, embedder=embedder)
+
+    assert all(results[rid]["embedded"] == 1 for rid, _ in references)
+    # all 20 chunks of the five references went out in one request
+    assert [len(r) for r in embedder.requests] == [20]
+    for _, curie in references:
+        chunks = registered[curie]
+        assert {c.reference_curie for c in chunks} == {curie}
+        assert chunks[-1].is_document_level
+        assert all(c.embedding is not None for c in chunks)
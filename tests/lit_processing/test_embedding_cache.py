@@ -0,0 +1,74 @@
+"""Tests for the local (model, chunk text) embedding cache."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from agr_literature_service.lit_processing.embedding import embedding_generation as eg
+from agr_literature_service.lit_processing.embedding.embedding_cache import EmbeddingCache, \
+    fill_from_cache, get_embedding_cache, text_hash
+from .test_embedding_batcher import MERGED_MD, FakeChunker, FakeEmbedder
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cache.put_many("model/2", ["a", "b"], [[0.5, 1.25], [0.1, -2.0]])
+    a, missing, b = cache.get_many("model/2", ["a", "c", "b"])
+    assert a == [0.5, 1.25]
+    assert missing is None
+    assert b == pytest.approx([0.1, -2.0], abs=1e-7)
+    # another model never sees these vectors
+    assert cache.get_many("other/2", ["a"]) == [None]
+    # the file is shared: a second handle (another process) sees them too
+    assert EmbeddingCache(cache.path).get_many("model/2", ["a"]) == [[0.5, 1.25]]
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_entries=10)
+    for i in range(10):
+        cache.put_many("m", [f"text {i}"], [[float(i)]])
+        cache._connection.execute("UPDATE embedding SET last_used = ? WHERE text_hash = ?",
+                                  [i, text_hash(f"text {i}")])
+    cache.put_many("m", ["text 10"], [[10.0]])
+    assert cache._count() == 9
+    assert cache.get_many("m", ["text 0", "text 1", "text 10"]) == [None, None, [10.0]]
+
+
+def test_fill_from_cache_returns_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    embedder = FakeEmbedder()
+    cache.put_many("openai:text-embedding-3-small/2", ["known"], [[1.0, 2.0]])
+    chunks = [SimpleNamespace(content=text, embedding=None) for text in ("known", "new")]
+    assert fill_from_cache(cache, embedder, chunks) == [chunks[1]]
+    assert chunks[0].embedding == [1.0, 2.0]
+
+
+def test_unchanged_chunks_are_not_embedded_again(tmp_path, monkeypatch):
+    pytest.importorskip("agr_abc_document_parsers.embeddings",
+                        reason="embeddings extra / shared release not installed")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite"))
+    assert get_embedding_cache() is not None
+
+    def sources_to_embed(db, reference_id, reference_curie, profile_name):
+        result = {"embedded": 0, "skipped_existing": 0, "failed": 0, "sources": 1,
+                  "chunks": 0, "cache_hits": 0}
+        return None, result, [(reference_curie, SimpleNamespace(referencefile_id=100 + reference_id))]
+
+    def run(markdown):
+        embedder = FakeEmbedder()
+        with patch.object(eg, "_sources_to_embed", side_effect=sources_to_embed), \
+                patch.object(eg, "download_file", return_value=markdown), \
+                patch.object(eg, "_register_parquet"), \
+                patch("agr_abc_document_parsers.embeddings.ParagraphPackChunker", FakeChunker):
+            results = eg.generate_classifier_embeddings_for_references(
+                None, [(1, "AGRKB:101000000000001")], embedder=embedder)
+        return results[1], sum(len(r) for r in embedder.requests)
+
+    first, embedded = run(MERGED_MD)
+    assert (first["chunks"], first["cache_hits"], embedded) == (4, 0, 4)
+
+    # regenerated markdown with one changed paragraph: only it and the
+    # whole-document chunk are embedded again
+    second, embedded = run(MERGED_MD.replace("every assay", "each assay"))
+    assert (second["embedded"], second["chunks"], second["cache_hits"], embedded) == (1, 4, 2, 2)
@@ -0,0 +1,175 @@
+"""Tests for the local reference embedding index; embedding_file rows and
+parquet downloads are patched, so no DB or S3 is needed."""
+
+import io
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from agr_literature_service.lit_processing.embedding import embedding_index as ei
+
+
+def _vectors(n, dimension=16, seed=1):
+    return np.random.default_rng(seed).normal(size=(n, dimension)).astype(np.float32)
+
+
+def _parquet(chunk_vectors, document_vector=None):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    embeddings = [list(map(float, v)) for v in chunk_vectors]
+    flags = [False] * len(embeddings)
+    if document_vector is not None:
+        embeddings.append(list(map(float, document_vector)))
+        flags.append(True)
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"embedding": embeddings, "is_document_level": flags}), buffer)
+    return buffer.getvalue()
+
+
+class TestVectorIndex:
+
+    def test_exact_search_and_incremental_updates(self, tmp_path):
+        vectors = _vectors(20)
+        index = ei.VectorIndex(str(tmp_path))
+        index.update([(100 + i, 1000 + i, v) for i, v in enumerate(vectors)])
+        assert len(index) == 20
+
+        results = index.search(vectors[3], k=3)
+        assert results[0][0] == 103
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert len(results) == 3
+        assert index.search(vectors[3], k=3, exclude=[103])[0][0] != 103
+
+        # replace one vector and drop another; a second handle (another
+        # process) notices and reloads
+        reader = ei.VectorIndex(str(tmp_path))
+        index.update([(105, 2005, vectors[3])], removals=[110])
+        assert reader.is_stale()
+        reader.load()
+        assert 110 not in reader
+        assert reader.sources()[105] == 2005
+        assert {r for r, _ in reader.search(vectors[3], k=2)} == {103, 105}
+        # the new vector of 105 is appended; its old row and 110's are removed
+        assert reader.count == 21
+        assert len(reader) == 19
+
+    def test_updates_leave_older_generations_intact(self, tmp_path):
+        vectors = _vectors(20)
+        index = ei.VectorIndex(str(tmp_path))
+        index.update([(100 + i, 1000 + i, v) for i, v in enumerate(vectors)])
+        reader = ei.VectorIndex(str(tmp_path))
+        index.update([(105, 2005, vectors[3])], removals=[110])
+        # the reader has not reloaded: 105 and 110 still have their old vectors
+        assert np.allclose(reader.vector(105), ei._normalize(vectors[5]))
+        results = reader.search_similar(110, k=3)
+        assert len(results) == 3
+        assert 110 not in {r for r, _ in results}
+        assert results == index.search(vectors[10], k=3, exclude=[110])
+
+    def test_zero_query_finds_nothing(self, tmp_path):
+        index = ei.VectorIndex(str(tmp_path))
+        index.update([(i, i, v) for i, v in enumerate(_vectors(4))])
+        assert index.search(np.zeros(16, dtype=np.float32)) == []
+
+    def test_removed_rows_are_compacted(self, tmp_path):
+        vectors = _vectors(8)
+        index = ei.VectorIndex(str(tmp_path))
+        index.update([(i, i, v) for i, v in enumerate(vectors)])
+        index.update([], removals=[0])
+        assert index.count == 8
+        # a quarter of the rows removed: the files are rewritten without them
+        index.update([], removals=[1, 2])
+        assert index.count == 5
+        assert index.search(vectors[6], k=1)[0][0] == 6
+
+    def test_reader_keeps_its_generation_across_a_compaction(self, tmp_path):
+        vectors = _vectors(8)
+        index = ei.VectorIndex(str(tmp_path))
+        index.update([(i, i, v) for i, v in enumerate(vectors)])
+        reader = ei.VectorIndex(str(tmp_path))
+        index.update([], removals=[0, 1])
+        index.update([(8, 8, vectors[0])])
+        # the reader still searches the generation it loaded, in full
+        assert reader.count == 8
+        assert reader.search(vectors[1], k=1)[0][0] == 1
+        reader.load()
+        assert reader.generation == index.generation
+        assert reader.search(vectors[0], k=1)[0][0] == 8
+        # only the files of the current and the previous generation are kept
+        names = sorted(p.name for p in tmp_path.iterdir() if p.name != "manifest.json")
+        assert names == ["rows.1.npy", "rows.2.npy", "vectors.1.f32"]
+
+    def test_approximate_search_finds_near_neighbours(self, tmp_path):
+        # 40 tight clusters of 10 vectors each
+        centers = _vectors(40, dimension=32, seed=2)
+        noise = _vectors(400, dimension=32, seed=3) * 0.05
+        vectors = np.repeat(centers, 10, axis=0) + noise
+        with patch.object(ei, "IVF_MIN_ROWS", 100):
+            index = ei.VectorIndex(str(tmp_path))
+            index.update([(i, i, v) for i, v in enumerate(vectors[:300])])
+            index.update([(i, i, v) for i, v in enumerate(vectors[300:], start=300)])
+        assert index._snapshot.centroids is not None
+        assert len(index._snapshot.assignment) == 400
+        for query in (5, 123, 355):
+            exact = {r for r, _ in index.search(vectors[query], k=10)}
+            approximate = {r for r, _ in index.search(vectors[query], k=10, exact=False, nprobe=4)}
+            assert len(exact & approximate) >= 8
+
+
+def test_parquet_vector_prefers_the_document_level_embedding():
+    vectors = _vectors(3)
+    assert np.allclose(ei.parquet_vector(_parquet(vectors[:2], document_vector=vectors[2])), vectors[2])
+    assert np.allclose(ei.parquet_vector(_parquet(vectors[:2])), vectors[:2].mean(axis=0), atol=1e-6)
+
+
+class TestReferenceEmbeddingIndex:
+
+    def test_refresh_indexes_new_and_repointed_parquets(self, tmp_path):
+        # each "parquet" here is just its reference-level vector
+        vectors = _vectors(4)
+        contents = {f"md5-{i}": v.tobytes() for i, v in enumerate(vectors)}
+        fetched = []
+
+        def fetch(md5sum):
+            fetched.append(md5sum)
+            return contents[md5sum]
+
+        index = ei.ReferenceEmbeddingIndex(str(tmp_path), fetch=fetch)
+        registered = {1: (11, "md5-0"), 2: (12, "md5-1"), 3: (13, "md5-2")}
+        with patch.object(ei.ReferenceEmbeddingIndex, "_registered", side_effect=lambda db: dict(registered)), \
+                patch.object(ei, "parquet_vector", side_effect=lambda c: np.frombuffer(c, dtype=np.float32)):
+            assert index.refresh(None, limit=2)["pending"] == 1
+            assert index.refresh(None)["indexed"] == 1
+            assert sorted(fetched) == ["md5-0", "md5-1", "md5-2"]
+            assert np.allclose(index.index.vector(2), ei._normalize(vectors[1]), atol=1e-6)
+
+            # nothing changed: nothing is fetched again
+            assert index.refresh(None)["indexed"] == 0
+            assert len(fetched) == 3
+
+            registered[1] = (21, "md5-3")
+            del registered[2]
+            assert index.refresh(None) == {"indexed": 1, "removed": 1, "pending": 0, "failed": 0, "size": 2}
+            assert index.index.sources() == {1: 21, 3: 13}
+        assert index.search(2) is None
+        assert index.search(1, k=1)[0][0] == 3
+
+    def test_background_refresh_runs_on_start_and_when_marked_stale(self, tmp_path):
+        index = ei.ReferenceEmbeddingIndex(str(tmp_path))
+        refreshed = threading.Semaphore(0)
+
+        def refresh(db, limit=None):
+            refreshed.release()
+            return {}
+
+        with patch.object(index, "refresh", side_effect=refresh), \
+                patch.object(ei, "EMBEDDING_INDEX_REFRESH_SECONDS", 3600):
+            index.start_background_refresh(MagicMock())
+            assert refreshed.acquire(timeout=5)
+            # a second start does not start another thread
+            index.start_background_refresh(MagicMock())
+            assert not refreshed.acquire(timeout=0.2)
+            index.mark_stale()
+            assert refreshed.acquire(timeout=5)
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from jose import jwt
+
+from agr_literature_service.lit_processing.utils.http_utils import HTTP_POOL_MAXSIZE, ServiceTokenProvider, \
+    get_http_session, reset_http_sessions
+
+
+def make_token(expires_in, subject='service'):
+    return jwt.encode({'sub': subject, 'exp': int(time.time() + expires_in)}, 'secret', algorithm='HS256')
+
+
+class CountingFetcher:
+
+    def __init__(self, expires_in):
+        self.expires_in = expires_in
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            return make_token(self.expires_in, subject=str(self.calls))
+
+
+class TestHttpUtils:
+
+    def test_session_is_shared_and_pooled(self):
+        session = get_http_session()
+        assert get_http_session() is session
+        adapter = session.get_adapter('https://pdfx.alliancegenome.org')
+        assert adapter._pool_maxsize == HTTP_POOL_MAXSIZE
+        assert adapter.max_retries.total == 3
+        reset_http_sessions()
+        assert get_http_session() is not session
+
+    def test_token_is_cached(self):
+        fetch = CountingFetcher(expires_in=3600)
+        provider = ServiceTokenProvider(fetch, refresh_margin=60)
+        threads = [threading.Thread(target=provider.get_token) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert provider.get_token() == provider.get_token()
+        assert fetch.calls == 1
+
+    def test_expiring_token_is_refreshed_in_background(self):
+        fetch = CountingFetcher(expires_in=100)
+        provider = ServiceTokenProvider(fetch, refresh_margin=60)
+        first = provider.get_token()
+        # 100s left: still usable, but inside 2 * margin
+        assert provider.get_token() == first
+        for _ in range(50):
+            if fetch.calls == 2:
+                break
+            time.sleep(0.05)
+        assert fetch.calls == 2
+        assert provider.get_token() != first
+
+    def test_expired_or_invalidated_token_is_fetched_again(self):
+        fetch = CountingFetcher(expires_in=30)
+        provider = ServiceTokenProvider(fetch, refresh_margin=60)
+        provider.get_token()
+        provider.get_token()
+        assert fetch.calls == 2
+
+        fetch.expires_in = 3600
+        provider.invalidate()
+        provider.get_token()
+        assert fetch.calls == 3
+
+    def test_forked_child_gets_its_own_session(self):
+        parent_session = get_http_session()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            os.close(read_fd)
+            os.write(write_fd, b'1' if get_http_session() is not parent_session else b'0')
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        assert os.read(read_fd, 1) == b'1'
+        os.close(read_fd)
@@ -0,0 +1,106 @@
+import gzip
+import io
+import os
+
+import boto3  # type: ignore
+import pytest
+from moto import mock_s3  # type: ignore
+
+from agr_literature_service.lit_processing.utils.s3_utils import MIN_PART_SIZE, S3_MAX_POOL_CONNECTIONS, \
+    S3MultipartUploadStream, open_s3_upload_stream, upload_stream_to_s3, copy_file_in_s3, get_s3_client, \
+    reset_s3_clients, delete_files_from_s3
+
+BUCKET = 'agr-literature-test'
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    reset_s3_clients()
+    with mock_s3():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    reset_s3_clients()
+
+
+def get_object_bytes(s3_client, key):
+    return s3_client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+
+
+class TestS3Utils:
+
+    def test_small_stream_uses_single_put(self, s3_client):
+        with S3MultipartUploadStream(BUCKET, 'small.txt', s3_client=s3_client) as sink:
+            sink.write(b'hello ')
+            sink.write(b'world')
+            assert sink.upload_id is None
+        assert get_object_bytes(s3_client, 'small.txt') == b'hello world'
+
+    def test_multipart_upload_keeps_part_order(self, s3_client):
+        data = os.urandom(2 * MIN_PART_SIZE + 12345)
+        with S3MultipartUploadStream(BUCKET, 'big.bin', part_size=MIN_PART_SIZE, max_workers=3,
+                                     s3_client=s3_client) as sink:
+            # odd write sizes so parts straddle the write boundaries
+            for start in range(0, len(data), 1000003):
+                sink.write(data[start:start + 1000003])
+            assert sink.upload_id is not None
+        assert get_object_bytes(s3_client, 'big.bin') == data
+        assert s3_client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+
+    def test_exception_aborts_upload(self, s3_client):
+        data = os.urandom(MIN_PART_SIZE + 1)
+        with pytest.raises(RuntimeError):
+            with S3MultipartUploadStream(BUCKET, 'aborted.bin', part_size=MIN_PART_SIZE,
+                                         s3_client=s3_client) as sink:
+                sink.write(data)
+                raise RuntimeError("producer failed")
+        assert 'Contents' not in s3_client.list_objects_v2(Bucket=BUCKET, Prefix='aborted.bin')
+        assert s3_client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+
+    def test_open_s3_upload_stream_compresses(self, s3_client):
+        with open_s3_upload_stream(BUCKET, 'data.json.gz', compress=True, s3_client=s3_client) as stream:
+            stream.write(b'{"data": []}')
+        assert gzip.decompress(get_object_bytes(s3_client, 'data.json.gz')) == b'{"data": []}'
+
+    def test_upload_stream_to_s3_and_copy(self, s3_client):
+        data = b'reference data\n' * 1000
+        assert upload_stream_to_s3(io.BytesIO(data), BUCKET, 'recent/file.gz', compress=True)
+        assert gzip.decompress(get_object_bytes(s3_client, 'recent/file.gz')) == data
+
+        assert copy_file_in_s3(BUCKET, 'recent/file.gz', 'latest/file.gz')
+        assert get_object_bytes(s3_client, 'latest/file.gz') == get_object_bytes(s3_client, 'recent/file.gz')
+
+    def test_delete_files_from_s3(self, s3_client):
+        for key in ['dump/1.dat.gz', 'dump/toc.dat', 'other/file']:
+            s3_client.put_object(Bucket=BUCKET, Key=key, Body=b'x')
+        assert delete_files_from_s3(BUCKET, ['dump/1.dat.gz', 'dump/toc.dat'])
+        keys = [obj['Key'] for obj in s3_client.list_objects_v2(Bucket=BUCKET)['Contents']]
+        assert keys == ['other/file']
+        assert delete_files_from_s3(BUCKET, [])
+
+    def test_upload_stream_to_missing_bucket_returns_false(self, s3_client):
+        assert upload_stream_to_s3(io.BytesIO(b'x'), 'no-such-bucket', 'file.txt') is False
+
+    def test_get_s3_client_is_shared(self, s3_client):
+        client = get_s3_client()
+        assert get_s3_client() is client
+        assert client.meta.config.max_pool_connections == S3_MAX_POOL_CONNECTIONS
+        assert get_s3_client('key', 'secret') is not client
+        reset_s3_clients()
+        assert get_s3_client() is not client
+
+    def test_forked_child_gets_its_own_client(self, s3_client):
+        parent_client = get_s3_client()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            os.close(read_fd)
+            os.write(write_fd, b'1' if get_s3_client() is not parent_client else b'0')
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        assert os.read(read_fd, 1) == b'1'
+        os.close(read_fd)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from agr_literature_service.lit_processing.utils.xml_conversion_pool import XmlConversionBusy, \
+    XmlConversionPool, XmlConversionTimeout
+
+MINIMAL_JATS = b"""\
+<?xml version="1.0" encoding="UTF-8"?>
+<article><front><article-meta>
+  <title-group><article-title>JATS Title</article-title></title-group>
+</article-meta></front>
+<body><sec><title>Intro</title><p>Body text.</p></sec></body></article>
+"""
+
+
+def slow_convert(xml_content, source_format):
+    time.sleep(float(xml_content))
+    return source_format
+
+
+class TestXmlConversionPool:
+
+    def test_converts_in_worker_process(self):
+        pool = XmlConversionPool(max_workers=2, max_pending=2, timeout=60)
+        try:
+            markdown = pool.convert(MINIMAL_JATS, "jats")
+            assert "JATS Title" in markdown
+            with pytest.raises(ValueError):
+                pool.convert(MINIMAL_JATS, "docx")
+        finally:
+            pool.shutdown()
+
+    def test_full_pool_refuses_when_not_waiting(self):
+        pool = XmlConversionPool(max_workers=1, max_pending=0, timeout=60, convert=slow_convert)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(pool.convert(b"1", "jats")))
+        try:
+            thread.start()
+            time.sleep(0.2)
+            with pytest.raises(XmlConversionBusy):
+                pool.convert(b"0", "tei", wait=False)
+            # waiting callers get the slot once it is released
+            assert pool.convert(b"0", "tei") == "tei"
+            thread.join()
+            assert results == ["jats"]
+        finally:
+            pool.shutdown()
+
+    def test_timeout_kills_conversion_and_pool_recovers(self):
+        pool = XmlConversionPool(max_workers=1, max_pending=1, timeout=60, convert=slow_convert)
+        try:
+            start = time.time()
+            with pytest.raises(XmlConversionTimeout):
+                pool.convert(b"30", "jats", timeout=0.5)
+            assert time.time() - start < 10
+            assert pool.convert(b"0", "tei") == "tei"
+        finally:
+            pool.shutdown()
+
+    def test_inline_without_workers(self):
+        pool = XmlConversionPool(max_workers=0, convert=lambda content, source_format: source_format)
+        assert pool.convert(b"<xml/>", "tei") == "tei"